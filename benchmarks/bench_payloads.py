@@ -0,0 +1,148 @@
+"""
+Callback payload benchmarks.
+
+For each scenario a synthetic conversation is generated and the payloads of the
+``messages`` and ``new_message`` props are measured: their JSON size, how long
+serializing and parsing them takes with the standard library (and with orjson
+and ``dash_chat.messages`` when available), and the size of a reply with
+``history_mode="server"``, which only carries the new message:
+
+    python benchmarks/bench_payloads.py
+    python benchmarks/bench_payloads.py --quick --output /tmp/bench.json
+
+Results are written as JSON, by default to the untracked
+``benchmarks/results/local/python-<version>.json`` so a run never overwrites
+the committed baselines next to it; record a new baseline with
+``--output benchmarks/results/python-<version>.json``. Compare two result
+files with ``benchmarks/compare.py``.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+from conversations import generate_conversation
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+SCENARIOS = {
+    "messages_100": {"messages": 100},
+    "messages_1k": {"messages": 1000},
+    "messages_10k": {"messages": 10000},
+    "markdown_rich_1k": {"messages": 1000, "markdown": "rich"},
+    "tables_1k_rows": {"messages": 200, "table_rows": 1000},
+    "graphs_10k_points": {"messages": 200, "graph_points": 10000},
+    "attachments_1mb": {"messages": 100, "attachment_bytes": 2**20},
+}
+QUICK = ("messages_100", "markdown_rich_1k", "tables_1k_rows")
+
+
+def _timed(function, repeat):
+    """Return the minimum and median time of ``function`` in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return round(min(times), 3), round(statistics.median(times), 3)
+
+
+def _measure(name, timings, function, repeat):
+    best, median = _timed(function, repeat)
+    timings[name + "_ms"] = best
+    timings[name + "_median_ms"] = median
+
+
+def run_scenario(params, repeat):
+    conversation = generate_conversation(**params)
+    new_message = conversation[-2]
+    reply = conversation[-1]
+    response = json.dumps({"messages": conversation})
+    encoded = response.encode("utf-8")
+
+    metrics = {
+        "messages_bytes": len(encoded),
+        "new_message_bytes": len(json.dumps({"new_message": new_message})),
+        "server_reply_bytes": len(json.dumps({"messages": [reply]})),
+    }
+    _measure("json_dumps", metrics, lambda: json.dumps(conversation), repeat)
+    _measure("json_loads", metrics, lambda: json.loads(response), repeat)
+
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+    if orjson is not None:
+        _measure("orjson_dumps", metrics, lambda: orjson.dumps(conversation), repeat)
+        _measure("orjson_loads", metrics, lambda: orjson.loads(encoded), repeat)
+
+    try:
+        from dash_chat.messages import parse_messages
+    except ImportError:
+        parse_messages = None
+    if parse_messages is not None:
+        _measure(
+            "parse_messages", metrics, lambda: parse_messages(conversation), repeat
+        )
+    return {"params": params, "metrics": metrics}
+
+
+def _version():
+    with open(os.path.join(os.path.dirname(HERE), "package.json")) as f:
+        return json.load(f)["version"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", help="where to write the results")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="small scenarios only")
+    parser.add_argument("scenarios", nargs="*", help="scenarios to run (all)")
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or (QUICK if args.quick else list(SCENARIOS))
+    version = _version()
+    results = {}
+    for name in names:
+        results[name] = run_scenario(SCENARIOS[name], args.repeat)
+        metrics = results[name]["metrics"]
+        print(
+            "{:<20} {:>12,} bytes  dumps {:>9.2f} ms  loads {:>9.2f} ms".format(
+                name,
+                metrics["messages_bytes"],
+                metrics["json_dumps_ms"],
+                metrics["json_loads_ms"],
+            )
+        )
+
+    output = args.output
+    if output is None:
+        os.makedirs(os.path.join(HERE, "results", "local"), exist_ok=True)
+        output = os.path.join(
+            HERE, "results", "local", "python-{}.json".format(version)
+        )
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "suite": "python",
+                "version": version,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "date": datetime.date.today().isoformat(),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+        f.write("\n")
+    print("Results written to {}".format(output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Conversation search benchmark.
+
+Indexes ``--conversations`` synthetic conversations of ``--messages`` messages
+each with ``dash_chat.search.SearchIndex`` and measures the median time of
+queries in one conversation, with whole words and with prefixes of the last
+word as typed:
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --conversations 100 --path /tmp/search.db
+
+The words are common to every conversation, the worst case for queries, which
+have to skip the matches of all the other conversations.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from conversations import WORDS  # noqa: E402
+
+from dash_chat.search import SearchIndex  # noqa: E402
+
+VOCABULARY = WORDS + "sales revenue alpha beta region product units margin".split()
+QUERIES = [
+    "table",
+    "revenue",
+    "sales revenue",
+    "alpha beta",
+    "ta",
+    "tab",
+    "reven",
+    "sales rev",
+]
+
+
+def build(index, conversations, messages, seed=0):
+    rng = random.Random(seed)
+    for conversation in range(conversations):
+        index.add(
+            "chat",
+            "session-{}".format(conversation),
+            0,
+            [
+                {
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "content": " ".join(rng.choice(VOCABULARY) for _ in range(12)),
+                }
+                for i in range(messages)
+            ],
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--path", help="index file to build (in memory by default)")
+    args = parser.parse_args(argv)
+
+    index = SearchIndex(args.path)
+    started = time.perf_counter()
+    build(index, args.conversations, args.messages)
+    print(
+        "Indexed {:,} messages in {:.1f} s".format(
+            args.conversations * args.messages, time.perf_counter() - started
+        )
+    )
+    rng = random.Random(1)
+    for query in QUERIES:
+        times = []
+        for _ in range(args.repeat):
+            session = "session-{}".format(rng.randrange(args.conversations))
+            started = time.perf_counter()
+            index.search("chat", session, query)
+            times.append((time.perf_counter() - started) * 1000)
+        print("{:<16} {:>8.2f} ms".format(query, statistics.median(times)))
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare two benchmark result files.
+
+    python benchmarks/compare.py benchmarks/results/python-0.3.0.json new.json
+
+Prints every metric of the scenarios both files share with its relative
+change, and exits with status 1 when a timing (``*_ms``) or size (``*_bytes``)
+metric grew by more than ``--threshold`` (20% by default).
+"""
+
+import argparse
+import json
+import sys
+
+
+def compare(old, new, threshold):
+    """Return the rows of the comparison and the names of regressed metrics."""
+    rows = []
+    regressions = []
+    for scenario, result in new["results"].items():
+        previous = old["results"].get(scenario)
+        if previous is None:
+            continue
+        for metric, value in result["metrics"].items():
+            before = previous["metrics"].get(metric)
+            if not before or not isinstance(value, (int, float)):
+                continue
+            change = (value - before) / before
+            rows.append((scenario, metric, before, value, change))
+            if change > threshold and metric.endswith(("_ms", "_bytes")):
+                regressions.append("{}.{}".format(scenario, metric))
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows, regressions = compare(old, new, args.threshold)
+    print("{} {} -> {}".format(new.get("suite", ""), old["version"], new["version"]))
+    for scenario, metric, before, value, change in rows:
+        print(
+            "{:<20} {:<26} {:>14,.3f} {:>14,.3f} {:>+8.1%}{}".format(
+                scenario,
+                metric,
+                before,
+                value,
+                change,
+                (
+                    "  <-- regression"
+                    if "{}.{}".format(scenario, metric) in regressions
+                    else ""
+                ),
+            )
+        )
+    if regressions:
+        print("{} regression(s) over {:.0%}".format(len(regressions), args.threshold))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
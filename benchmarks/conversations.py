@@ -0,0 +1,149 @@
+"""
+Synthetic conversations for benchmarks.
+
+``generate_conversation`` builds a deterministic list of messages in the shape
+of the ChatComponent ``messages`` prop, alternating user and assistant turns.
+Every ``rich_every``-th assistant message carries a table and/or a graph and
+every ``rich_every``-th user message an attachment, when their size is set:
+
+    messages = generate_conversation(
+        1000, markdown="rich", table_rows=200, graph_points=5000
+    )
+
+``benchmarks/js/conversations.js`` builds the same conversations for the Jest
+benchmarks.
+"""
+
+import base64
+import random
+
+WORDS = (
+    "dash chat component message reply stream table graph figure token model "
+    "latency budget history session server browser render cache index query"
+).split()
+TABLE_COLUMNS = ["Region", "Product", "Units", "Revenue", "Margin"]
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def markdown_text(rng, complexity="plain"):
+    """Return assistant text: one paragraph, or rich Markdown with ``"rich"``."""
+    if complexity == "plain":
+        return _sentence(rng, 24)
+    if complexity != "rich":
+        raise ValueError("markdown must be 'plain' or 'rich'")
+    rows = "\n".join(
+        "| {} | {} | {:.2f} |".format(
+            rng.choice(WORDS), rng.randint(1, 999), rng.random()
+        )
+        for _ in range(5)
+    )
+    return (
+        "## {}\n\n{} **{}** and `{}`.\n\n- {}\n- {}\n- [{}](https://example.com)\n\n"
+        "```python\nfor {} in range({}):\n    print({})\n```\n\n"
+        "| Name | Count | Share |\n| --- | --- | --- |\n{}\n"
+    ).format(
+        _sentence(rng, 4),
+        _sentence(rng),
+        rng.choice(WORDS),
+        rng.choice(WORDS),
+        _sentence(rng, 6),
+        _sentence(rng, 6),
+        rng.choice(WORDS),
+        rng.choice(WORDS),
+        rng.randint(2, 20),
+        rng.choice(WORDS),
+        rows,
+    )
+
+
+def table_part(rng, rows):
+    return {
+        "type": "table",
+        "header": TABLE_COLUMNS,
+        "data": [
+            [
+                rng.choice(["North", "South", "East", "West"]),
+                rng.choice(WORDS),
+                rng.randint(1, 10000),
+                round(rng.random() * 1e6, 2),
+                round(rng.random(), 4),
+            ]
+            for _ in range(rows)
+        ],
+        "props": {"striped": True, "hover": True},
+    }
+
+
+def graph_part(rng, points):
+    value = 0.0
+    y = []
+    for _ in range(points):
+        value += rng.gauss(0, 1)
+        y.append(round(value, 6))
+    return {
+        "type": "graph",
+        "props": {
+            "figure": {
+                "data": [
+                    {
+                        "type": "scatter",
+                        "mode": "lines",
+                        "x": list(range(points)),
+                        "y": y,
+                    }
+                ],
+                "layout": {"title": {"text": "Series"}},
+            }
+        },
+    }
+
+
+def attachment_part(rng, size):
+    data = rng.randbytes(size)
+    return {
+        "type": "attachment",
+        "file": "data:application/octet-stream;base64,"
+        + base64.b64encode(data).decode("ascii"),
+        "fileName": "data.bin",
+        "fileType": "application/octet-stream",
+    }
+
+
+def generate_conversation(
+    messages,
+    markdown="plain",
+    table_rows=0,
+    graph_points=0,
+    attachment_bytes=0,
+    rich_every=10,
+    seed=0,
+):
+    """Return ``messages`` synthetic messages; the same arguments give the same list."""
+    rng = random.Random(seed)
+    conversation = []
+    for i in range(messages):
+        turn = i // 2
+        rich = turn % rich_every == rich_every - 1
+        if i % 2 == 0:
+            content = _sentence(rng)
+            if rich and attachment_bytes:
+                content = [
+                    {"type": "text", "text": content},
+                    attachment_part(rng, attachment_bytes),
+                ]
+            conversation.append({"role": "user", "content": content, "id": i})
+            continue
+        content = markdown_text(rng, markdown)
+        if rich and (table_rows or graph_points):
+            content = [{"type": "text", "text": content}]
+            if table_rows:
+                content.append(table_part(rng, table_rows))
+            if graph_points:
+                content.append(graph_part(rng, graph_points))
+        conversation.append(
+            {"role": "assistant", "content": content, "id": "reply-{}".format(i)}
+        )
+    return conversation
@@ -0,0 +1,10 @@
+const path = require("path");
+const baseConfig = require("../jest.config");
+
+// runs benchmarks/js/*.bench.js with the unit test setup: npm run bench:js
+module.exports = async () => ({
+    ...(await baseConfig()),
+    rootDir: path.resolve(__dirname, ".."),
+    testMatch: ["<rootDir>/benchmarks/js/**/*.bench.js"],
+    testTimeout: 600000,
+});
@@ -0,0 +1,128 @@
+/**
+ * Synthetic conversations for the Jest benchmarks, built like
+ * `benchmarks/conversations.py`. A small seeded generator keeps them the same
+ * from one run to the next.
+*/
+
+const WORDS = (
+    "dash chat component message reply stream table graph figure token model " +
+    "latency budget history session server browser render cache index query"
+).split(" ");
+const TABLE_COLUMNS = ["Region", "Product", "Units", "Revenue", "Margin"];
+const REGIONS = ["North", "South", "East", "West"];
+const MAX_UNITS = 10000;
+const MAX_REVENUE = 1e6;
+
+// mulberry32, a tiny seeded pseudo random generator
+const seededRandom = (seed) => {
+    let state = seed >>> 0;
+    return () => {
+        state = (state + 0x6d2b79f5) >>> 0;
+        let t = state;
+        t = Math.imul(t ^ (t >>> 15), t | 1);
+        t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+        return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    };
+};
+
+const pick = (random, items) => items[Math.floor(random() * items.length)];
+
+const sentence = (random, words = 12) => {
+    const text = Array.from({ length: words }, () => pick(random, WORDS)).join(" ");
+    return `${text.charAt(0).toUpperCase()}${text.slice(1)}.`;
+};
+
+const markdownText = (random, complexity) => {
+    if (complexity === "plain") {
+        return sentence(random, 24);
+    }
+    const rows = Array.from(
+        { length: 5 },
+        () => `| ${pick(random, WORDS)} | ${Math.floor(random() * 999)} | ${random().toFixed(2)} |`
+    ).join("\n");
+    return [
+        `## ${sentence(random, 4)}`,
+        `${sentence(random)} **${pick(random, WORDS)}** and \`${pick(random, WORDS)}\`.`,
+        `- ${sentence(random, 6)}\n- ${sentence(random, 6)}\n- [${pick(random, WORDS)}](https://example.com)`,
+        "```python\nfor i in range(10):\n    print(i)\n```",
+        `| Name | Count | Share |\n| --- | --- | --- |\n${rows}`,
+    ].join("\n\n");
+};
+
+const tablePart = (random, rows) => ({
+    type: "table",
+    header: TABLE_COLUMNS,
+    data: Array.from({ length: rows }, () => [
+        pick(random, REGIONS),
+        pick(random, WORDS),
+        Math.floor(random() * MAX_UNITS),
+        Math.round(random() * MAX_REVENUE * 100) / 100,
+        Math.round(random() * 10000) / 10000,
+    ]),
+    props: { striped: true, hover: true },
+});
+
+const graphPart = (random, points) => {
+    const x = new Array(points);
+    const y = new Array(points);
+    let value = 0;
+    for (let i = 0; i < points; i++) {
+        value += random() - 0.5;
+        x[i] = i;
+        y[i] = value;
+    }
+    return {
+        type: "graph",
+        props: { figure: { data: [{ type: "scatter", mode: "lines", x, y }], layout: {} } },
+    };
+};
+
+const attachmentPart = (size) => ({
+    type: "attachment",
+    file: `data:application/octet-stream;base64,${"A".repeat(Math.ceil(size / 3) * 4)}`,
+    fileName: "data.bin",
+    fileType: "application/octet-stream",
+});
+
+/**
+ * Return `messages` synthetic messages alternating user and assistant turns.
+ * Every `richEvery`-th assistant message carries a table and/or a graph and every
+ * `richEvery`-th user message an attachment, when their size is set.
+*/
+const generateConversation = ({
+    messages,
+    markdown = "plain",
+    tableRows = 0,
+    graphPoints = 0,
+    attachmentBytes = 0,
+    richEvery = 10,
+    seed = 0,
+}) => {
+    const random = seededRandom(seed);
+    const conversation = [];
+    for (let i = 0; i < messages; i++) {
+        const rich = Math.floor(i / 2) % richEvery === richEvery - 1;
+        if (i % 2 === 0) {
+            let content = sentence(random);
+            if (rich && attachmentBytes) {
+                content = [{ type: "text", text: content }, attachmentPart(attachmentBytes)];
+            }
+            conversation.push({ role: "user", content, id: i });
+        } else {
+            let content = markdownText(random, markdown);
+            if (rich && (tableRows || graphPoints)) {
+                content = [{ type: "text", text: content }];
+                if (tableRows) {
+                    content.push(tablePart(random, tableRows));
+                }
+                if (graphPoints) {
+                    content.push(graphPart(random, graphPoints));
+                }
+            }
+            conversation.push({ role: "assistant", content, id: `reply-${i}` });
+        }
+    }
+    return conversation;
+};
+
+export default generateConversation;
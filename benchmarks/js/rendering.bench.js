@@ -0,0 +1,182 @@
+import fs from "fs";
+import path from "path";
+import React from "react";
+import { render, waitFor } from "@testing-library/react";
+import ChatComponent from "../../src/lib/components/ChatComponent";
+import renderMessageContent from "../../src/private/renderers";
+import openMessageStore from "../../src/private/indexedDbStore";
+import generateConversation from "./conversations";
+import packageJson from "../../package.json";
+
+// in-memory stand-in for IndexedDB, which jsdom does not provide
+jest.mock("../../src/private/indexedDbStore", () => {
+    const openStore = jest.fn(() => ({
+        loadPage: jest.fn(async () => ({ entries: [], hasMore: false })),
+        put: jest.fn(async () => {}),
+        clear: jest.fn(async () => {}),
+    }));
+    return { __esModule: true, default: openStore };
+});
+
+const REPEAT = 5;
+const APPENDS = 20;
+const RESULTS = {};
+
+const SCENARIOS = {
+    messages_100: { messages: 100 },
+    messages_1k: { messages: 1000 },
+    markdown_rich_1k: { messages: 1000, markdown: "rich" },
+    tables_1k_rows: { messages: 200, tableRows: 1000 },
+    graphs_10k_points: { messages: 200, graphPoints: 10000 },
+};
+
+const round = (value) => Math.round(value * 1000) / 1000;
+
+// minimum and median time of `fn` in milliseconds; `setup` and `teardown` are
+// not timed
+const timed = (fn, setup = () => null, teardown = () => null) => {
+    const times = [];
+    for (let i = 0; i < REPEAT; i++) {
+        const context = setup();
+        const start = performance.now();
+        const result = fn(context);
+        times.push(performance.now() - start);
+        teardown(result || context);
+    }
+    times.sort((a, b) => a - b);
+    return { min: round(times[0]), median: round(times[Math.floor(times.length / 2)]) };
+};
+
+const record = (scenario, metrics) => {
+    RESULTS[scenario] = RESULTS[scenario] || { params: SCENARIOS[scenario], metrics: {} };
+    Object.assign(RESULTS[scenario].metrics, metrics);
+};
+
+const recordTime = (scenario, name, { min, median }) => {
+    record(scenario, { [`${name}_ms`]: min, [`${name}_median_ms`]: median });
+};
+
+// a copy with new objects, as every callback response is parsed afresh
+const reparse = (messages) => JSON.parse(JSON.stringify(messages));
+
+describe("benchmarks", () => {
+    beforeAll(async () => {
+        window.HTMLElement.prototype.scrollIntoView = jest.fn();
+        // load the Markdown chunk so it is not part of the first measurement
+        const { container, unmount } = render(<div>{renderMessageContent("warm up")}</div>);
+        await waitFor(() => expect(container.querySelector(".markdown-placeholder")).toBeNull());
+        unmount();
+    });
+
+    afterAll(() => {
+        // untracked, so a run never overwrites the committed baselines
+        const localResults = path.join(__dirname, "..", "results", "local");
+        fs.mkdirSync(localResults, { recursive: true });
+        const output = process.env.BENCH_OUTPUT || path.join(
+            localResults, `js-${packageJson.version}.json`
+        );
+        const report = {
+            suite: "js",
+            version: packageJson.version,
+            node: process.version,
+            date: new Date().toISOString().slice(0, 10),
+            results: RESULTS,
+        };
+        fs.writeFileSync(output, `${JSON.stringify(report, null, 2)}\n`);
+    });
+
+    Object.entries(SCENARIOS).forEach(([scenario, params]) => {
+        const messages = generateConversation(params);
+
+        test(`renderMessageContent: ${scenario}`, () => {
+            const renderAll = (contents) => {
+                const { unmount } = render(
+                    <div>{contents.map((content, i) => <div key={i}>{renderMessageContent(content)}</div>)}</div>
+                );
+                unmount();
+            };
+            // new content objects miss the table and figure caches
+            recordTime(scenario, "render_content_cold", timed(renderAll, () => reparse(messages).map((m) => m.content)));
+            const contents = messages.map((message) => message.content);
+            renderAll(contents);
+            recordTime(scenario, "render_content_warm", timed(() => renderAll(contents)));
+        });
+
+        test(`ChatComponent re-render: ${scenario}`, () => {
+            const mount = () => render(<ChatComponent id="chat" messages={messages} setProps={() => {}} />);
+            const unmount = (rendered) => rendered.unmount();
+            const reply = { role: "assistant", content: "New reply", id: "new-reply" };
+
+            recordTime(scenario, "mount", timed(mount, () => null, unmount));
+            // the same message objects plus a new one, as with history_mode="server"
+            recordTime(scenario, "rerender_append", timed(({ rerender }) => {
+                rerender(<ChatComponent id="chat" messages={[...messages, reply]} setProps={() => {}} />);
+            }, mount, unmount));
+            // every message a new object, as when a callback returns the whole history
+            recordTime(scenario, "rerender_reparsed", timed(({ rerender, next }) => {
+                rerender(<ChatComponent id="chat" messages={next} setProps={() => {}} />);
+            }, () => ({ ...mount(), next: [...reparse(messages), reply] }), unmount));
+        });
+
+        test(`persistence writes: ${scenario}`, () => {
+            localStorage.clear();
+            const setItem = jest.spyOn(Storage.prototype, "setItem");
+            const { rerender, unmount } = render(
+                <ChatComponent id="bench" messages={messages} persistence={true} persistence_type="local" setProps={() => {}} />
+            );
+            setItem.mockClear();
+
+            let history = messages;
+            const start = performance.now();
+            for (let i = 0; i < APPENDS; i++) {
+                history = [...history, { role: "assistant", content: `Reply ${i}`, id: `append-${i}` }];
+                rerender(
+                    <ChatComponent id="bench" messages={history} persistence={true} persistence_type="local" setProps={() => {}} />
+                );
+            }
+            const localMs = (performance.now() - start) / APPENDS;
+            const written = setItem.mock.calls
+                .filter(([key]) => key === "bench")
+                .reduce((total, [, value]) => total + value.length, 0);
+            unmount();
+            setItem.mockRestore();
+            localStorage.clear();
+
+            record(scenario, {
+                local_storage_append_ms: round(localMs),
+                local_storage_bytes_per_append: Math.round(written / APPENDS),
+            });
+        });
+
+        test(`IndexedDB writes: ${scenario}`, async () => {
+            const { rerender, unmount } = render(
+                <ChatComponent id="bench-idb" persistence={true} persistence_type="indexeddb" setProps={() => {}} />
+            );
+            await waitFor(() => expect(openMessageStore).toHaveBeenCalled());
+            const store = openMessageStore.mock.results[openMessageStore.mock.results.length - 1].value;
+            await waitFor(() => expect(store.loadPage).toHaveBeenCalled());
+
+            const start = performance.now();
+            rerender(
+                <ChatComponent id="bench-idb" messages={messages} persistence={true} persistence_type="indexeddb" setProps={() => {}} />
+            );
+            const initialMs = performance.now() - start;
+            store.put.mockClear();
+
+            const appended = [...messages, { role: "assistant", content: "Reply", id: "append-idb" }];
+            const appendStart = performance.now();
+            rerender(
+                <ChatComponent id="bench-idb" messages={appended} persistence={true} persistence_type="indexeddb" setProps={() => {}} />
+            );
+            const appendMs = performance.now() - appendStart;
+            const recordsWritten = store.put.mock.calls.reduce((total, [entries]) => total + entries.length, 0);
+            unmount();
+
+            record(scenario, {
+                indexeddb_initial_write_ms: round(initialMs),
+                indexeddb_append_ms: round(appendMs),
+                indexeddb_records_per_append: recordsWritten,
+            });
+        });
+    });
+});
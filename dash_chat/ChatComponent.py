@@ -19,12 +19,47 @@ class ChatComponent(Component):
         callbacks. The ID needs to be unique across all of the components
         in an app.
 
+    - admission (dict; optional):
+        Admission decision on the last message, as returned by
+        `dash_chat.limits`:    - `status` (string): One of \"admitted\",
+        \"queued\", \"rejected\" or \"coalesced\".    - `position`
+        (number): Number of messages waiting before a queued one.    -
+        `reason` (string): Why a message was rejected: \"session_rate\",
+        \"app_rate\" or      \"overloaded\".    - `retry_after` (number):
+        Seconds until a rejected message may be sent again. Sending is
+        disabled while the message is queued and until a rejected message
+        may be retried, with a notice above the input. Decisions pushed
+        through `push_url` update it too.
+
+        `admission` is a dict with keys:
+
+        - status (a value equal to: "admitted", "queued", "rejected", "coalesced"; optional)
+
+        - position (number; optional)
+
+        - reason (string; optional)
+
+        - retry_after (number; optional)
+
     - assistant_bubble_style (dict; optional):
         Css styles to customize the assistant message bubble.
 
+    - cancel_job (string; optional):
+        Set to the id of the running job when the stop button is clicked;
+        pass it to `JobPool.cancel` in a callback.
+
     - class_name (string; default ""):
         Name for the class attribute to be added to the chat container.
 
+    - collect_metrics (boolean; default False):
+        Whether to measure the timings of every turn: until the server
+        answers (`ack_ms`), until the first reply text is shown
+        (`first_token_ms`), rendering the reply (`render_ms`), the whole
+        turn (`turn_ms`), persisting it (`persistence_ms`), uploading
+        attachments (`upload_ms`) and the bytes sent and received. Turns
+        are published in batches of `metrics_batch_size`, to `metrics_url`
+        when it is set and through the `metrics` prop otherwise.
+
     - container_style (dict; optional):
         Inline css styles to customize the chat container.
 
@@ -36,6 +71,38 @@ class ChatComponent(Component):
         Whether to horizontally fill the screen with the chat container.
         If False, centers and constrains container to a maximum width.
 
+    - history_mode (a value equal to: "client", "server"; default "client"):
+        Where the authoritative conversation history lives. Options are:
+        - `\"client\"`: `messages` holds the full history and callbacks
+        return the whole updated list.    - `\"server\"`: the history is
+        kept in a `dash_chat.store` conversation store. Callbacks only
+        receive `new_message` and return the new assistant message(s) in
+        `messages`, which are appended to the chat.
+
+    - history_page (dict; optional):
+        Page of server-side history returned for `request_history`: its
+        `messages` in chronological order, the `cursor` to ask for the
+        page before it and whether older messages exist (`has_more`). The
+        messages are added above the ones shown, keeping the scroll
+        position.
+
+        `history_page` is a dict with keys:
+
+        - messages (list; optional)
+
+        - cursor (string | number; optional)
+
+        - has_more (boolean; optional)
+
+    - image_format (a value equal to: "webp", "jpeg", "png"; optional):
+        Format attached images are re-encoded to. By default they keep
+        their own format. Browsers that cannot encode WebP send PNG
+        instead.
+
+    - image_quality (number; default 0.85):
+        Quality, from 0 to 1, of images re-encoded as `\"webp\"` or
+        `\"jpeg\"`.
+
     - input_container_style (dict; optional):
         Inline styles for the container holding the message input field.
 
@@ -45,6 +112,34 @@ class ChatComponent(Component):
     - input_text_style (dict; optional):
         Inline styles for the message input field itself.
 
+    - job_status (dict; optional):
+        Status of the job generating the reply, as returned by
+        `dash_chat.jobs.JobPool.submit`:    - `id` (string): The job id.
+        - `status` (string): One of \"queued\", \"running\", \"done\",
+        \"failed\" or \"cancelled\".    - `position` (number): Number of
+        jobs queued before a queued job.    - `error` (string): Why a
+        failed job failed. The typing indicator is shown while the job is
+        queued or running, and a stop button replaces the send button.
+        Statuses pushed through `push_url` update it too.
+
+        `job_status` is a dict with keys:
+
+        - id (string; optional)
+
+        - status (a value equal to: "queued", "running", "done", "failed", "cancelled"; optional)
+
+        - position (number; optional)
+
+        - error (string; optional)
+
+    - max_image_dimension (number; optional):
+        Longest side in pixels attached images are downscaled to before
+        they are sent, keeping their aspect ratio. Vision models
+        downsample larger images anyway, so 1024 to 2048 loses nothing
+        while cutting phone photos to a fraction of their size. Images are
+        resized in a Web Worker with `OffscreenCanvas` where available, as
+        soon as they are attached. GIFs and SVGs are sent unchanged.
+
     - messages (list of dicts; optional):
         An array of options. The list of chat messages. Each message
         object should have:    - `role` (string): The message sender,
@@ -57,14 +152,129 @@ class ChatComponent(Component):
 
         - content (list | string | dict; required)
 
+    - metrics (dict; optional):
+        Set by the component with a batch of turn metrics when
+        `collect_metrics` is on and no `metrics_url` is set: `{\"turns\":
+        [...]}`. Pass it to `MetricsCollector.observe_batch`.
+
+        `metrics` is a dict with keys:
+
+        - turns (list of dicts; optional)
+
+    - metrics_batch_size (number; default 10):
+        Number of finished turns published at once.
+
+    - metrics_url (string; optional):
+        URL the turn metrics are posted to, usually the one returned by
+        `dash_chat.metrics.register`. Batches are sent with
+        `navigator.sendBeacon`, and the last one when the page is closed.
+
     - new_message (dict; optional):
         Latest chat message that was appended to messages array.
 
+    - overscan (number; default 5):
+        Number of messages rendered above and below the visible ones when
+        `virtualize` is True.
+
+    - page_size (number; optional):
+        Number of messages per page when loading a server-side history
+        (`history_mode=\"server\"`) a page at a time. When set, the
+        component asks for the newest page on load and for the page before
+        it whenever the chat is scrolled to the top, through
+        `request_history`.
+
     - persistence (boolean; default False):
         Whether messages should be stored for persistence.
 
-    - persistence_type (a value equal to: "local", "session"; default "local"):
-        Where persisted messages will be stored.
+    - persistence_type (a value equal to: "local", "session", "indexeddb"; default "local"):
+        Where persisted messages will be stored. Options are:    -
+        `\"local\"`: localStorage, kept across browser sessions.    -
+        `\"session\"`: sessionStorage, cleared when the tab is closed.
+        - `\"indexeddb\"`: IndexedDB, kept across browser sessions. Each
+        message is written as its own record when it is added, attachments
+        are stored as binary Blobs, and history is loaded a page at a time
+        (newest first) as the chat is scrolled up. Suited to long
+        conversations and attachments that would not fit in localStorage.
+
+    - push_url (string; optional):
+        URL of the push endpoint registered with
+        `dash_chat.push.register(app)`. When set, the component subscribes
+        to its conversation (identified by `session_id`, which is
+        generated if needed) and shows the messages and stream deltas
+        pushed to it as they arrive, without a callback round-trip. In
+        client history mode pushed messages are added to `messages` too.
+        Dropped connections reconnect and receive the events they missed.
+
+    - request_history (dict; optional):
+        Set by the component to ask for a page of server-side history.
+        `cursor` is None for the newest page, otherwise the `cursor` of
+        the last page received; `limit` is the `page_size`. Answer it with
+        `dash_chat.store.history_page`.
+
+        `request_history` is a dict with keys:
+
+        - cursor (string | number; optional)
+
+        - limit (number; optional)
+
+    - search_query (string; optional):
+        Set by the component with the text typed in the search box when
+        `searchable` is True. Answer it with
+        `dash_chat.search.SearchIndex.search`.
+
+    - search_results (list of dicts; optional):
+        Matches for `search_query`, as returned by
+        `dash_chat.search.SearchIndex.search`:    - `seq` (number):
+        Position of the message in the server-side history.    - `id`
+        (string | number): Id of the message, when it has one.    - `role`
+        (string): Role of the message.    - `snippet` (list of strings):
+        Text around the match, alternately plain and matching      the
+        query. Clicking a match scrolls to its message and highlights it.
+        Older pages of a server-side history (`page_size`) are loaded
+        first when the message is not shown yet.
+
+        `search_results` is a list of dicts with keys:
+
+        - seq (number; required)
+
+        - id (string | number; optional)
+
+        - role (string; optional)
+
+        - snippet (list of strings; optional)
+
+    - searchable (boolean; default False):
+        Whether to show a search box above the messages. What is typed in
+        it is published in `search_query` once typing pauses, and the
+        matches returned in `search_results` are listed below it.
+
+    - session_id (string; optional):
+        Key identifying this browser session's conversation in a
+        server-side store. Generated by the component when no value is
+        given and `history_mode` is `\"server\"` or `push_url` or
+        `upload_url` is set.
+
+    - stream_delta (dict; optional):
+        Incremental update to an assistant reply that is still being
+        generated, usually set through the `progress` output of a
+        background callback with the helpers in `dash_chat.streaming`. The
+        text is written into the message with the same `id` starting at
+        `offset` (the end of the current text when omitted). Updates with
+        a `seq` lower than or equal to the last one seen are ignored. The
+        final reply returned in `messages` with the same `id` replaces the
+        streamed bubble.
+
+        `stream_delta` is a dict with keys:
+
+        - id (string | number; required)
+
+        - seq (number; optional)
+
+        - text (string; optional)
+
+        - offset (number; optional)
+
+        - done (boolean; optional)
 
     - supported_input_file_types (string | list of strings; default "*/*"):
         String or array of file types to accept in the attachment file
@@ -79,8 +289,28 @@ class ChatComponent(Component):
         `\"dots\"`: Displays animated dots.    - `\"spinner\"`: Displays a
         spinner animation.
 
+    - upload_chunk_size (number; default 2097152):
+        Size in bytes of the chunks attachments larger than it are
+        uploaded in, when `upload_url` is set. Chunks are hashed in a Web
+        Worker and checked by the server, dropped connections resume from
+        the last chunk received, and the file preview shows the upload's
+        progress. The server may use smaller chunks. Set it to 0 to always
+        upload files in a single request.
+
+    - upload_url (string; optional):
+        URL of the attachment upload endpoint registered with
+        `dash_chat.uploads.register(app)`. When set, attachments are
+        uploaded to the server as they are sent and `new_message` only
+        carries a handle (`fileId`, `fileName`, `fileType`, `fileSize` and
+        `url`) instead of a base64 data URL.
+
     - user_bubble_style (dict; optional):
-        Css styles to customize the user message bubble."""
+        Css styles to customize the user message bubble.
+
+    - virtualize (boolean; default False):
+        Whether to only render the messages in view (plus `overscan`
+        messages above and below). Keeps scrolling and typing responsive
+        in conversations with thousands of messages."""
 
     _children_props = []
     _base_nodes = ["children"]
@@ -107,46 +337,118 @@ class ChatComponent(Component):
         persistence=Component.UNDEFINED,
         persistence_type=Component.UNDEFINED,
         supported_input_file_types=Component.UNDEFINED,
+        history_mode=Component.UNDEFINED,
+        session_id=Component.UNDEFINED,
+        stream_delta=Component.UNDEFINED,
+        upload_url=Component.UNDEFINED,
+        virtualize=Component.UNDEFINED,
+        overscan=Component.UNDEFINED,
+        page_size=Component.UNDEFINED,
+        request_history=Component.UNDEFINED,
+        history_page=Component.UNDEFINED,
+        collect_metrics=Component.UNDEFINED,
+        metrics_url=Component.UNDEFINED,
+        metrics_batch_size=Component.UNDEFINED,
+        metrics=Component.UNDEFINED,
+        max_image_dimension=Component.UNDEFINED,
+        image_format=Component.UNDEFINED,
+        image_quality=Component.UNDEFINED,
+        upload_chunk_size=Component.UNDEFINED,
+        push_url=Component.UNDEFINED,
+        job_status=Component.UNDEFINED,
+        cancel_job=Component.UNDEFINED,
+        admission=Component.UNDEFINED,
+        searchable=Component.UNDEFINED,
+        search_query=Component.UNDEFINED,
+        search_results=Component.UNDEFINED,
         **kwargs
     ):
         self._prop_names = [
             "id",
+            "admission",
             "assistant_bubble_style",
+            "cancel_job",
             "class_name",
+            "collect_metrics",
             "container_style",
             "fill_height",
             "fill_width",
+            "history_mode",
+            "history_page",
+            "image_format",
+            "image_quality",
             "input_container_style",
             "input_placeholder",
             "input_text_style",
+            "job_status",
+            "max_image_dimension",
             "messages",
+            "metrics",
+            "metrics_batch_size",
+            "metrics_url",
             "new_message",
+            "overscan",
+            "page_size",
             "persistence",
             "persistence_type",
+            "push_url",
+            "request_history",
+            "search_query",
+            "search_results",
+            "searchable",
+            "session_id",
+            "stream_delta",
             "supported_input_file_types",
             "theme",
             "typing_indicator",
+            "upload_chunk_size",
+            "upload_url",
             "user_bubble_style",
+            "virtualize",
         ]
         self._valid_wildcard_attributes = []
         self.available_properties = [
             "id",
+            "admission",
             "assistant_bubble_style",
+            "cancel_job",
             "class_name",
+            "collect_metrics",
             "container_style",
             "fill_height",
             "fill_width",
+            "history_mode",
+            "history_page",
+            "image_format",
+            "image_quality",
             "input_container_style",
             "input_placeholder",
             "input_text_style",
+            "job_status",
+            "max_image_dimension",
             "messages",
+            "metrics",
+            "metrics_batch_size",
+            "metrics_url",
             "new_message",
+            "overscan",
+            "page_size",
             "persistence",
             "persistence_type",
+            "push_url",
+            "request_history",
+            "search_query",
+            "search_results",
+            "searchable",
+            "session_id",
+            "stream_delta",
             "supported_input_file_types",
             "theme",
             "typing_indicator",
+            "upload_chunk_size",
+            "upload_url",
             "user_bubble_style",
+            "virtualize",
         ]
         self.available_wildcard_properties = []
         _explicit_args = kwargs.pop("_explicit_args")
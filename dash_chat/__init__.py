@@ -31,7 +31,7 @@ _current_path = _os.path.dirname(_os.path.abspath(__file__))
 
 _this_module = _sys.modules[__name__]
 
-async_resources = []
+async_resources = ["markdown", "graph"]
 
 _js_dist = []
 
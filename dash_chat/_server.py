@@ -0,0 +1,53 @@
+"""Helpers for registering dash-chat endpoints on an app's Flask server."""
+
+import flask
+
+
+def get_server(app):
+    """Return the Flask server of a Dash app, or ``app`` if it is a Flask app."""
+    return app if isinstance(app, flask.Flask) else app.server
+
+
+def relative_path(app, path):
+    """Return the URL the browser should use for ``path`` on ``app``."""
+    if isinstance(app, flask.Flask):
+        return path
+    return app.get_relative_path(path)
+
+
+def register_blueprint(app, blueprint):
+    """Mount a blueprint under the Dash app's routes prefix."""
+    prefix = ""
+    if not isinstance(app, flask.Flask):
+        prefix = app.config.routes_pathname_prefix.rstrip("/")
+    get_server(app).register_blueprint(blueprint, url_prefix=prefix)
+
+
+# raster images are the only uploads shown inline; anything else, HTML and SVG
+# included, could run script on the app's origin
+INLINE_TYPES = frozenset(
+    ("image/png", "image/jpeg", "image/gif", "image/webp", "image/avif", "image/bmp")
+)
+
+
+def is_inline(mime_type):
+    """Return whether an uploaded file of ``mime_type`` may be shown inline."""
+    return (mime_type or "").split(";")[0].strip().lower() in INLINE_TYPES
+
+
+def send_upload(path, mime_type, download_name=None, **options):
+    """Send an uploaded file, as a download unless it is a raster image.
+
+    The type was chosen by the uploader, so the browser is told not to sniff
+    another one and to sandbox the response if it renders it anyway.
+    """
+    response = flask.send_file(
+        path,
+        mimetype=mime_type,
+        as_attachment=not is_inline(mime_type),
+        download_name=download_name,
+        **options
+    )
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    response.headers["Content-Security-Policy"] = "sandbox"
+    return response
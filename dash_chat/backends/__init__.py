@@ -0,0 +1,56 @@
+"""
+Language model backends that do not block the server.
+
+Calling a model synchronously inside a callback holds a Flask worker thread for
+the whole generation, so a few slow replies starve every other request. A
+``BackendRunner`` runs backend requests as coroutines on one shared event loop
+instead, with one pooled HTTP client per backend and concurrency limits per
+backend and per session. The chat callback submits the request and returns
+straight away; a ``dcc.Interval`` callback delivers the reply once it is ready:
+
+    from dash_chat.backends import OpenAIBackend, get_runner
+
+    backend = OpenAIBackend(model="gpt-4o-mini", max_concurrency=8)
+    runner = get_runner()
+
+    @callback(
+        Output("poll", "disabled"),
+        Input("chat", "new_message"),
+        State("chat", "session_id"),
+        prevent_initial_call=True,
+    )
+    def handle_chat(new_message, session_id):
+        store.append("chat", session_id, new_message)
+        runner.submit(backend, store.get_messages("chat", session_id), session_id)
+        return False
+
+    @callback(
+        Output("chat", "messages"),
+        Output("poll", "disabled", allow_duplicate=True),
+        Input("poll", "n_intervals"),
+        State("chat", "session_id"),
+        prevent_initial_call=True,
+    )
+    def deliver(_, session_id):
+        replies = runner.collect(session_id)
+        store.append("chat", session_id, *replies)
+        return replies or no_update, runner.pending(session_id) == 0
+
+In background callbacks ``runner.stream(backend, messages)`` yields the reply
+chunks for ``stream_to_progress``. ``FakeBackend`` answers deterministically
+with configurable latency, for tests and offline development.
+"""
+
+from .base import ChatBackend
+from .fake import FakeBackend
+from .openai_backend import OpenAIBackend, to_openai_messages
+from .runner import BackendRunner, get_runner
+
+__all__ = [
+    "BackendRunner",
+    "ChatBackend",
+    "FakeBackend",
+    "OpenAIBackend",
+    "get_runner",
+    "to_openai_messages",
+]
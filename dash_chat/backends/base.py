@@ -0,0 +1,31 @@
+"""The interface chat backends implement."""
+
+
+class ChatBackend:
+    """Base class for the language model backends run by a ``BackendRunner``.
+
+    Subclasses implement the coroutine ``complete``, and ``stream`` when the
+    model can send its reply in chunks. Both receive the conversation as a list
+    of messages in the same shape as the ChatComponent ``messages`` prop and
+    run on the runner's event loop, so they must not block: use async clients
+    and ``asyncio.sleep`` rather than blocking calls.
+
+    ``max_concurrency`` caps how many requests the runner sends to the backend
+    at once, e.g. to stay within a provider's rate limits; ``None`` means no cap.
+    """
+
+    max_concurrency = None
+
+    async def complete(self, messages, **options):
+        """Return the full text of the reply to ``messages``."""
+        raise NotImplementedError
+
+    async def stream(self, messages, **options):
+        """Yield the reply to ``messages`` as text chunks.
+
+        Defaults to yielding the result of ``complete`` as a single chunk.
+        """
+        yield await self.complete(messages, **options)
+
+    async def aclose(self):
+        """Release connections held by the backend."""
@@ -0,0 +1,79 @@
+"""In-process backend for tests and demos."""
+
+import asyncio
+
+from .base import ChatBackend
+
+
+def _last_user_text(messages):
+    for message in reversed(messages):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content")
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return " ".join(
+                item.get("text", "")
+                for item in content
+                if isinstance(item, dict) and item.get("type") == "text"
+            )
+    return ""
+
+
+class FakeBackend(ChatBackend):
+    """Backend answering without a model, with configurable latency.
+
+    ``reply`` is the reply text, or a function of the messages returning it; by
+    default the last user message is echoed back. The reply takes ``latency``
+    seconds before the first chunk, then ``chunk_latency`` seconds per further
+    word when streamed. Replies are deterministic, so tests can assert on them.
+
+    ``calls`` counts the requests received and ``peak_concurrency`` records the
+    most requests that were in progress at the same time.
+    """
+
+    def __init__(
+        self, reply=None, latency=0.0, chunk_latency=0.0, max_concurrency=None
+    ):
+        self.reply = reply
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.max_concurrency = max_concurrency
+        self.calls = 0
+        self.active = 0
+        self.peak_concurrency = 0
+
+    def _text(self, messages):
+        if callable(self.reply):
+            return self.reply(messages)
+        if self.reply is not None:
+            return self.reply
+        return "You said: {}".format(_last_user_text(messages))
+
+    def _start(self):
+        self.calls += 1
+        self.active += 1
+        self.peak_concurrency = max(self.peak_concurrency, self.active)
+
+    async def complete(self, messages, **options):
+        self._start()
+        try:
+            await asyncio.sleep(self.latency)
+            words = self._text(messages).split(" ")
+            await asyncio.sleep(self.chunk_latency * (len(words) - 1))
+            return " ".join(words)
+        finally:
+            self.active -= 1
+
+    async def stream(self, messages, **options):
+        self._start()
+        try:
+            await asyncio.sleep(self.latency)
+            words = self._text(messages).split(" ")
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(self.chunk_latency)
+                yield word if i == 0 else " " + word
+        finally:
+            self.active -= 1
@@ -0,0 +1,135 @@
+"""Backend for the OpenAI chat completions API (and compatible servers)."""
+
+import asyncio
+import base64
+
+from .base import ChatBackend
+
+_FETCHABLE = ("http://", "https://", "data:")
+
+
+def _image_url(item, store):
+    url = item.get("url") or item.get("file")
+    if isinstance(url, str) and url.startswith(_FETCHABLE):
+        return url
+    if store is None:
+        raise ValueError(
+            "Attachment {!r} has the server-relative URL {!r}, which the model "
+            "cannot fetch; pass the upload store to send it inline".format(
+                item.get("fileName"), url
+            )
+        )
+    with store.open(item) as f:
+        data = base64.b64encode(f.read()).decode("ascii")
+    return "data:{};base64,{}".format(item.get("fileType"), data)
+
+
+def to_openai_messages(messages, store=None):
+    """Convert ChatComponent messages to chat completions messages.
+
+    Text parts are kept and image attachments are sent as ``image_url`` parts;
+    other attachments and rich content (graphs, tables) are left out. Images
+    uploaded through ``upload_url`` only have a URL relative to the Dash app,
+    so they are read from ``store`` (the ``UploadStore`` or ``BlobStore``
+    behind the endpoint) and sent as ``data:`` URLs; without a store they
+    raise ``ValueError``.
+    """
+    converted = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, dict):
+            content = [content]
+        if isinstance(content, list):
+            parts = []
+            for item in content:
+                if isinstance(item, str):
+                    parts.append({"type": "text", "text": item})
+                elif item.get("type") == "text":
+                    parts.append({"type": "text", "text": item.get("text", "")})
+                elif item.get("type") == "attachment" and str(
+                    item.get("fileType", "")
+                ).startswith("image/"):
+                    url = _image_url(item, store)
+                    parts.append({"type": "image_url", "image_url": {"url": url}})
+            content = parts
+        converted.append({"role": message["role"], "content": content})
+    return converted
+
+
+class OpenAIBackend(ChatBackend):
+    """Chat completions backend using one pooled ``AsyncOpenAI`` client.
+
+    The client and its HTTP connection pool (``max_connections`` connections,
+    kept alive between requests) are created on first use and shared by every
+    request the runner sends, so sessions do not each open connections.
+    ``options`` are default arguments for ``chat.completions.create``, e.g.
+    ``temperature`` or ``max_tokens``. ``upload_store`` is the store of the
+    upload endpoint, used to send uploaded images inline. Requires the
+    ``openai`` package.
+    """
+
+    def __init__(
+        self,
+        model="gpt-4o-mini",
+        api_key=None,
+        base_url=None,
+        max_connections=20,
+        max_concurrency=None,
+        upload_store=None,
+        **options
+    ):
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.upload_store = upload_store
+        self.options = options
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+            import openai
+
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                )
+            )
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, http_client=http_client
+            )
+        return self._client
+
+    async def _messages(self, messages):
+        if self.upload_store is None:
+            return to_openai_messages(messages)
+        # reading and encoding uploaded images would block the shared loop
+        return await asyncio.to_thread(to_openai_messages, messages, self.upload_store)
+
+    async def complete(self, messages, **options):
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=await self._messages(messages),
+            **{**self.options, **options}
+        )
+        return (response.choices[0].message.content or "").strip()
+
+    async def stream(self, messages, **options):
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=await self._messages(messages),
+            stream=True,
+            **{**self.options, **options}
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
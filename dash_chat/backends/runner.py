@@ -0,0 +1,198 @@
+"""Run backend requests on a shared event loop, off the request threads."""
+
+import asyncio
+import queue
+import threading
+from collections import defaultdict
+
+from ..streaming import new_message_id
+
+_DONE = object()
+
+
+class BackendRunner:
+    """Runs backend requests on one event loop in a background thread.
+
+    Requests are coroutines on the runner's loop, so any number of slow
+    generations wait on the network together instead of each holding a Flask
+    worker thread. Two limits apply: at most ``backend.max_concurrency``
+    requests run per backend, and at most ``max_per_session`` per session key
+    (one by default, so a user's messages are answered in order); requests over
+    a limit wait on the loop.
+
+    ``submit`` returns immediately with a future, and ``collect`` picks up the
+    finished replies of a session, e.g. from a ``dcc.Interval`` callback. In a
+    background callback, ``run`` waits for a reply and ``stream`` yields its
+    chunks as they arrive, which combines with ``stream_to_progress``.
+    """
+
+    def __init__(self, max_per_session=1):
+        if max_per_session < 1:
+            raise ValueError("max_per_session must be at least 1")
+        self.max_per_session = max_per_session
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="dash-chat-backends", daemon=True
+        )
+        self._thread.start()
+        self._lock = threading.Lock()
+        self._replies = defaultdict(list)
+        self._backends = {}
+        # only touched from the loop thread
+        self._backend_limits = {}
+        self._session_limits = {}
+
+    def _backend_limit(self, backend):
+        key = id(backend)
+        if key not in self._backend_limits:
+            limit = backend.max_concurrency
+            self._backend_limits[key] = asyncio.Semaphore(limit) if limit else None
+            self._backends[key] = backend
+        return self._backend_limits[key]
+
+    async def _limited(self, backend, session_key, run):
+        entry = None
+        if session_key is not None:
+            entry = self._session_limits.get(session_key)
+            if entry is None:
+                entry = self._session_limits[session_key] = [
+                    asyncio.Semaphore(self.max_per_session),
+                    0,
+                ]
+            entry[1] += 1
+        backend_limit = self._backend_limit(backend)
+        try:
+            if entry is not None:
+                await entry[0].acquire()
+            try:
+                if backend_limit is None:
+                    return await run()
+                async with backend_limit:
+                    return await run()
+            finally:
+                if entry is not None:
+                    entry[0].release()
+        finally:
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._session_limits[session_key]
+
+    async def _reply(self, backend, messages, session_key, options):
+        text = await self._limited(
+            backend, session_key, lambda: backend.complete(messages, **options)
+        )
+        return {"role": "assistant", "content": text, "id": new_message_id()}
+
+    def submit(self, backend, messages, session_key=None, **options):
+        """Start generating a reply and return a ``concurrent.futures.Future``.
+
+        The future resolves to an assistant message dict. When ``session_key``
+        is given the reply can also be picked up with :meth:`collect`. Extra
+        keyword arguments are passed to the backend.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._reply(backend, list(messages), session_key, options), self.loop
+        )
+        if session_key is not None:
+            with self._lock:
+                self._replies[session_key].append(future)
+        return future
+
+    def pending(self, session_key):
+        """Return how many submitted replies of a session were not collected."""
+        with self._lock:
+            return len(self._replies.get(session_key, ()))
+
+    def collect(self, session_key):
+        """Return the finished replies of a session, oldest first.
+
+        Replies still being generated are left for a later call. A failed
+        generation raises its exception here; the other finished replies stay
+        queued for the next call.
+        """
+        with self._lock:
+            futures = self._replies.get(session_key, [])
+            done = [future for future in futures if future.done()]
+            remaining = [future for future in futures if not future.done()]
+            if remaining:
+                self._replies[session_key] = remaining
+            else:
+                self._replies.pop(session_key, None)
+        replies = []
+        for index, future in enumerate(done):
+            try:
+                replies.append(future.result())
+            except BaseException:
+                with self._lock:
+                    self._replies[session_key][:0] = done[:index] + done[index + 1 :]
+                raise
+        return replies
+
+    def run(self, backend, messages, session_key=None, timeout=None, **options):
+        """Generate a reply and wait for it, for use in background callbacks."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._reply(backend, list(messages), session_key, options), self.loop
+        )
+        return future.result(timeout)
+
+    def stream(self, backend, messages, session_key=None, timeout=None, **options):
+        """Yield the chunks of a reply as they arrive.
+
+        Meant for background callbacks, e.g. with
+        ``stream_to_progress(set_progress, runner.stream(backend, history))``.
+        ``timeout`` bounds the wait for each chunk. Closing the generator early
+        cancels the request.
+        """
+        chunks = queue.Queue()
+
+        async def produce():
+            async for chunk in backend.stream(messages, **options):
+                chunks.put(chunk)
+
+        async def run():
+            try:
+                await self._limited(backend, session_key, produce)
+            except BaseException as e:
+                chunks.put(e)
+                raise
+            finally:
+                chunks.put(_DONE)
+
+        future = asyncio.run_coroutine_threadsafe(run(), self.loop)
+        try:
+            while True:
+                chunk = chunks.get(timeout=timeout)
+                if chunk is _DONE:
+                    break
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                yield chunk
+        finally:
+            future.cancel()
+
+    def close(self, timeout=5):
+        """Close the backends' connections and stop the event loop."""
+        if not self.loop.is_running():
+            return
+
+        async def close_backends():
+            for backend in list(self._backends.values()):
+                await backend.aclose()
+
+        asyncio.run_coroutine_threadsafe(close_backends(), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+
+
+_default_runner = None
+_default_lock = threading.Lock()
+
+
+def get_runner():
+    """Return the process-wide runner, starting it on first use."""
+    global _default_runner
+    with _default_lock:
+        if _default_runner is None:
+            _default_runner = BackendRunner()
+        return _default_runner
@@ -0,0 +1,311 @@
+"""
+Content-addressed attachment storage.
+
+Files are stored once per SHA-256 digest, however many sessions upload them,
+and served from immutable URLs (``/_dash-chat/blobs/<sha256>``) that browsers
+can cache forever. Byte quotas per session and for the whole store are enforced
+by evicting the least recently used files.
+
+Use it as the store behind the upload endpoint:
+
+    blob_store = dash_chat.blobs.register(
+        app, root="attachments", max_bytes=10 * 2**30, max_session_bytes=200 * 2**20
+    )
+    dash_chat.uploads.register(app, store=blob_store)
+
+    app.layout = ChatComponent(id="chat", upload_url=blob_store.upload_url)
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+import flask
+
+from ._server import is_inline, register_blueprint, relative_path, send_upload
+from .uploads import CHUNK_SIZE, SessionRequired, UploadTooLarge
+
+BLOB_ROUTE = "_dash-chat/blobs"
+ONE_YEAR = 365 * 24 * 60 * 60
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+class QuotaExceeded(UploadTooLarge):
+    """Raised when a single file is larger than the session or global quota."""
+
+
+class BlobStore:
+    """Deduplicating file store keyed by SHA-256 digest.
+
+    ``root`` holds the files under ``objects/`` and a SQLite index recording
+    each blob's size and type and which sessions reference it. When a session
+    holds more than ``max_session_bytes`` its least recently used references are
+    dropped; when the store holds more than ``max_bytes`` the least recently used
+    blobs are deleted. Blobs no session references any more are deleted too.
+    """
+
+    def __init__(self, root=None, max_bytes=None, max_session_bytes=None, url=None):
+        self.root = root or os.path.join(tempfile.gettempdir(), "dash_chat_blobs")
+        self.max_bytes = max_bytes
+        self.max_session_bytes = max_session_bytes
+        self.url = url
+        self.upload_url = None
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(self.root, "tmp"), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.root, "index.db"), check_same_thread=False
+        )
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mime_type TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS refs (
+                    session_key TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (session_key, sha256)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS refs_by_sha256 ON refs (sha256)"
+            )
+
+    def _digest(self, handle):
+        digest = handle.get("fileId") if isinstance(handle, dict) else handle
+        if not isinstance(digest, str) or not _DIGEST.fullmatch(digest):
+            raise KeyError("Invalid blob digest: {!r}".format(digest))
+        return digest
+
+    def path(self, handle):
+        """Return the path on disk of a blob, given its handle or digest."""
+        digest = self._digest(handle)
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def open(self, handle, mode="rb"):
+        """Open a blob as a file object, given its handle or digest."""
+        return open(self.path(handle), mode)
+
+    def metadata(self, handle):
+        """Return the size and type of a blob, given its handle or digest."""
+        digest = self._digest(handle)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mime_type FROM blobs WHERE sha256 = ?", (digest,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(digest)
+        return {"fileId": digest, "fileSize": row[0], "fileType": row[1]}
+
+    def touch(self, handle):
+        """Mark a blob as recently used so it is evicted last."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE blobs SET last_access = ? WHERE sha256 = ?",
+                (time.time(), self._digest(handle)),
+            )
+
+    def save(self, stream, name, mime_type=None, session_key=""):
+        """Hash and store a binary stream, returning an attachment handle.
+
+        The stream is copied to a temporary file while it is hashed, so it is
+        never held in memory. If a blob with the same digest exists the copy is
+        discarded and the existing blob is referenced instead. With
+        ``max_session_bytes`` an upload without ``session_key`` raises
+        :class:`dash_chat.uploads.SessionRequired`, as it could not be counted.
+        """
+        if self.max_session_bytes is not None and not session_key:
+            raise SessionRequired(name)
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    if self._too_large(size):
+                        raise QuotaExceeded(name)
+                    f.write(chunk)
+            digest = sha256.hexdigest()
+            mime_type = mime_type or "application/octet-stream"
+
+            with self._lock, self._conn:
+                # another process may be saving the same digest
+                self._conn.execute("BEGIN IMMEDIATE")
+                now = time.time()
+                exists = self._conn.execute(
+                    "SELECT 1 FROM blobs WHERE sha256 = ?", (digest,)
+                ).fetchone()
+                if exists:
+                    self._conn.execute(
+                        "UPDATE blobs SET last_access = ? WHERE sha256 = ?",
+                        (now, digest),
+                    )
+                else:
+                    path = self.path(digest)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp_path, path)
+                    self._conn.execute(
+                        "INSERT INTO blobs VALUES (?, ?, ?, ?)",
+                        (digest, size, mime_type, now),
+                    )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO refs VALUES (?, ?, ?)",
+                    (session_key, digest, now),
+                )
+                self._enforce_quotas(session_key, keep=digest)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        handle = {
+            "type": "attachment",
+            "fileId": digest,
+            "fileName": name,
+            "fileType": mime_type,
+            "fileSize": size,
+        }
+        if self.url:
+            handle["url"] = "{}/{}".format(self.url, digest)
+        return handle
+
+    def _too_large(self, size):
+        return any(
+            limit is not None and size > limit
+            for limit in (self.max_bytes, self.max_session_bytes)
+        )
+
+    def _enforce_quotas(self, session_key, keep):
+        if self.max_session_bytes is not None:
+            rows = self._conn.execute(
+                "SELECT refs.sha256, blobs.size FROM refs JOIN blobs USING (sha256) "
+                "WHERE refs.session_key = ? ORDER BY refs.last_access",
+                (session_key,),
+            ).fetchall()
+            total = sum(size for _, size in rows)
+            for digest, size in rows:
+                if total <= self.max_session_bytes:
+                    break
+                if digest != keep:
+                    self._conn.execute(
+                        "DELETE FROM refs WHERE session_key = ? AND sha256 = ?",
+                        (session_key, digest),
+                    )
+                    total -= size
+
+        orphans = self._conn.execute(
+            "SELECT sha256 FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM refs)"
+        ).fetchall()
+        for (digest,) in orphans:
+            self._delete_blob(digest)
+
+        if self.max_bytes is not None:
+            (total,) = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM blobs"
+            ).fetchone()
+            if total > self.max_bytes:
+                rows = self._conn.execute(
+                    "SELECT sha256, size FROM blobs ORDER BY last_access"
+                ).fetchall()
+                for digest, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    if digest != keep:
+                        self._delete_blob(digest)
+                        total -= size
+
+    def _delete_blob(self, digest):
+        self._conn.execute("DELETE FROM refs WHERE sha256 = ?", (digest,))
+        self._conn.execute("DELETE FROM blobs WHERE sha256 = ?", (digest,))
+        path = self.path(digest)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def release(self, session_key):
+        """Drop every reference held by a session, deleting unshared blobs."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM refs WHERE session_key = ?", (session_key,))
+            self._enforce_quotas(session_key, keep=None)
+
+    def total_bytes(self, session_key=None):
+        """Return the bytes stored, overall or referenced by one session."""
+        with self._lock:
+            if session_key is None:
+                row = self._conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM blobs"
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT COALESCE(SUM(blobs.size), 0) FROM refs "
+                    "JOIN blobs USING (sha256) WHERE refs.session_key = ?",
+                    (session_key,),
+                ).fetchone()
+        return row[0]
+
+
+def _blob_view(store):
+    def blob(digest):
+        try:
+            info = store.metadata(digest)
+        except KeyError:
+            flask.abort(404)
+        store.touch(digest)
+        # send_file handles Range requests and hands the file to the WSGI
+        # server's file wrapper, which uses sendfile where available
+        response = send_upload(
+            store.path(digest),
+            info["fileType"],
+            download_name=digest,
+            conditional=True,
+            etag=digest,
+            max_age=ONE_YEAR,
+        )
+        response.cache_control.immutable = True
+        # only images may be kept by shared caches, which would otherwise
+        # serve a malicious page for a year
+        response.cache_control.public = is_inline(info["fileType"])
+        response.cache_control.private = not is_inline(info["fileType"])
+        return response
+
+    return blob
+
+
+def register(app, root=None, max_bytes=None, max_session_bytes=None, store=None):
+    """Register the blob serving endpoint on a Dash app's Flask server.
+
+    Returns the :class:`BlobStore`, which can be passed to
+    ``dash_chat.uploads.register(app, store=...)`` to store uploads.
+    """
+    url = relative_path(app, "/" + BLOB_ROUTE)
+    if store is None:
+        store = BlobStore(root, max_bytes, max_session_bytes, url=url)
+    elif store.url is None:
+        store.url = url
+
+    blueprint = flask.Blueprint("dash_chat_blobs", __name__)
+    blueprint.add_url_rule(
+        "/{}/<digest>".format(BLOB_ROUTE), "blob", _blob_view(store), methods=["GET"]
+    )
+    register_blueprint(app, blueprint)
+    return store
@@ -0,0 +1,512 @@
+"""
+Cached replies for repeated prompts.
+
+Chat bots often get the same opening questions over and over, and each one is a
+fresh, paid, multi-second model call. ``ResponseCache`` stores replies keyed by
+a hash of the conversation so far plus the model parameters, and runs identical
+requests that arrive while one is in flight only once:
+
+    from dash_chat.cache import ResponseCache, cached_reply
+
+    cache = ResponseCache(ttl=24 * 3600, max_bytes=64 * 2**20, path="replies.db")
+
+    def handle_chat(new_message, messages):
+        messages = messages + [new_message]
+        text = cached_reply(
+            cache, messages, lambda: generate(messages), model="gpt-4o-mini"
+        )
+        return messages + [{"role": "assistant", "content": text}]
+
+Only the ``role`` and ``content`` of messages are hashed, so message ids and
+timestamps do not defeat the cache. A message sent with ``"cache": False``
+always gets a fresh reply. With ``dash_chat.backends``, wrap the backend in a
+``CachedBackend`` instead.
+
+Entries expire ``ttl`` seconds after they are stored and the least recently used
+ones are evicted beyond ``max_entries`` entries or ``max_bytes`` of replies.
+With ``path`` replies are also kept in a SQLite database, which survives
+restarts and can be shared by several server processes; recently used replies
+are still served from memory.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from .backends.base import ChatBackend
+
+
+def cache_key(messages, **params):
+    """Return the cache key of a conversation and model parameters.
+
+    The key is a SHA-256 digest of the canonical JSON of the messages' ``role``
+    and ``content`` and of the parameters, so it does not depend on message ids
+    or on the order of dict keys.
+    """
+    canonical = json.dumps(
+        {
+            "messages": [
+                {"role": message.get("role"), "content": message.get("content")}
+                for message in messages
+            ],
+            "params": params,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(messages):
+    """Return whether the newest message allows a cached reply."""
+    return not messages or messages[-1].get("cache", True) is not False
+
+
+class ResponseCache:
+    """Reply cache with an in-memory tier and an optional SQLite tier.
+
+    Values are any JSON-serializable reply, typically its text. Both tiers keep
+    at most ``max_entries`` entries and ``max_bytes`` bytes of serialized
+    values, evicting the least recently used ones first. Entries expire after
+    ``ttl`` seconds; ``None`` keeps them until they are evicted.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 2**20, ttl=3600, path=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._conn:
+                if path != ":memory:":
+                    self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS dash_chat_cache (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        expires REAL,
+                        used REAL NOT NULL
+                    ) WITHOUT ROWID
+                    """
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS dash_chat_cache_used "
+                    "ON dash_chat_cache (used)"
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS dash_chat_cache_expires "
+                    "ON dash_chat_cache (expires)"
+                )
+                # running totals kept by triggers, so every process sharing the
+                # file sees them without counting the table on each write
+                self._conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS dash_chat_cache_totals (
+                        id INTEGER PRIMARY KEY CHECK (id = 0),
+                        entries INTEGER NOT NULL,
+                        bytes INTEGER NOT NULL
+                    )
+                    """
+                )
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO dash_chat_cache_totals "
+                    "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM dash_chat_cache"
+                )
+                self._conn.execute(
+                    """
+                    CREATE TRIGGER IF NOT EXISTS dash_chat_cache_inserted
+                    AFTER INSERT ON dash_chat_cache BEGIN
+                        UPDATE dash_chat_cache_totals
+                        SET entries = entries + 1, bytes = bytes + NEW.size;
+                    END
+                    """
+                )
+                self._conn.execute(
+                    """
+                    CREATE TRIGGER IF NOT EXISTS dash_chat_cache_deleted
+                    AFTER DELETE ON dash_chat_cache BEGIN
+                        UPDATE dash_chat_cache_totals
+                        SET entries = entries - 1, bytes = bytes - OLD.size;
+                    END
+                    """
+                )
+
+    def _expires(self):
+        return None if self.ttl is None else time.time() + self.ttl
+
+    def _remember(self, key, value, size, expires):
+        # caller holds the lock
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size, expires)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def _lookup(self, key):
+        # caller holds the lock; returns (found, value)
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is not None:
+            value, size, expires = entry
+            if expires is None or expires > now:
+                self._entries.move_to_end(key)
+                return True, json.loads(value)
+            del self._entries[key]
+            self._bytes -= size
+        if self._conn is None:
+            return False, None
+        row = self._conn.execute(
+            "SELECT value, size, expires FROM dash_chat_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return False, None
+        value, size, expires = row
+        with self._conn:
+            if expires is not None and expires <= now:
+                self._conn.execute("DELETE FROM dash_chat_cache WHERE key = ?", (key,))
+                return False, None
+            self._conn.execute(
+                "UPDATE dash_chat_cache SET used = ? WHERE key = ?", (now, key)
+            )
+        self._remember(key, value, size, expires)
+        return True, json.loads(value)
+
+    def _fetch(self, key):
+        """Look ``key`` up and count the hit or miss; returns (found, value)."""
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found, value
+
+    def _count_coalesced(self):
+        with self._lock:
+            self.coalesced += 1
+
+    def get(self, key, default=None):
+        """Return the cached value for ``key``, or ``default``."""
+        found, value = self._fetch(key)
+        return value if found else default
+
+    def set(self, key, value):
+        """Store ``value`` under ``key``."""
+        serialized = json.dumps(value, separators=(",", ":"))
+        size = len(serialized.encode("utf-8"))
+        expires = self._expires()
+        with self._lock:
+            self._remember(key, serialized, size, expires)
+            if self._conn is not None and size <= self.max_bytes:
+                with self._conn:
+                    # a delete and an insert rather than INSERT OR REPLACE, whose
+                    # implicit delete does not fire the totals trigger
+                    self._conn.execute(
+                        "DELETE FROM dash_chat_cache WHERE key = ?", (key,)
+                    )
+                    self._conn.execute(
+                        "INSERT INTO dash_chat_cache VALUES (?, ?, ?, ?, ?)",
+                        (key, serialized, size, expires, time.time()),
+                    )
+                    self._trim_database()
+
+    def _database_totals(self):
+        return self._conn.execute(
+            "SELECT entries, bytes FROM dash_chat_cache_totals"
+        ).fetchone()
+
+    def _trim_database(self):
+        count, total = self._database_totals()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        self._conn.execute(
+            "DELETE FROM dash_chat_cache WHERE expires <= ?", (time.time(),)
+        )
+        count, total = self._database_totals()
+        evicted = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM dash_chat_cache ORDER BY used"
+        ):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM dash_chat_cache WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for ``key``, computing it on a miss.
+
+        When several threads miss on the same key at once only the first calls
+        ``compute``; the others wait for and share its result. Exceptions are
+        raised in every waiting thread and nothing is cached.
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                self.misses += 1
+                future = self._in_flight[key] = Future()
+                owner = True
+        if not owner:
+            return future.result()
+        try:
+            value = compute()
+            self.set(key, value)
+            future.set_result(value)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return value
+
+    def stats(self):
+        """Return the hit, miss, coalesced and eviction counters and the size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.coalesced = self.evictions = 0
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM dash_chat_cache")
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def cached_reply(cache, messages, generate, **params):
+    """Return the reply to ``messages`` from the cache or from ``generate()``.
+
+    ``params`` are the model parameters that change the reply (model name,
+    temperature, ...) and are part of the key. Replies to a newest message with
+    ``"cache": False`` are generated and not stored.
+    """
+    if not is_cacheable(messages):
+        return generate()
+    return cache.get_or_compute(cache_key(messages, **params), generate)
+
+
+class _SharedStream:
+    """A streamed reply replayed to every request waiting for it.
+
+    The wrapped backend's stream runs in its own task, so a request closing
+    early does not cut it short for the others; it is cancelled once nobody
+    is reading it. ``store(text)`` is awaited with the complete reply before
+    the task ends.
+    """
+
+    def __init__(self, chunks, store):
+        self.chunks = []
+        self.readers = 0
+        self.received = False
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(chunks, store))
+
+    async def _pump(self, chunks, store):
+        try:
+            async for chunk in chunks:
+                self.chunks.append(chunk)
+                self._notify()
+            self.received = True
+            text = "".join(self.chunks)
+            await store(text)
+            return text
+        finally:
+            self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def read(self):
+        self.readers += 1
+        try:
+            index = 0
+            while True:
+                while index < len(self.chunks):
+                    yield self.chunks[index]
+                    index += 1
+                if self.task.done():
+                    break
+                await self._changed.wait()
+            # raises the wrapped backend's error, if any
+            self.task.result()
+        finally:
+            self.readers -= 1
+            if not self.readers and not self.received and not self.task.done():
+                self.task.cancel()
+
+
+class CachedBackend(ChatBackend):
+    """Backend answering from a :class:`ResponseCache` before asking ``backend``.
+
+    Identical requests in flight on the runner at the same time share one call
+    to the wrapped backend, whether they are completed or streamed; a stream
+    joining late gets the chunks received so far at once. ``params`` are added
+    to the cache key; the wrapped backend's ``model``, ``base_url`` and
+    ``options`` (its default request options) are included automatically, so
+    differently configured backends never share replies.
+    """
+
+    def __init__(self, backend, cache, **params):
+        self.backend = backend
+        self.cache = cache
+        self.params = params
+        self.max_concurrency = backend.max_concurrency
+        self._in_flight = {}
+        self._streams = {}
+
+    def _key(self, messages, options):
+        # the request's options override the backend's, as in OpenAIBackend
+        params = dict(self.params)
+        params.update(getattr(self.backend, "options", None) or {})
+        params.update(options)
+        params.setdefault("model", getattr(self.backend, "model", None))
+        params.setdefault("backend", type(self.backend).__name__)
+        params.setdefault("base_url", getattr(self.backend, "base_url", None))
+        return cache_key(messages, **params)
+
+    # the cache may be a SQLite file shared with other processes, so it is read
+    # and written in a thread rather than blocking every backend on the loop
+    async def _fetch(self, key):
+        return await asyncio.to_thread(self.cache._fetch, key)
+
+    async def _store(self, key, value):
+        await asyncio.to_thread(self.cache.set, key, value)
+
+    def _join(self, key):
+        """Return ``(stream, task)`` of an identical request in flight, or None."""
+        shared = self._streams.get(key)
+        if shared is not None:
+            return shared, shared.task
+        task = self._in_flight.get(key)
+        return (None, task) if task is not None else None
+
+    def _track(self, key, task, shared=None):
+        self._in_flight[key] = task
+        if shared is not None:
+            self._streams[key] = shared
+        task.add_done_callback(lambda _: self._forget(key, task))
+
+    def _forget(self, key, task):
+        if not task.cancelled():
+            # retrieved here too, as every request waiting for it may be gone
+            task.exception()
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        shared = self._streams.get(key)
+        if shared is not None and shared.task is task:
+            del self._streams[key]
+
+    async def _lookup(self, key):
+        """Return ``(found, value, joined)``, reading the cache when needed."""
+        joined = self._join(key)
+        if joined is None:
+            found, value = await self._fetch(key)
+            if found:
+                return True, value, None
+            # an identical request may have started while the cache was read
+            joined = self._join(key)
+        if joined is not None:
+            self.cache._count_coalesced()
+        return False, None, joined
+
+    async def _complete(self, key, messages, options):
+        value = await self.backend.complete(messages, **options)
+        await self._store(key, value)
+        return value
+
+    async def complete(self, messages, **options):
+        if not is_cacheable(messages):
+            return await self.backend.complete(messages, **options)
+        key = self._key(messages, options)
+        found, value, joined = await self._lookup(key)
+        if found:
+            return value
+        if joined is not None:
+            shared, task = joined
+            if shared is not None:
+                return "".join([chunk async for chunk in shared.read()])
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(self._complete(key, messages, options))
+        self._track(key, task)
+        return await asyncio.shield(task)
+
+    async def stream(self, messages, **options):
+        if not is_cacheable(messages):
+            async for chunk in self.backend.stream(messages, **options):
+                yield chunk
+            return
+        key = self._key(messages, options)
+        found, value, joined = await self._lookup(key)
+        if found:
+            yield value
+            return
+        if joined is not None:
+            shared, task = joined
+            if shared is None:
+                yield await asyncio.shield(task)
+                return
+        else:
+            shared = _SharedStream(
+                self.backend.stream(messages, **options),
+                lambda text: self._store(key, text),
+            )
+            self._track(key, shared.task, shared)
+        async for chunk in shared.read():
+            yield chunk
+
+    async def aclose(self):
+        await self.backend.aclose()
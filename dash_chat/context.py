@@ -0,0 +1,246 @@
+"""
+Prompts that fit a model's context window.
+
+Sending the whole conversation to the model every turn makes each request
+slower and more expensive than the last, until it no longer fits the model's
+context window. ``ContextManager`` builds the prompt under a token budget
+instead, choosing which messages to send with a policy:
+
+    from dash_chat.context import ContextManager, PinSystem, RollingSummary
+
+    context = ContextManager(
+        max_tokens=8000,
+        policy=PinSystem(RollingSummary(summarize)),
+    )
+
+    def handle_chat(new_message, messages):
+        messages = messages + [new_message]
+        prompt = context.prompt(messages, session_key=session_id)
+        reply = generate(prompt)
+        ...
+
+Token counts are cached per message, so each turn only counts the new message.
+Messages are identified by their ``id``, role and length, or by Python's hash of
+their content when they have no ``id``. Strings cache their hash, so looking up
+the same message objects again is cheap, but messages parsed afresh from each
+callback's JSON are new strings whose text is hashed again every turn; give
+messages an ``id`` to avoid that. Attachments are counted by their file name
+and type plus a fixed ``attachment_tokens``, never by their base64 data.
+
+The default policy, ``SlidingWindow``, sends the newest messages that fit.
+``PinSystem`` always keeps system messages, and ``RollingSummary`` replaces the
+messages that no longer fit with a summary that is extended as more turns drop
+out. Policies are objects with a ``select(messages, budget, counter,
+session_key)`` method returning the messages to send.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+
+# tokens every chat message costs on top of its content
+MESSAGE_OVERHEAD = 4
+# the cost of a low-detail image in OpenAI models
+ATTACHMENT_TOKENS = 85
+CHARS_PER_TOKEN = 4
+
+
+def approximate_tokens(text):
+    """Estimate the tokens of ``text`` at four characters per token."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def tiktoken_counter(model="gpt-4o-mini"):
+    """Return a function counting tokens exactly with ``tiktoken``.
+
+    Requires the ``tiktoken`` package.
+    """
+    import tiktoken
+
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _parts(content):
+    if isinstance(content, (str, dict)):
+        return [content]
+    return content or []
+
+
+def _reference(part):
+    """Return the text a content part is counted as, and its attachment count."""
+    if isinstance(part, str):
+        return part, 0
+    kind = part.get("type")
+    if kind == "text":
+        return part.get("text", ""), 0
+    if kind == "attachment":
+        return "{} {}".format(part.get("fileName", ""), part.get("fileType", "")), 1
+    # rendered content (graphs, tables) is sent by reference only
+    return "[{}]".format(kind), 0
+
+
+class TokenCounter:
+    """Counts message tokens, caching the count of every message seen.
+
+    ``count_text`` is the function counting the tokens of a string, by default
+    :func:`approximate_tokens`. At most ``max_size`` message counts are cached.
+    """
+
+    def __init__(
+        self, count_text=None, attachment_tokens=ATTACHMENT_TOKENS, max_size=100000
+    ):
+        self.count_text = count_text or approximate_tokens
+        self.attachment_tokens = attachment_tokens
+        self.max_size = max_size
+        self.counted = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _references(self, message):
+        return [_reference(part) for part in _parts(message.get("content"))]
+
+    def _key(self, message, references):
+        length = sum(len(text) for text, _ in references)
+        if message.get("id") is not None:
+            return (message.get("role"), message["id"], length)
+        # a different length from the keys above, so the two never collide
+        return (message.get("role"), length, len(references), hash(tuple(references)))
+
+    def count(self, message):
+        """Return the tokens of one message, counting it only the first time."""
+        references = self._references(message)
+        key = self._key(message, references)
+        with self._lock:
+            tokens = self._cache.get(key)
+            if tokens is not None:
+                self._cache.move_to_end(key)
+                return tokens
+        tokens = MESSAGE_OVERHEAD + sum(
+            self.count_text(text) + attachments * self.attachment_tokens
+            for text, attachments in references
+        )
+        with self._lock:
+            self.counted += 1
+            self._cache[key] = tokens
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def total(self, messages):
+        """Return the tokens of a list of messages."""
+        return sum(self.count(message) for message in messages)
+
+
+class SlidingWindow:
+    """Send the newest messages that fit the budget.
+
+    The newest message is always sent, even when it alone exceeds the budget.
+    """
+
+    def select(self, messages, budget, counter, session_key=None):
+        used = 0
+        start = len(messages)
+        while start > 0:
+            tokens = counter.count(messages[start - 1])
+            if used + tokens > budget and start < len(messages):
+                break
+            used += tokens
+            start -= 1
+        return messages[start:]
+
+
+class PinSystem:
+    """Always send system messages, and choose the others with ``policy``."""
+
+    def __init__(self, policy=None):
+        self.policy = policy or SlidingWindow()
+
+    def select(self, messages, budget, counter, session_key=None):
+        pinned = [message for message in messages if message.get("role") == "system"]
+        others = [message for message in messages if message.get("role") != "system"]
+        remaining = budget - counter.total(pinned)
+        return pinned + self.policy.select(others, remaining, counter, session_key)
+
+
+class RollingSummary:
+    """Replace the messages that do not fit with a summary of them.
+
+    ``summarize(messages, previous_summary)`` returns a summary of ``messages``
+    continuing ``previous_summary`` (``None`` at first). Each turn only the
+    messages newly dropped by ``policy`` are summarized. ``summary_tokens`` of
+    the budget are set aside for the summary, which is sent as a system message.
+    """
+
+    def __init__(self, summarize, policy=None, summary_tokens=500, max_sessions=1024):
+        self.summarize = summarize
+        self.policy = policy or SlidingWindow()
+        self.summary_tokens = summary_tokens
+        self.max_sessions = max_sessions
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def select(self, messages, budget, counter, session_key=None):
+        kept = self.policy.select(
+            messages, budget - self.summary_tokens, counter, session_key
+        )
+        evicted = messages[: len(messages) - len(kept)]
+        if not evicted:
+            return kept
+
+        with self._lock:
+            state = self._summaries.get(session_key)
+        count, last, summary = state or (0, None, None)
+        if count > len(evicted) or (count and evicted[count - 1] != last):
+            # the conversation changed under the summary, start over
+            count, summary = 0, None
+        if count < len(evicted):
+            summary = self.summarize(evicted[count:], summary)
+            with self._lock:
+                self._summaries[session_key] = (len(evicted), evicted[-1], summary)
+                self._summaries.move_to_end(session_key)
+                while len(self._summaries) > self.max_sessions:
+                    self._summaries.popitem(last=False)
+
+        summary_message = {
+            "role": "system",
+            "content": "Summary of the earlier conversation: {}".format(summary),
+        }
+        return [summary_message] + kept
+
+
+class ContextManager:
+    """Build prompts under a token budget.
+
+    ``max_tokens`` is the budget for the prompt, less ``reserve`` tokens kept
+    free for the reply. ``policy`` chooses the messages (``SlidingWindow`` by
+    default) and ``counter`` is the :class:`TokenCounter` used, shared between
+    sessions.
+    """
+
+    def __init__(self, max_tokens, policy=None, counter=None, reserve=0):
+        self.max_tokens = max_tokens
+        self.reserve = reserve
+        self.policy = policy or SlidingWindow()
+        self.counter = counter or TokenCounter()
+
+    @property
+    def budget(self):
+        return self.max_tokens - self.reserve
+
+    def prompt(self, messages, session_key=None):
+        """Return the messages to send for a conversation.
+
+        ``session_key`` identifies the conversation for policies keeping state
+        between turns, such as :class:`RollingSummary`.
+        """
+        return self.policy.select(
+            list(messages), self.budget, self.counter, session_key
+        )
+
+    def count(self, messages):
+        """Return the tokens of a list of messages."""
+        return self.counter.total(messages)
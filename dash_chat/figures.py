@@ -0,0 +1,316 @@
+"""
+Compact Plotly figures for ``graph`` message content.
+
+Figures returned by a chat callback travel through the callback response, are
+persisted with the rest of the conversation and are drawn by Plotly in the
+browser, so a trace with hundreds of thousands of points is slow at every step.
+``compact_figure`` downsamples large traces to a point budget and encodes
+numeric arrays as base64 typed arrays (``{"dtype": "f8", "bdata": ...}``)
+instead of JSON number lists:
+
+    from dash_chat.figures import graph
+
+    reply = {
+        "role": "assistant",
+        "content": [
+            {"type": "text", "text": "Here are last month's requests."},
+            graph(px.line(df, x="time", y="requests"), max_points=2000),
+        ],
+    }
+
+Line traces are downsampled with Largest-Triangle-Three-Buckets, which keeps
+the visual shape of the series, and marker-only traces by keeping the first
+point in each cell of a grid over the plot area. Both keep the points in their
+original order. Requires numpy (``pip install dash-chat[figures]``).
+"""
+
+import base64
+import copy
+
+import numpy as np
+
+DEFAULT_MAX_POINTS = 5000
+
+# attributes holding one value per point, which are sliced along with x and y
+_POINT_ARRAYS = ("x", "y", "text", "hovertext", "customdata", "ids")
+_MARKER_ARRAYS = ("color", "size", "opacity", "symbol")
+_DOWNSAMPLED_TYPES = ("scatter", "scattergl")
+# data arrays plotly.js accepts as typed arrays; other arrays such as axis
+# ranges or domains must stay lists
+_ENCODED_ARRAYS = (
+    "x",
+    "y",
+    "z",
+    "customdata",
+    "open",
+    "high",
+    "low",
+    "close",
+    "lat",
+    "lon",
+    "r",
+    "theta",
+    "values",
+)
+_ENCODED_MARKER_ARRAYS = ("color", "size", "opacity")
+
+# typed arrays plotly.js can decode, by numpy dtype
+_DTYPES = {
+    np.dtype("int8"): "i1",
+    np.dtype("uint8"): "u1",
+    np.dtype("int16"): "i2",
+    np.dtype("uint16"): "u2",
+    np.dtype("int32"): "i4",
+    np.dtype("uint32"): "u4",
+    np.dtype("float32"): "f4",
+    np.dtype("float64"): "f8",
+}
+_INT32 = np.iinfo(np.int32)
+
+
+def _as_numbers(values):
+    """Return values as a float array for downsampling, or None."""
+    array = np.asarray(values)
+    if array.dtype.kind in "iufb":
+        return array.astype(np.float64)
+    if array.dtype.kind == "M":
+        return array.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    try:
+        return array.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    except (TypeError, ValueError):
+        return None
+
+
+def lttb_indices(x, y, threshold):
+    """Return the indices of the points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept, so ``threshold`` must be at
+    least 2; every other bucket contributes the point forming the largest
+    triangle with the previously kept point and the average of the next bucket.
+    """
+    if threshold < 2:
+        raise ValueError("threshold must be at least 2")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold == 2:
+        return np.array([0, n - 1], dtype=np.int64)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_values = y[end:next_end]
+        next_values = next_values[~np.isnan(next_values)]
+        next_y = next_values.mean() if len(next_values) else y[previous]
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        # gaps (NaN) are only kept when the whole bucket is a gap
+        area = np.where(np.isnan(area), -1.0, area)
+        previous = start + int(np.argmax(area))
+        indices[bucket + 1] = previous
+    return indices
+
+
+def grid_indices(x, y, threshold):
+    """Return the indices of the first point in each occupied grid cell.
+
+    The plot area is divided into at most ``threshold`` cells, so at most
+    ``threshold`` points are kept, in their original order.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) <= threshold:
+        return np.arange(len(x))
+    side = max(int(np.sqrt(threshold)), 1)
+
+    def cells(values):
+        finite = values[np.isfinite(values)]
+        if len(finite) == 0:
+            return np.zeros(len(values), dtype=np.int64)
+        low, high = finite.min(), finite.max()
+        scale = (side - 1) / (high - low) if high > low else 0.0
+        position = np.nan_to_num((values - low) * scale, nan=0.0)
+        return np.clip(position, 0, side - 1).astype(np.int64)
+
+    cell = cells(x) * side + cells(y)
+    _, first = np.unique(cell, return_index=True)
+    return np.sort(first)
+
+
+def encode_array(values):
+    """Encode a numeric array as a plotly.js typed array spec.
+
+    Returns ``{"dtype", "bdata"}`` (plus ``"shape"`` for 2-D arrays), or None
+    when the values are not numeric. 64-bit integers are narrowed to 32 bits
+    when they fit and sent as floats otherwise, as plotly.js has no 64-bit
+    integer arrays.
+    """
+    array = np.asarray(values)
+    if array.dtype.kind == "b" or array.dtype.kind not in "iuf" or array.ndim > 2:
+        return None
+    if array.dtype not in _DTYPES:
+        if (
+            array.dtype.kind in "iu"
+            and array.size
+            and _INT32.min <= array.min()
+            and array.max() <= _INT32.max
+        ):
+            array = array.astype(np.int32)
+        else:
+            array = array.astype(np.float64)
+    # typed arrays are little-endian in every browser
+    array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+    spec = {
+        "dtype": _DTYPES[array.dtype.newbyteorder("=")],
+        "bdata": base64.b64encode(array.tobytes()).decode("ascii"),
+    }
+    if array.ndim == 2:
+        spec["shape"] = "{}, {}".format(*array.shape)
+    return spec
+
+
+def decode_array(spec):
+    """Decode a typed array spec (as made by :func:`encode_array`) to numpy."""
+    dtype = np.dtype(spec["dtype"]).newbyteorder("<")
+    array = np.frombuffer(base64.b64decode(spec["bdata"]), dtype=dtype)
+    if spec.get("shape"):
+        array = array.reshape([int(size) for size in str(spec["shape"]).split(",")])
+    return array
+
+
+def _decoded(value):
+    if isinstance(value, dict) and "bdata" in value and "dtype" in value:
+        return decode_array(value)
+    return value
+
+
+def _downsample_trace(trace, max_points):
+    y = trace.get("y")
+    if y is None or trace.get("type", "scatter") not in _DOWNSAMPLED_TYPES:
+        return
+    n = len(y)
+    if n <= max_points:
+        return
+
+    if trace.get("x") is None:
+        x0, dx = trace.get("x0", 0), trace.get("dx", 1)
+        if not isinstance(x0, (int, float)) or not isinstance(dx, (int, float)):
+            return
+        # implicit x positions become explicit once points are dropped
+        trace["x"] = x0 + dx * np.arange(n)
+        trace.pop("x0", None)
+        trace.pop("dx", None)
+    x_numbers = _as_numbers(trace["x"])
+    if x_numbers is None or len(x_numbers) != n:
+        x_numbers = np.arange(n, dtype=np.float64)
+    y_numbers = _as_numbers(y)
+    if y_numbers is None:
+        return
+
+    mode = trace.get("mode") or "lines"
+    if "lines" in mode:
+        indices = lttb_indices(x_numbers, y_numbers, max_points)
+    else:
+        indices = grid_indices(x_numbers, y_numbers, max_points)
+
+    def take(values):
+        if isinstance(values, (list, tuple, np.ndarray)) and len(values) == n:
+            return np.asarray(values)[indices]
+        return values
+
+    for key in _POINT_ARRAYS:
+        if key in trace:
+            trace[key] = take(trace[key])
+    marker = trace.get("marker")
+    if isinstance(marker, dict):
+        for key in _MARKER_ARRAYS:
+            if key in marker:
+                marker[key] = take(marker[key])
+
+
+def _encode(value):
+    if isinstance(value, np.ndarray) or (
+        isinstance(value, (list, tuple))
+        and len(value) > 0
+        and all(
+            isinstance(item, (int, float)) and not isinstance(item, bool)
+            for item in value
+        )
+    ):
+        spec = encode_array(value)
+        if spec is not None:
+            return spec
+    return value
+
+
+def _encode_trace(trace):
+    for key in _ENCODED_ARRAYS:
+        if key in trace:
+            trace[key] = _encode(trace[key])
+    marker = trace.get("marker")
+    if isinstance(marker, dict):
+        for key in _ENCODED_MARKER_ARRAYS:
+            if key in marker:
+                marker[key] = _encode(marker[key])
+
+
+def compact_figure(figure, max_points=DEFAULT_MAX_POINTS, encode=True):
+    """Return a figure dict with large traces downsampled and arrays encoded.
+
+    ``figure`` is a figure dict or a ``plotly.graph_objects.Figure``; it is not
+    modified. Scatter traces with more than ``max_points`` points are
+    downsampled to ``max_points``, which must be at least 2. With ``encode``
+    numeric arrays are sent as base64 typed arrays, otherwise as lists.
+    """
+    if max_points is not None and max_points < 2:
+        raise ValueError("max_points must be at least 2")
+    if hasattr(figure, "to_plotly_json"):
+        figure = figure.to_plotly_json()
+    figure = copy.deepcopy(dict(figure))
+    data = []
+    for trace in figure.get("data", []):
+        trace = {key: _decoded(value) for key, value in trace.items()}
+        if isinstance(trace.get("marker"), dict):
+            trace["marker"] = {
+                key: _decoded(value) for key, value in trace["marker"].items()
+            }
+        if max_points is not None:
+            _downsample_trace(trace, max_points)
+        if encode:
+            _encode_trace(trace)
+        data.append(trace)
+    figure["data"] = data
+    # whatever was not encoded has to be JSON serializable
+    return _to_lists(figure)
+
+
+def _to_lists(value):
+    if isinstance(value, dict):
+        return {key: _to_lists(item) for key, item in value.items()}
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "M":
+            return np.datetime_as_string(value).tolist()
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_to_lists(item) for item in value]
+    return value
+
+
+def graph(figure, max_points=DEFAULT_MAX_POINTS, encode=True, **props):
+    """Return a ``graph`` content part for a message.
+
+    The figure is compacted with :func:`compact_figure`; other keyword arguments
+    (``config``, ``responsive``, ``style``, ...) are passed on as graph props.
+    """
+    props["figure"] = compact_figure(figure, max_points=max_points, encode=encode)
+    return {"type": "graph", "props": props}
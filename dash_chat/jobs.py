@@ -0,0 +1,544 @@
+"""
+Generation jobs run by a worker pool, with status and cancellation.
+
+Generating a reply inside the chat callback holds the request thread for the
+whole generation, and the user has no way to stop it. A ``JobPool`` runs every
+turn as a job on its worker threads instead. The chat callback submits the job
+and returns its status to the component's ``job_status`` prop, which keeps the
+typing indicator up while the job is queued or running and shows a stop button
+that sets ``cancel_job``:
+
+    from dash_chat.jobs import JobPool, JobQueue
+
+    def generate(job):
+        # closing the stream cancels the model request
+        return runner.stream(backend, job.payload["messages"], job.session_key)
+
+    pool = JobPool(generate, workers=8, queue=JobQueue("jobs.db"), hub=hub)
+
+    @callback(
+        Output("chat", "messages"),
+        Output("chat", "job_status"),
+        Input("chat", "new_message"),
+        State("chat", "messages"),
+        State("chat", "session_id"),
+        prevent_initial_call=True,
+    )
+    def handle_chat(new_message, messages, session_id):
+        messages = messages + [new_message]
+        return messages, pool.submit(session_id, {"messages": messages})
+
+    @callback(
+        Output("chat", "job_status", allow_duplicate=True),
+        Input("chat", "cancel_job"),
+        State("chat", "session_id"),
+        prevent_initial_call=True,
+    )
+    def stop(job_id, session_id):
+        return pool.cancel(job_id, session_id)
+
+The handler returns the reply text, a message dict, or an iterable (or async
+iterable) of text chunks. Chunked replies are checked for cancellation between
+chunks, and a cancelled stream is closed so the upstream request is dropped.
+With a ``dash_chat.push`` hub the chunks, the reply and every status change are
+pushed to the component; without one, a ``dcc.Interval`` callback picks up the
+replies with ``pool.collect(session_id)`` and the status with ``pool.status``.
+
+Jobs are kept in a SQLite ``JobQueue``. With a database file, several server
+processes (e.g. gunicorn workers) share the queue: any process's workers run
+the next job, and status and cancellation reach the job wherever it runs. A
+running job holds a lease its pool renews; when the process running it dies,
+the lease runs out and the job is queued again.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+from .streaming import _iterate, iter_deltas
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """Raised by :meth:`Job.raise_if_cancelled` to stop a cancelled job."""
+
+
+class JobQueue:
+    """Jobs and their results in a SQLite database.
+
+    Without ``path`` the database is in memory and only shared by the threads
+    of this process. Finished jobs are deleted ``keep`` seconds after they
+    ended. A running job whose lease was not renewed for ``lease`` seconds,
+    because the process running it died, is queued again, or fails once it
+    was claimed ``max_attempts`` times.
+    """
+
+    def __init__(self, path=None, keep=3600, lease=30, max_attempts=3):
+        self.path = path
+        self.keep = keep
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._next_expiry = 0.0
+        self._lock = threading.Lock()
+        # wakes the local workers when a job is queued by this process
+        self.queued = threading.Condition(self._lock)
+        self._conn = sqlite3.connect(
+            path or ":memory:", check_same_thread=False, timeout=30
+        )
+        with self._conn:
+            if path is not None:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS dash_chat_jobs (
+                    id TEXT PRIMARY KEY,
+                    session_key TEXT,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    cancel INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    collected INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS dash_chat_jobs_status "
+                "ON dash_chat_jobs (status, created)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS dash_chat_jobs_session "
+                "ON dash_chat_jobs (session_key, status)"
+            )
+
+    def put(self, session_key, payload):
+        """Queue a job with a JSON-serializable ``payload``; returns its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO dash_chat_jobs (id, session_key, payload, status, "
+                    "created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, session_key, json.dumps(payload), QUEUED, now, now),
+                )
+                self._conn.execute(
+                    "DELETE FROM dash_chat_jobs WHERE updated < ? "
+                    "AND status IN (?, ?, ?)",
+                    (now - self.keep,) + FINISHED,
+                )
+            self.queued.notify()
+        return job_id
+
+    def claim(self):
+        """Mark the next queued job running and return it, or None.
+
+        Returns ``(job_id, session_key, payload)``. Only one process gets a job,
+        however many claim it at once.
+        """
+        with self._lock:
+            if time.monotonic() >= self._next_expiry:
+                self._next_expiry = time.monotonic() + self.lease / 4
+                self._expire()
+            while True:
+                # sessions with fewer running jobs first, so a session
+                # queuing many turns does not delay everyone else's
+                row = self._conn.execute(
+                    "SELECT id, session_key, payload FROM dash_chat_jobs AS job "
+                    "WHERE status = ? ORDER BY (SELECT COUNT(*) FROM dash_chat_jobs "
+                    "WHERE session_key = job.session_key AND status = ?), created "
+                    "LIMIT 1",
+                    (QUEUED, RUNNING),
+                ).fetchone()
+                if row is None:
+                    return None
+                with self._conn:
+                    claimed = self._conn.execute(
+                        "UPDATE dash_chat_jobs SET status = ?, updated = ?, "
+                        "attempts = attempts + 1 WHERE id = ? AND status = ?",
+                        (RUNNING, time.time(), row[0], QUEUED),
+                    ).rowcount
+                if claimed:
+                    return row[0], row[1], json.loads(row[2])
+
+    def _expire(self):
+        # caller holds the lock
+        cutoff = time.time() - self.lease
+        with self._conn:
+            self._conn.execute(
+                "UPDATE dash_chat_jobs SET status = ?, updated = ? "
+                "WHERE status = ? AND updated < ? AND cancel = 1",
+                (CANCELLED, time.time(), RUNNING, cutoff),
+            )
+            self._conn.execute(
+                "UPDATE dash_chat_jobs SET status = ?, error = ?, updated = ? "
+                "WHERE status = ? AND updated < ? AND attempts >= ?",
+                (
+                    FAILED,
+                    "The worker running the job stopped",
+                    time.time(),
+                    RUNNING,
+                    cutoff,
+                    self.max_attempts,
+                ),
+            )
+            requeued = self._conn.execute(
+                "UPDATE dash_chat_jobs SET status = ? "
+                "WHERE status = ? AND updated < ?",
+                (QUEUED, RUNNING, cutoff),
+            ).rowcount
+        if requeued:
+            logger.warning("Requeued %d jobs whose worker stopped", requeued)
+
+    def renew(self, job_ids):
+        """Extend the lease of running jobs, as their worker is still alive."""
+        if not job_ids:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE dash_chat_jobs SET updated = ? WHERE id = ? AND status = ?",
+                [(time.time(), job_id, RUNNING) for job_id in job_ids],
+            )
+
+    def finish(self, job_id, status, result=None, error=None):
+        """Record the end of a running job."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE dash_chat_jobs SET status = ?, result = ?, error = ?, "
+                "updated = ? WHERE id = ?",
+                (
+                    status,
+                    None if result is None else json.dumps(result),
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def cancel(self, job_id, session_key=None):
+        """Cancel a queued job, or ask the worker running it to stop.
+
+        With ``session_key`` only a job of that session is cancelled. Returns
+        whether the job was found unfinished.
+        """
+        match = "id = ?" if session_key is None else "id = ? AND session_key = ?"
+        params = (job_id,) if session_key is None else (job_id, session_key)
+        with self._lock, self._conn:
+            queued = self._conn.execute(
+                "UPDATE dash_chat_jobs SET status = ?, updated = ? "
+                "WHERE status = ? AND " + match,
+                (CANCELLED, time.time(), QUEUED) + params,
+            ).rowcount
+            running = self._conn.execute(
+                "UPDATE dash_chat_jobs SET cancel = 1 WHERE status = ? AND " + match,
+                (RUNNING,) + params,
+            ).rowcount
+        return bool(queued or running)
+
+    def cancel_requested(self, job_id):
+        """Return whether the running job ``job_id`` was cancelled."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cancel FROM dash_chat_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return row is None or bool(row[0])
+
+    def get(self, job_id):
+        """Return ``(session_key, status, position, error)`` of a job, or None.
+
+        ``position`` is the number of jobs queued before a queued job.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT session_key, status, error, created FROM dash_chat_jobs "
+                "WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            session_key, status, error, created = row
+            position = None
+            if status == QUEUED:
+                (position,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM dash_chat_jobs "
+                    "WHERE status = ? AND created < ?",
+                    (QUEUED, created),
+                ).fetchone()
+        return session_key, status, position, error
+
+    def unfinished(self, session_key):
+        """Return the number of queued and running jobs of a session."""
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM dash_chat_jobs "
+                "WHERE session_key = ? AND status IN (?, ?)",
+                (session_key, QUEUED, RUNNING),
+            ).fetchone()
+        return count
+
+    def collect(self, session_key):
+        """Return the replies of a session's finished jobs not collected yet."""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, result FROM dash_chat_jobs WHERE session_key = ? "
+                "AND status IN (?, ?, ?) AND collected = 0 ORDER BY created",
+                (session_key,) + FINISHED,
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE dash_chat_jobs SET collected = 1 WHERE id = ?",
+                [(job_id,) for job_id, _ in rows],
+            )
+        return [json.loads(result) for _, result in rows if result is not None]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Job:
+    """A job as seen by the handler running it.
+
+    ``payload`` is the value passed to :meth:`JobPool.submit`. Handlers that do
+    not return chunks should check ``cancelled`` (or call
+    :meth:`raise_if_cancelled`) between steps of long work.
+    """
+
+    def __init__(self, queue, job_id, session_key, payload, poll_interval):
+        self.id = job_id
+        self.session_key = session_key
+        self.payload = payload
+        self._queue = queue
+        self._poll_interval = poll_interval
+        self._cancelled = threading.Event()
+        self._next_check = 0.0
+
+    @property
+    def cancelled(self):
+        # cancellation may come from another process, look it up now and then
+        if not self._cancelled.is_set() and time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self._poll_interval
+            if self._queue.cancel_requested(self.id):
+                self._cancelled.set()
+        return self._cancelled.is_set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(self.id)
+
+
+class JobPool:
+    """Runs queued jobs on ``workers`` threads with ``handler(job)``.
+
+    Model calls wait on the network, so threads are enough to run many of them
+    at once; keep CPU-bound work out of the handler. Workers look for jobs
+    queued by other processes every ``poll_interval`` seconds, which also
+    bounds how long a cancellation from another process takes to be noticed.
+    With ``hub``, a :class:`dash_chat.push.PushHub`, replies and status
+    changes are pushed to the job's session. The leases of running jobs are
+    renewed by a separate thread, so a handler may take longer than the
+    queue's ``lease`` without its job being queued again.
+    """
+
+    def __init__(self, handler, workers=4, queue=None, hub=None, poll_interval=0.5):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.handler = handler
+        self.queue = queue if queue is not None else JobQueue()
+        self.hub = hub
+        self.poll_interval = poll_interval
+        self._running = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stopped = threading.Event()
+        self._heartbeat = threading.Thread(
+            target=self._renew, name="dash-chat-jobs-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+        self._threads = [
+            threading.Thread(
+                target=self._work, name="dash-chat-jobs-{}".format(i), daemon=True
+            )
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, session_key, payload):
+        """Queue a job and return its status, for the ``job_status`` prop."""
+        job_id = self.queue.put(session_key, payload)
+        status = self.status(job_id)
+        self._publish(session_key, status)
+        return status
+
+    def status(self, job_id):
+        """Return ``{"id", "status"}`` of a job, or None when it is unknown.
+
+        Queued jobs also have their ``position`` in the queue and failed ones
+        their ``error``.
+        """
+        found = self.queue.get(job_id)
+        if found is None:
+            return None
+        _, status, position, error = found
+        result = {"id": job_id, "status": status}
+        if position is not None:
+            result["position"] = position
+        if error is not None:
+            result["error"] = error
+        return result
+
+    def cancel(self, job_id, session_key=None):
+        """Cancel a job and return its status.
+
+        A queued job never runs; a running one is stopped at its next chunk.
+        With ``session_key`` only a job of that session is cancelled, so the
+        ``cancel_job`` prop cannot stop other users' jobs.
+        """
+        if not job_id:
+            return None
+        found = self.queue.get(job_id)
+        if found is None or session_key not in (None, found[0]):
+            return None
+        if self.queue.cancel(job_id, session_key):
+            with self._lock:
+                job = self._running.get(job_id)
+            if job is not None:
+                job._cancelled.set()
+            else:
+                # a queued job, or one running in another process
+                self._publish(found[0], self.status(job_id))
+        return self.status(job_id)
+
+    def pending(self, session_key):
+        """Return how many jobs of a session are queued or running."""
+        return self.queue.unfinished(session_key)
+
+    def collect(self, session_key):
+        """Return the replies of a session's finished jobs, oldest first.
+
+        Each reply is returned once. Cancelled jobs return the text streamed
+        before they stopped, if any.
+        """
+        return self.queue.collect(session_key)
+
+    def _publish(self, session_key, status):
+        if self.hub is not None and session_key is not None and status is not None:
+            self.hub.publish(session_key, "job", status)
+
+    def _work(self):
+        while not self._closed:
+            try:
+                self._work_once()
+            except Exception:
+                # e.g. a locked database or a failing hub; the job's lease
+                # runs out and it is queued again
+                logger.exception("Job worker failed, retrying")
+                self._stopped.wait(self.poll_interval)
+
+    def _work_once(self):
+        claimed = self.queue.claim()
+        if claimed is None:
+            with self.queue.queued:
+                self.queue.queued.wait(self.poll_interval)
+            return
+        job = Job(self.queue, *claimed, poll_interval=self.poll_interval)
+        with self._lock:
+            self._running[job.id] = job
+        try:
+            self._run(job)
+        finally:
+            with self._lock:
+                del self._running[job.id]
+
+    def _renew(self):
+        while not self._stopped.wait(self.queue.lease / 4):
+            with self._lock:
+                job_ids = list(self._running)
+            try:
+                self.queue.renew(job_ids)
+            except Exception:
+                logger.exception("Renewing job leases failed")
+
+    def _run(self, job):
+        self._publish(job.session_key, {"id": job.id, "status": RUNNING})
+        reply = None
+        error = None
+        streamed = False
+        try:
+            result = self.handler(job)
+            if isinstance(result, str):
+                reply = {"role": "assistant", "content": result, "id": job.id}
+            elif result is None or isinstance(result, dict):
+                reply = result
+            else:
+                reply = self._stream(job, result)
+                streamed = True
+            if not job.cancelled:
+                status = DONE
+            else:
+                status = CANCELLED
+                if not streamed:
+                    # finished after the user stopped waiting for it
+                    reply = None
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:
+            status, error = FAILED, str(e) or type(e).__name__
+        if reply is not None and self.hub is not None and job.session_key is not None:
+            self.hub.send_message(job.session_key, reply)
+        self.queue.finish(job.id, status, reply, error)
+        self._publish(job.session_key, self.status(job.id))
+
+    def _stream(self, job, chunks):
+        """Consume a reply's chunks until it ends or the job is cancelled."""
+        parts = []
+
+        def until_cancelled():
+            iterator = _iterate(chunks)
+            try:
+                for chunk in iterator:
+                    if job.cancelled:
+                        break
+                    parts.append(chunk)
+                    yield chunk
+            finally:
+                # closing the stream cancels the request behind it
+                iterator.close()
+
+        if self.hub is not None and job.session_key is not None:
+            for delta in iter_deltas(until_cancelled(), job.id):
+                self.hub.send_delta(job.session_key, delta)
+        else:
+            for _ in until_cancelled():
+                pass
+        if not parts and job.cancelled:
+            return None
+        return {"role": "assistant", "content": "".join(parts), "id": job.id}
+
+    def close(self, timeout=5):
+        """Stop the running jobs and the workers."""
+        self._closed = True
+        self._stopped.set()
+        with self._lock:
+            running = list(self._running.values())
+        for job in running:
+            self.queue.cancel(job.id)
+            job._cancelled.set()
+        with self.queue.queued:
+            self.queue.queued.notify_all()
+        for thread in self._threads + [self._heartbeat]:
+            thread.join(timeout)
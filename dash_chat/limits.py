@@ -0,0 +1,294 @@
+"""
+Per-session admission control for chat turns.
+
+One user holding Enter, or a scripted client, can fire callbacks faster than
+the model answers and use up the quota of everyone else. An
+``AdmissionController`` rate-limits turns with a token bucket per session and
+one for the whole app, and bounds how many turns wait for admission at once;
+turns over a limit are shed according to its ``policy``:
+
+    from dash_chat.limits import AdmissionController
+
+    limiter = AdmissionController(session_rate=0.2, session_burst=3, app_rate=10)
+
+    @callback(
+        Output("chat", "messages"),
+        Output("chat", "admission"),
+        Input("chat", "new_message"),
+        State("chat", "messages"),
+        State("chat", "session_id"),
+        prevent_initial_call=True,
+    )
+    def handle_chat(new_message, messages, session_id):
+        admission = limiter.admit(session_id)
+        if not admission:
+            return no_update, admission.status
+        messages = messages + [new_message]
+        return messages + [generate(messages)], admission.status
+
+The ``admission`` prop disables the send button while a turn is queued or
+until a rejected one may be retried, and tells the user why. Policies:
+
+``"reject"``
+    turns over a limit are rejected straight away, with a ``retry_after``.
+``"queue"``
+    turns wait (in the callback) until the buckets admit them, for at most
+    ``max_wait`` seconds.
+``"coalesce"``
+    like ``"queue"``, but a new turn from a session with a turn waiting takes
+    its place: only the latest message is answered.
+
+However long the waits, at most ``max_queue`` turns wait at once; further turns
+are rejected as overloaded, so a burst cannot hold every server thread and
+the turns of well-behaved sessions keep a bounded latency. With a
+``dash_chat.push`` hub, sessions also see their queue position while waiting.
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+REJECT = "reject"
+QUEUE = "queue"
+COALESCE = "coalesce"
+POLICIES = (REJECT, QUEUE, COALESCE)
+
+ADMITTED = "admitted"
+QUEUED = "queued"
+REJECTED = "rejected"
+COALESCED = "coalesced"
+
+
+class TokenBucket:
+    """Token bucket allowing ``rate`` requests per second with bursts of ``burst``.
+
+    Tokens are reserved in order, possibly ahead of time, so waiting requests
+    are admitted at the bucket's rate in the order they came. Not thread-safe;
+    the caller locks.
+    """
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._interval = 1.0 / rate
+        self._tolerance = (burst - 1) * self._interval
+        # when the bucket would be full again, if nothing else were taken
+        self._full_at = 0.0
+
+    def delay(self, now):
+        """Return the seconds until a token is available."""
+        return max(0.0, self._full_at - self._tolerance - now)
+
+    def take(self, now):
+        """Reserve a token and return the seconds until it is available."""
+        delay = self.delay(now)
+        self._full_at = max(self._full_at, now) + self._interval
+        return delay
+
+    def tokens(self, now):
+        """Return the number of tokens available now."""
+        full_in = max(0.0, self._full_at - now)
+        return int(self.burst - full_in * self.rate + 1e-9)
+
+
+class Admission:
+    """The decision on a turn; true when the turn may run.
+
+    ``status`` is the value for the ChatComponent ``admission`` prop.
+    """
+
+    __slots__ = ("status",)
+
+    def __init__(self, status, **details):
+        self.status = dict(details, status=status)
+
+    @property
+    def admitted(self):
+        return self.status["status"] == ADMITTED
+
+    def __bool__(self):
+        return self.admitted
+
+    def __repr__(self):
+        return "Admission({!r})".format(self.status)
+
+
+def _rejected(reason, retry_after):
+    return Admission(REJECTED, reason=reason, retry_after=round(retry_after, 3))
+
+
+class AdmissionController:
+    """Decides which chat turns run, with rate limits and a bounded wait queue.
+
+    Each session may start ``session_rate`` turns per second with bursts of
+    ``session_burst``; with ``app_rate`` all sessions together may start
+    ``app_rate`` per second with bursts of ``app_burst`` (default
+    ``app_rate``). Buckets of at most ``max_sessions`` sessions are kept,
+    the least recently seen are dropped first.
+    """
+
+    def __init__(
+        self,
+        session_rate=0.5,
+        session_burst=3,
+        app_rate=None,
+        app_burst=None,
+        policy=QUEUE,
+        max_queue=64,
+        max_wait=30.0,
+        max_sessions=10000,
+        hub=None,
+    ):
+        if policy not in POLICIES:
+            raise ValueError("policy must be one of {}".format(", ".join(POLICIES)))
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.policy = policy
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_sessions = max_sessions
+        self.hub = hub
+        self.app_bucket = None
+        if app_rate is not None:
+            self.app_bucket = TokenBucket(app_rate, app_burst or max(1, int(app_rate)))
+        self.admitted = 0
+        self.rejected = 0
+        self.coalesced = 0
+        self._buckets = OrderedDict()
+        # ticket -> (session key, time it is admitted, app token taken) of the
+        # waiting turns
+        self._waiting = {}
+        # session key -> ticket of its newest waiting turn
+        self._latest = {}
+        self._tickets = itertools.count()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def _bucket(self, session_key):
+        # caller holds the lock
+        bucket = self._buckets.get(session_key)
+        if bucket is None:
+            bucket = self._buckets[session_key] = TokenBucket(
+                self.session_rate, self.session_burst
+            )
+            while len(self._buckets) > self.max_sessions:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(session_key)
+        return bucket
+
+    def _delay(self, bucket, now):
+        # caller holds the lock; returns (seconds, the limit causing the wait)
+        delay, reason = bucket.delay(now), "session_rate"
+        if self.app_bucket is not None and self.app_bucket.delay(now) > delay:
+            delay, reason = self.app_bucket.delay(now), "app_rate"
+        return delay, reason
+
+    def _take(self, bucket, now):
+        # caller holds the lock
+        bucket.take(now)
+        if self.app_bucket is not None:
+            self.app_bucket.take(now)
+
+    def try_admit(self, session_key):
+        """Admit a turn if the buckets allow it now, without ever waiting.
+
+        Use it in front of a queue of its own, e.g. a
+        :class:`dash_chat.jobs.JobPool`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(session_key)
+            delay, reason = self._delay(bucket, now)
+            if delay > 0:
+                self.rejected += 1
+                return _rejected(reason, delay)
+            self._take(bucket, now)
+            self.admitted += 1
+            return Admission(ADMITTED)
+
+    def admit(self, session_key):
+        """Decide on a turn of ``session_key``, waiting when the policy queues.
+
+        Returns an :class:`Admission`, true when the turn may run. Queued turns
+        block the calling thread until they are admitted, or until a newer turn
+        of the same session replaces them under the ``"coalesce"`` policy.
+        """
+        if self.policy == REJECT:
+            return self.try_admit(session_key)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(session_key)
+            replaced = self._latest.get(session_key)
+            if self.policy == COALESCE and replaced is not None:
+                # take over the slot of the waiting turn
+                _, start, app_taken = self._waiting.pop(replaced)
+                self._changed.notify_all()
+            else:
+                delay, reason = self._delay(bucket, now)
+                if delay == 0:
+                    self._take(bucket, now)
+                    self.admitted += 1
+                    return Admission(ADMITTED)
+                if delay > self.max_wait:
+                    self.rejected += 1
+                    return _rejected(reason, delay)
+                if len(self._waiting) >= self.max_queue:
+                    self.rejected += 1
+                    return _rejected("overloaded", delay)
+                start, app_taken = now + bucket.take(now), False
+            ticket = next(self._tickets)
+            self._waiting[ticket] = (session_key, start, app_taken)
+            self._latest[session_key] = ticket
+            position = sum(1 for _, other, _ in self._waiting.values() if other < start)
+        self._publish(session_key, QUEUED, position=position)
+        return self._wait(session_key, ticket)
+
+    def _wait(self, session_key, ticket):
+        with self._changed:
+            while ticket in self._waiting:
+                _, start, app_taken = self._waiting[ticket]
+                now = time.monotonic()
+                if start <= now and not app_taken and self.app_bucket is not None:
+                    # the app's tokens go to turns the session limit lets through,
+                    # so one session's queued turns cannot reserve them all
+                    start = now + self.app_bucket.take(now)
+                    self._waiting[ticket] = (session_key, start, True)
+                if start <= now:
+                    del self._waiting[ticket]
+                    if self._latest.get(session_key) == ticket:
+                        del self._latest[session_key]
+                    self.admitted += 1
+                    admission = Admission(ADMITTED)
+                    break
+                self._changed.wait(start - now)
+            else:
+                # a newer turn of the session took the slot
+                self.coalesced += 1
+                admission = Admission(COALESCED)
+        self._publish(session_key, admission.status["status"])
+        return admission
+
+    def _publish(self, session_key, status, **details):
+        if self.hub is not None and session_key is not None:
+            self.hub.publish(session_key, "admission", dict(details, status=status))
+
+    def waiting(self):
+        """Return the number of turns waiting for admission."""
+        with self._lock:
+            return len(self._waiting)
+
+    def stats(self):
+        """Return the admitted, rejected and coalesced counters and the queue."""
+        with self._lock:
+            return {
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "coalesced": self.coalesced,
+                "waiting": len(self._waiting),
+                "sessions": len(self._buckets),
+            }
@@ -0,0 +1,452 @@
+"""
+Load test a chat app with many concurrent sessions.
+
+Starts a sample app with a ``ChatComponent`` answered by a ``FakeBackend`` in a
+separate process, then simulates concurrent users: each session posts
+``new_message`` callback requests straight to ``/_dash-update-component``,
+exactly as the browser does, with random think times between turns. Reports
+the turn latency percentiles, throughput, payload sizes and the server's
+resident memory as the conversations grow:
+
+    python -m dash_chat.loadtest --sessions 50 --turns 20 --think-time 2
+
+With ``--history-mode server`` the sample app keeps the history in a
+``MemoryStore`` and requests only carry the new message. ``--url`` points the
+sessions at an app that is already running instead; it must have the same
+callback (see ``create_app``). Everything runs on one machine, so the numbers
+measure the server process under concurrency, not the network.
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import math
+import multiprocessing
+import random
+import socket
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+COMPONENT_ID = "chat"
+UPDATE_PATH = "/_dash-update-component"
+
+
+def create_app(history_mode="client", latency=0.5, reply_words=50):
+    """Return the sample app: one chat answered by a ``FakeBackend``.
+
+    ``latency`` is the backend's time to answer in seconds and ``reply_words``
+    the length of its replies.
+    """
+    import dash
+    from dash import Input, Output, State, html
+
+    from . import ChatComponent
+    from .backends import FakeBackend, get_runner
+    from .store import MemoryStore
+
+    backend = FakeBackend(reply=" ".join(["word"] * reply_words), latency=latency)
+    runner = get_runner()
+    app = dash.Dash(__name__)
+    app.layout = html.Div(
+        [ChatComponent(id=COMPONENT_ID, messages=[], history_mode=history_mode)]
+    )
+
+    if history_mode == "server":
+        store = MemoryStore(max_conversations=100000)
+
+        @app.callback(
+            Output(COMPONENT_ID, "messages"),
+            Input(COMPONENT_ID, "new_message"),
+            State(COMPONENT_ID, "session_id"),
+            prevent_initial_call=True,
+        )
+        def reply_server(new_message, session_id):
+            store.append(COMPONENT_ID, session_id, new_message)
+            history = store.get_messages(COMPONENT_ID, session_id)
+            reply = runner.run(backend, history, session_key=session_id)
+            store.append(COMPONENT_ID, session_id, reply)
+            return [reply]
+
+    else:
+
+        @app.callback(
+            Output(COMPONENT_ID, "messages"),
+            Input(COMPONENT_ID, "new_message"),
+            State(COMPONENT_ID, "messages"),
+            prevent_initial_call=True,
+        )
+        def reply_client(new_message, messages):
+            history = (messages or []) + [new_message]
+            return history + [runner.run(backend, history)]
+
+    return app
+
+
+def _serve(port, app_options):
+    from werkzeug.serving import make_server
+
+    # one log line per request would dominate the run
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    app = create_app(**app_options)
+    make_server("127.0.0.1", port, app.server, threaded=True).serve_forever()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(history_mode="client", latency=0.5, reply_words=50, timeout=30):
+    """Start the sample app in a new process; returns ``(process, url)``."""
+    port = _free_port()
+    process = multiprocessing.Process(
+        target=_serve,
+        args=(
+            port,
+            {
+                "history_mode": history_mode,
+                "latency": latency,
+                "reply_words": reply_words,
+            },
+        ),
+        daemon=True,
+    )
+    process.start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if not process.is_alive() or time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError("The sample app did not start")
+            time.sleep(0.1)
+    return process, "http://127.0.0.1:{}".format(port)
+
+
+def rss_bytes(pid):
+    """Return the resident memory of a process, or None when unknown."""
+    try:
+        import psutil
+
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/{}/status".format(pid)) as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def percentile(values, q):
+    """Return the ``q``-th percentile of ``values`` (linear interpolation)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = math.floor(position)
+    high = math.ceil(position)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _request_body(new_message, history_mode, messages, session_id):
+    state = (
+        {"id": COMPONENT_ID, "property": "session_id", "value": session_id}
+        if history_mode == "server"
+        else {"id": COMPONENT_ID, "property": "messages", "value": messages}
+    )
+    return {
+        "output": "{}.messages".format(COMPONENT_ID),
+        "outputs": {"id": COMPONENT_ID, "property": "messages"},
+        "inputs": [
+            {"id": COMPONENT_ID, "property": "new_message", "value": new_message}
+        ],
+        "state": [state],
+        "changedPropIds": ["{}.new_message".format(COMPONENT_ID)],
+    }
+
+
+class _Session(threading.Thread):
+    def __init__(self, url, turns, think_time, history_mode, seed, results, timeout):
+        super().__init__(daemon=True)
+        self.url = urlsplit(url)
+        self.turns = turns
+        self.think_time = think_time
+        self.history_mode = history_mode
+        self.random = random.Random(seed)
+        self.results = results
+        self.timeout = timeout
+        self.session_id = uuid.UUID(int=self.random.getrandbits(128)).hex
+
+    def _post(self, connection, body):
+        payload = json.dumps(body).encode("utf-8")
+        start = time.perf_counter()
+        connection.request(
+            "POST",
+            UPDATE_PATH,
+            body=payload,
+            headers={"Content-Type": "application/json"},
+        )
+        response = connection.getresponse()
+        data = response.read()
+        latency = time.perf_counter() - start
+        if response.status != 200:
+            raise RuntimeError("HTTP {}".format(response.status))
+        return latency, len(payload), data
+
+    def run(self):
+        connection = http.client.HTTPConnection(
+            self.url.hostname, self.url.port, timeout=self.timeout
+        )
+        messages = []
+        for turn in range(self.turns):
+            if self.think_time:
+                time.sleep(self.random.expovariate(1 / self.think_time))
+            new_message = {
+                "role": "user",
+                "content": "Question {} from {}".format(turn, self.session_id),
+                "id": int(time.time() * 1000),
+            }
+            body = _request_body(
+                new_message, self.history_mode, messages, self.session_id
+            )
+            try:
+                latency, sent, data = self._post(connection, body)
+                returned = json.loads(data)["response"][COMPONENT_ID]["messages"]
+            except Exception as e:
+                connection.close()
+                connection = http.client.HTTPConnection(
+                    self.url.hostname, self.url.port, timeout=self.timeout
+                )
+                self.results.error(turn, e)
+                continue
+            if self.history_mode == "server":
+                messages = messages + [new_message] + returned
+            else:
+                messages = returned
+            self.results.add(turn, latency, sent, len(data))
+        connection.close()
+
+
+class LoadTestResults:
+    """Turn latencies and payload sizes collected by the sessions."""
+
+    def __init__(self, pid=None):
+        self.pid = pid
+        self.turns = {}
+        self.errors = []
+        self.rss = {}
+        self._remaining = {}
+        self._lock = threading.Lock()
+
+    def expect(self, sessions, turns):
+        self._remaining = {turn: sessions for turn in range(turns)}
+
+    def _finish_turn(self, turn):
+        self._remaining[turn] -= 1
+        if self._remaining[turn] == 0 and self.pid is not None:
+            # every session has sent this many turns
+            self.rss[turn] = rss_bytes(self.pid)
+
+    def add(self, turn, latency, sent, received):
+        with self._lock:
+            self.turns.setdefault(turn, []).append((latency, sent, received))
+            self._finish_turn(turn)
+
+    def error(self, turn, error):
+        with self._lock:
+            self.errors.append((turn, repr(error)))
+            self._finish_turn(turn)
+
+    def summary(self, elapsed):
+        """Return the report as a JSON-serializable dict."""
+        samples = [sample for turn in self.turns.values() for sample in turn]
+        latencies = [latency for latency, _, _ in samples]
+
+        def ms(value):
+            return None if value is None else round(value * 1000, 2)
+
+        by_turn = []
+        for turn in sorted(self.turns):
+            turn_samples = self.turns[turn]
+            turn_latencies = [latency for latency, _, _ in turn_samples]
+            by_turn.append(
+                {
+                    "turn": turn + 1,
+                    "p50_ms": ms(percentile(turn_latencies, 50)),
+                    "p95_ms": ms(percentile(turn_latencies, 95)),
+                    "request_bytes": round(
+                        sum(sent for _, sent, _ in turn_samples) / len(turn_samples)
+                    ),
+                    "response_bytes": round(
+                        sum(received for _, _, received in turn_samples)
+                        / len(turn_samples)
+                    ),
+                    "rss_bytes": self.rss.get(turn),
+                }
+            )
+        return {
+            "requests": len(samples),
+            "errors": len(self.errors),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95)),
+            "p99_ms": ms(percentile(latencies, 99)),
+            "max_ms": ms(max(latencies) if latencies else None),
+            "request_bytes": sum(sent for _, sent, _ in samples),
+            "response_bytes": sum(received for _, _, received in samples),
+            "by_turn": by_turn,
+            "error_samples": self.errors[:10],
+        }
+
+
+def run_load_test(
+    url,
+    sessions=10,
+    turns=10,
+    think_time=1.0,
+    history_mode="client",
+    ramp_up=0.0,
+    seed=0,
+    pid=None,
+    timeout=60,
+):
+    """Run ``sessions`` concurrent sessions of ``turns`` turns against ``url``.
+
+    ``think_time`` is the mean pause before each message, drawn from an
+    exponential distribution, and sessions start spread over ``ramp_up``
+    seconds. ``pid`` is the server process whose memory is sampled after each
+    turn. Returns the summary of :meth:`LoadTestResults.summary`.
+    """
+    results = LoadTestResults(pid)
+    results.expect(sessions, turns)
+    rss_start = rss_bytes(pid) if pid is not None else None
+    threads = [
+        _Session(url, turns, think_time, history_mode, seed + i, results, timeout)
+        for i in range(sessions)
+    ]
+    start = time.perf_counter()
+    for i, thread in enumerate(threads):
+        if ramp_up and i:
+            time.sleep(ramp_up / sessions)
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = results.summary(time.perf_counter() - start)
+    summary.update(
+        sessions=sessions,
+        turns=turns,
+        think_time_s=think_time,
+        history_mode=history_mode,
+    )
+    summary["rss_bytes_start"] = rss_start
+    return summary
+
+
+def _format_bytes(value):
+    if value is None:
+        return "-"
+    if value < 1024:
+        return "{} B".format(value)
+    for unit in ("KB", "MB", "GB"):
+        value /= 1024
+        if value < 1024 or unit == "GB":
+            return "{:.1f} {}".format(value, unit)
+
+
+def format_summary(summary):
+    """Return the summary as a human readable report."""
+    lines = [
+        "{sessions} sessions x {turns} turns, history_mode={history_mode}".format(
+            **summary
+        ),
+        "requests {requests}, errors {errors}, {elapsed_s} s, "
+        "{throughput_rps} turns/s".format(**summary),
+        "latency p50 {p50_ms} ms, p95 {p95_ms} ms, p99 {p99_ms} ms, "
+        "max {max_ms} ms".format(**summary),
+        "server RSS at start {}".format(_format_bytes(summary["rss_bytes_start"])),
+        "",
+        "{:>5} {:>10} {:>10} {:>12} {:>12} {:>12}".format(
+            "turn", "p50 ms", "p95 ms", "request", "response", "server RSS"
+        ),
+    ]
+    for row in summary["by_turn"]:
+        lines.append(
+            "{:>5} {:>10} {:>10} {:>12} {:>12} {:>12}".format(
+                row["turn"],
+                row["p50_ms"],
+                row["p95_ms"],
+                _format_bytes(row["request_bytes"]),
+                _format_bytes(row["response_bytes"]),
+                _format_bytes(row["rss_bytes"]),
+            )
+        )
+    for turn, error in summary["error_samples"]:
+        lines.append("error in turn {}: {}".format(turn + 1, error))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m dash_chat.loadtest", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument(
+        "--think-time", type=float, default=1.0, help="mean seconds between turns"
+    )
+    parser.add_argument(
+        "--ramp-up", type=float, default=0.0, help="seconds to start all sessions"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.5, help="fake backend seconds per reply"
+    )
+    parser.add_argument("--reply-words", type=int, default=50)
+    parser.add_argument(
+        "--history-mode", choices=("client", "server"), default="client"
+    )
+    parser.add_argument("--url", help="test an app that is already running")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    process = None
+    url = args.url
+    pid = None
+    if url is None:
+        process, url = start_server(args.history_mode, args.latency, args.reply_words)
+        pid = process.pid
+    try:
+        summary = run_load_test(
+            url,
+            sessions=args.sessions,
+            turns=args.turns,
+            think_time=args.think_time,
+            history_mode=args.history_mode,
+            ramp_up=args.ramp_up,
+            seed=args.seed,
+            pid=pid,
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+    print(format_summary(summary))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
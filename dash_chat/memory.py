@@ -0,0 +1,330 @@
+"""
+Retrieval of the relevant older turns of long conversations.
+
+A sliding window forgets what fell out of it, and sending the whole history
+makes prompts grow with the session. ``VectorMemory`` keeps an embedding matrix
+per conversation instead, extended as messages are added, and the
+``RelevantHistory`` context policy sends the newest messages plus the older
+ones most similar to the latest message:
+
+    from dash_chat.context import ContextManager
+    from dash_chat.memory import RelevantHistory, VectorMemory, hashing_embedder
+
+    memory = VectorMemory(embed=hashing_embedder())  # or your embedding model
+    context = ContextManager(
+        max_tokens=8000, policy=RelevantHistory(memory, k=4, recall_tokens=2000)
+    )
+
+    def handle_chat(new_message, messages):
+        messages = messages + [new_message]
+        prompt = context.prompt(messages, session_key=session_id)
+        reply = generate(prompt)
+        ...
+
+``embed(texts)`` returns one vector per text, as an array of shape
+``(len(texts), dim)``; only messages not embedded yet are passed to it. Vectors
+are normalized as they are added, so a search is a single matrix-vector product
+and a partial sort, whatever the length of the conversation. Conversations with
+more than ``mmap_rows`` messages are moved to a memory-mapped file in
+``directory``, so long sessions do not hold their vectors in RAM.
+
+``hashing_embedder`` hashes words and word pairs into a fixed number of
+dimensions: deterministic and offline, for tests and as a lexical fallback.
+Requires numpy (``pip install dash-chat[memory]``).
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .context import SlidingWindow
+from .search import message_text
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_INITIAL_ROWS = 64
+
+
+def hashing_embedder(dim=512):
+    """Return an embedding function hashing words and word pairs into ``dim`` bins.
+
+    Hashes do not depend on the process, so vectors are the same on every run.
+    """
+
+    def embed(texts):
+        vectors = np.zeros((len(texts), dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _WORD.findall(text.lower())
+            for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8)
+                value = int.from_bytes(digest.digest(), "little")
+                # the top bit gives the sign, so collisions tend to cancel out
+                vectors[row, value % dim] += 1.0 if value >> 63 else -1.0
+        return vectors
+
+    return embed
+
+
+def sentence_transformer_embedder(model="all-MiniLM-L6-v2"):
+    """Return an embedding function using a ``sentence-transformers`` model.
+
+    Requires the ``sentence-transformers`` package.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    encoder = SentenceTransformer(model)
+    return lambda texts: encoder.encode(texts, convert_to_numpy=True)
+
+
+class _Conversation:
+    """The vectors of one conversation and the positions of their messages."""
+
+    def __init__(self, dim):
+        self.vectors = np.empty((_INITIAL_ROWS, dim), dtype=np.float32)
+        self.positions = np.empty(_INITIAL_ROWS, dtype=np.int64)
+        self.rows = 0
+        # messages seen so far, with or without text, and the last of them
+        self.seen = 0
+        self.last = None
+        self.path = None
+
+    def append(self, vectors, positions, mmap_rows, directory):
+        needed = self.rows + len(vectors)
+        if needed > len(self.vectors):
+            self._grow(max(needed, 2 * len(self.vectors)), mmap_rows, directory)
+        self.vectors[self.rows : needed] = vectors
+        self.positions[self.rows : needed] = positions
+        self.rows = needed
+
+    def _grow(self, capacity, mmap_rows, directory):
+        shape = (capacity, self.vectors.shape[1])
+        if self.path is None and capacity <= mmap_rows:
+            vectors = np.empty(shape, dtype=np.float32)
+            vectors[: self.rows] = self.vectors[: self.rows]
+            self.vectors = vectors
+        elif self.path is None:
+            handle, self.path = tempfile.mkstemp(suffix=".f32", dir=directory)
+            os.close(handle)
+            vectors = np.memmap(self.path, dtype=np.float32, mode="w+", shape=shape)
+            vectors[: self.rows] = self.vectors[: self.rows]
+            self.vectors = vectors
+        else:
+            # a scratch file, the page cache keeps what was written without a flush
+            del self.vectors
+            with open(self.path, "r+b") as f:
+                f.truncate(shape[0] * shape[1] * 4)
+            self.vectors = np.memmap(
+                self.path, dtype=np.float32, mode="r+", shape=shape
+            )
+        positions = np.empty(capacity, dtype=np.int64)
+        positions[: self.rows] = self.positions[: self.rows]
+        self.positions = positions
+
+    def close(self):
+        if self.path is not None:
+            del self.vectors
+            os.remove(self.path)
+            self.path = None
+
+
+class VectorMemory:
+    """Embedding matrices of conversations, searched by cosine similarity.
+
+    Conversations are identified by a key, such as the session id. Vectors of
+    at most ``max_conversations`` conversations are kept, the least recently
+    used are dropped first. ``directory`` is where the memory-mapped files of
+    conversations with more than ``mmap_rows`` messages go, by default the
+    system's temporary directory; they are deleted with their conversation.
+    """
+
+    def __init__(
+        self,
+        embed=None,
+        dim=None,
+        mmap_rows=100000,
+        directory=None,
+        max_conversations=1000,
+    ):
+        self.embed = embed or hashing_embedder()
+        self.dim = dim
+        self.mmap_rows = mmap_rows
+        self.directory = directory
+        self.max_conversations = max_conversations
+        self.embedded = 0
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _vectors(self, texts):
+        vectors = np.asarray(self.embed(texts), dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError("embed must return one vector per text")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        # texts without features stay zero vectors and match nothing
+        return vectors / np.where(norms > 0, norms, 1)
+
+    def add(self, key, messages, start=None):
+        """Add ``messages`` to a conversation, the first at position ``start``.
+
+        Positions default to following the messages added before. Messages
+        without text are counted but not embedded.
+        """
+        messages = list(messages)
+        with self._lock:
+            conversation = self._conversations.get(key)
+            seen = conversation.seen if conversation is not None else 0
+        start = seen if start is None else start
+        texts, positions = [], []
+        for position, message in enumerate(messages, start=start):
+            text = message_text(message)
+            if text:
+                texts.append(text)
+                positions.append(position)
+        vectors = self._vectors(texts) if texts else None
+        self._store(key, seen, start, messages, vectors, positions)
+
+    def _store(self, key, seen, start, messages, vectors, positions):
+        with self._lock:
+            conversation = self._conversations.get(key)
+            if conversation is None:
+                if vectors is None and self.dim is None:
+                    return
+                self.dim = self.dim or vectors.shape[1]
+                conversation = self._conversations[key] = _Conversation(self.dim)
+                while len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)[1].close()
+            elif conversation.seen != seen:
+                # another thread added these messages first
+                return
+            self._conversations.move_to_end(key)
+            if vectors is not None:
+                if vectors.shape[1] != self.dim:
+                    raise ValueError(
+                        "embed returned {} dimensions, expected {}".format(
+                            vectors.shape[1], self.dim
+                        )
+                    )
+                conversation.append(vectors, positions, self.mmap_rows, self.directory)
+                self.embedded += len(vectors)
+            conversation.seen = max(conversation.seen, start + len(messages))
+            if messages:
+                conversation.last = messages[-1]
+
+    def sync(self, key, messages):
+        """Add the messages of a conversation not added yet.
+
+        ``messages`` is the whole conversation; only the messages after the
+        ones seen before are embedded. If the conversation no longer starts
+        with them, it is embedded again from the start.
+        """
+        with self._lock:
+            conversation = self._conversations.get(key)
+            seen, last = (
+                (0, None)
+                if conversation is None
+                else (
+                    conversation.seen,
+                    conversation.last,
+                )
+            )
+        if seen > len(messages) or (seen and messages[seen - 1] != last):
+            self.remove(key)
+            seen = 0
+        if seen < len(messages):
+            self.add(key, messages[seen:], start=seen)
+
+    def search(self, key, query, k=5, before=None, min_score=None):
+        """Return the ``k`` messages of a conversation most similar to ``query``.
+
+        Results are ``(position, score)`` pairs, the best first. ``before``
+        only considers messages at lower positions, e.g. those that are not
+        sent anyway; ``min_score`` drops results less similar than it.
+        """
+        if not message_text({"content": query}):
+            return []
+        with self._lock:
+            conversation = self._conversations.get(key)
+            if conversation is None or conversation.rows == 0:
+                return []
+            self._conversations.move_to_end(key)
+            rows = conversation.rows
+            if before is not None:
+                # rows are added in order of position
+                rows = int(
+                    np.searchsorted(conversation.positions[:rows], before, side="left")
+                )
+            vectors = conversation.vectors[:rows]
+            positions = conversation.positions[:rows]
+        if rows == 0 or k <= 0:
+            return []
+        scores = vectors @ self._vectors([query])[0]
+        if k < rows:
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best], kind="stable")]
+        else:
+            best = np.argsort(-scores, kind="stable")
+        return [
+            (int(positions[row]), float(scores[row]))
+            for row in best
+            if min_score is None or scores[row] >= min_score
+        ]
+
+    def remove(self, key):
+        """Forget a conversation."""
+        with self._lock:
+            conversation = self._conversations.pop(key, None)
+            if conversation is not None:
+                conversation.close()
+
+    def __len__(self):
+        return len(self._conversations)
+
+    def close(self):
+        """Forget every conversation, deleting their memory-mapped files."""
+        with self._lock:
+            for conversation in self._conversations.values():
+                conversation.close()
+            self._conversations.clear()
+
+
+class RelevantHistory:
+    """Send the newest messages and the older ones most relevant to the last.
+
+    ``policy`` chooses the newest messages (``SlidingWindow`` by default) with
+    the budget less ``recall_tokens``. Of the messages it leaves out, up to
+    ``k`` of the most similar to the last message, and at least ``min_score``
+    similar, are sent too, in their original order, as long as they fit the
+    budget.
+    """
+
+    def __init__(self, memory, k=4, policy=None, recall_tokens=1000, min_score=0.1):
+        self.memory = memory
+        self.k = k
+        self.policy = policy or SlidingWindow()
+        self.recall_tokens = recall_tokens
+        self.min_score = min_score
+
+    def select(self, messages, budget, counter, session_key=None):
+        self.memory.sync(session_key, messages)
+        recent = self.policy.select(
+            messages, budget - self.recall_tokens, counter, session_key
+        )
+        start = len(messages) - len(recent)
+        if start == 0:
+            return recent
+
+        query = message_text(messages[-1])
+        hits = self.memory.search(
+            session_key, query, self.k, before=start, min_score=self.min_score
+        )
+        remaining = budget - counter.total(recent)
+        recalled = []
+        for position, _ in hits:
+            tokens = counter.count(messages[position])
+            if tokens <= remaining:
+                recalled.append(position)
+                remaining -= tokens
+        return [messages[position] for position in sorted(recalled)] + recent
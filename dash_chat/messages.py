@@ -0,0 +1,450 @@
+"""
+Typed chat messages.
+
+Messages travel as plain dicts, ``{"role", "content"}``, where ``content`` is a
+string, a content part or a list of parts. This module parses them into small
+classes with ``__slots__``, so callbacks get validated, attribute-style access
+instead of ``isinstance`` checks, and large histories take far less memory than
+nested dicts:
+
+    from dash_chat.messages import AttachmentPart, Message, dumps
+
+    def handle_chat(new_message, messages):
+        message = Message.from_dict(new_message)
+        for part in message.parts:
+            if isinstance(part, AttachmentPart) and part.is_image:
+                image = part.data  # decoded once, a zero-copy memoryview
+        ...
+        return [m.to_dict() for m in history]
+
+Invalid messages raise ``MessageError`` naming the offending field. ``dumps``
+serializes messages (or lists of them) to JSON bytes with ``orjson`` when it is
+installed and the standard library otherwise; ``loads`` reads them back.
+Keys the classes do not know about, such as ``"cache": False``, are kept in
+``extra`` and written back unchanged.
+"""
+
+import base64
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ROLES = ("user", "assistant", "system", "tool")
+
+_DATA_URL = re.compile(r"data:([^;,]*)(;base64)?,", re.ASCII)
+
+
+class MessageError(ValueError):
+    """Raised when a message does not have the expected shape."""
+
+
+def _check(condition, path, problem):
+    if not condition:
+        raise MessageError("{}: {}".format(path, problem))
+
+
+def _extra(data, known):
+    extra = {key: value for key, value in data.items() if key not in known}
+    return extra or None
+
+
+class Part:
+    """Base class of message content parts."""
+
+    __slots__ = ("extra",)
+    type = None
+
+    def to_dict(self):
+        raise NotImplementedError
+
+    def _with_extra(self, data):
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, self.to_dict())
+
+
+class TextPart(Part):
+    """A ``{"type": "text", "text"}`` part, rendered as Markdown."""
+
+    __slots__ = ("text",)
+    type = "text"
+    _known = frozenset(("type", "text"))
+
+    def __init__(self, text, extra=None):
+        self.text = text
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data, path="part"):
+        text = data.get("text", "")
+        _check(isinstance(text, str), path + ".text", "must be a string")
+        return cls(text, _extra(data, cls._known))
+
+    def to_dict(self):
+        return self._with_extra({"type": "text", "text": self.text})
+
+
+class AttachmentPart(Part):
+    """An attached file, inline as a data URL (``file``) or uploaded (``url``).
+
+    ``data`` decodes an inline file once and returns a ``memoryview`` of its
+    bytes; slicing it does not copy. Parts built with :meth:`from_bytes` keep
+    the given buffer and only encode it when serialized.
+    """
+
+    __slots__ = (
+        "file",
+        "file_name",
+        "file_type",
+        "file_size",
+        "file_id",
+        "url",
+        "_data",
+    )
+    type = "attachment"
+    _known = frozenset(
+        ("type", "file", "fileName", "fileType", "fileSize", "fileId", "url")
+    )
+
+    def __init__(
+        self,
+        file_name,
+        file_type="",
+        file=None,
+        url=None,
+        file_id=None,
+        file_size=None,
+        extra=None,
+    ):
+        self.file_name = file_name
+        self.file_type = file_type
+        self.file = file
+        self.url = url
+        self.file_id = file_id
+        self.file_size = file_size
+        self.extra = extra
+        self._data = None
+
+    @classmethod
+    def from_bytes(cls, data, file_name, file_type="application/octet-stream"):
+        """Build an inline attachment from a bytes-like object without copying."""
+        part = cls(file_name, file_type, file_size=memoryview(data).nbytes)
+        part._data = memoryview(data)
+        return part
+
+    @classmethod
+    def from_dict(cls, data, path="part"):
+        file_name = data.get("fileName")
+        _check(isinstance(file_name, str), path + ".fileName", "must be a string")
+        file = data.get("file")
+        url = data.get("url")
+        _check(
+            isinstance(file, str) or isinstance(url, str),
+            path,
+            "attachment needs a file or a url",
+        )
+        return cls(
+            file_name,
+            data.get("fileType") or "",
+            file=file,
+            url=url,
+            file_id=data.get("fileId"),
+            file_size=data.get("fileSize"),
+            extra=_extra(data, cls._known),
+        )
+
+    @property
+    def is_image(self):
+        return self.file_type.startswith("image/")
+
+    @property
+    def data(self):
+        """The file's bytes as a read-only memoryview, for inline attachments."""
+        if self._data is None:
+            if self.file is None:
+                raise MessageError(
+                    "{}: uploaded attachments are read from their store".format(
+                        self.file_name
+                    )
+                )
+            match = _DATA_URL.match(self.file)
+            payload = self.file[match.end() :] if match else self.file
+            if match and not match.group(2):
+                self._data = memoryview(payload.encode("utf-8")).toreadonly()
+            else:
+                # browsers may drop the base64 padding
+                payload += "=" * (-len(payload) % 4)
+                self._data = memoryview(base64.b64decode(payload)).toreadonly()
+        return self._data
+
+    def to_dict(self):
+        data = {"type": "attachment", "fileName": self.file_name}
+        if self.file_type:
+            data["fileType"] = self.file_type
+        if self.file is None and self._data is not None:
+            self.file = "data:{};base64,{}".format(
+                self.file_type, base64.b64encode(self._data).decode("ascii")
+            )
+        if self.file is not None:
+            data["file"] = self.file
+        if self.url is not None:
+            data["url"] = self.url
+        if self.file_id is not None:
+            data["fileId"] = self.file_id
+        if self.file_size is not None:
+            data["fileSize"] = self.file_size
+        return self._with_extra(data)
+
+
+class GraphPart(Part):
+    """A ``{"type": "graph", "props"}`` part holding a Plotly ``figure``."""
+
+    __slots__ = ("props",)
+    type = "graph"
+    _known = frozenset(("type", "props"))
+
+    def __init__(self, props, extra=None):
+        self.props = props
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data, path="part"):
+        props = data.get("props")
+        _check(isinstance(props, dict), path + ".props", "must be a dict")
+        _check(
+            isinstance(props.get("figure"), dict),
+            path + ".props.figure",
+            "must be a dict",
+        )
+        return cls(props, _extra(data, cls._known))
+
+    @property
+    def figure(self):
+        return self.props["figure"]
+
+    def to_dict(self):
+        return self._with_extra({"type": "graph", "props": self.props})
+
+
+class TablePart(Part):
+    """A ``{"type": "table", "header", "data", "props"}`` part."""
+
+    __slots__ = ("header", "data", "props")
+    type = "table"
+    _known = frozenset(("type", "header", "data", "props"))
+
+    def __init__(self, header, data, props=None, extra=None):
+        self.header = header
+        self.data = data
+        self.props = props if props is not None else {}
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data, path="part"):
+        header = data.get("header")
+        rows = data.get("data")
+        _check(isinstance(header, list), path + ".header", "must be a list")
+        _check(isinstance(rows, list), path + ".data", "must be a list of rows")
+        props = data.get("props", {})
+        _check(isinstance(props, dict), path + ".props", "must be a dict")
+        return cls(header, rows, props, _extra(data, cls._known))
+
+    def to_dict(self):
+        return self._with_extra(
+            {
+                "type": "table",
+                "header": self.header,
+                "data": self.data,
+                "props": self.props,
+            }
+        )
+
+
+class ColumnarTablePart(Part):
+    """A ``columnar_table`` part, as built by ``dash_chat.tables``."""
+
+    __slots__ = ("columns", "num_rows", "page_size", "props", "url")
+    type = "columnar_table"
+    _known = frozenset(("type", "columns", "num_rows", "page_size", "props", "url"))
+
+    def __init__(
+        self, columns, num_rows, page_size=None, props=None, url=None, extra=None
+    ):
+        self.columns = columns
+        self.num_rows = num_rows
+        self.page_size = page_size
+        self.props = props if props is not None else {}
+        self.url = url
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data, path="part"):
+        _check(
+            isinstance(data.get("columns"), list), path + ".columns", "must be a list"
+        )
+        _check(
+            isinstance(data.get("num_rows"), int), path + ".num_rows", "must be an int"
+        )
+        return cls(
+            data["columns"],
+            data["num_rows"],
+            data.get("page_size"),
+            data.get("props"),
+            data.get("url"),
+            _extra(data, cls._known),
+        )
+
+    def to_dict(self):
+        data = {
+            "type": "columnar_table",
+            "columns": self.columns,
+            "num_rows": self.num_rows,
+            "props": self.props,
+        }
+        if self.page_size is not None:
+            data["page_size"] = self.page_size
+        if self.url is not None:
+            data["url"] = self.url
+        return self._with_extra(data)
+
+
+PART_TYPES = {
+    part.type: part
+    for part in (TextPart, AttachmentPart, GraphPart, TablePart, ColumnarTablePart)
+}
+
+
+def parse_part(data, path="part"):
+    """Parse one content part; plain strings become :class:`TextPart`."""
+    if isinstance(data, str):
+        return TextPart(data)
+    _check(isinstance(data, dict), path, "must be a string or a dict")
+    part_type = PART_TYPES.get(data.get("type"))
+    _check(
+        part_type is not None,
+        path + ".type",
+        "unknown part type {!r}".format(data.get("type")),
+    )
+    return part_type.from_dict(data, path)
+
+
+class Message:
+    """A chat message.
+
+    ``content`` is kept in the shape it was given: a string, a single
+    :class:`Part` or a list of parts. ``parts`` always returns a list.
+    """
+
+    __slots__ = ("role", "content", "id", "extra")
+    _known = frozenset(("role", "content", "id"))
+
+    def __init__(self, role, content, id=None, extra=None):
+        self.role = role
+        self.content = content
+        self.id = id
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data, path="message"):
+        """Parse and validate a message dict, e.g. the ``new_message`` prop."""
+        _check(isinstance(data, dict), path, "must be a dict")
+        role = data.get("role")
+        _check(role in ROLES, path + ".role", "must be one of {}".format(ROLES))
+        content = data.get("content")
+        if isinstance(content, list):
+            content = [
+                parse_part(part, "{}.content[{}]".format(path, i))
+                for i, part in enumerate(content)
+            ]
+        elif isinstance(content, dict):
+            content = parse_part(content, path + ".content")
+        else:
+            _check(
+                isinstance(content, str),
+                path + ".content",
+                "must be a string, a part or a list of parts",
+            )
+        return cls(role, content, data.get("id"), _extra(data, cls._known))
+
+    @property
+    def parts(self):
+        if isinstance(self.content, str):
+            return [TextPart(self.content)]
+        if isinstance(self.content, Part):
+            return [self.content]
+        return list(self.content)
+
+    @property
+    def text(self):
+        """The message's text parts joined by blank lines."""
+        if isinstance(self.content, str):
+            return self.content
+        return "\n\n".join(
+            part.text for part in self.parts if isinstance(part, TextPart)
+        )
+
+    def to_dict(self):
+        if isinstance(self.content, str):
+            content = self.content
+        elif isinstance(self.content, Part):
+            content = self.content.to_dict()
+        else:
+            content = [part.to_dict() for part in self.content]
+        data = {"role": self.role, "content": content}
+        if self.id is not None:
+            data["id"] = self.id
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __eq__(self, other):
+        return isinstance(other, Message) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return "Message({!r})".format(self.to_dict())
+
+
+def parse_messages(messages):
+    """Parse and validate a list of message dicts, e.g. the ``messages`` prop."""
+    _check(isinstance(messages, list), "messages", "must be a list")
+    return [
+        Message.from_dict(message, "messages[{}]".format(i))
+        for i, message in enumerate(messages)
+    ]
+
+
+def _default(value):
+    if isinstance(value, (Message, Part)):
+        return value.to_dict()
+    if isinstance(value, memoryview):
+        return base64.b64encode(value).decode("ascii")
+    raise TypeError("{} is not JSON serializable".format(type(value).__name__))
+
+
+def dumps(value):
+    """Serialize messages, parts or plain data to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(
+        value, default=_default, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def loads(data, parse=True):
+    """Read JSON messages; with ``parse`` a list becomes :class:`Message` objects."""
+    value = orjson.loads(data) if orjson is not None else json.loads(data)
+    if not parse:
+        return value
+    if isinstance(value, list):
+        return parse_messages(value)
+    return Message.from_dict(value)
@@ -0,0 +1,336 @@
+"""
+Client-side turn metrics, aggregated on the server.
+
+With ``collect_metrics=True`` the ChatComponent measures every turn in the
+browser: how long the server took to answer, until the first reply text was
+shown, to render and to persist the reply, and the bytes sent and received.
+This module aggregates those turns into histograms and serves them in the
+Prometheus text format:
+
+    metrics = dash_chat.metrics.register(app)
+
+    app.layout = ChatComponent(
+        id="chat", collect_metrics=True, metrics_url=metrics.url
+    )
+
+Batches of turns are posted to ``metrics.url`` with ``navigator.sendBeacon``
+and ``/metrics`` can be scraped by Prometheus. Without ``metrics_url`` the
+component sets its ``metrics`` prop instead, which a callback passes on:
+
+    @callback(Input("chat", "metrics"))
+    def record_metrics(batch):
+        metrics.observe_batch(batch, component="chat")
+
+Histograms are labelled with the component id. Ids are chosen by the browser,
+so only ``max_components`` distinct ones are kept and the others are counted
+as ``"other"``.
+"""
+
+import bisect
+import json
+import math
+import threading
+
+import flask
+
+from ._server import get_server, register_blueprint, relative_path
+
+METRICS_ROUTE = "_dash-chat/metrics"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = tuple(256 * 4**i for i in range(10))
+
+# turn fields reported by the component: (field, metric, help)
+TIMINGS = (
+    ("ack_ms", "ack", "From sending a message to the first server response."),
+    ("first_token_ms", "first_token", "From sending a message to the first text."),
+    ("render_ms", "render", "From receiving the complete reply to showing it."),
+    ("turn_ms", "turn", "From sending a message to showing the complete reply."),
+    ("persistence_ms", "persistence", "Writing the turn to browser storage."),
+    ("upload_ms", "upload", "Uploading or reading attachments before sending."),
+)
+SIZES = (
+    ("request_bytes", "request", "JSON size of the messages sent."),
+    ("response_bytes", "response", "JSON size of the responses received."),
+)
+
+
+class Histogram:
+    """Counts observations in cumulative buckets with upper bounds ``buckets``."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+
+    def cumulative(self):
+        """Return ``(upper bound, count)`` pairs, ending with ``inf``."""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile, interpolating within its bucket.
+
+        Returns ``None`` without observations, and the largest finite bound
+        when the quantile falls in the last bucket.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower = 0.0
+        previous = 0
+        for bound, total in self.cumulative():
+            # empty buckets cannot hold the quantile, even at rank 0
+            if total >= rank and total > previous:
+                if math.isinf(bound):
+                    return self.buckets[-1] if self.buckets else None
+                count = total - previous
+                return lower + (bound - lower) * (rank - previous) / count
+            lower, previous = bound, total
+        return None
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if not math.isfinite(value) or value < 0:
+        return None
+    return value
+
+
+def _component_label(component):
+    if isinstance(component, str):
+        return component
+    # pattern-matching ids are dicts
+    return json.dumps(component, sort_keys=True, separators=(",", ":"))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(value):
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value))
+
+
+class MetricsCollector:
+    """Aggregates turn metrics into histograms per component.
+
+    Timings are kept in seconds in ``time_buckets`` and sizes in bytes in
+    ``size_buckets``. Fields missing from a turn, e.g. ``upload_ms`` when
+    nothing was attached, are not observed.
+    """
+
+    def __init__(
+        self, time_buckets=TIME_BUCKETS, size_buckets=SIZE_BUCKETS, max_components=50
+    ):
+        self.time_buckets = time_buckets
+        self.size_buckets = size_buckets
+        self.max_components = max_components
+        self.url = None
+        self._histograms = {}
+        self._turns = {}
+        self._components = set()
+        self._lock = threading.Lock()
+
+    def _label(self, component):
+        # caller holds the lock
+        label = _component_label(component)
+        if label not in self._components:
+            if len(self._components) >= self.max_components:
+                return "other"
+            self._components.add(label)
+        return label
+
+    def _histogram(self, metric, label, buckets):
+        key = (metric, label)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(buckets)
+        return histogram
+
+    def observe(self, turn, component="chat"):
+        """Record one turn as reported by the component."""
+        if not isinstance(turn, dict):
+            return
+        status = "completed" if turn.get("completed", True) else "abandoned"
+        with self._lock:
+            label = self._label(component)
+            self._turns[(label, status)] = self._turns.get((label, status), 0) + 1
+            for field, metric, _ in TIMINGS:
+                value = _number(turn.get(field))
+                if value is not None:
+                    self._histogram(metric, label, self.time_buckets).observe(
+                        value / 1000
+                    )
+            for field, metric, _ in SIZES:
+                value = _number(turn.get(field))
+                if value is not None:
+                    self._histogram(metric, label, self.size_buckets).observe(value)
+
+    def observe_batch(self, batch, component="chat", max_turns=None):
+        """Record a batch, ``{"turns": [...]}``, from the ``metrics`` prop or a beacon.
+
+        A ``component`` in the batch takes precedence. Returns the number of
+        turns recorded, at most ``max_turns``.
+        """
+        if not isinstance(batch, dict) or not isinstance(batch.get("turns"), list):
+            return 0
+        turns = batch["turns"][:max_turns]
+        component = batch.get("component") or component
+        for turn in turns:
+            self.observe(turn, component)
+        return len(turns)
+
+    def histogram(self, metric, component=None):
+        """Return the histogram of ``metric``, e.g. ``"turn"``, of ``component``.
+
+        Without ``component`` the histograms of every component are merged.
+        """
+        buckets = (
+            self.time_buckets
+            if metric in {name for _, name, _ in TIMINGS}
+            else self.size_buckets
+        )
+        merged = Histogram(buckets)
+        with self._lock:
+            for (name, label), histogram in self._histograms.items():
+                if name == metric and (
+                    component is None or label == _component_label(component)
+                ):
+                    merged.merge(histogram)
+        return merged
+
+    def prometheus_text(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = [
+            "# HELP dash_chat_turns_total Chat turns measured in the browser.",
+            "# TYPE dash_chat_turns_total counter",
+        ]
+        with self._lock:
+            for (label, status), count in sorted(self._turns.items()):
+                lines.append(
+                    'dash_chat_turns_total{{component="{}",status="{}"}} {}'.format(
+                        _escape(label), status, count
+                    )
+                )
+            families = [(metric, "seconds", help) for _, metric, help in TIMINGS]
+            families += [(metric, "bytes", help) for _, metric, help in SIZES]
+            for metric, unit, help in families:
+                name = "dash_chat_turn_{}_{}".format(metric, unit)
+                lines.append("# HELP {} {}".format(name, help))
+                lines.append("# TYPE {} histogram".format(name))
+                for (family, label), histogram in sorted(self._histograms.items()):
+                    if family != metric:
+                        continue
+                    component = _escape(label)
+                    for bound, count in histogram.cumulative():
+                        lines.append(
+                            '{}_bucket{{component="{}",le="{}"}} {}'.format(
+                                name, component, _format(bound), count
+                            )
+                        )
+                    lines.append(
+                        '{}_sum{{component="{}"}} {}'.format(
+                            name, component, _format(histogram.sum)
+                        )
+                    )
+                    lines.append(
+                        '{}_count{{component="{}"}} {}'.format(
+                            name, component, histogram.count
+                        )
+                    )
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._turns.clear()
+            self._components.clear()
+
+
+def _beacon_view(collector, max_turns, max_body_size):
+    def beacon():
+        # read at most one byte past the limit, whatever Content-Length says
+        body = flask.request.stream.read(max_body_size + 1)
+        if len(body) > max_body_size:
+            flask.abort(413)
+        # sendBeacon may send the JSON as text/plain
+        try:
+            batch = json.loads(body)
+        except ValueError:
+            flask.abort(400)
+        if not isinstance(batch, dict) or not isinstance(batch.get("turns"), list):
+            flask.abort(400)
+        collector.observe_batch(batch, max_turns=max_turns)
+        return "", 204
+
+    return beacon
+
+
+def _prometheus_view(collector):
+    def prometheus():
+        return flask.Response(
+            collector.prometheus_text(), content_type=PROMETHEUS_CONTENT_TYPE
+        )
+
+    return prometheus
+
+
+def register(
+    app,
+    collector=None,
+    prometheus_path="/metrics",
+    max_turns=100,
+    max_body_size=256 * 1024,
+):
+    """Register the turn metrics endpoints on a Dash app's Flask server.
+
+    ``app`` may also be a plain Flask app. Batches posted to the returned
+    collector's ``url`` are recorded in ``collector`` (by default a new
+    :class:`MetricsCollector`), at most ``max_turns`` turns per batch and
+    ``max_body_size`` bytes per request. The metrics are served for Prometheus
+    at ``prometheus_path`` on the server itself, outside the app's routes
+    prefix; ``None`` leaves it out, e.g. to combine them with other metrics
+    through ``collector.prometheus_text()``.
+    """
+    if collector is None:
+        collector = MetricsCollector()
+    collector.url = relative_path(app, "/" + METRICS_ROUTE)
+
+    blueprint = flask.Blueprint("dash_chat_metrics", __name__)
+    blueprint.add_url_rule(
+        "/" + METRICS_ROUTE,
+        "beacon",
+        _beacon_view(collector, max_turns, max_body_size),
+        methods=["POST"],
+    )
+    register_blueprint(app, blueprint)
+
+    if prometheus_path is not None:
+        get_server(app).add_url_rule(
+            prometheus_path,
+            "dash_chat_prometheus",
+            _prometheus_view(collector),
+            methods=["GET"],
+        )
+    return collector
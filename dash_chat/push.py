@@ -0,0 +1,271 @@
+"""
+Server-pushed messages over Server-Sent Events.
+
+Callbacks can only answer the request that triggered them, so replies that
+arrive later (long tool runs, multi-part answers, follow-ups from an agent)
+would otherwise need ``dcc.Interval`` polling. ``register`` adds an SSE endpoint
+on the app's server; components with ``push_url`` subscribe to their
+conversation and show pushed messages and stream deltas as they arrive:
+
+    hub = dash_chat.push.register(app)
+
+    app.layout = ChatComponent(id="chat", push_url=hub.url)
+
+    @callback(
+        Output("chat", "messages"),
+        Input("chat", "new_message"),
+        State("chat", "messages"),
+        State("chat", "session_id"),
+    )
+    def handle_chat(new_message, messages, session_id):
+        threading.Thread(target=run_agent, args=(session_id, new_message)).start()
+        return messages + [new_message]
+
+    def run_agent(session_id, new_message):
+        reply = hub.stream(session_id, generate_tokens(new_message))
+        ...
+        hub.send_message(session_id, {"role": "assistant", "content": "Done."})
+
+The component sets its ``session_id`` when ``push_url`` is set. Every event has
+an id; when the connection drops the browser reconnects with the last id it
+saw and the events it missed are replayed from the last ``history`` events kept
+per conversation. When the conversation's events were dropped meanwhile (after
+a restart, or evicted while idle), every event kept since is replayed.
+
+The hub lives in the server process, so with several worker processes a
+message must be published in the process its subscriber is connected to, e.g.
+by routing sessions to workers with sticky sessions.
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+import flask
+
+from ._server import register_blueprint, relative_path
+from .streaming import iter_deltas, new_message_id
+
+PUSH_ROUTE = "_dash-chat/push"
+# milliseconds the browser waits before reconnecting
+RECONNECT_DELAY = 3000
+
+
+class _Channel:
+    """The events of one conversation and the condition its subscribers wait on."""
+
+    def __init__(self, history):
+        # event ids carry the channel's token, so ids of a restarted hub or of
+        # an evicted channel are not taken for positions in this one
+        self.token = uuid.uuid4().hex[:8]
+        self.events = deque(maxlen=history)
+        self.next_id = 0
+        self.subscribers = 0
+        self.condition = threading.Condition()
+
+
+class PushHub:
+    """Fans events out to the subscribers of each conversation.
+
+    The last ``history`` events of every conversation are kept to replay to
+    reconnecting subscribers, for at most ``max_conversations`` conversations
+    without subscribers. At most ``max_subscribers`` connections are kept open,
+    each holding a server thread; idle connections get a comment every
+    ``heartbeat`` seconds so proxies do not close them.
+    """
+
+    def __init__(
+        self, history=256, max_conversations=1024, max_subscribers=1000, heartbeat=15
+    ):
+        self.history = history
+        self.max_conversations = max_conversations
+        self.max_subscribers = max_subscribers
+        self.heartbeat = heartbeat
+        self.url = None
+        self._channels = OrderedDict()
+        self._subscribers = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _channel(self, session_key):
+        # caller holds the lock
+        channel = self._channels.get(session_key)
+        if channel is None:
+            channel = self._channels[session_key] = _Channel(self.history)
+            idle = [
+                key
+                for key, other in self._channels.items()
+                if other.subscribers == 0 and key != session_key
+            ]
+            for key in idle[: len(self._channels) - self.max_conversations]:
+                del self._channels[key]
+        self._channels.move_to_end(session_key)
+        return channel
+
+    def publish(self, session_key, event, data):
+        """Send an event of type ``event`` with JSON ``data`` to a conversation.
+
+        Returns the event id.
+        """
+        payload = json.dumps(data, separators=(",", ":"))
+        with self._lock:
+            channel = self._channel(session_key)
+        with channel.condition:
+            event_id = "{}-{}".format(channel.token, channel.next_id)
+            channel.events.append((channel.next_id, event_id, event, payload))
+            channel.next_id += 1
+            channel.condition.notify_all()
+        return event_id
+
+    def send_message(self, session_key, message):
+        """Push a complete message; one with the id of a shown message replaces it.
+
+        Messages without an ``id`` get one. Returns the message sent.
+        """
+        if message.get("id") is None:
+            message = dict(message, id=new_message_id())
+        self.publish(session_key, "message", message)
+        return message
+
+    def send_delta(self, session_key, delta):
+        """Push a ``stream_delta``, as built by ``streaming.iter_deltas``."""
+        self.publish(session_key, "delta", delta)
+
+    def stream(self, session_key, chunks, message_id=None):
+        """Push a reply as it is generated from a (sync or async) iterable of chunks.
+
+        Every chunk is sent as an append-only delta. Returns the complete
+        assistant message, with the same id as the streamed bubble.
+        """
+        message_id = message_id or new_message_id()
+        parts = []
+        for delta in iter_deltas(chunks, message_id):
+            parts.append(delta["text"])
+            self.send_delta(session_key, delta)
+        return {"role": "assistant", "content": "".join(parts), "id": message_id}
+
+    @staticmethod
+    def _start(channel, last_event_id):
+        """Return the sequence number of the first event to send."""
+        # caller holds the channel's condition
+        if not last_event_id:
+            return channel.next_id
+        token, _, number = last_event_id.partition("-")
+        if (
+            token != channel.token
+            or not number.isdigit()
+            or int(number) >= channel.next_id
+        ):
+            # sent before a restart or an eviction: replay everything kept
+            return 0
+        return int(number) + 1
+
+    def subscribe(self, session_key, last_event_id=None):
+        """Yield the Server-Sent Events of a conversation as text.
+
+        Without ``last_event_id`` only new events are sent, otherwise the kept
+        events after it are sent first. Raises ``OverflowError`` when
+        ``max_subscribers`` connections are open.
+        """
+        with self._lock:
+            if self._subscribers >= self.max_subscribers:
+                raise OverflowError("too many push subscribers")
+        return self._events(session_key, last_event_id)
+
+    def _events(self, session_key, last_event_id):
+        # counted once the response starts, a response closed before is not
+        with self._lock:
+            self._subscribers += 1
+            channel = self._channel(session_key)
+            channel.subscribers += 1
+        with channel.condition:
+            cursor = self._start(channel, last_event_id)
+        try:
+            yield "retry: {}\n\n".format(RECONNECT_DELAY)
+            while not self._closed:
+                with channel.condition:
+                    if cursor >= channel.next_id:
+                        channel.condition.wait(self.heartbeat)
+                    pending = [event for event in channel.events if event[0] >= cursor]
+                    cursor = max(cursor, channel.next_id)
+                if not pending:
+                    yield ": keepalive\n\n"
+                for _, event_id, event, payload in pending:
+                    yield "id: {}\nevent: {}\ndata: {}\n\n".format(
+                        event_id, event, payload
+                    )
+        finally:
+            with self._lock:
+                self._subscribers -= 1
+                channel.subscribers -= 1
+
+    def subscribers(self, session_key=None):
+        """Return the number of open connections, to one conversation or in all."""
+        with self._lock:
+            if session_key is None:
+                return self._subscribers
+            channel = self._channels.get(session_key)
+            return channel.subscribers if channel is not None else 0
+
+    def wait_for_subscriber(self, session_key, timeout=5.0):
+        """Wait until a conversation has a subscriber; returns whether it has one."""
+        deadline = time.monotonic() + timeout
+        while self.subscribers(session_key) == 0:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self):
+        """End every subscription, e.g. when the server shuts down."""
+        self._closed = True
+        with self._lock:
+            channels = list(self._channels.values())
+        for channel in channels:
+            with channel.condition:
+                channel.condition.notify_all()
+
+
+def _push_view(hub):
+    def push():
+        request = flask.request
+        session_key = request.args.get("session")
+        if not session_key:
+            flask.abort(400)
+        # EventSource sends the header when it reconnects by itself, the
+        # component passes it in the query string when it reconnects after an error
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get(
+            "last_event_id"
+        )
+        try:
+            events = hub.subscribe(session_key, last_event_id)
+        except OverflowError:
+            flask.abort(503)
+        return flask.Response(
+            events,
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    return push
+
+
+def register(app, hub=None, **options):
+    """Register the push endpoint on a Dash app's Flask server.
+
+    ``app`` may also be a plain Flask app. Returns ``hub`` (by default a new
+    :class:`PushHub` created with ``options``); pass its ``url`` to the
+    ``push_url`` prop of the ChatComponent and publish to it from callbacks
+    or background threads. The server must handle requests in threads, as the
+    Dash and Flask development servers do.
+    """
+    if hub is None:
+        hub = PushHub(**options)
+    hub.url = relative_path(app, "/" + PUSH_ROUTE)
+
+    blueprint = flask.Blueprint("dash_chat_push", __name__)
+    blueprint.add_url_rule("/" + PUSH_ROUTE, "push", _push_view(hub), methods=["GET"])
+    register_blueprint(app, blueprint)
+    return hub
@@ -0,0 +1,271 @@
+"""
+Full-text search over server-side conversation history.
+
+Scrolling back through thousands of messages to find "that table from last
+week" does not work. ``SearchIndex`` keeps a SQLite FTS5 index of the messages
+in a conversation store, updated as messages are appended, and the component's
+search box queries it through its ``search_query`` and ``search_results``
+props:
+
+    from dash_chat.search import SearchIndex
+
+    store = SQLiteStore("history.db")
+    index = SearchIndex("search.db")
+    index.attach(store)
+
+    app.layout = ChatComponent(
+        id="chat", history_mode="server", page_size=50, searchable=True
+    )
+
+    @callback(
+        Output("chat", "search_results"),
+        Input("chat", "search_query"),
+        State("chat", "session_id"),
+        prevent_initial_call=True,
+    )
+    def search(query, session_id):
+        return index.search("chat", session_id, query)
+
+Text parts, the header and cells of tables, the column names and string values
+of columnar tables and the file names of attachments are indexed. A query
+matches messages containing all of its words, the last one as a prefix while it
+has two to six letters, so results follow typing; longer words are matched
+whole, as their prefixes are not indexed. The newest matches come first, with
+the message's position, so the component can load older history up to a match
+and scroll to it. Each query only reads the index of its conversation; with a
+million messages in a thousand conversations queries take one to two
+milliseconds (``benchmarks/bench_search.py``).
+"""
+
+import json
+import re
+import sqlite3
+import threading
+
+# marks the matched words in snippets, split out before results are returned
+_START = "\x02"
+_END = "\x03"
+_WORD = re.compile(r"\w+", re.UNICODE)
+SNIPPET_WORDS = 12
+_SEQ_BITS = 32
+# lengths of the prefixes indexed: longer ones would read the matches of every
+# conversation, so longer last words are matched as whole words
+PREFIXES = (2, 3, 4, 5, 6)
+
+
+def _part_text(part):
+    if isinstance(part, str):
+        return [part]
+    if not isinstance(part, dict):
+        return []
+    part_type = part.get("type")
+    if part_type == "text":
+        return [part.get("text") or ""]
+    if part_type == "attachment":
+        return [part.get("fileName") or ""]
+    if part_type == "table":
+        texts = [str(cell) for cell in part.get("header") or ()]
+        for row in part.get("data") or ():
+            cells = row.values() if isinstance(row, dict) else row
+            texts.extend(str(cell) for cell in cells if cell is not None)
+        return texts
+    if part_type == "columnar_table":
+        texts = []
+        for column in part.get("columns") or ():
+            texts.append(str(column.get("name", "")))
+            # numeric columns are base64 typed arrays, only strings are indexed
+            for values in (column.get("dictionary"), column.get("values")):
+                if isinstance(values, list):
+                    texts.extend(value for value in values if isinstance(value, str))
+        return texts
+    return []
+
+
+def message_text(message):
+    """Return the searchable text of a message."""
+    content = message.get("content") if isinstance(message, dict) else None
+    parts = content if isinstance(content, list) else [content]
+    return "\n".join(text for part in parts for text in _part_text(part) if text)
+
+
+def _match_query(query, prefixes=PREFIXES):
+    words = _WORD.findall(query or "")
+    if not words:
+        return None
+    terms = ['"{}"'.format(word) for word in words]
+    # single letters would match most of the index
+    if len(words[-1]) in prefixes:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _segments(snippet):
+    """Split a snippet into plain and matched text, alternating from plain."""
+    segments = [""]
+    for piece in re.split("({}|{})".format(_START, _END), snippet):
+        if piece in (_START, _END):
+            segments.append("")
+        else:
+            segments[-1] += piece
+    return segments
+
+
+class SearchIndex:
+    """SQLite FTS5 index of conversation messages.
+
+    Without ``path`` the index is in memory. With a file it survives restarts
+    and can be shared by several server processes, like ``SQLiteStore``.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        with self._conn:
+            if path is not None:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS dash_chat_search_conversations (
+                    id INTEGER PRIMARY KEY,
+                    component_id TEXT NOT NULL,
+                    session_key TEXT NOT NULL,
+                    UNIQUE (component_id, session_key)
+                )
+                """
+            )
+            # the rowid of a message is its conversation's id << 32 | its position,
+            # so a query reads the index of one conversation only
+            self._conn.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS dash_chat_search USING fts5(
+                    text,
+                    role UNINDEXED,
+                    message_id UNINDEXED,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '{}'
+                )
+                """.format(
+                    " ".join(str(length) for length in PREFIXES)
+                )
+            )
+            (sql,) = self._conn.execute(
+                "SELECT sql FROM sqlite_master WHERE name = 'dash_chat_search'"
+            ).fetchone()
+        # an index file created with other prefixes keeps them
+        found = re.search(r"prefix\s*=\s*'([\d ]*)'", sql)
+        self._prefixes = tuple(int(n) for n in found.group(1).split()) if found else ()
+
+    def _rowids(self, component_id, session_key, create=False):
+        # caller holds the lock; returns the conversation's rowid range or None
+        if create:
+            # another process sharing the file may have added it already
+            self._conn.execute(
+                "INSERT OR IGNORE INTO dash_chat_search_conversations "
+                "(component_id, session_key) VALUES (?, ?)",
+                (component_id, session_key),
+            )
+        row = self._conn.execute(
+            "SELECT id FROM dash_chat_search_conversations "
+            "WHERE component_id = ? AND session_key = ?",
+            (component_id, session_key),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0] << _SEQ_BITS, ((row[0] + 1) << _SEQ_BITS) - 1
+
+    def attach(self, store):
+        """Index the messages appended to ``store`` from now on."""
+        store.add_listener(self)
+
+    def add(self, component_id, session_key, start, messages):
+        """Index ``messages`` of a conversation, the first at position ``start``.
+
+        Messages indexed before at the same positions are replaced.
+        """
+        rows = []
+        for seq, message in enumerate(messages, start=start):
+            text = message_text(message)
+            if text:
+                message_id = message.get("id")
+                if message_id is not None:
+                    message_id = json.dumps(message_id)
+                rows.append((seq, (text, message.get("role"), message_id)))
+        if not rows:
+            return
+        with self._lock, self._conn:
+            first, _ = self._rowids(component_id, session_key, create=True)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO dash_chat_search "
+                "(rowid, text, role, message_id) "
+                "VALUES (?, ?, ?, ?)",
+                [(first + seq,) + row for seq, row in rows],
+            )
+
+    def index_conversation(self, store, component_id, session_key):
+        """Index a conversation already in ``store``, e.g. after attaching.
+
+        Messages appended meanwhile and already indexed through the listener
+        are replaced, not duplicated, in a single transaction.
+        """
+        self.add(
+            component_id, session_key, 0, store.get_messages(component_id, session_key)
+        )
+
+    def remove(self, component_id, session_key):
+        """Remove a conversation from the index."""
+        with self._lock, self._conn:
+            rowids = self._rowids(component_id, session_key)
+            if rowids is not None:
+                self._conn.execute(
+                    "DELETE FROM dash_chat_search WHERE rowid BETWEEN ? AND ?", rowids
+                )
+
+    on_append = add
+    on_clear = remove
+
+    def search(self, component_id, session_key, query, limit=20):
+        """Return the newest messages of a conversation matching ``query``.
+
+        Each result is a dict with the message's position ``seq``, its ``id``
+        (when it has one), its ``role`` and a ``snippet``: a list of text
+        segments, alternately plain and matching the query.
+        """
+        terms = _match_query(query, self._prefixes)
+        if terms is None:
+            return []
+        with self._lock:
+            rowids = self._rowids(component_id, session_key)
+            if rowids is None:
+                return []
+            # newest first: ranking by relevance would read the statistics of
+            # every conversation, which gets slow for common words
+            rows = self._conn.execute(
+                "SELECT rowid, role, message_id, "
+                "snippet(dash_chat_search, 0, ?, ?, '...', ?) "
+                "FROM dash_chat_search WHERE dash_chat_search MATCH ? "
+                "AND rowid BETWEEN ? AND ? ORDER BY rowid DESC LIMIT ?",
+                (_START, _END, SNIPPET_WORDS, terms) + rowids + (limit,),
+            ).fetchall()
+        results = []
+        for rowid, role, message_id, snippet in rows:
+            result = {
+                "seq": rowid - rowids[0],
+                "role": role,
+                "snippet": _segments(snippet),
+            }
+            if message_id is not None:
+                result["id"] = json.loads(message_id)
+            results.append(result)
+        return results
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM dash_chat_search"
+            ).fetchone()
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
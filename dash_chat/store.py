@@ -0,0 +1,301 @@
+"""
+Server-side conversation stores.
+
+With ``history_mode="server"`` the ChatComponent keeps the authoritative history
+on the server instead of round-tripping the whole ``messages`` list through every
+callback. Callbacks receive only ``new_message`` and the component's
+``session_id``, record the turn in a store and return just the new assistant
+message(s):
+
+    store = MemoryStore()
+
+    @callback(
+        Output("chat", "messages"),
+        Input("chat", "new_message"),
+        State("chat", "session_id"),
+        prevent_initial_call=True,
+    )
+    def handle_chat(new_message, session_id):
+        store.append("chat", session_id, new_message)
+        history = store.get_messages("chat", session_id)
+        reply = {"role": "assistant", "content": generate(history)}
+        store.append("chat", session_id, reply)
+        return [reply]
+
+Conversations are keyed by the component ``id`` plus a session key, so one store
+can back several chat components.
+
+Long conversations can be sent to the browser a page at a time. With ``page_size``
+set the component asks for the newest page on load and for older pages as the
+chat is scrolled up, through its ``request_history`` prop:
+
+    @callback(
+        Output("chat", "history_page"),
+        Input("chat", "request_history"),
+        State("chat", "session_id"),
+        prevent_initial_call=True,
+    )
+    def load_history(request, session_id):
+        return history_page(store, "chat", session_id, request)
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+MAX_PAGE_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore:
+    """Base class for conversation stores.
+
+    Subclasses implement ``append``, ``get_messages``, ``get_page`` and ``clear``.
+    Messages are plain JSON-serializable dicts in the same shape as the
+    ``messages`` prop.
+    """
+
+    _listeners = ()
+
+    def add_listener(self, listener):
+        """Tell ``listener`` about every change to the store's conversations.
+
+        ``listener.on_append(component_id, session_key, start, messages)`` is
+        called after messages are appended, ``start`` being the position of the
+        first one (the cursor of ``get_page``), and
+        ``listener.on_clear(component_id, session_key)`` after a conversation
+        is removed. Used to keep a search index up to date. Listeners run once
+        the change is saved; their errors are logged, not raised.
+        """
+        self._listeners = self._listeners + (listener,)
+
+    def _appended(self, component_id, session_key, start, messages):
+        for listener in self._listeners:
+            try:
+                listener.on_append(component_id, session_key, start, messages)
+            except Exception:
+                logger.exception("Store listener %r failed on append", listener)
+
+    def _cleared(self, component_id, session_key):
+        for listener in self._listeners:
+            try:
+                listener.on_clear(component_id, session_key)
+            except Exception:
+                logger.exception("Store listener %r failed on clear", listener)
+
+    def append(self, component_id, session_key, *messages):
+        """Append one or more messages to the end of a conversation."""
+        raise NotImplementedError
+
+    def get_messages(self, component_id, session_key, limit=None):
+        """Return the conversation in chronological order.
+
+        If ``limit`` is given only the most recent ``limit`` messages are returned.
+        Unknown conversations return an empty list.
+        """
+        raise NotImplementedError
+
+    def get_page(self, component_id, session_key, before=None, limit=50):
+        """Return up to ``limit`` messages older than the cursor ``before``.
+
+        Returns a dict with the page's ``messages`` in chronological order, the
+        ``cursor`` to pass as ``before`` to get the preceding page and whether
+        there are older messages (``has_more``). Without ``before`` the newest
+        messages are returned.
+        """
+        raise NotImplementedError
+
+    def clear(self, component_id, session_key):
+        """Remove a conversation from the store."""
+        raise NotImplementedError
+
+
+class MemoryStore(ConversationStore):
+    """In-process store holding conversations in memory.
+
+    At most ``max_conversations`` conversations are kept; the least recently
+    used one is dropped when a new conversation would exceed the limit.
+    Suitable for a single server process.
+    """
+
+    def __init__(self, max_conversations=1024):
+        if max_conversations < 1:
+            raise ValueError("max_conversations must be at least 1")
+        self.max_conversations = max_conversations
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def append(self, component_id, session_key, *messages):
+        key = (component_id, session_key)
+        evicted = []
+        with self._lock:
+            history = self._conversations.get(key)
+            if history is None:
+                history = self._conversations[key] = []
+                while len(self._conversations) > self.max_conversations:
+                    evicted.append(self._conversations.popitem(last=False)[0])
+            else:
+                self._conversations.move_to_end(key)
+            start = len(history)
+            history.extend(messages)
+        for evicted_key in evicted:
+            self._cleared(*evicted_key)
+        if messages:
+            self._appended(component_id, session_key, start, messages)
+
+    def get_messages(self, component_id, session_key, limit=None):
+        key = (component_id, session_key)
+        with self._lock:
+            history = self._conversations.get(key)
+            if history is None:
+                return []
+            self._conversations.move_to_end(key)
+            if limit is None:
+                return list(history)
+            return history[-limit:] if limit > 0 else []
+
+    def get_page(self, component_id, session_key, before=None, limit=50):
+        key = (component_id, session_key)
+        with self._lock:
+            history = self._conversations.get(key, [])
+            if key in self._conversations:
+                self._conversations.move_to_end(key)
+            # positions in the list never change, messages are only appended
+            end = len(history) if before is None else max(0, min(before, len(history)))
+            start = max(0, end - max(limit, 0))
+            messages = history[start:end]
+        return {
+            "messages": messages,
+            "cursor": start if messages else before,
+            "has_more": start > 0,
+        }
+
+    def clear(self, component_id, session_key):
+        with self._lock:
+            self._conversations.pop((component_id, session_key), None)
+        self._cleared(component_id, session_key)
+
+    def __len__(self):
+        return len(self._conversations)
+
+
+class SQLiteStore(ConversationStore):
+    """Store persisting conversations to a SQLite database.
+
+    History survives restarts and can be shared by several server processes
+    pointing at the same database file. One row is written per message, so
+    appending costs the same regardless of how long the conversation is.
+    """
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS dash_chat_messages (
+                    component_id TEXT NOT NULL,
+                    session_key TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    message TEXT NOT NULL,
+                    PRIMARY KEY (component_id, session_key, seq)
+                ) WITHOUT ROWID
+                """
+            )
+
+    def append(self, component_id, session_key, *messages):
+        if not messages:
+            return
+        with self._lock, self._conn:
+            # take the write lock before reading the last position, so appends
+            # from other processes cannot pick the same one
+            self._conn.execute("BEGIN IMMEDIATE")
+            (last_seq,) = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) FROM dash_chat_messages "
+                "WHERE component_id = ? AND session_key = ?",
+                (component_id, session_key),
+            ).fetchone()
+            self._conn.executemany(
+                "INSERT INTO dash_chat_messages VALUES (?, ?, ?, ?)",
+                [
+                    (component_id, session_key, last_seq + i, json.dumps(message))
+                    for i, message in enumerate(messages, start=1)
+                ],
+            )
+        self._appended(component_id, session_key, last_seq + 1, messages)
+
+    def get_messages(self, component_id, session_key, limit=None):
+        if limit is not None and limit <= 0:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message FROM dash_chat_messages "
+                "WHERE component_id = ? AND session_key = ? "
+                "ORDER BY seq DESC LIMIT ?",
+                (component_id, session_key, -1 if limit is None else limit),
+            ).fetchall()
+        return [json.loads(message) for (message,) in reversed(rows)]
+
+    def get_page(self, component_id, session_key, before=None, limit=50):
+        query = (
+            "SELECT seq, message FROM dash_chat_messages "
+            "WHERE component_id = ? AND session_key = ? {}"
+            "ORDER BY seq DESC LIMIT ?"
+        )
+        params = [component_id, session_key]
+        if before is None:
+            query = query.format("")
+        else:
+            query = query.format("AND seq < ? ")
+            params.append(before)
+        # one extra row tells whether an older page exists
+        params.append(max(limit, 0) + 1)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "messages": [json.loads(message) for _, message in reversed(rows)],
+            "cursor": rows[-1][0] if rows else before,
+            "has_more": has_more,
+        }
+
+    def clear(self, component_id, session_key):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM dash_chat_messages "
+                "WHERE component_id = ? AND session_key = ?",
+                (component_id, session_key),
+            )
+        self._cleared(component_id, session_key)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def history_page(
+    store, component_id, session_key, request, max_page_size=MAX_PAGE_SIZE
+):
+    """Answer a ChatComponent ``request_history`` event from a conversation store.
+
+    ``request`` is the ``{"cursor", "limit"}`` dict set by the component; the
+    returned page is meant for its ``history_page`` prop. Pages are read with
+    keyset pagination, so loading an old page costs the same as loading the
+    newest one, and are capped at ``max_page_size`` messages.
+    """
+    request = request or {}
+    cursor = request.get("cursor")
+    limit = min(int(request.get("limit") or max_page_size), max_page_size)
+    return store.get_page(
+        component_id,
+        session_key,
+        before=None if cursor is None else int(cursor),
+        limit=limit,
+    )
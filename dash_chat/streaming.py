@@ -0,0 +1,122 @@
+"""
+Helpers for streaming assistant replies into a ChatComponent.
+
+A reply is streamed through the component's ``stream_delta`` prop, which writes
+``text`` into the in-progress message with the same ``id`` starting at
+``offset``. The usual way to drive it is the ``progress`` output of a Dash
+background callback:
+
+    @callback(
+        Output("chat", "messages"),
+        Input("chat", "new_message"),
+        State("chat", "messages"),
+        background=True,
+        progress=Output("chat", "stream_delta"),
+        prevent_initial_call=True,
+    )
+    def handle_chat(set_progress, new_message, messages):
+        updated_messages = messages + [new_message]
+        reply = stream_to_progress(set_progress, generate_tokens(updated_messages))
+        return updated_messages + [reply]
+
+The first tokens show up as soon as the progress output is polled instead of
+when the whole reply has been generated. The final reply returned by the
+callback carries the same ``id`` and replaces the streamed bubble.
+"""
+
+import asyncio
+import time
+import uuid
+
+
+def new_message_id():
+    """Return a fresh id for an assistant message."""
+    return uuid.uuid4().hex
+
+
+def _iterate(chunks):
+    """Iterate over a sync or async iterable of text chunks from sync code."""
+    if not hasattr(chunks, "__aiter__"):
+        yield from chunks
+        return
+
+    loop = asyncio.new_event_loop()
+    iterator = chunks.__aiter__()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def iter_deltas(chunks, message_id=None):
+    """Turn an iterable (or async iterable) of text chunks into append-only deltas.
+
+    Each delta is a dict suitable for the ``stream_delta`` prop. Empty chunks are
+    skipped and a final delta with ``done=True`` closes the message. Use this
+    with transports that deliver every update, such as ``dash_chat.push``.
+    """
+    message_id = message_id or new_message_id()
+    seq = 0
+    offset = 0
+    for chunk in _iterate(chunks):
+        if not chunk:
+            continue
+        yield {"id": message_id, "seq": seq, "offset": offset, "text": chunk}
+        seq += 1
+        offset += len(chunk)
+    yield {"id": message_id, "seq": seq, "offset": offset, "text": "", "done": True}
+
+
+async def aiter_deltas(chunks, message_id=None):
+    """Async counterpart of :func:`iter_deltas` for async iterables of chunks."""
+    message_id = message_id or new_message_id()
+    seq = 0
+    offset = 0
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        yield {"id": message_id, "seq": seq, "offset": offset, "text": chunk}
+        seq += 1
+        offset += len(chunk)
+    yield {"id": message_id, "seq": seq, "offset": offset, "text": "", "done": True}
+
+
+def stream_to_progress(set_progress, chunks, message_id=None, interval=0.1):
+    """Stream text chunks through a background callback's ``set_progress``.
+
+    Dash only keeps the latest progress value between two polls, so instead of
+    append-only deltas every update carries the reply generated so far with
+    ``offset=0``; a skipped poll then never loses text. Updates are sent at most
+    once per ``interval`` seconds.
+
+    Returns the complete assistant message, with the same id as the streamed
+    bubble, to be returned as (part of) the callback's ``messages`` output.
+    """
+    message_id = message_id or new_message_id()
+    parts = []
+    seq = 0
+    last_sent = None
+    pending = False
+    for chunk in _iterate(chunks):
+        if not chunk:
+            continue
+        parts.append(chunk)
+        pending = True
+        now = time.monotonic()
+        if last_sent is None or now - last_sent >= interval:
+            set_progress(
+                {"id": message_id, "seq": seq, "offset": 0, "text": "".join(parts)}
+            )
+            seq += 1
+            last_sent = now
+            pending = False
+
+    text = "".join(parts)
+    if pending:
+        set_progress({"id": message_id, "seq": seq, "offset": 0, "text": text})
+    return {"role": "assistant", "content": text, "id": message_id}
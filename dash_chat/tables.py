@@ -0,0 +1,300 @@
+"""
+Columnar tables for large result sets.
+
+The ``table`` content part carries every row as a JSON list and renders every
+row at once, which does not scale to query results with tens of thousands of
+rows. ``columnar_table`` builds a ``columnar_table`` content part instead:
+numeric columns are sent as base64 typed arrays, repetitive string columns as a
+dictionary of distinct values plus integer codes, and the browser renders one
+page of rows at a time:
+
+    from dash_chat.tables import columnar_table
+
+    reply = {
+        "role": "assistant",
+        "content": [
+            {"type": "text", "text": "Here are the matching orders."},
+            columnar_table(df, page_size=50, striped=True, hover=True),
+        ],
+    }
+
+Tables too large to send at all can be kept on the server. Register the page
+endpoint and pass its store; the message then only holds the first page and
+later pages are fetched as they are viewed:
+
+    tables = dash_chat.tables.register(app)
+
+    columnar_table(df, store=tables)
+
+The store lives in the server process, so with several worker processes the
+page requests of a table must reach the process that created it, e.g. by
+routing sessions to workers with sticky sessions; elsewhere they get a 404.
+
+Accepts pandas DataFrames, pyarrow Tables, dicts of columns, structured NumPy
+arrays and 2-D NumPy arrays (with ``columns`` naming them). Requires numpy
+(``pip install dash-chat[figures]``).
+"""
+
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+import flask
+import numpy as np
+
+from ._server import register_blueprint, relative_path
+from .figures import encode_array
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+TABLE_ROUTE = "_dash-chat/tables"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+_TABLE_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def _arrow_column(column):
+    column = column.combine_chunks() if hasattr(column, "combine_chunks") else column
+    if hasattr(column, "dictionary") and hasattr(column, "indices"):
+        # already dictionary encoded, keep the encoding
+        codes = column.indices.to_numpy(zero_copy_only=False)
+        codes = np.where(column.is_null().to_numpy(zero_copy_only=False), -1, codes)
+        return column.dictionary.to_pylist(), codes
+    return column.to_numpy(zero_copy_only=False)
+
+
+def _to_columns(data, columns=None):
+    """Return the table as an ordered dict of column name to values."""
+    if hasattr(data, "column_names") and hasattr(data, "column"):
+        return OrderedDict(
+            (name, _arrow_column(data.column(name))) for name in data.column_names
+        )
+    if hasattr(data, "dtypes") and hasattr(data, "columns") and hasattr(data, "iloc"):
+        result = OrderedDict()
+        for name in data.columns:
+            series = data[name]
+            if hasattr(series, "cat"):
+                codes = series.cat.codes.to_numpy()
+                result[str(name)] = (series.cat.categories.tolist(), codes)
+            else:
+                result[str(name)] = series.to_numpy()
+        return result
+    if isinstance(data, dict):
+        return OrderedDict((str(name), values) for name, values in data.items())
+    array = np.asarray(data)
+    if array.dtype.names:
+        return OrderedDict((name, array[name]) for name in array.dtype.names)
+    if array.ndim != 2:
+        raise ValueError("Tables need two-dimensional data")
+    names = columns or ["Column {}".format(i + 1) for i in range(array.shape[1])]
+    if len(names) != array.shape[1]:
+        raise ValueError("Expected {} column names".format(array.shape[1]))
+    return OrderedDict((str(name), array[:, i]) for i, name in enumerate(names))
+
+
+def _num_rows(values):
+    return len(values[1]) if isinstance(values, tuple) else len(values)
+
+
+def _slice(values, start, stop):
+    if isinstance(values, tuple):
+        return values[0], values[1][start:stop]
+    return values[start:stop]
+
+
+def _codes_spec(codes, size):
+    for dtype in (np.int8, np.int16, np.int32):
+        if size <= np.iinfo(dtype).max:
+            return encode_array(np.asarray(codes, dtype=dtype))
+    return encode_array(np.asarray(codes, dtype=np.float64))
+
+
+def _nulls(array):
+    """Return which items of an object array are missing."""
+    if pd is not None:
+        # also pd.NA and pd.NaT, as found in nullable pandas columns
+        return pd.isna(array)
+    return np.fromiter(
+        (
+            item is None
+            or (
+                isinstance(item, (float, np.floating, np.datetime64, np.timedelta64))
+                and item != item
+            )
+            for item in array
+        ),
+        dtype=bool,
+        count=len(array),
+    )
+
+
+def encode_column(name, values):
+    """Encode one column for a ``columnar_table`` content part.
+
+    Numbers become typed arrays, booleans and datetimes typed arrays with a
+    ``type`` marking how to display them, and strings a ``dictionary`` of
+    distinct values with integer ``codes`` (-1 for missing values) when values
+    repeat, or a plain list of ``values`` otherwise.
+    """
+    if isinstance(values, tuple):
+        dictionary, codes = values
+        return {
+            "name": name,
+            "dictionary": list(dictionary),
+            "codes": _codes_spec(codes, len(dictionary)),
+        }
+
+    array = np.asarray(values)
+    kind = array.dtype.kind
+    if kind in "iuf":
+        return {"name": name, "values": encode_array(array)}
+    if kind == "b":
+        return {
+            "name": name,
+            "type": "bool",
+            "values": encode_array(array.astype(np.uint8)),
+        }
+    if kind == "M":
+        milliseconds = array.astype("datetime64[ms]").astype(np.float64)
+        milliseconds[np.isnat(array)] = np.nan
+        return {"name": name, "type": "datetime", "values": encode_array(milliseconds)}
+
+    array = array.astype(object)
+    nulls = _nulls(array)
+    strings = [None if null else str(item) for item, null in zip(array.tolist(), nulls)]
+    dictionary = sorted({item for item in strings if item is not None})
+    if len(dictionary) * 2 > len(strings):
+        # mostly distinct values, a dictionary would not save anything
+        return {"name": name, "values": strings}
+    index = {value: code for code, value in enumerate(dictionary)}
+    codes = np.fromiter(
+        (-1 if item is None else index[item] for item in strings),
+        dtype=np.int64,
+        count=len(strings),
+    )
+    return {
+        "name": name,
+        "dictionary": dictionary,
+        "codes": _codes_spec(codes, len(dictionary)),
+    }
+
+
+def encode_columns(columns, start=0, stop=None):
+    """Encode rows ``start`` to ``stop`` of an ordered dict of columns."""
+    return [
+        encode_column(name, _slice(values, start, stop))
+        for name, values in columns.items()
+    ]
+
+
+class TableStore:
+    """In-memory store of tables whose pages are fetched on demand.
+
+    At most ``max_tables`` tables are kept; the least recently used one is
+    dropped when a new table would exceed the limit, after which its pages can
+    no longer be fetched.
+    """
+
+    def __init__(self, max_tables=128, url=None):
+        if max_tables < 1:
+            raise ValueError("max_tables must be at least 1")
+        self.max_tables = max_tables
+        self.url = url
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, columns):
+        """Store an ordered dict of columns and return its table id."""
+        table_id = uuid.uuid4().hex
+        with self._lock:
+            self._tables[table_id] = columns
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+        return table_id
+
+    def page(self, table_id, offset, limit):
+        """Return rows ``offset`` to ``offset + limit`` of a table, encoded."""
+        with self._lock:
+            columns = self._tables[table_id]
+            self._tables.move_to_end(table_id)
+        return encode_columns(columns, offset, offset + limit)
+
+    def __len__(self):
+        return len(self._tables)
+
+
+def columnar_table(
+    data, columns=None, page_size=DEFAULT_PAGE_SIZE, store=None, **props
+):
+    """Return a ``columnar_table`` content part for a message.
+
+    ``columns`` names the columns of a 2-D NumPy array. With ``store`` (a
+    :class:`TableStore` registered with :func:`register`) only the first page of
+    rows is included and the others are fetched from the server. Other keyword
+    arguments (``striped``, ``hover``, ``size``, ``style``, ...) are passed on as
+    table props, as for the ``table`` content part.
+    """
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1")
+    table = _to_columns(data, columns)
+    num_rows = _num_rows(next(iter(table.values()))) if table else 0
+    part = {
+        "type": "columnar_table",
+        "num_rows": num_rows,
+        "page_size": page_size,
+        "props": props,
+    }
+    if store is not None and num_rows > page_size:
+        if store.url is None:
+            raise ValueError("Register the table store with dash_chat.tables.register")
+        part["columns"] = encode_columns(table, 0, page_size)
+        part["url"] = "{}/{}".format(store.url, store.add(table))
+    else:
+        part["columns"] = encode_columns(table)
+    return part
+
+
+def _page_view(store):
+    def page(table_id):
+        if not _TABLE_ID.fullmatch(table_id):
+            flask.abort(404)
+        try:
+            offset = max(int(flask.request.args.get("offset", 0)), 0)
+            limit = int(flask.request.args.get("limit", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            flask.abort(400)
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+        try:
+            columns = store.page(table_id, offset, limit)
+        except KeyError:
+            flask.abort(404)
+        return flask.jsonify({"offset": offset, "columns": columns})
+
+    return page
+
+
+def register(app, max_tables=128, store=None):
+    """Register the table page endpoint on a Dash app's Flask server.
+
+    Returns the :class:`TableStore` to pass to :func:`columnar_table`. The
+    store is kept in memory by each worker process, so under a multi-process
+    server such as gunicorn pages are only found by the process that stored the
+    table; route sessions to workers with sticky sessions.
+    """
+    url = relative_path(app, "/" + TABLE_ROUTE)
+    if store is None:
+        store = TableStore(max_tables, url=url)
+    elif store.url is None:
+        store.url = url
+
+    blueprint = flask.Blueprint("dash_chat_tables", __name__)
+    blueprint.add_url_rule(
+        "/{}/<table_id>".format(TABLE_ROUTE), "page", _page_view(store), methods=["GET"]
+    )
+    register_blueprint(app, blueprint)
+    return store
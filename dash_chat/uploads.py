@@ -0,0 +1,550 @@
+"""
+Attachment uploads straight to the server.
+
+By default attachments are read into base64 data URLs and sent inside
+``new_message``, which inflates them by a third and pushes them through the
+callback JSON pipeline. Registering the upload endpoint lets the component send
+the file body directly to disk; ``new_message`` then only carries a small handle:
+
+    {
+        "type": "attachment",
+        "fileId": "5f0c...",
+        "fileName": "report.pdf",
+        "fileType": "application/pdf",
+        "fileSize": 20971520,
+        "url": "/_dash-chat/uploads/5f0c...",
+    }
+
+Usage:
+
+    uploads = dash_chat.uploads.register(app)
+
+    app.layout = ChatComponent(id="chat", upload_url=uploads.upload_url)
+
+    @callback(...)
+    def handle_chat(new_message, messages):
+        for item in new_message["content"]:
+            if item["type"] == "attachment":
+                with uploads.open(item) as f:
+                    ...
+
+Files larger than the component's ``upload_chunk_size`` are sent in chunks to
+``<upload_url>/chunked`` instead: the upload is created with a POST, each chunk
+is PUT with its offset and SHA-256, and a GET returns how much was received so
+a dropped upload resumes where it stopped. Chunks are written straight to a
+partial file, checked, and the complete file is handed to the store.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from urllib.parse import unquote
+
+import flask
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from ._server import register_blueprint, relative_path, send_upload
+
+UPLOAD_ROUTE = "_dash-chat/uploads"
+CHUNKED_ROUTE = UPLOAD_ROUTE + "/chunked"
+CHUNK_SIZE = 64 * 1024
+DEFAULT_UPLOAD_CHUNK_SIZE = 2 * 2**20
+MAX_UPLOAD_CHUNK_SIZE = 16 * 2**20
+
+_UPLOAD_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured ``max_file_size``."""
+
+
+class SessionRequired(Exception):
+    """Raised when a store with per-session quotas gets an upload without one."""
+
+
+class ChunkOffsetMismatch(Exception):
+    """Raised when a chunk does not start where the received bytes end."""
+
+    def __init__(self, received):
+        super().__init__("expected a chunk at offset {}".format(received))
+        self.received = received
+
+
+class ChunkHashMismatch(Exception):
+    """Raised when a chunk does not match the SHA-256 it was sent with."""
+
+
+class UploadStore:
+    """Stores uploaded attachments as files in ``folder``.
+
+    Each upload is written to ``<folder>/<id>`` with its name, type and size in
+    a ``<id>.json`` sidecar. Ids are random, so files can only be fetched by
+    someone who received the handle.
+    """
+
+    def __init__(self, folder=None, max_file_size=None, url=None):
+        self.folder = folder or os.path.join(tempfile.gettempdir(), "dash_chat_uploads")
+        self.max_file_size = max_file_size
+        self.url = url
+        self.upload_url = url
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _file_id(self, handle):
+        file_id = handle.get("fileId") if isinstance(handle, dict) else handle
+        if not isinstance(file_id, str) or not _UPLOAD_ID.fullmatch(file_id):
+            raise KeyError("Invalid upload id: {!r}".format(file_id))
+        return file_id
+
+    def path(self, handle):
+        """Return the path on disk of an upload, given its handle or id."""
+        return os.path.join(self.folder, self._file_id(handle))
+
+    def metadata(self, handle):
+        """Return the handle stored for an upload, given its handle or id."""
+        with open(self.path(handle) + ".json") as f:
+            return json.load(f)
+
+    def open(self, handle, mode="rb"):
+        """Open an upload as a file object, given its handle or id."""
+        return open(self.path(handle), mode)
+
+    def save(self, stream, name, mime_type=None, session_key=""):
+        """Copy a binary stream to disk in chunks and return the new handle.
+
+        ``session_key`` is accepted for compatibility with
+        :class:`dash_chat.blobs.BlobStore` and ignored.
+        """
+        file_id = uuid.uuid4().hex
+        path = os.path.join(self.folder, file_id)
+        size = 0
+        try:
+            with open(path, "wb") as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if self.max_file_size is not None and size > self.max_file_size:
+                        raise UploadTooLarge(name)
+                    f.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+
+        handle = {
+            "type": "attachment",
+            "fileId": file_id,
+            "fileName": name,
+            "fileType": mime_type or "application/octet-stream",
+            "fileSize": size,
+        }
+        if self.url:
+            handle["url"] = "{}/{}".format(self.url, file_id)
+        with open(path + ".json", "w") as f:
+            json.dump(handle, f)
+        return handle
+
+    def delete(self, handle):
+        """Remove an upload and its metadata."""
+        path = self.path(handle)
+        for filename in (path, path + ".json"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+
+class ChunkedUploads:
+    """Uploads received a chunk at a time, then saved to ``store``.
+
+    Each upload is written to ``<folder>/<id>.part`` as its chunks arrive, and
+    its name, type, size, chunk size and the bytes received so far are kept in
+    ``<id>.json``, so any server process can take the next chunk and uploads
+    survive restarts. Each chunk is written holding an exclusive lock on
+    ``<id>.lock``, so processes sharing ``folder`` on one machine never write
+    the same upload at once. Chunks must arrive in order and are never
+    buffered in memory. Uploads left unfinished for ``expires`` seconds are
+    deleted.
+    """
+
+    def __init__(
+        self,
+        store,
+        folder=None,
+        max_chunk_size=MAX_UPLOAD_CHUNK_SIZE,
+        expires=24 * 3600,
+    ):
+        self.store = store
+        self.folder = folder or os.path.join(
+            tempfile.gettempdir(), "dash_chat_partial_uploads"
+        )
+        self.max_chunk_size = max_chunk_size
+        self.expires = expires
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _path(self, upload_id):
+        if not isinstance(upload_id, str) or not _UPLOAD_ID.fullmatch(upload_id):
+            raise KeyError("Invalid upload id: {!r}".format(upload_id))
+        return os.path.join(self.folder, upload_id)
+
+    def _save_state(self, state):
+        path = self._path(state["uploadId"]) + ".json"
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+
+    @contextlib.contextmanager
+    def _locked(self, upload_id):
+        """Hold the lock of an upload, shared by every process using ``folder``."""
+        path = self._path(upload_id)
+        with open(path + ".lock", "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        # retries for 10 seconds, then raises
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+            try:
+                yield
+            finally:
+                if not os.path.exists(path + ".json"):
+                    # finished, aborted or unknown: nobody needs the lock again
+                    # fails on Windows while open, the file is then left behind
+                    with contextlib.suppress(OSError):
+                        os.remove(path + ".lock")
+                if fcntl is None:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def status(self, upload_id):
+        """Return the state of an upload; raises ``KeyError`` if it is unknown."""
+        try:
+            with open(self._path(upload_id) + ".json") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(upload_id)
+
+    def create(self, name, mime_type, size, chunk_size=None, session_key=""):
+        """Start an upload of ``size`` bytes and return its state.
+
+        ``chunk_size`` is the size the client asked for, capped at
+        ``max_chunk_size``.
+        """
+        max_file_size = getattr(self.store, "max_file_size", None)
+        if max_file_size is not None and size > max_file_size:
+            raise UploadTooLarge(name)
+        # checked now rather than once every chunk was received
+        session_quota = getattr(self.store, "max_session_bytes", None)
+        if session_quota is not None and not session_key:
+            raise SessionRequired(name)
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            chunk_size = DEFAULT_UPLOAD_CHUNK_SIZE
+        self.cleanup()
+        state = {
+            "uploadId": uuid.uuid4().hex,
+            "fileName": name,
+            "fileType": mime_type or "application/octet-stream",
+            "fileSize": size,
+            "chunkSize": min(chunk_size, self.max_chunk_size),
+            "received": 0,
+            "sessionKey": session_key,
+            "updated": time.time(),
+        }
+        open(self._path(state["uploadId"]) + ".part", "wb").close()
+        self._save_state(state)
+        return state
+
+    def write(self, upload_id, offset, stream, sha256=None):
+        """Append a chunk read from ``stream`` at ``offset``.
+
+        Returns the upload's state and, once the last chunk is written, the
+        handle of the file saved to the store. A chunk that is too large or
+        does not match ``sha256`` (hex) is discarded.
+        """
+        with self._locked(upload_id):
+            state = self.status(upload_id)
+            if offset != state["received"]:
+                raise ChunkOffsetMismatch(state["received"])
+            limit = min(state["chunkSize"], state["fileSize"] - offset)
+            digest = hashlib.sha256()
+            written = 0
+            with open(self._path(upload_id) + ".part", "r+b") as f:
+                f.seek(offset)
+                try:
+                    while True:
+                        block = stream.read(CHUNK_SIZE)
+                        if not block:
+                            break
+                        written += len(block)
+                        if written > limit:
+                            raise UploadTooLarge(state["fileName"])
+                        digest.update(block)
+                        f.write(block)
+                    if sha256 is not None and digest.hexdigest() != sha256.lower():
+                        raise ChunkHashMismatch(state["fileName"])
+                except BaseException:
+                    f.truncate(offset)
+                    raise
+            state["received"] = offset + written
+            state["updated"] = time.time()
+            self._save_state(state)
+            if state["received"] < state["fileSize"]:
+                return state, None
+            return state, self._complete(state)
+
+    def _complete(self, state):
+        upload_id = state["uploadId"]
+        try:
+            with open(self._path(upload_id) + ".part", "rb") as f:
+                return self.store.save(
+                    f,
+                    state["fileName"],
+                    state["fileType"],
+                    session_key=state["sessionKey"],
+                )
+        finally:
+            self._delete(upload_id)
+
+    def _delete(self, upload_id):
+        # caller holds the upload's lock
+        path = self._path(upload_id)
+        for filename in (path + ".part", path + ".json"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def abort(self, upload_id):
+        """Delete an unfinished upload."""
+        with self._locked(upload_id):
+            self._delete(upload_id)
+
+    def cleanup(self):
+        """Delete the uploads left unfinished for more than ``expires`` seconds."""
+        if self.expires is None:
+            return
+        cutoff = time.time() - self.expires
+        for filename in os.listdir(self.folder):
+            upload_id, extension = os.path.splitext(filename)
+            if extension != ".json":
+                continue
+            try:
+                if self.status(upload_id)["updated"] >= cutoff:
+                    continue
+                with self._locked(upload_id):
+                    # a chunk may have arrived while waiting for the lock
+                    if self.status(upload_id)["updated"] < cutoff:
+                        self._delete(upload_id)
+            except (KeyError, ValueError):
+                continue
+
+
+def _upload_view(store):
+    def upload():
+        request = flask.request
+        max_file_size = getattr(store, "max_file_size", None)
+        if request.content_length is not None and (
+            max_file_size is not None and request.content_length > max_file_size
+        ):
+            flask.abort(413)
+
+        if request.files:
+            # multipart/form-data, e.g. from a plain HTML form
+            storage = next(iter(request.files.values()))
+            name, mime_type, stream = (
+                storage.filename,
+                storage.mimetype,
+                storage.stream,
+            )
+        else:
+            # the name is URI-encoded by the component as headers are latin-1
+            name = unquote(request.headers.get("X-File-Name", ""))
+            mime_type = request.mimetype
+            stream = request.stream
+
+        try:
+            handle = store.save(
+                stream,
+                os.path.basename(name) or "upload",
+                mime_type,
+                session_key=request.headers.get("X-Chat-Session", ""),
+            )
+        except UploadTooLarge:
+            flask.abort(413)
+        except SessionRequired:
+            flask.abort(400)
+        return flask.jsonify(handle), 201
+
+    return upload
+
+
+def _download_view(store):
+    def download(file_id):
+        try:
+            handle = store.metadata(file_id)
+        except (KeyError, FileNotFoundError):
+            flask.abort(404)
+        return send_upload(
+            store.path(file_id),
+            handle["fileType"],
+            download_name=handle.get("fileName") or file_id,
+            conditional=True,
+        )
+
+    return download
+
+
+def _public_state(state):
+    return {
+        key: state[key] for key in ("uploadId", "fileSize", "chunkSize", "received")
+    }
+
+
+def _chunked_create_view(chunked):
+    def create():
+        request = flask.request
+        spec = request.get_json(silent=True)
+        if not isinstance(spec, dict):
+            flask.abort(400)
+        size = spec.get("fileSize")
+        if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+            flask.abort(400)
+        name = os.path.basename(str(spec.get("fileName") or "")) or "upload"
+        try:
+            state = chunked.create(
+                name,
+                spec.get("fileType"),
+                size,
+                chunk_size=spec.get("chunkSize"),
+                session_key=request.headers.get("X-Chat-Session", ""),
+            )
+        except UploadTooLarge:
+            flask.abort(413)
+        except SessionRequired:
+            flask.abort(400)
+        return flask.jsonify(_public_state(state)), 201
+
+    return create
+
+
+def _chunked_status_view(chunked):
+    def status(upload_id):
+        try:
+            return flask.jsonify(_public_state(chunked.status(upload_id)))
+        except KeyError:
+            flask.abort(404)
+
+    return status
+
+
+def _chunked_write_view(chunked):
+    def write(upload_id):
+        request = flask.request
+        try:
+            offset = int(request.headers["X-Upload-Offset"])
+        except (KeyError, ValueError):
+            flask.abort(400)
+        try:
+            state, handle = chunked.write(
+                upload_id,
+                offset,
+                request.stream,
+                sha256=request.headers.get("X-Chunk-SHA256"),
+            )
+        except KeyError:
+            flask.abort(404)
+        except ChunkOffsetMismatch as e:
+            return flask.jsonify({"received": e.received}), 409
+        except ChunkHashMismatch:
+            flask.abort(422)
+        except UploadTooLarge:
+            flask.abort(413)
+        except SessionRequired:
+            flask.abort(400)
+        if handle is None:
+            return flask.jsonify(_public_state(state))
+        return flask.jsonify(handle), 201
+
+    return write
+
+
+def _chunked_abort_view(chunked):
+    def abort(upload_id):
+        try:
+            chunked.abort(upload_id)
+        except KeyError:
+            flask.abort(404)
+        return "", 204
+
+    return abort
+
+
+def register(
+    app,
+    folder=None,
+    max_file_size=None,
+    store=None,
+    partial_folder=None,
+    max_chunk_size=MAX_UPLOAD_CHUNK_SIZE,
+):
+    """Register the attachment upload endpoints on a Dash app's Flask server.
+
+    ``app`` may also be a plain Flask app. Files are saved to ``store`` (by
+    default a new :class:`UploadStore` in ``folder``), which is returned; pass
+    its ``upload_url`` to the ``upload_url`` prop of the ChatComponent and use it
+    in callbacks to open the uploaded files. Chunked uploads are kept in
+    ``partial_folder`` until they are complete; the :class:`ChunkedUploads`
+    receiving them is the store's ``chunked_uploads``.
+    """
+    url = relative_path(app, "/" + UPLOAD_ROUTE)
+    if store is None:
+        store = UploadStore(folder, max_file_size=max_file_size, url=url)
+    elif store.url is None:
+        store.url = url
+    store.upload_url = url
+
+    blueprint = flask.Blueprint("dash_chat_uploads", __name__)
+    blueprint.add_url_rule(
+        "/" + UPLOAD_ROUTE,
+        "upload",
+        _upload_view(store),
+        methods=["POST"],
+    )
+    blueprint.add_url_rule(
+        "/{}/<file_id>".format(UPLOAD_ROUTE),
+        "download",
+        _download_view(store),
+        methods=["GET"],
+    )
+
+    chunked = ChunkedUploads(store, partial_folder, max_chunk_size=max_chunk_size)
+    store.chunked_uploads = chunked
+    blueprint.add_url_rule(
+        "/" + CHUNKED_ROUTE,
+        "chunked_create",
+        _chunked_create_view(chunked),
+        methods=["POST"],
+    )
+    chunk_rule = "/{}/<upload_id>".format(CHUNKED_ROUTE)
+    blueprint.add_url_rule(
+        chunk_rule, "chunked_status", _chunked_status_view(chunked), methods=["GET"]
+    )
+    blueprint.add_url_rule(
+        chunk_rule, "chunked_write", _chunked_write_view(chunked), methods=["PUT"]
+    )
+    blueprint.add_url_rule(
+        chunk_rule, "chunked_abort", _chunked_abort_view(chunked), methods=["DELETE"]
+    )
+    register_blueprint(app, blueprint)
+    return store
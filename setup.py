@@ -13,13 +13,17 @@ setup(
     name=package_name,
     version=package["version"],
     author=package["author"],
-    packages=[package_name.replace("-", "_")],
+    packages=[
+        package_name.replace("-", "_"),
+        package_name.replace("-", "_") + ".backends",
+    ],
     include_package_data=True,
     license=package["license"],
     description=package.get("description", package_name),
     long_description=long_description,
     long_description_content_type="text/markdown",
     install_requires=[],
+    extras_require={"figures": ["numpy"], "memory": ["numpy"], "fast": ["orjson"]},
     classifiers=[
         "Programming Language :: Python :: 3",
         "Programming Language :: Python :: 3 :: Only",
@@ -14,17 +14,142 @@
  * ```
 */
 
-import React, { useEffect, useRef, useState } from "react";
+import React, { useCallback, useEffect, useLayoutEffect, useMemo, useRef, useState } from "react";
 import { EllipsisVertical } from "lucide-react";
 import PropTypes from "prop-types";
 
+import MessageBubble from "../../private/MessageBubble";
 import MessageInput from "../../private/ChatMessageInput";
-import renderMessageContent from "../../private/renderers";
 import TypingIndicatorDots from "../../private/DotsIndicator";
 import TypingIndicatorSpinner from "../../private/SpinnerIndicator";
+import VirtualMessageList from "../../private/VirtualMessageList";
+import openMessageStore from "../../private/indexedDbStore";
+import resizeImage from "../../private/imageResize";
+import uploadInChunks from "../../private/chunkedUpload";
+import subscribeToPush from "../../private/pushSubscription";
+import { createTurnTracker, jsonBytes, sendMetrics } from "../../private/turnMetrics";
 
 import "../../styles/chatStyles.css";
 
+const PERSISTENCE_PAGE_SIZE = 50;
+
+const createSessionId = () => {
+    if (window.crypto && window.crypto.randomUUID) {
+        return window.crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+};
+
+/**
+ * Append messages to the history, replacing any message that has the same id
+ * (e.g. the final version of a streamed reply).
+ */
+const mergeMessages = (prevMessages, newMessages) => {
+    const merged = [...prevMessages];
+    newMessages.forEach((message) => {
+        let index = -1;
+        if (message && typeof message.id !== "undefined") {
+            for (let i = merged.length - 1; i >= 0; i--) {
+                if (merged[i]?.id === message.id) {
+                    index = i;
+                    break;
+                }
+            }
+        }
+        if (index === -1) {
+            merged.push(message);
+        } else {
+            merged[index] = message;
+        }
+    });
+    return merged;
+};
+
+/**
+ * Apply a stream delta to the in-progress message it belongs to. The delta text
+ * replaces everything from `offset` onwards, so cumulative updates (offset 0)
+ * and append-only updates (offset at the current length) are both supported.
+ */
+const applyStreamDelta = (prevMessages, delta) => {
+    const { id: messageId, text = "", offset, done } = delta;
+    let index = -1;
+    for (let i = prevMessages.length - 1; i >= 0; i--) {
+        if (prevMessages[i]?.id === messageId) {
+            index = i;
+            break;
+        }
+    }
+    const current = index === -1 ? { role: "assistant", content: "", id: messageId } : prevMessages[index];
+    const currentText = typeof current.content === "string" ? current.content : "";
+    const start = typeof offset === "number" ? offset : currentText.length;
+    if (start > currentText.length) {
+        // a chunk went missing, wait for the final message instead
+        return prevMessages;
+    }
+    const updated = { ...current, content: currentText.slice(0, start) + text };
+    if (done) {
+        delete updated.streaming;
+    } else {
+        updated.streaming = true;
+    }
+    if (index === -1) {
+        return [...prevMessages, updated];
+    }
+    const updatedMessages = [...prevMessages];
+    updatedMessages[index] = updated;
+    return updatedMessages;
+};
+
+const isRenderableMessage = (message) => (
+    Boolean(message) && typeof message === "object" && Boolean(message.role) && Boolean(message.content)
+);
+
+// the order a job goes through its statuses, finished ones last
+const JOB_PROGRESS = { queued: 0, running: 1, done: 2, failed: 2, cancelled: 2 };
+
+const isActiveJob = (status) => (
+    Boolean(status) && (status.status === "queued" || status.status === "running")
+);
+
+/**
+ * Statuses of a job arrive both from callbacks and from push events, possibly out of
+ * order, so a status never replaces a later one of the same job.
+ */
+const mergeJobStatus = (current, next) => {
+    if (current && next && current.id === next.id && JOB_PROGRESS[next.status] < JOB_PROGRESS[current.status]) {
+        return current;
+    }
+    return next;
+};
+
+const MS_PER_SECOND = 1000;
+
+// wait for a pause in typing before searching, and how long a found message stays highlighted
+const SEARCH_DEBOUNCE_MS = 250;
+const HIGHLIGHT_MS = 2000;
+
+// why the input is disabled by an admission decision
+const admissionNotice = (admission) => {
+    if (!admission) {
+        return null;
+    }
+    if (admission.status === "queued") {
+        return admission.position ? `Waiting for your turn, ${admission.position} ahead` : "Waiting for your turn";
+    }
+    if (admission.status !== "rejected") {
+        return null;
+    }
+    const reason = admission.reason === "overloaded"
+        ? "The assistant is busy."
+        : "You are sending messages too quickly.";
+    const seconds = Math.ceil(admission.retry_after || 0);
+    return seconds ? `${reason} Try again in ${seconds} s.` : `${reason} Try again shortly.`;
+};
+
+const getMessageKey = (message, index) => (
+    typeof message.id === "undefined" || message.id === null ? `index-${index}` : message.id
+);
+
 const defaultUserBubbleStyle = {
     backgroundColor: "#007bff",
     color: "white",
@@ -65,34 +190,171 @@ const ChatComponent = ({
     setProps = () => {},
     fill_height: fillHeight = true,
     fill_width: fillWidth = true,
-    user_bubble_style: userBubbleStyleProp = {},
-    assistant_bubble_style: assistantBubbleStyleProp = {},
+    user_bubble_style: userBubbleStyleProp = null,
+    assistant_bubble_style: assistantBubbleStyleProp = null,
     input_placeholder: inputPlaceholder = "",
     class_name: className = "",
     persistence = false,
     persistence_type: persistenceType = "local",
     supported_input_file_types : accept = "*/*",
+    history_mode: historyMode = "client",
+    session_id: sessionIdProp = null,
+    stream_delta: streamDelta = null,
+    upload_url: uploadUrl = null,
+    virtualize = false,
+    overscan = 5,
+    page_size: pageSize = null,
+    history_page: historyPage = null,
+    collect_metrics: collectMetrics = false,
+    metrics_url: metricsUrl = null,
+    metrics_batch_size: metricsBatchSize = 10,
+    max_image_dimension: maxImageDimension = null,
+    image_format: imageFormat = null,
+    image_quality: imageQuality = 0.85,
+    upload_chunk_size: uploadChunkSize = 2097152,
+    push_url: pushUrl = null,
+    job_status: jobStatusProp = null,
+    admission: admissionProp = null,
+    searchable = false,
+    search_results: searchResults = null,
 }) => {
-    const userBubbleStyle = { ...defaultUserBubbleStyle, ...userBubbleStyleProp };
-    const assistantBubbleStyle = { ...defaultAssistantBubbleStyle, ...assistantBubbleStyleProp };
+    // stable style objects let unchanged bubbles skip re-rendering
+    const userBubbleStyle = useMemo(
+        () => ({ ...defaultUserBubbleStyle, ...userBubbleStyleProp }),
+        [userBubbleStyleProp]
+    );
+    const assistantBubbleStyle = useMemo(
+        () => ({ ...defaultAssistantBubbleStyle, ...assistantBubbleStyleProp }),
+        [assistantBubbleStyleProp]
+    );
     const [currentMessage, setCurrentMessage] = useState("");
     const [attachment, setAttachment] = useState("");
+    // the selected file and its downscaled version, prepared while the message is typed
+    const preparedAttachmentRef = useRef(null);
+    // fraction of the attachment uploaded, null when no chunked upload is running
+    const [uploadProgress, setUploadProgress] = useState(null);
     const [localMessages, setLocalMessages] = useState([]);
     const [showTyping, setShowTyping] = useState(false);
+    const [jobStatus, setJobStatus] = useState(jobStatusProp);
+    const [admission, setAdmission] = useState(admissionProp);
     const [dropdownOpen, setDropdownOpen] = useState(false);
     const messageEndRef = useRef(null);
+    const chatMessagesRef = useRef(null);
     const dropdownRef = useRef(null);
+    const initialMessagesRef = useRef(messages);
+    const streamSeqRef = useRef({});
+    // `messages` with the messages pushed since the prop last changed
+    const pushedMessagesRef = useRef(null);
+    const serverHistory = historyMode === "server";
+    const indexedDb = persistence && persistenceType === "indexeddb";
+    const messageStoreRef = useRef(null);
+    const [messageStoreReady, setMessageStoreReady] = useState(false);
+    // position of each message written to IndexedDB, by message and by id
+    const persistedSeqsRef = useRef(new WeakMap());
+    const seqByIdRef = useRef(new Map());
+    const nextSeqRef = useRef(0);
+    const olderSeqRef = useRef(null);
+    const loadingOlderRef = useRef(false);
+    const scrollAnchorRef = useRef(null);
+    const lastMessageRef = useRef(null);
+    const serverPaging = serverHistory && Boolean(pageSize);
+    // cursor of the next older server-side page, null once the history is complete
+    const historyCursorRef = useRef(null);
+    const historyPendingRef = useRef(false);
+    // position of the oldest loaded message in the server-side history, see `search_results`
+    const oldestSeqRef = useRef(0);
+    const [searchText, setSearchText] = useState("");
+    const sentQueryRef = useRef("");
+    const [jumpTarget, setJumpTarget] = useState(null);
+    const [highlight, setHighlight] = useState(null);
+    // finished turns waiting to be published, see `collect_metrics`
+    const metricsBatchRef = useRef([]);
+    const turnTrackerRef = useRef(null);
+
+    const flushMetrics = (force) => {
+        const turns = metricsBatchRef.current;
+        if (turns.length === 0 || (!force && turns.length < metricsBatchSize)) {
+            return;
+        }
+        metricsBatchRef.current = [];
+        if (metricsUrl) {
+            sendMetrics(metricsUrl, id, turns);
+        } else {
+            setProps({ metrics: { turns } });
+        }
+    };
+    const flushMetricsRef = useRef(flushMetrics);
+    flushMetricsRef.current = flushMetrics;
+    if (collectMetrics && !turnTrackerRef.current) {
+        turnTrackerRef.current = createTurnTracker((turn) => {
+            metricsBatchRef.current.push(turn);
+            flushMetricsRef.current(false);
+        });
+    }
+    const turnTracker = collectMetrics ? turnTrackerRef.current : null;
 
     let storeType;
-    if (persistenceType === "local") {
-        storeType = "localStorage";
-    } else if (persistenceType === "local") {
+    if (persistenceType === "session") {
         storeType = "sessionStorage";
+    } else {
+        // IndexedDB keeps messages only, small keys stay in localStorage
+        storeType = "localStorage";
     }
 
+    const rememberPersisted = (entries) => {
+        entries.forEach(({ seq, message }) => {
+            persistedSeqsRef.current.set(message, seq);
+            if (typeof message.id !== "undefined" && message.id !== null) {
+                seqByIdRef.current.set(message.id, seq);
+            }
+        });
+    };
+
+    // pushed messages are addressed to the session too, and uploads are counted against its quota
+    const needsSession = serverHistory || Boolean(pushUrl) || Boolean(uploadUrl);
+    const [sessionId, setSessionId] = useState(() => {
+        if (sessionIdProp || !needsSession) {
+            return sessionIdProp;
+        }
+        const savedSessionId = persistence ? window[storeType].getItem(`${id}-session`) : null;
+        return savedSessionId || createSessionId();
+    });
+
+    // report the session key so callbacks can look up the server-side history
+    useEffect(() => {
+        if (needsSession && sessionId && sessionId !== sessionIdProp) {
+            if (persistence) {
+                window[storeType].setItem(`${id}-session`, sessionId);
+            }
+            setProps({ session_id: sessionId });
+        }
+    }, [sessionId, needsSession]);
+
     // load messages from storage or initialize from messages
     useEffect(() => {
-        if (persistence) {
+        let cancelled = false;
+        if (indexedDb) {
+            const store = openMessageStore(id);
+            messageStoreRef.current = null;
+            setMessageStoreReady(false);
+            store.loadPage(null, PERSISTENCE_PAGE_SIZE).then(({ entries, hasMore }) => {
+                if (cancelled) {
+                    return;
+                }
+                messageStoreRef.current = store;
+                const initialized = JSON.parse(window[storeType].getItem(`${id}-initialized`));
+                if (entries.length > 0) {
+                    rememberPersisted(entries);
+                    nextSeqRef.current = entries[entries.length - 1].seq + 1;
+                    olderSeqRef.current = hasMore ? entries[0].seq : null;
+                    setLocalMessages(entries.map((entry) => entry.message));
+                } else if (!initialized && messages.length > 0) {
+                    setLocalMessages(messages);
+                    window[storeType].setItem(`${id}-initialized`, "true");
+                }
+                setMessageStoreReady(true);
+            });
+        } else if (persistence) {
             const savedMessages = JSON.parse(window[storeType].getItem(id)) || [];
             const initialized = JSON.parse(window[storeType].getItem(`${id}-initialized`));
             if (savedMessages.length > 0) {
@@ -105,32 +367,289 @@ const ChatComponent = ({
         } else {
             setLocalMessages(messages);
         }
-    }, [id, persistence, storeType]);
+        return () => {
+            cancelled = true;
+        };
+    }, [id, persistence, storeType, indexedDb]);
 
-    // persist messages whenever localMessages updates
+    // persist messages whenever localMessages updates, skipping partial streamed replies
     useEffect(() => {
-        if (persistence && localMessages.length > 0) {
+        if (indexedDb) {
+            if (!messageStoreRef.current) {
+                return;
+            }
+            // only messages added or replaced since the last write are stored
+            const entries = [];
+            for (let i = localMessages.length - 1; i >= 0 && !persistedSeqsRef.current.has(localMessages[i]); i--) {
+                const message = localMessages[i];
+                if (isRenderableMessage(message) && !message.streaming) {
+                    const hasId = typeof message.id !== "undefined" && message.id !== null;
+                    const seq = hasId && seqByIdRef.current.has(message.id)
+                        ? seqByIdRef.current.get(message.id)
+                        : nextSeqRef.current++;
+                    entries.unshift({ seq, message });
+                }
+            }
+            if (entries.length > 0) {
+                rememberPersisted(entries);
+                const written = turnTracker ? turnTracker.write() : () => {};
+                messageStoreRef.current.put(entries).finally(written);
+            }
+        } else if (persistence && localMessages.length > 0 && !localMessages[localMessages.length - 1]?.streaming) {
+            const written = turnTracker ? turnTracker.write() : () => {};
             window[storeType].setItem(id, JSON.stringify(localMessages));
+            written();
         }
-    }, [localMessages, id, persistence, storeType]);
+        if (turnTracker) {
+            turnTracker.settle();
+        }
+    }, [localMessages, id, persistence, storeType, indexedDb, messageStoreReady]);
 
     // hide typing indicator & update local messages with new ones
     useEffect(() => {
-        if (messages.length > 0) {
+        pushedMessagesRef.current = null;
+        if (serverHistory) {
+            // in server mode `messages` only carries the messages to append
+            if (messages === initialMessagesRef.current || messages.length === 0) {
+                return;
+            }
+            if (messages.some((message) => message?.role === "assistant")) {
+                setShowTyping(false);
+                if (turnTracker) {
+                    turnTracker.response(jsonBytes(messages), true);
+                }
+            }
+            setLocalMessages((prevMessages) => mergeMessages(prevMessages, messages));
+        } else if (messages.length > 0) {
             const lastMsg = messages.slice(-1).pop();
             if (lastMsg?.role === "assistant") {
                 setShowTyping(false);
-                setLocalMessages((prevMessages) => [...prevMessages, lastMsg]);
+                if (turnTracker) {
+                    // client mode sends the whole history back with every reply
+                    turnTracker.response(jsonBytes(messages), true);
+                }
+                setLocalMessages((prevMessages) => mergeMessages(prevMessages, [lastMsg]));
             } else {
                 setLocalMessages(messages || []);
             }
         }
     }, [messages]);
 
+    // append streamed chunks to the in-progress assistant bubble
+    const handleStreamDelta = (delta) => {
+        if (!delta || typeof delta.id === "undefined" || delta.id === null) {
+            return;
+        }
+        const seq = delta.seq || 0;
+        const lastSeq = streamSeqRef.current[delta.id];
+        if (typeof lastSeq !== "undefined" && seq <= lastSeq) {
+            return;
+        }
+        streamSeqRef.current[delta.id] = seq;
+        if (turnTracker) {
+            turnTracker.response(jsonBytes(delta), false);
+        }
+        setShowTyping(false);
+        setLocalMessages((prevMessages) => applyStreamDelta(prevMessages, delta));
+    };
+
     useEffect(() => {
-        if (messageEndRef.current) {
+        handleStreamDelta(streamDelta);
+    }, [streamDelta]);
+
+    const handlePushedMessage = (message) => {
+        if (!isRenderableMessage(message)) {
+            return;
+        }
+        if (message.role === "assistant") {
+            setShowTyping(false);
+            if (turnTracker) {
+                turnTracker.response(jsonBytes(message), true);
+            }
+        }
+        setLocalMessages((prevMessages) => mergeMessages(prevMessages, [message]));
+        if (!serverHistory) {
+            // in client mode callbacks read the history from `messages`
+            const updated = mergeMessages(pushedMessagesRef.current || messages, [message]);
+            pushedMessagesRef.current = updated;
+            setProps({ messages: updated });
+        }
+    };
+
+    const handleJobStatus = (status) => {
+        setJobStatus((current) => mergeJobStatus(current, status));
+    };
+
+    useEffect(() => {
+        handleJobStatus(jobStatusProp);
+    }, [jobStatusProp]);
+
+    // the typing indicator follows the job generating the reply
+    useEffect(() => {
+        if (jobStatus) {
+            setShowTyping(isActiveJob(jobStatus));
+        }
+        if (jobStatus !== jobStatusProp) {
+            // a pushed status, shared with callbacks
+            setProps({ job_status: jobStatus });
+        }
+    }, [jobStatus]);
+
+    useEffect(() => {
+        setAdmission(admissionProp);
+    }, [admissionProp]);
+
+    // a rejected message disables sending until it may be retried
+    useEffect(() => {
+        if (!admission || admission.status !== "rejected") {
+            return () => {};
+        }
+        setShowTyping(false);
+        const timer = setTimeout(() => setAdmission(null), (admission.retry_after || 0) * MS_PER_SECOND);
+        return () => clearTimeout(timer);
+    }, [admission]);
+
+    const handleStopJob = () => {
+        if (isActiveJob(jobStatus)) {
+            setProps({ cancel_job: jobStatus.id });
+        }
+    };
+
+    // the subscription outlives renders, it calls the latest handlers
+    const pushHandlersRef = useRef(null);
+    pushHandlersRef.current = {
+        onMessage: handlePushedMessage,
+        onDelta: handleStreamDelta,
+        onJob: handleJobStatus,
+        onAdmission: setAdmission,
+    };
+
+    useEffect(() => {
+        if (!pushUrl || !sessionId || typeof EventSource === "undefined") {
+            return () => {};
+        }
+        const subscription = subscribeToPush(pushUrl, sessionId, {
+            onMessage: (message) => pushHandlersRef.current.onMessage(message),
+            onDelta: (delta) => pushHandlersRef.current.onDelta(delta),
+            onJob: (status) => pushHandlersRef.current.onJob(status),
+            onAdmission: (decision) => pushHandlersRef.current.onAdmission(decision),
+        });
+        return () => subscription.close();
+    }, [pushUrl, sessionId]);
+
+    // keep the view in place when older messages are added above it
+    useLayoutEffect(() => {
+        const container = chatMessagesRef.current;
+        if (scrollAnchorRef.current !== null && container) {
+            container.scrollTop += container.scrollHeight - scrollAnchorRef.current;
+        }
+        scrollAnchorRef.current = null;
+        if (turnTracker) {
+            turnTracker.committed(localMessages[localMessages.length - 1], localMessages.length);
+        }
+    }, [localMessages]);
+
+    // a beacon still gets through while the page is closed, publish what is left then
+    useEffect(() => {
+        if (!collectMetrics || !metricsUrl) {
+            return () => {};
+        }
+        const flush = () => flushMetricsRef.current(true);
+        const handleVisibilityChange = () => {
+            if (document.visibilityState === "hidden") {
+                flush();
+            }
+        };
+        window.addEventListener("pagehide", flush);
+        document.addEventListener("visibilitychange", handleVisibilityChange);
+        return () => {
+            window.removeEventListener("pagehide", flush);
+            document.removeEventListener("visibilitychange", handleVisibilityChange);
+            flush();
+        };
+    }, [collectMetrics, metricsUrl]);
+
+    useEffect(() => {
+        const lastMessage = localMessages[localMessages.length - 1];
+        if (messageEndRef.current && lastMessage !== lastMessageRef.current) {
             messageEndRef.current.scrollIntoView({ behavior: "smooth" });
         }
+        lastMessageRef.current = lastMessage;
+    }, [localMessages]);
+
+    const requestHistoryPage = (cursor) => {
+        historyPendingRef.current = true;
+        setProps({ request_history: { cursor, limit: pageSize } });
+    };
+
+    // ask for the newest page of a server-side history, older ones follow on scroll
+    useEffect(() => {
+        if (serverPaging) {
+            requestHistoryPage(null);
+        }
+    }, [serverPaging]);
+
+    // prepend a page of server-side history returned for `request_history`
+    useEffect(() => {
+        if (!serverPaging || !historyPage || !historyPendingRef.current) {
+            return;
+        }
+        historyPendingRef.current = false;
+        historyCursorRef.current = historyPage.has_more ? historyPage.cursor : null;
+        const pageMessages = historyPage.messages || [];
+        if (pageMessages.length === 0) {
+            return;
+        }
+        oldestSeqRef.current = historyPage.cursor;
+        if (localMessages.length > 0 && chatMessagesRef.current) {
+            scrollAnchorRef.current = chatMessagesRef.current.scrollHeight;
+        }
+        setLocalMessages((prevMessages) => {
+            // messages sent while the page was loading may already be shown
+            const shownIds = new Set(prevMessages.map((message) => message?.id).filter((messageId) => (
+                typeof messageId !== "undefined" && messageId !== null
+            )));
+            return [...pageMessages.filter((message) => !shownIds.has(message?.id)), ...prevMessages];
+        });
+    }, [historyPage]);
+
+    const loadOlderMessages = () => {
+        if (serverPaging) {
+            if (historyCursorRef.current !== null && !historyPendingRef.current) {
+                requestHistoryPage(historyCursorRef.current);
+            }
+            return;
+        }
+        const store = messageStoreRef.current;
+        if (!store || olderSeqRef.current === null || loadingOlderRef.current) {
+            return;
+        }
+        loadingOlderRef.current = true;
+        store.loadPage(olderSeqRef.current, PERSISTENCE_PAGE_SIZE).then(({ entries, hasMore }) => {
+            loadingOlderRef.current = false;
+            if (store !== messageStoreRef.current || entries.length === 0) {
+                return;
+            }
+            rememberPersisted(entries);
+            olderSeqRef.current = hasMore ? entries[0].seq : null;
+            scrollAnchorRef.current = chatMessagesRef.current ? chatMessagesRef.current.scrollHeight : null;
+            setLocalMessages((prevMessages) => [...entries.map((entry) => entry.message), ...prevMessages]);
+        });
+    };
+
+    // load the previous page of history when scrolled to the top
+    const handleMessagesScroll = (e) => {
+        if (e.currentTarget.scrollTop === 0) {
+            loadOlderMessages();
+        }
+    };
+
+    // keep loading while the messages do not fill the chat, as it cannot be scrolled yet
+    useEffect(() => {
+        const container = chatMessagesRef.current;
+        if (container && container.clientHeight > 0 && container.scrollHeight <= container.clientHeight) {
+            loadOlderMessages();
+        }
     }, [localMessages]);
 
     useEffect(() => {
@@ -147,6 +666,76 @@ const ChatComponent = ({
     }, []);
 
 
+    const renderableMessages = useMemo(
+        () => (virtualize ? localMessages.filter(isRenderableMessage) : localMessages),
+        [localMessages, virtualize]
+    );
+
+    // publish the query once typing pauses
+    useEffect(() => {
+        const query = searchText.trim();
+        if (!searchable || query === sentQueryRef.current) {
+            return () => {};
+        }
+        const timer = setTimeout(() => {
+            sentQueryRef.current = query;
+            setProps({ search_query: query });
+        }, SEARCH_DEBOUNCE_MS);
+        return () => clearTimeout(timer);
+    }, [searchText, searchable]);
+
+    // find the message of a search result, loading older history until it is shown
+    useEffect(() => {
+        if (!jumpTarget) {
+            return;
+        }
+        const hasId = typeof jumpTarget.id !== "undefined" && jumpTarget.id !== null;
+        let index = hasId ? localMessages.findIndex((message) => message?.id === jumpTarget.id) : -1;
+        if (index === -1) {
+            index = jumpTarget.seq - oldestSeqRef.current;
+            index = index < localMessages.length ? index : -1;
+        }
+        if (index < 0) {
+            if (historyPendingRef.current) {
+                return;
+            }
+            if (serverPaging && historyCursorRef.current !== null && jumpTarget.seq < oldestSeqRef.current) {
+                // one request for every page up to the message
+                historyPendingRef.current = true;
+                setProps({
+                    request_history: {
+                        cursor: historyCursorRef.current,
+                        limit: Math.max(pageSize, oldestSeqRef.current - jumpTarget.seq),
+                    },
+                });
+                return;
+            }
+            setJumpTarget(null);
+            return;
+        }
+        setJumpTarget(null);
+        const message = localMessages[index];
+        setHighlight({ key: getMessageKey(message, virtualize ? renderableMessages.indexOf(message) : index) });
+    }, [jumpTarget, localMessages]);
+
+    useEffect(() => {
+        if (!highlight) {
+            return () => {};
+        }
+        const container = chatMessagesRef.current;
+        const bubble = container && !virtualize ? container.querySelector(".chat-bubble.highlighted") : null;
+        if (bubble) {
+            bubble.scrollIntoView({ block: "center", behavior: "smooth" });
+        }
+        const timer = setTimeout(() => setHighlight(null), HIGHLIGHT_MS);
+        return () => clearTimeout(timer);
+    }, [highlight]);
+
+    const handleSearchResult = (result) => {
+        setSearchText("");
+        setJumpTarget({ seq: result.seq, id: result.id });
+    };
+
     const handleInputChange = (e) => {
         setCurrentMessage(e.target.value);
     };
@@ -160,19 +749,87 @@ const ChatComponent = ({
         });
     };
 
+    const uploadFile = async (file) => {
+        const sessionHeaders = {};
+        if (sessionId) {
+            // lets the server apply per-session attachment quotas
+            sessionHeaders["X-Chat-Session"] = sessionId;
+        }
+        if (uploadChunkSize && file.size > uploadChunkSize) {
+            setUploadProgress(0);
+            try {
+                return await uploadInChunks(file, {
+                    url: `${uploadUrl}/chunked`,
+                    chunkSize: uploadChunkSize,
+                    headers: sessionHeaders,
+                    onProgress: setUploadProgress,
+                });
+            } finally {
+                setUploadProgress(null);
+            }
+        }
+        const headers = {
+            ...sessionHeaders,
+            "Content-Type": file.type || "application/octet-stream",
+            "X-File-Name": encodeURIComponent(file.name),
+        };
+        const response = await fetch(uploadUrl, { method: "POST", body: file, headers });
+        if (!response.ok) {
+            throw new Error(`Upload of ${file.name} failed with status ${response.status}`);
+        }
+        return response.json();
+    };
+
+    const handleAttachment = (file) => {
+        setAttachment(file);
+        preparedAttachmentRef.current = file
+            ? {
+                file,
+                prepared: resizeImage(file, {
+                    maxDimension: maxImageDimension,
+                    format: imageFormat,
+                    quality: imageQuality,
+                }),
+            }
+            : null;
+    };
+
     const handleSendMessage = async () => {
         if (currentMessage.trim() || attachment) {
             let content;
+            const attachedAt = performance.now();
+            const prepared = preparedAttachmentRef.current;
+            const file = prepared && prepared.file === attachment ? await prepared.prepared : attachment;
 
-            if (attachment) {
-                const base64File = await convertFileToBase64(attachment);
+            if (file && uploadUrl) {
+                let handle;
+                try {
+                    handle = await uploadFile(file);
+                } catch (error) {
+                    console.error(error);
+                    // keeps the attachment so it can be sent again
+                    return false;
+                }
+                content = [
+                    { type: "text", text: currentMessage.trim() },
+                    {
+                        type: "attachment",
+                        fileId: handle.fileId,
+                        fileName: handle.fileName,
+                        fileType: handle.fileType,
+                        fileSize: handle.fileSize,
+                        url: handle.url,
+                    },
+                ];
+            } else if (file) {
+                const base64File = await convertFileToBase64(file);
                 content = [
                     { type: "text", text: currentMessage.trim() },
                     {
                         type: "attachment",
                         file: base64File,
-                        fileName: attachment.name,
-                        fileType: attachment.type
+                        fileName: file.name,
+                        fileType: file.type
                     },
                 ];
             } else {
@@ -180,13 +837,15 @@ const ChatComponent = ({
             }
 
             const newMessage = { role: "user", content, id: Date.now() };
-            setLocalMessages((prevMessages) => {
-                const updatedMessages = [...prevMessages, newMessage];
-                if (persistence) {
-                    window[storeType].setItem(id, JSON.stringify(updatedMessages));
-                }
-                return updatedMessages;
-            });
+            if (turnTracker) {
+                turnTracker.start({
+                    messageId: newMessage.id,
+                    requestBytes: jsonBytes(newMessage),
+                    uploadMs: attachment ? performance.now() - attachedAt : null,
+                });
+            }
+            // persisted by the localMessages effect
+            setLocalMessages((prevMessages) => [...prevMessages, newMessage]);
 
             if (setProps) {
                 setProps({ new_message: newMessage });
@@ -194,18 +853,65 @@ const ChatComponent = ({
 
             setShowTyping(true);
             setCurrentMessage("");
-            setAttachment("");
+            handleAttachment("");
+            return true;
         }
+        return false;
     };
 
     const handleClearChat = () => {
         setLocalMessages([]);
-        if (persistence) {
+        if (indexedDb) {
+            if (messageStoreRef.current) {
+                messageStoreRef.current.clear();
+            }
+            seqByIdRef.current.clear();
+            olderSeqRef.current = null;
+        } else if (persistence) {
             window[storeType].removeItem(id);
         }
+        if (serverHistory) {
+            // start a fresh server-side conversation
+            setSessionId(createSessionId());
+            historyCursorRef.current = null;
+            historyPendingRef.current = false;
+            oldestSeqRef.current = 0;
+        }
         setDropdownOpen(false);
     };
 
+    const highlightKey = highlight ? highlight.key : null;
+    const renderBubble = useCallback((message, key) => (
+        <MessageBubble
+            key={key}
+            message={message}
+            style={message.role === "user" ? userBubbleStyle : assistantBubbleStyle}
+            highlighted={key === highlightKey}
+        />
+    ), [userBubbleStyle, assistantBubbleStyle, highlightKey]);
+
+    // typing only changes `currentMessage`, so the history is left untouched
+    const messageList = useMemo(() => {
+        if (localMessages.length === 0) {
+            return <div className="empty-chat">No conversation yet.</div>;
+        }
+        if (virtualize) {
+            return (
+                <VirtualMessageList
+                    messages={renderableMessages}
+                    renderMessage={renderBubble}
+                    getKey={getMessageKey}
+                    containerRef={chatMessagesRef}
+                    overscan={overscan}
+                    scrollToKey={highlightKey}
+                />
+            );
+        }
+        return localMessages.map((message, index) => (
+            isRenderableMessage(message) ? renderBubble(message, getMessageKey(message, index)) : null
+        ));
+    }, [localMessages, renderableMessages, virtualize, overscan, renderBubble, highlightKey]);
+
     const styleChatContainer = {};
     const inputFieldStyle = {};
     if (fillHeight) {
@@ -249,28 +955,49 @@ const ChatComponent = ({
                     </div>
                 </div>
             )}
-            <div className="chat-messages">
-                {localMessages.length === 0 ? (
-                    <div className="empty-chat">No conversation yet.</div>
-                ) : (
-                    localMessages.map((message, index) => {
-                        if (!message || typeof message !== "object" || !message.role || !message.content) {
-                            return null;
-                        }
-                        const bubbleStyle = message.role === "user" ? userBubbleStyle : assistantBubbleStyle;
-                        return (
-                            <div key={index} className={`chat-bubble ${message.role}`} style={bubbleStyle}>
-                                <div className="markdown-content">
-                                    {renderMessageContent(message.content)}
-                                </div>
-                            </div>
-                        );
-                    })
-                )}
+            {searchable && (
+                <div className="chat-search">
+                    <input
+                        type="search"
+                        className="chat-search-input"
+                        placeholder="Search messages"
+                        aria-label="Search messages"
+                        value={searchText}
+                        onChange={(e) => setSearchText(e.target.value)}
+                        onKeyDown={(e) => (e.key === "Escape" ? setSearchText("") : null)}
+                        data-testid="search-input"
+                    />
+                    {searchText.trim() && searchResults && (
+                        <ul className="chat-search-results" data-testid="search-results">
+                            {searchResults.length === 0 && <li className="chat-search-empty">No matches</li>}
+                            {searchResults.map((result) => (
+                                <li key={result.seq}>
+                                    <button
+                                        type="button"
+                                        className={`chat-search-result ${result.role || ""}`}
+                                        onClick={() => handleSearchResult(result)}
+                                    >
+                                        {(result.snippet || []).map((segment, index) => (
+                                            index % 2 === 1 ? <mark key={index}>{segment}</mark> : <span key={index}>{segment}</span>
+                                        ))}
+                                    </button>
+                                </li>
+                            ))}
+                        </ul>
+                    )}
+                </div>
+            )}
+            <div className="chat-messages" ref={chatMessagesRef} onScroll={indexedDb || serverPaging ? handleMessagesScroll : null}>
+                {messageList}
                 {showTyping && (
                     <div className="typing-indicator user-typing" data-testid="typing-indicator">
                         {typingIndicator === "dots" && <TypingIndicatorDots />}
                         {typingIndicator === "spinner" && <TypingIndicatorSpinner />}
+                        {jobStatus?.status === "queued" && (
+                            <span className="job-queue-status" data-testid="job-queue-status">
+                                {jobStatus.position ? `Queued, ${jobStatus.position} ahead` : "Queued"}
+                            </span>
+                        )}
                     </div>
                 )}
                 <div ref={messageEndRef} />
@@ -284,7 +1011,11 @@ const ChatComponent = ({
                     inputComponentStyles={{ ...inputFieldStyle, ...inputTextStyle }}
                     placeholder={inputPlaceholder}
                     showTyping={showTyping}
-                    setAttachment={setAttachment}
+                    setAttachment={handleAttachment}
+                    uploadProgress={uploadProgress}
+                    onStop={isActiveJob(jobStatus) ? handleStopJob : null}
+                    notice={admissionNotice(admission)}
+                    disabled={Boolean(admission) && (admission.status === "queued" || admission.status === "rejected")}
                     accept={accept}
                 />
             </div>
@@ -381,9 +1112,12 @@ ChatComponent.propTypes = {
     */
     persistence: PropTypes.bool,
     /**
-     * Where persisted messages will be stored
+     * Where persisted messages will be stored. Options are:
+     *    - `"local"`: localStorage, kept across browser sessions.
+     *    - `"session"`: sessionStorage, cleared when the tab is closed.
+     *    - `"indexeddb"`: IndexedDB, kept across browser sessions. Each message is written as its own record when it is added, attachments are stored as binary Blobs, and history is loaded a page at a time (newest first) as the chat is scrolled up. Suited to long conversations and attachments that would not fit in localStorage.
     */
-    persistence_type: PropTypes.oneOf(["local", "session"]),
+    persistence_type: PropTypes.oneOf(["local", "session", "indexeddb"]),
     /**
      * String or array of file types to accept in the attachment file input
     */
@@ -391,6 +1125,191 @@ ChatComponent.propTypes = {
         PropTypes.string,
         PropTypes.arrayOf(PropTypes.string),
     ]),
+    /**
+     * Where the authoritative conversation history lives. Options are:
+     *    - `"client"`: `messages` holds the full history and callbacks return the whole updated list.
+     *    - `"server"`: the history is kept in a `dash_chat.store` conversation store. Callbacks only receive `new_message` and return the new assistant message(s) in `messages`, which are appended to the chat.
+    */
+    history_mode: PropTypes.oneOf(["client", "server"]),
+    /**
+     * Key identifying this browser session's conversation in a server-side store.
+     * Generated by the component when no value is given and `history_mode` is `"server"` or
+     * `push_url` or `upload_url` is set.
+    */
+    session_id: PropTypes.string,
+    /**
+     * Incremental update to an assistant reply that is still being generated, usually set through
+     * the `progress` output of a background callback with the helpers in `dash_chat.streaming`.
+     * The text is written into the message with the same `id` starting at `offset` (the end of the
+     * current text when omitted). Updates with a `seq` lower than or equal to the last one seen are ignored.
+     * The final reply returned in `messages` with the same `id` replaces the streamed bubble.
+    */
+    stream_delta: PropTypes.shape({
+        id: PropTypes.oneOfType([PropTypes.string, PropTypes.number]).isRequired,
+        seq: PropTypes.number,
+        text: PropTypes.string,
+        offset: PropTypes.number,
+        done: PropTypes.bool,
+    }),
+    /**
+     * URL of the attachment upload endpoint registered with `dash_chat.uploads.register(app)`.
+     * When set, attachments are uploaded to the server as they are sent and `new_message` only
+     * carries a handle (`fileId`, `fileName`, `fileType`, `fileSize` and `url`) instead of a base64 data URL.
+    */
+    upload_url: PropTypes.string,
+    /**
+     * Whether to only render the messages in view (plus `overscan` messages above and below).
+     * Keeps scrolling and typing responsive in conversations with thousands of messages.
+    */
+    virtualize: PropTypes.bool,
+    /**
+     * Number of messages rendered above and below the visible ones when `virtualize` is True.
+    */
+    overscan: PropTypes.number,
+    /**
+     * Number of messages per page when loading a server-side history (`history_mode="server"`) a page
+     * at a time. When set, the component asks for the newest page on load and for the page before it
+     * whenever the chat is scrolled to the top, through `request_history`.
+    */
+    page_size: PropTypes.number,
+    /**
+     * Set by the component to ask for a page of server-side history. `cursor` is null for the newest
+     * page, otherwise the `cursor` of the last page received; `limit` is the `page_size`. Answer it
+     * with `dash_chat.store.history_page`.
+    */
+    request_history: PropTypes.shape({
+        cursor: PropTypes.oneOfType([PropTypes.string, PropTypes.number]),
+        limit: PropTypes.number,
+    }),
+    /**
+     * Page of server-side history returned for `request_history`: its `messages` in chronological
+     * order, the `cursor` to ask for the page before it and whether older messages exist (`has_more`).
+     * The messages are added above the ones shown, keeping the scroll position.
+    */
+    history_page: PropTypes.shape({
+        messages: PropTypes.array,
+        cursor: PropTypes.oneOfType([PropTypes.string, PropTypes.number]),
+        has_more: PropTypes.bool,
+    }),
+    /**
+     * Whether to measure the timings of every turn: until the server answers (`ack_ms`), until the
+     * first reply text is shown (`first_token_ms`), rendering the reply (`render_ms`), the whole turn
+     * (`turn_ms`), persisting it (`persistence_ms`), uploading attachments (`upload_ms`) and the
+     * bytes sent and received. Turns are published in batches of `metrics_batch_size`, to
+     * `metrics_url` when it is set and through the `metrics` prop otherwise.
+    */
+    collect_metrics: PropTypes.bool,
+    /**
+     * URL the turn metrics are posted to, usually the one returned by `dash_chat.metrics.register`.
+     * Batches are sent with `navigator.sendBeacon`, and the last one when the page is closed.
+    */
+    metrics_url: PropTypes.string,
+    /**
+     * Number of finished turns published at once.
+    */
+    metrics_batch_size: PropTypes.number,
+    /**
+     * Set by the component with a batch of turn metrics when `collect_metrics` is on and no
+     * `metrics_url` is set: `{"turns": [...]}`. Pass it to `MetricsCollector.observe_batch`.
+    */
+    metrics: PropTypes.shape({
+        turns: PropTypes.arrayOf(PropTypes.object),
+    }),
+    /**
+     * Longest side in pixels attached images are downscaled to before they are sent, keeping their
+     * aspect ratio. Vision models downsample larger images anyway, so 1024 to 2048 loses nothing
+     * while cutting phone photos to a fraction of their size. Images are resized in a Web Worker
+     * with `OffscreenCanvas` where available, as soon as they are attached. GIFs and SVGs are sent
+     * unchanged.
+    */
+    max_image_dimension: PropTypes.number,
+    /**
+     * Format attached images are re-encoded to. By default they keep their own format. Browsers
+     * that cannot encode WebP send PNG instead.
+    */
+    image_format: PropTypes.oneOf(["webp", "jpeg", "png"]),
+    /**
+     * Quality, from 0 to 1, of images re-encoded as `"webp"` or `"jpeg"`.
+    */
+    image_quality: PropTypes.number,
+    /**
+     * Size in bytes of the chunks attachments larger than it are uploaded in, when `upload_url` is
+     * set. Chunks are hashed in a Web Worker and checked by the server, dropped connections resume
+     * from the last chunk received, and the file preview shows the upload's progress. The server
+     * may use smaller chunks. Set it to 0 to always upload files in a single request.
+    */
+    upload_chunk_size: PropTypes.number,
+    /**
+     * URL of the push endpoint registered with `dash_chat.push.register(app)`. When set, the
+     * component subscribes to its conversation (identified by `session_id`, which is generated if
+     * needed) and shows the messages and stream deltas pushed to it as they arrive, without a
+     * callback round-trip. In client history mode pushed messages are added to `messages` too.
+     * Dropped connections reconnect and receive the events they missed.
+    */
+    push_url: PropTypes.string,
+    /**
+     * Status of the job generating the reply, as returned by `dash_chat.jobs.JobPool.submit`:
+     *    - `id` (string): The job id.
+     *    - `status` (string): One of "queued", "running", "done", "failed" or "cancelled".
+     *    - `position` (number): Number of jobs queued before a queued job.
+     *    - `error` (string): Why a failed job failed.
+     * The typing indicator is shown while the job is queued or running, and a stop button
+     * replaces the send button. Statuses pushed through `push_url` update it too.
+    */
+    job_status: PropTypes.shape({
+        id: PropTypes.string,
+        status: PropTypes.oneOf(["queued", "running", "done", "failed", "cancelled"]),
+        position: PropTypes.number,
+        error: PropTypes.string,
+    }),
+    /**
+     * Set to the id of the running job when the stop button is clicked; pass it to
+     * `JobPool.cancel` in a callback.
+    */
+    cancel_job: PropTypes.string,
+    /**
+     * Admission decision on the last message, as returned by `dash_chat.limits`:
+     *    - `status` (string): One of "admitted", "queued", "rejected" or "coalesced".
+     *    - `position` (number): Number of messages waiting before a queued one.
+     *    - `reason` (string): Why a message was rejected: "session_rate", "app_rate" or
+     *      "overloaded".
+     *    - `retry_after` (number): Seconds until a rejected message may be sent again.
+     * Sending is disabled while the message is queued and until a rejected message may be
+     * retried, with a notice above the input. Decisions pushed through `push_url` update it too.
+    */
+    admission: PropTypes.shape({
+        status: PropTypes.oneOf(["admitted", "queued", "rejected", "coalesced"]),
+        position: PropTypes.number,
+        reason: PropTypes.string,
+        retry_after: PropTypes.number,
+    }),
+    /**
+     * Whether to show a search box above the messages. What is typed in it is published in
+     * `search_query` once typing pauses, and the matches returned in `search_results` are listed
+     * below it.
+    */
+    searchable: PropTypes.bool,
+    /**
+     * Set by the component with the text typed in the search box when `searchable` is True.
+     * Answer it with `dash_chat.search.SearchIndex.search`.
+    */
+    search_query: PropTypes.string,
+    /**
+     * Matches for `search_query`, as returned by `dash_chat.search.SearchIndex.search`:
+     *    - `seq` (number): Position of the message in the server-side history.
+     *    - `id` (string | number): Id of the message, when it has one.
+     *    - `role` (string): Role of the message.
+     *    - `snippet` (list of strings): Text around the match, alternately plain and matching
+     *      the query.
+     * Clicking a match scrolls to its message and highlights it. Older pages of a server-side
+     * history (`page_size`) are loaded first when the message is not shown yet.
+    */
+    search_results: PropTypes.arrayOf(PropTypes.shape({
+        seq: PropTypes.number.isRequired,
+        id: PropTypes.oneOfType([PropTypes.string, PropTypes.number]),
+        role: PropTypes.string,
+        snippet: PropTypes.arrayOf(PropTypes.string),
+    })),
 };
 
 export default ChatComponent;
@@ -11,13 +11,17 @@
  *     inputComponentStyles={{ padding: "10px" }}
  *     showTyping={showTyping}
  *     setAttachment={showTsetAttachmentyping}
+ *     uploadProgress={0.4}
+ *     onStop={handleStop}
+ *     notice="Waiting for your turn"
+ *     disabled={false}
  * />
  * ```
 */
 
 import React, { useState, useRef } from "react";
 import PropTypes from "prop-types";
-import { Paperclip, Send, X, FileText } from "lucide-react";
+import { Paperclip, Send, Square, X, FileText } from "lucide-react";
 
 /**
  * A reusable message input component for chat interfaces.
@@ -34,6 +38,10 @@ const MessageInput = ({
     inputComponentStyles = null,
     showTyping = false,
     accept,
+    uploadProgress = null,
+    onStop = null,
+    notice = null,
+    disabled = false,
 }) => {
     const fileInputRef = useRef(null);
     const [selectedFile, setSelectedFile] = useState(null);
@@ -61,15 +69,28 @@ const MessageInput = ({
     };
 
     const handleSend = () => {
-        if (value.trim() || selectedFile) {
+        if (uploadProgress !== null || disabled) {
+            return;
+        }
+        if (selectedFile) {
+            // the preview shows the upload's progress until the message is sent
+            Promise.resolve(onSend(value.trim(), selectedFile)).then((sent) => {
+                if (sent !== false) {
+                    handleRemoveFile();
+                }
+            });
+        } else if (value.trim()) {
             onSend(value.trim(), selectedFile);
-            setSelectedFile(null);
-            setFilePreview(null);
         }
     };
 
     return (
         <div className="message-input-container" style={customStyles}>
+            {notice && (
+                <div className="input-notice" role="status" data-testid="input-notice">
+                    {notice}
+                </div>
+            )}
             {filePreview && (
                 <div className="file-preview-container">
                     <button
@@ -91,6 +112,14 @@ const MessageInput = ({
                     ) : selectedFile.type.startsWith("image/") ? (
                         <img src={filePreview} alt="Preview" className="file-preview-image" />
                     ) : <p className="file-name-preview">{selectedFile.name} unsupported</p>}
+                    {uploadProgress !== null && (
+                        <progress
+                            className="upload-progress"
+                            value={uploadProgress}
+                            max={1}
+                            data-testid="upload-progress"
+                        />
+                    )}
                 </div>
             )}
             <textarea
@@ -100,7 +129,7 @@ const MessageInput = ({
                 placeholder={placeholder}
                 onChange={handleInputChange}
                 onKeyDown={(e) => {
-                    if (e.key === "Enter" && !showTyping) {
+                    if (e.key === "Enter" && !showTyping && !onStop && !disabled) {
                         e.preventDefault();
                         handleSend();
                     }
@@ -124,14 +153,25 @@ const MessageInput = ({
                     onChange={handleFileUpload}
                     data-testid="file-input"
                 />
-                <button
-                    onClick={handleSend}
-                    className={`message-input-button ${showTyping ? 'disabled' : ''}`}
-                    data-testid="send-button"
-                    disabled={showTyping}
-                >
-                    {buttonLabel ? buttonLabel : <Send size={18} />}
-                </button>
+                {onStop ? (
+                    <button
+                        onClick={onStop}
+                        className="message-input-button stop-button"
+                        data-testid="stop-button"
+                        aria-label="Stop generating"
+                    >
+                        <Square size={18} />
+                    </button>
+                ) : (
+                    <button
+                        onClick={handleSend}
+                        className={`message-input-button ${showTyping || uploadProgress !== null || disabled ? 'disabled' : ''}`}
+                        data-testid="send-button"
+                        disabled={showTyping || uploadProgress !== null || disabled}
+                    >
+                        {buttonLabel ? buttonLabel : <Send size={18} />}
+                    </button>
+                )}
             </div>
         </div>
     );
@@ -181,6 +221,24 @@ MessageInput.propTypes = {
         PropTypes.string,
         PropTypes.arrayOf(PropTypes.string),
     ]),
+    /**
+     * Fraction of the attached file uploaded so far, shown in the file preview. Null when no
+     * upload is running.
+    */
+    uploadProgress: PropTypes.number,
+    /**
+     * Callback to stop the reply being generated. When set, a stop button replaces the send
+     * button.
+    */
+    onStop: PropTypes.func,
+    /**
+     * Message shown above the input, e.g. why sending is disabled.
+    */
+    notice: PropTypes.string,
+    /**
+     * Disable sending, e.g. while the last message waits to be admitted.
+    */
+    disabled: PropTypes.bool,
 };
 
 export default MessageInput;
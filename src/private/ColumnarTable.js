@@ -0,0 +1,219 @@
+/**
+ * Example Usage:
+ * ```
+ * <ColumnarTable
+ *     item={{
+ *         type: "columnar_table",
+ *         num_rows: 2,
+ *         page_size: 50,
+ *         columns: [
+ *             { name: "City", dictionary: ["Lagos", "Paris"], codes: [0, 1] },
+ *             { name: "Orders", values: { dtype: "i4", bdata: "AwAAAAUAAAA=" } },
+ *         ],
+ *         props: { striped: true },
+ *     }}
+ * />
+ * ```
+*/
+
+import React, { useEffect, useMemo, useRef, useState } from "react";
+import PropTypes from "prop-types";
+
+import { decodeTypedArray } from "./typedArrays";
+
+const DEFAULT_PAGE_SIZE = 50;
+const ROW_HEIGHT = 33;
+const MAX_BODY_HEIGHT = 400;
+const OVERSCAN_ROWS = 10;
+
+/**
+ * Bootstrap table classes for the props of a table content part.
+*/
+const tableClassName = ({ class_name: className, striped, bordered, borderless, hover, size, dark } = {}) => {
+    const classList = ["table"];
+    if (className) {classList.push(className);}
+    if (striped) {classList.push("table-striped");}
+    if (bordered) {classList.push("table-bordered");}
+    if (borderless) {classList.push("table-borderless");}
+    if (hover) {classList.push("table-hover");}
+    if (size === "sm") {classList.push("table-sm");}
+    else if (size === "lg") {classList.push("table-lg");}
+    else if (size === "md") {classList.push("table-md");}
+    if (dark) {classList.push("table-dark");}
+    return classList.join(" ");
+};
+
+const decodeValues = (values) => (
+    Array.isArray(values) || !values ? values || [] : decodeTypedArray(values)
+);
+
+const decodeColumn = (column) => ({
+    ...column,
+    values: column.dictionary ? null : decodeValues(column.values),
+    codes: column.dictionary ? decodeValues(column.codes) : null,
+});
+
+const formatCell = (column, row) => {
+    if (column.codes) {
+        const code = column.codes[row];
+        return code < 0 || typeof code === "undefined" ? "" : column.dictionary[code];
+    }
+    const value = column.values[row];
+    if (value === null || typeof value === "undefined" || Number.isNaN(value)) {
+        return "";
+    }
+    if (column.type === "bool") {
+        return value ? "true" : "false";
+    }
+    if (column.type === "datetime") {
+        return new Date(value).toISOString();
+    }
+    return String(value);
+};
+
+/**
+ * Table for `columnar_table` content parts, as built by `dash_chat.tables`.
+ * Shows one page of rows at a time and only mounts the rows scrolled into view.
+ * When the part has a `url` only its first page is included and the others are
+ * fetched from the server as they are viewed.
+*/
+
+const ColumnarTable = ({ item }) => {
+    const { num_rows: numRows = 0, page_size: pageSize = DEFAULT_PAGE_SIZE, url, props: tableProps = {} } = item;
+    const firstPage = useMemo(() => (item.columns || []).map(decodeColumn), [item.columns]);
+    const [page, setPage] = useState(0);
+    const [fetchedPages, setFetchedPages] = useState({});
+    const [error, setError] = useState(null);
+    const [scrollTop, setScrollTop] = useState(0);
+    const scrollRef = useRef(null);
+
+    const pageCount = Math.max(1, Math.ceil(numRows / pageSize));
+    const pageStart = page * pageSize;
+    const pageRows = Math.max(0, Math.min(pageSize, numRows - pageStart));
+    // fetched pages hold their own rows only, included ones the whole table
+    let columns = firstPage;
+    let rowOffset = pageStart;
+    if (url) {
+        columns = page === 0 ? firstPage : fetchedPages[page];
+        rowOffset = 0;
+    }
+
+    useEffect(() => {
+        if (!url || page === 0 || fetchedPages[page]) {
+            return () => {};
+        }
+        let cancelled = false;
+        setError(null);
+        fetch(`${url}?offset=${pageStart}&limit=${pageSize}`)
+            .then((response) => {
+                if (!response.ok) {
+                    throw new Error(`Could not load rows (${response.status})`);
+                }
+                return response.json();
+            })
+            .then((result) => {
+                if (!cancelled) {
+                    setFetchedPages((previous) => ({ ...previous, [page]: result.columns.map(decodeColumn) }));
+                }
+            })
+            .catch((e) => {
+                if (!cancelled) {
+                    setError(e.message);
+                }
+            });
+        return () => {
+            cancelled = true;
+        };
+    }, [url, page]);
+
+    const changePage = (nextPage) => {
+        setPage(nextPage);
+        setError(null);
+        setScrollTop(0);
+        if (scrollRef.current) {
+            scrollRef.current.scrollTop = 0;
+        }
+    };
+
+    const visibleRows = Math.ceil(MAX_BODY_HEIGHT / ROW_HEIGHT);
+    const start = Math.max(0, Math.floor(scrollTop / ROW_HEIGHT) - OVERSCAN_ROWS);
+    const end = Math.min(pageRows, start + visibleRows + 2 * OVERSCAN_ROWS);
+    const headers = firstPage.map((column) => column.name);
+
+    let body;
+    if (error) {
+        body = <tr><td colSpan={headers.length}>{error}</td></tr>;
+    } else if (!columns) {
+        body = <tr><td colSpan={headers.length}>Loading…</td></tr>;
+    } else {
+        const rows = [];
+        for (let row = start; row < end; row++) {
+            rows.push(
+                <tr key={pageStart + row} style={{ height: ROW_HEIGHT }}>
+                    {columns.map((column, cIdx) => (
+                        <td key={cIdx}>{formatCell(column, rowOffset + row)}</td>
+                    ))}
+                </tr>
+            );
+        }
+        body = (
+            <>
+                {start > 0 && <tr style={{ height: start * ROW_HEIGHT }} />}
+                {rows}
+                {end < pageRows && <tr style={{ height: (pageRows - end) * ROW_HEIGHT }} />}
+            </>
+        );
+    }
+
+    return (
+        <div className="columnar-table">
+            <div
+                ref={scrollRef}
+                className="columnar-table-body"
+                style={{ maxHeight: MAX_BODY_HEIGHT }}
+                onScroll={(e) => setScrollTop(e.currentTarget.scrollTop)}
+            >
+                <table className={tableClassName(tableProps)} style={tableProps.style}>
+                    <thead>
+                        <tr>
+                            {headers.map((header, idx) => (
+                                <th key={idx}>{header}</th>
+                            ))}
+                        </tr>
+                    </thead>
+                    <tbody>{body}</tbody>
+                </table>
+            </div>
+            {pageCount > 1 && (
+                <div className="columnar-table-pager">
+                    <button onClick={() => changePage(page - 1)} disabled={page === 0} aria-label="previous page">
+                        ‹
+                    </button>
+                    <span>
+                        Rows {pageStart + 1}–{pageStart + pageRows} of {numRows}
+                    </span>
+                    <button onClick={() => changePage(page + 1)} disabled={page >= pageCount - 1} aria-label="next page">
+                        ›
+                    </button>
+                </div>
+            )}
+        </div>
+    );
+};
+
+ColumnarTable.propTypes = {
+    /**
+     * The `columnar_table` content part: its `columns`, `num_rows`, `page_size`,
+     * table `props` and, for tables kept on the server, the `url` of their pages.
+    */
+    item: PropTypes.shape({
+        columns: PropTypes.arrayOf(PropTypes.object),
+        num_rows: PropTypes.number,
+        page_size: PropTypes.number,
+        url: PropTypes.string,
+        props: PropTypes.object,
+    }).isRequired,
+};
+
+export { tableClassName };
+export default ColumnarTable;
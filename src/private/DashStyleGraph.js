@@ -0,0 +1,59 @@
+import React from "react";
+import PropTypes from "prop-types";
+import Plot from "react-plotly.js";
+
+/**
+ * Plotly graph taking the same props as `dcc.Graph`. Loaded on first use from
+ * its own chunk, so chats without graphs do not download plotly.js.
+*/
+
+const DashStyleGraph = ({
+  figure = {},
+  config = {},
+  style = {},
+  className = '',
+  animate = false,
+  animationOptions = {},
+  responsive = true,
+  useResizeHandler = false,
+  divId,
+  ...rest
+}) => {
+  const { data = [], layout = {}, frames = [] } = figure;
+  const finalConfig = { responsive, ...config };
+
+  return (
+    <Plot
+      data={data}
+      layout={layout}
+      frames={frames}
+      config={finalConfig}
+      revision={layout.revision}
+      animate={animate}
+      animation={animationOptions}
+      style={{
+        width: useResizeHandler ? '100%' : null,
+        height: useResizeHandler ? '100%' : null,
+        ...style,
+      }}
+      className={className}
+      divId={divId}
+      useResizeHandler={useResizeHandler}
+      {...rest}
+    />
+  );
+};
+
+DashStyleGraph.propTypes = {
+  figure: PropTypes.object,
+  config: PropTypes.object,
+  style: PropTypes.object,
+  className: PropTypes.string,
+  animate: PropTypes.bool,
+  animationOptions: PropTypes.object,
+  responsive: PropTypes.bool,
+  useResizeHandler: PropTypes.bool,
+  divId: PropTypes.string,
+};
+
+export default DashStyleGraph;
@@ -0,0 +1,22 @@
+import Markdown from "react-markdown";
+import remarkGfm from "remark-gfm";
+import PropTypes from "prop-types";
+
+const remarkPlugins = [remarkGfm];
+
+/**
+ * Markdown with GitHub flavoured extensions (tables, strikethrough, task lists).
+ * Loaded on first use from its own chunk. `Markdown` is a plain function of its
+ * props, so this can also be called directly to get the rendered tree.
+*/
+
+const MarkdownText = ({ children }) => Markdown({ children, remarkPlugins });
+
+MarkdownText.propTypes = {
+    /**
+     * Markdown source.
+    */
+    children: PropTypes.string,
+};
+
+export default MarkdownText;
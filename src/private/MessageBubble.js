@@ -0,0 +1,37 @@
+import React, { memo } from "react";
+import PropTypes from "prop-types";
+
+import renderMessageContent from "./renderers";
+
+/**
+ * A single chat message. Memoized so that a bubble only re-renders when its
+ * message or style object changes, not when the rest of the chat does.
+*/
+
+const MessageBubble = ({ message, style, highlighted = false }) => (
+    <div className={`chat-bubble ${message.role}${highlighted ? " highlighted" : ""}`} style={style}>
+        <div className="markdown-content">
+            {renderMessageContent(message.content)}
+        </div>
+    </div>
+);
+
+MessageBubble.propTypes = {
+    /**
+     * The message to display, with its `role` and `content`.
+    */
+    message: PropTypes.shape({
+        role: PropTypes.string.isRequired,
+        content: PropTypes.oneOfType([PropTypes.string, PropTypes.array, PropTypes.object]).isRequired,
+    }).isRequired,
+    /**
+     * Inline styles for the bubble.
+    */
+    style: PropTypes.object,
+    /**
+     * Whether to highlight the bubble, e.g. as the message a search result points to.
+    */
+    highlighted: PropTypes.bool,
+};
+
+export default memo(MessageBubble);
@@ -0,0 +1,250 @@
+/**
+ * Example Usage:
+ * ```
+ * <VirtualMessageList
+ *     messages={messages}
+ *     getKey={(message, index) => message.id || index}
+ *     renderMessage={(message, key) => <Bubble key={key} message={message} />}
+ *     containerRef={scrollContainerRef}
+ *     overscan={5}
+ * />
+ * ```
+*/
+
+import React, { useCallback, useEffect, useLayoutEffect, useMemo, useRef, useState } from "react";
+import PropTypes from "prop-types";
+
+const DEFAULT_ESTIMATED_HEIGHT = 80;
+const DEFAULT_VIEWPORT_HEIGHT = 600;
+const BOTTOM_THRESHOLD = 40;
+const MIN_HEIGHT_CHANGE = 0.5;
+
+// index of the last item starting at or before `y`
+const findItemAt = (offsets, y) => {
+    let low = 0;
+    let high = offsets.length - 2;
+    while (low < high) {
+        const middle = Math.ceil((low + high) / 2);
+        if (offsets[middle] <= y) {
+            low = middle;
+        } else {
+            high = middle - 1;
+        }
+    }
+    return Math.max(low, 0);
+};
+
+const outerHeight = (node) => {
+    const style = window.getComputedStyle(node);
+    return node.offsetHeight + (parseFloat(style.marginTop) || 0) + (parseFloat(style.marginBottom) || 0);
+};
+
+/**
+ * Renders only the messages inside the scroll container's viewport, plus `overscan`
+ * messages on each side, with spacers standing in for the others. Heights are
+ * measured once a message has been rendered and estimated before that.
+ * While the container is scrolled to the bottom it stays pinned there as
+ * messages are added or change size.
+*/
+
+const VirtualMessageList = ({
+    messages,
+    renderMessage,
+    getKey,
+    containerRef,
+    overscan = 5,
+    estimatedHeight = DEFAULT_ESTIMATED_HEIGHT,
+    scrollToKey = null,
+}) => {
+    const heightsRef = useRef(new Map());
+    const topSpacerRef = useRef(null);
+    const bottomSpacerRef = useRef(null);
+    const resizeObserverRef = useRef(null);
+    const nodeKeysRef = useRef(new WeakMap());
+    const frameRef = useRef(null);
+    const [measureVersion, setMeasureVersion] = useState(0);
+    const [viewport, setViewport] = useState({ scrollTop: 0, height: 0, listTop: 0, atBottom: true });
+
+    const keys = useMemo(() => messages.map((message, index) => getKey(message, index)), [messages, getKey]);
+
+    const offsets = useMemo(() => {
+        const result = new Array(keys.length + 1);
+        result[0] = 0;
+        keys.forEach((key, index) => {
+            const height = heightsRef.current.get(key);
+            result[index + 1] = result[index] + (typeof height === "number" ? height : estimatedHeight);
+        });
+        return result;
+    }, [keys, measureVersion, estimatedHeight]);
+
+    const readViewport = useCallback(() => {
+        const container = containerRef.current;
+        if (!container || !topSpacerRef.current) {
+            return;
+        }
+        const listTop = topSpacerRef.current.getBoundingClientRect().top
+            - container.getBoundingClientRect().top + container.scrollTop;
+        const next = {
+            scrollTop: container.scrollTop,
+            height: container.clientHeight,
+            listTop,
+            atBottom: container.scrollHeight - container.scrollTop - container.clientHeight <= BOTTOM_THRESHOLD,
+        };
+        setViewport((previous) => (
+            Object.keys(next).every((key) => previous[key] === next[key]) ? previous : next
+        ));
+    }, [containerRef]);
+
+    // record a measured height, returning whether it changed
+    const recordHeight = (key, node) => {
+        const height = outerHeight(node);
+        const previous = heightsRef.current.get(key);
+        // nodes in a hidden container have no size yet, keep the estimate
+        if (node.offsetHeight === 0 || (typeof previous === "number" && Math.abs(previous - height) <= MIN_HEIGHT_CHANGE)) {
+            return false;
+        }
+        heightsRef.current.set(key, height);
+        return true;
+    };
+
+    useEffect(() => {
+        const container = containerRef.current;
+        if (!container) {
+            return () => {};
+        }
+        const handleScroll = () => {
+            if (frameRef.current === null) {
+                frameRef.current = window.requestAnimationFrame(() => {
+                    frameRef.current = null;
+                    readViewport();
+                });
+            }
+        };
+        container.addEventListener("scroll", handleScroll);
+        window.addEventListener("resize", handleScroll);
+        readViewport();
+        return () => {
+            container.removeEventListener("scroll", handleScroll);
+            window.removeEventListener("resize", handleScroll);
+            if (frameRef.current !== null) {
+                window.cancelAnimationFrame(frameRef.current);
+                frameRef.current = null;
+            }
+        };
+    }, [containerRef, readViewport]);
+
+    const count = keys.length;
+    const viewportHeight = viewport.height || DEFAULT_VIEWPORT_HEIGHT;
+    let start, end;
+    if (viewport.atBottom) {
+        end = count;
+        start = findItemAt(offsets, offsets[count] - viewportHeight);
+    } else {
+        const top = viewport.scrollTop - viewport.listTop;
+        start = findItemAt(offsets, top);
+        end = findItemAt(offsets, top + viewportHeight) + 1;
+    }
+    start = Math.max(0, start - overscan);
+    end = Math.min(count, end + overscan);
+
+    // measure the rendered messages and keep the view pinned to the bottom
+    useLayoutEffect(() => {
+        let changed = false;
+        const nodes = [];
+        let node = topSpacerRef.current ? topSpacerRef.current.nextElementSibling : null;
+        for (let index = start; index < end && node && node !== bottomSpacerRef.current; index++) {
+            changed = recordHeight(keys[index], node) || changed;
+            nodeKeysRef.current.set(node, keys[index]);
+            nodes.push(node);
+            node = node.nextElementSibling;
+        }
+
+        if (typeof ResizeObserver !== "undefined") {
+            if (!resizeObserverRef.current) {
+                // images and graphs change size after they have been rendered
+                resizeObserverRef.current = new ResizeObserver((entries) => {
+                    const resized = entries.filter((entry) => (
+                        nodeKeysRef.current.has(entry.target)
+                        && recordHeight(nodeKeysRef.current.get(entry.target), entry.target)
+                    ));
+                    if (resized.length > 0) {
+                        setMeasureVersion((version) => version + 1);
+                    }
+                });
+            }
+            resizeObserverRef.current.disconnect();
+            nodes.forEach((item) => resizeObserverRef.current.observe(item));
+        }
+
+        const container = containerRef.current;
+        if (viewport.atBottom && container) {
+            container.scrollTop = container.scrollHeight;
+        }
+        if (changed) {
+            setMeasureVersion((version) => version + 1);
+        }
+    });
+
+    // center the message with `scrollToKey` in the view, after the pinning above
+    useLayoutEffect(() => {
+        const index = scrollToKey === null ? -1 : keys.indexOf(scrollToKey);
+        const container = containerRef.current;
+        if (index === -1 || !container) {
+            return;
+        }
+        const height = offsets[index + 1] - offsets[index];
+        container.scrollTop = Math.max(0, viewport.listTop + offsets[index] - (container.clientHeight - height) / 2);
+        readViewport();
+    }, [scrollToKey]);
+
+    useEffect(() => () => {
+        if (resizeObserverRef.current) {
+            resizeObserverRef.current.disconnect();
+        }
+    }, []);
+
+    return (
+        <>
+            <div ref={topSpacerRef} className="virtual-spacer" style={{ height: offsets[start], flexShrink: 0 }} />
+            {messages.slice(start, end).map((message, index) => renderMessage(message, keys[start + index]))}
+            <div
+                ref={bottomSpacerRef}
+                className="virtual-spacer"
+                style={{ height: offsets[count] - offsets[end], flexShrink: 0 }}
+            />
+        </>
+    );
+};
+
+VirtualMessageList.propTypes = {
+    /**
+     * Messages to render, in display order.
+    */
+    messages: PropTypes.array.isRequired,
+    /**
+     * Renders one message; must return a single element with the given key.
+    */
+    renderMessage: PropTypes.func.isRequired,
+    /**
+     * Returns a key for a message that stays stable as messages are added.
+    */
+    getKey: PropTypes.func.isRequired,
+    /**
+     * Ref to the scrollable element containing the list.
+    */
+    containerRef: PropTypes.object.isRequired,
+    /**
+     * Number of extra messages rendered above and below the viewport.
+    */
+    overscan: PropTypes.number,
+    /**
+     * Height assumed for messages that have not been measured yet.
+    */
+    estimatedHeight: PropTypes.number,
+    /**
+     * Key of a message to scroll into view, e.g. a search result.
+    */
+    scrollToKey: PropTypes.oneOfType([PropTypes.string, PropTypes.number]),
+};
+
+export default VirtualMessageList;
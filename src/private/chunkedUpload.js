@@ -0,0 +1,206 @@
+/**
+ * Example Usage:
+ * ```
+ * const handle = await uploadInChunks(file, {
+ *     url: "/_dash-chat/uploads/chunked",
+ *     chunkSize: 2 * 1024 * 1024,
+ *     onProgress: (fraction) => setProgress(fraction),
+ * });
+ * ```
+*/
+
+import { canUseWorkers, createWorkerRunner } from "./workers";
+
+const MAX_RETRIES = 5;
+const RETRY_DELAY_MS = 500;
+const HEX_RADIX = 16;
+
+// kept as a string so it reaches the worker untranspiled
+const HASH_WORKER_SOURCE = `
+self.onmessage = function (event) {
+    var job = event.data;
+    job.blob.arrayBuffer().then(function (buffer) {
+        return crypto.subtle.digest("SHA-256", buffer);
+    }).then(function (digest) {
+        var bytes = new Uint8Array(digest);
+        var hex = "";
+        for (var i = 0; i < bytes.length; i++) {
+            hex += (bytes[i] < 16 ? "0" : "") + bytes[i].toString(16);
+        }
+        self.postMessage({ id: job.id, hash: hex });
+    }).catch(function (error) {
+        self.postMessage({ id: job.id, error: String(error) });
+    });
+};
+`;
+
+const runInWorker = createWorkerRunner(HASH_WORKER_SOURCE);
+
+// Web Crypto is only available on https pages and localhost
+const canHash = () => typeof crypto !== "undefined" && Boolean(crypto.subtle);
+
+const toHex = (digest) => Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(HEX_RADIX).padStart(2, "0"))
+    .join("");
+
+/**
+ * SHA-256 of a Blob as a hex string, computed in a Web Worker where available and on the
+ * page when there is none or it failed. Resolves to null when the page cannot hash, in
+ * which case chunks are sent without a checksum.
+*/
+const hashChunk = async (blob) => {
+    if (!canHash()) {
+        return null;
+    }
+    if (canUseWorkers()) {
+        try {
+            const { hash } = await runInWorker({ blob });
+            return hash;
+        } catch (error) {
+            if (!error.workerFailed) {
+                throw error;
+            }
+        }
+    }
+    return toHex(await crypto.subtle.digest("SHA-256", await blob.arrayBuffer()));
+};
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// ids of unfinished uploads, so a reloaded page can resume them
+const resumeKey = (url, file) => `dash-chat-upload:${url}:${file.name}:${file.size}:${file.lastModified}`;
+
+const rememberUpload = (key, uploadId) => {
+    try {
+        if (uploadId) {
+            window.sessionStorage.setItem(key, uploadId);
+        } else {
+            window.sessionStorage.removeItem(key);
+        }
+    } catch (error) {
+        // storage may be disabled, uploads then only resume within the page
+    }
+};
+
+const savedUpload = (key) => {
+    try {
+        return window.sessionStorage.getItem(key);
+    } catch (error) {
+        return null;
+    }
+};
+
+const failed = (file, response) => new Error(`Upload of ${file.name} failed with status ${response.status}`);
+
+/**
+ * Resume the saved upload of `file`, or start a new one. Resolves to the upload's
+ * `{ uploadId, chunkSize, received, fileSize }`.
+*/
+const startUpload = async (url, file, chunkSize, headers) => {
+    const key = resumeKey(url, file);
+    const uploadId = savedUpload(key);
+    if (uploadId) {
+        const response = await fetch(`${url}/${uploadId}`, { headers });
+        if (response.ok) {
+            return response.json();
+        }
+        rememberUpload(key, null);
+    }
+    const response = await fetch(url, {
+        method: "POST",
+        headers: { ...headers, "Content-Type": "application/json" },
+        body: JSON.stringify({
+            fileName: file.name,
+            fileType: file.type || "application/octet-stream",
+            fileSize: file.size,
+            chunkSize,
+        }),
+    });
+    if (!response.ok) {
+        throw failed(file, response);
+    }
+    const upload = await response.json();
+    rememberUpload(key, upload.uploadId);
+    return upload;
+};
+
+/**
+ * Upload `file` to the chunked upload endpoint at `url` in chunks of about `chunkSize` bytes,
+ * and resolve to its attachment handle. The file is read one chunk at a time and every chunk is
+ * sent with its SHA-256, hashed off the main thread while the previous chunk uploads. Dropped
+ * connections and server errors are retried from the last chunk the server acknowledged, and an
+ * upload interrupted by a reload resumes when the same file is sent again from the same tab.
+ * `onProgress` is called with the fraction of the file received by the server.
+*/
+const uploadInChunks = async (file, { url, chunkSize, headers = {}, onProgress = () => {} }) => {
+    const key = resumeKey(url, file);
+    const upload = await startUpload(url, file, chunkSize, headers);
+    const size = upload.chunkSize;
+    const hashes = new Map();
+    const hashAt = (start) => {
+        if (!hashes.has(start)) {
+            hashes.set(start, hashChunk(file.slice(start, start + size)));
+        }
+        return hashes.get(start);
+    };
+
+    let offset = upload.received;
+    let failures = 0;
+    let handle = null;
+    onProgress(offset / file.size);
+    while (!handle) {
+        const hash = await hashAt(offset);
+        hashes.delete(offset);
+        const chunkHeaders = { ...headers, "Content-Type": "application/octet-stream", "X-Upload-Offset": String(offset) };
+        if (hash) {
+            chunkHeaders["X-Chunk-SHA256"] = hash;
+        }
+        const sending = fetch(`${url}/${upload.uploadId}`, {
+            method: "PUT",
+            headers: chunkHeaders,
+            body: file.slice(offset, offset + size),
+        });
+        if (offset + size < file.size) {
+            // hash the next chunk while this one uploads
+            hashAt(offset + size);
+        }
+
+        let response = null;
+        try {
+            response = await sending;
+        } catch (error) {
+            // the connection dropped, retried below
+        }
+        if (response && response.status === 201) {
+            handle = await response.json();
+        } else if (response && (response.ok || response.status === 409)) {
+            // 409: the server has a different offset, continue from there
+            ({ received: offset } = await response.json());
+            failures = 0;
+        } else if (response && response.status < 500 && response.status !== 422) {
+            // 422 is a corrupted chunk, anything else will not get better
+            rememberUpload(key, null);
+            throw failed(file, response);
+        } else {
+            failures += 1;
+            if (failures > MAX_RETRIES) {
+                throw new Error(`Upload of ${file.name} failed after ${MAX_RETRIES} retries`);
+            }
+            await sleep(RETRY_DELAY_MS * (2 ** (failures - 1)));
+            // the chunk may have arrived before the connection dropped
+            try {
+                const status = await fetch(`${url}/${upload.uploadId}`, { headers });
+                if (status.ok) {
+                    ({ received: offset } = await status.json());
+                }
+            } catch (error) {
+                // still offline, retry the same chunk
+            }
+        }
+        onProgress(handle ? 1 : offset / file.size);
+    }
+    rememberUpload(key, null);
+    return handle;
+};
+
+export default uploadInChunks;
@@ -0,0 +1,130 @@
+/**
+ * Example Usage:
+ * ```
+ * const image = await resizeImage(file, { maxDimension: 1568, format: "webp", quality: 0.85 });
+ * ```
+*/
+
+import { canUseWorkers, createWorkerRunner } from "./workers";
+
+const MIME_TYPES = { webp: "image/webp", jpeg: "image/jpeg", png: "image/png" };
+const EXTENSIONS = { "image/webp": "webp", "image/jpeg": "jpg", "image/png": "png" };
+// animated and vector images would lose their animation or sharpness
+const KEPT_TYPES = ["image/gif", "image/svg+xml"];
+
+// kept as a string so it reaches the worker untranspiled
+const WORKER_SOURCE = `
+self.onmessage = function (event) {
+    var job = event.data;
+    createImageBitmap(job.file, { imageOrientation: "from-image" }).then(function (bitmap) {
+        var scale = job.maxDimension ? Math.min(1, job.maxDimension / Math.max(bitmap.width, bitmap.height)) : 1;
+        var width = Math.max(1, Math.round(bitmap.width * scale));
+        var height = Math.max(1, Math.round(bitmap.height * scale));
+        var canvas = new OffscreenCanvas(width, height);
+        var context = canvas.getContext("2d");
+        context.imageSmoothingQuality = "high";
+        context.drawImage(bitmap, 0, 0, width, height);
+        bitmap.close();
+        var options = { type: job.type };
+        if (typeof job.quality === "number") {
+            options.quality = job.quality;
+        }
+        return canvas.convertToBlob(options).then(function (blob) {
+            self.postMessage({ id: job.id, blob: blob, scaled: scale < 1 });
+        });
+    }).catch(function (error) {
+        self.postMessage({ id: job.id, error: String(error) });
+    });
+};
+`;
+
+const runInWorker = createWorkerRunner(WORKER_SOURCE);
+
+const canUseWorker = () => canUseWorkers()
+    && typeof OffscreenCanvas !== "undefined"
+    && typeof createImageBitmap !== "undefined";
+
+const encodeInWorker = (file, maxDimension, type, quality) => runInWorker({ file, maxDimension, type, quality });
+
+const loadImage = (file) => new Promise((resolve, reject) => {
+    const url = URL.createObjectURL(file);
+    const image = new Image();
+    image.onload = () => {
+        URL.revokeObjectURL(url);
+        resolve(image);
+    };
+    image.onerror = () => {
+        URL.revokeObjectURL(url);
+        reject(new Error(`Could not decode ${file.name}`));
+    };
+    image.src = url;
+});
+
+// fallback for browsers without OffscreenCanvas in workers
+const encodeOnPage = async (file, maxDimension, type, quality) => {
+    const image = await loadImage(file);
+    const longest = Math.max(image.naturalWidth, image.naturalHeight);
+    const scale = maxDimension ? Math.min(1, maxDimension / longest) : 1;
+    const canvas = document.createElement("canvas");
+    canvas.width = Math.max(1, Math.round(image.naturalWidth * scale));
+    canvas.height = Math.max(1, Math.round(image.naturalHeight * scale));
+    const context = canvas.getContext("2d");
+    context.imageSmoothingQuality = "high";
+    context.drawImage(image, 0, 0, canvas.width, canvas.height);
+    const blob = await new Promise((resolve) => canvas.toBlob(resolve, type, quality));
+    if (!blob) {
+        throw new Error(`Could not encode ${file.name}`);
+    }
+    return { blob, scaled: scale < 1 };
+};
+
+const renamed = (name, type) => {
+    const extension = EXTENSIONS[type];
+    if (!extension) {
+        return name;
+    }
+    const dot = name.lastIndexOf(".");
+    return `${dot > 0 ? name.slice(0, dot) : name}.${extension}`;
+};
+
+/**
+ * Downscale an image so its longest side is at most `maxDimension` pixels and re-encode it
+ * as `format` ("webp", "jpeg" or "png", by default its own type) at `quality` (0 to 1).
+ * Runs in a Web Worker with `OffscreenCanvas` where available, and on the page otherwise
+ * or when the worker fails.
+ * Resolves to the original file when it is not an image that can be re-encoded, when
+ * decoding fails, or when the result would not be smaller.
+*/
+const resizeImage = async (file, { maxDimension = null, format = null, quality = null } = {}) => {
+    if (!file || !file.type.startsWith("image/") || KEPT_TYPES.includes(file.type)) {
+        return file;
+    }
+    if (!maxDimension && !format) {
+        return file;
+    }
+    const type = MIME_TYPES[format] || file.type;
+    const options = [file, maxDimension, type, quality];
+    let result;
+    try {
+        try {
+            result = canUseWorker() ? await encodeInWorker(...options) : await encodeOnPage(...options);
+        } catch (error) {
+            // a worker that could not start or crashed, rather than an undecodable image
+            if (!error.workerFailed) {
+                throw error;
+            }
+            result = await encodeOnPage(...options);
+        }
+    } catch (error) {
+        console.error(error);
+        return file;
+    }
+    const { blob, scaled } = result;
+    // an image that already fits is only replaced when re-encoding makes it smaller
+    if (!scaled && blob.size >= file.size) {
+        return file;
+    }
+    return new File([blob], renamed(file.name, blob.type), { type: blob.type, lastModified: file.lastModified });
+};
+
+export default resizeImage;
@@ -0,0 +1,145 @@
+/**
+ * Example Usage:
+ * ```
+ * const store = openMessageStore("chat");
+ * const { entries, hasMore } = await store.loadPage(null, 50);
+ * await store.put([{ seq: 0, message }]);
+ * ```
+*/
+
+const DB_NAME = "dash-chat";
+const DB_VERSION = 1;
+const STORE_NAME = "messages";
+
+let dbPromise = null;
+
+const requestToPromise = (request) => new Promise((resolve, reject) => {
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+});
+
+const transactionDone = (transaction) => new Promise((resolve, reject) => {
+    transaction.oncomplete = () => resolve();
+    transaction.onerror = () => reject(transaction.error);
+    transaction.onabort = () => reject(transaction.error);
+});
+
+const openDatabase = () => {
+    if (!dbPromise) {
+        const request = window.indexedDB.open(DB_NAME, DB_VERSION);
+        request.onupgradeneeded = () => {
+            // one record per message, keyed by chat and position in the chat
+            request.result.createObjectStore(STORE_NAME, { keyPath: ["chatId", "seq"] });
+        };
+        dbPromise = requestToPromise(request);
+    }
+    return dbPromise;
+};
+
+const dataUrlToBlob = (dataUrl) => {
+    const [header, data] = dataUrl.split(",");
+    const mimeType = header.slice("data:".length).split(";")[0];
+    const binary = window.atob(data);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return new Blob([bytes], { type: mimeType });
+};
+
+const mapAttachments = (message, convert) => {
+    if (!Array.isArray(message.content)) {
+        return message;
+    }
+    return {
+        ...message,
+        content: message.content.map((item) => (
+            item && typeof item === "object" && item.type === "attachment" ? convert(item) : item
+        )),
+    };
+};
+
+// inline attachments are stored as Blobs rather than base64 data URLs
+const toRecord = (message) => mapAttachments(message, (item) => {
+    if (typeof item.file !== "string" || !item.file.startsWith("data:")) {
+        return item;
+    }
+    const { file, ...rest } = item;
+    return { ...rest, blob: dataUrlToBlob(file) };
+});
+
+const fromRecord = (message) => mapAttachments(message, (item) => {
+    if (!item.blob) {
+        return item;
+    }
+    const { blob, ...rest } = item;
+    return { ...rest, file: URL.createObjectURL(blob) };
+});
+
+/**
+ * Opens the IndexedDB message history of one chat. Messages are written one
+ * record each, so appending a message costs the same however long the chat is,
+ * and read back a page at a time starting with the newest.
+*/
+const openMessageStore = (chatId) => {
+    const range = (beforeSeq) => IDBKeyRange.bound(
+        [chatId, -Infinity],
+        [chatId, beforeSeq === null ? Infinity : beforeSeq],
+        false,
+        beforeSeq !== null
+    );
+
+    return {
+        /**
+         * Load up to `limit` messages older than `beforeSeq` (or the newest ones
+         * when it is null), returned oldest first as `{ seq, message }` entries.
+        */
+        loadPage: async (beforeSeq, limit) => {
+            const db = await openDatabase();
+            const transaction = db.transaction(STORE_NAME, "readonly");
+            const request = transaction.objectStore(STORE_NAME).openCursor(range(beforeSeq), "prev");
+            const entries = [];
+            let hasMore = false;
+            await new Promise((resolve, reject) => {
+                request.onerror = () => reject(request.error);
+                request.onsuccess = () => {
+                    const cursor = request.result;
+                    if (!cursor) {
+                        resolve();
+                    } else if (entries.length === limit) {
+                        hasMore = true;
+                        resolve();
+                    } else {
+                        entries.push({ seq: cursor.value.seq, message: fromRecord(cursor.value.message) });
+                        cursor.continue();
+                    }
+                };
+            });
+            return { entries: entries.reverse(), hasMore };
+        },
+        /**
+         * Write `{ seq, message }` entries, replacing messages already stored
+         * at the same position.
+        */
+        put: async (entries) => {
+            const db = await openDatabase();
+            const transaction = db.transaction(STORE_NAME, "readwrite");
+            const objectStore = transaction.objectStore(STORE_NAME);
+            entries.forEach(({ seq, message }) => {
+                objectStore.put({ chatId, seq, message: toRecord(message) });
+            });
+            return transactionDone(transaction);
+        },
+        /**
+         * Delete every message of the chat.
+        */
+        clear: async () => {
+            const db = await openDatabase();
+            const transaction = db.transaction(STORE_NAME, "readwrite");
+            transaction.objectStore(STORE_NAME).delete(range(null));
+            return transactionDone(transaction);
+        },
+    };
+};
+
+export default openMessageStore;
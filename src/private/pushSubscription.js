@@ -0,0 +1,75 @@
+/**
+ * Example Usage:
+ * ```
+ * const subscription = subscribeToPush("/_dash-chat/push", sessionId, {
+ *     onMessage: (message) => ...,
+ *     onDelta: (delta) => ...,
+ *     onJob: (status) => ...,
+ *     onAdmission: (admission) => ...,
+ * });
+ * subscription.close();
+ * ```
+*/
+
+const RECONNECT_DELAY_MS = 1000;
+const MAX_RECONNECT_DELAY_MS = 30000;
+
+/**
+ * Subscribe to the messages, stream deltas, job statuses and admission decisions pushed
+ * to a conversation by `dash_chat.push`. EventSource reconnects by itself after a dropped connection,
+ * sending the id of the last event received; when the server refuses or the
+ * connection cannot be reopened, a new EventSource is created with backoff and
+ * the last event id in the query string, so no pushed event is lost.
+*/
+const subscribeToPush = (url, sessionId, { onMessage, onDelta, onJob = () => {}, onAdmission = () => {} }) => {
+    let source = null;
+    let lastEventId = null;
+    let failures = 0;
+    let timer = null;
+    let closed = false;
+
+    const handle = (callback) => (event) => {
+        failures = 0;
+        lastEventId = event.lastEventId || lastEventId;
+        let data;
+        try {
+            data = JSON.parse(event.data);
+        } catch (error) {
+            console.error(error);
+            return;
+        }
+        callback(data);
+    };
+
+    const connect = () => {
+        const params = new URLSearchParams({ session: sessionId });
+        if (lastEventId) {
+            params.set("last_event_id", lastEventId);
+        }
+        const separator = url.includes("?") ? "&" : "?";
+        source = new EventSource(`${url}${separator}${params}`);
+        source.addEventListener("message", handle(onMessage));
+        source.addEventListener("delta", handle(onDelta));
+        source.addEventListener("job", handle(onJob));
+        source.addEventListener("admission", handle(onAdmission));
+        source.onerror = () => {
+            if (closed || source.readyState !== EventSource.CLOSED) {
+                return;
+            }
+            failures += 1;
+            const delay = Math.min(MAX_RECONNECT_DELAY_MS, RECONNECT_DELAY_MS * (2 ** (failures - 1)));
+            timer = setTimeout(connect, delay);
+        };
+    };
+
+    connect();
+    return {
+        close: () => {
+            closed = true;
+            clearTimeout(timer);
+            source.close();
+        },
+    };
+};
+
+export default subscribeToPush;
@@ -1,58 +1,83 @@
-import React from "react";
-import PropTypes from "prop-types";
+import React, { lazy, Suspense } from "react";
 import { FileText } from "lucide-react";
-import Markdown from "react-markdown";
-import remarkGfm from "remark-gfm";
-import Plot from "react-plotly.js";
-
-const DashStyleGraph = ({
-  figure = {},
-  config = {},
-  style = {},
-  className = '',
-  animate = false,
-  animationOptions = {},
-  responsive = true,
-  useResizeHandler = false,
-  divId,
-  ...rest
-}) => {
-  const { data = [], layout = {}, frames = [] } = figure;
-  const finalConfig = { responsive, ...config };
-
-  return (
-    <Plot
-      data={data}
-      layout={layout}
-      frames={frames}
-      config={finalConfig}
-      revision={layout.revision}
-      animate={animate}
-      animation={animationOptions}
-      style={{
-        width: useResizeHandler ? '100%' : null,
-        height: useResizeHandler ? '100%' : null,
-        ...style,
-      }}
-      className={className}
-      divId={divId}
-      useResizeHandler={useResizeHandler}
-      {...rest}
-    />
-  );
+
+import ColumnarTable, { tableClassName } from "./ColumnarTable";
+import { decodeFigure } from "./typedArrays";
+
+const MARKDOWN_CACHE_SIZE = 500;
+
+// markdown and plotly.js are split into chunks that are only fetched once a
+// message needs them
+let loadedMarkdown = null;
+const MarkdownText = lazy(() => import(/* webpackChunkName: "markdown" */ "./MarkdownText").then((module) => {
+    loadedMarkdown = module.default;
+    return module;
+}));
+const DashStyleGraph = lazy(() => import(/* webpackChunkName: "graph" */ "./DashStyleGraph"));
+
+/**
+ * Least recently used cache of rendered output, so markdown bodies are not
+ * parsed again when a bubble re-renders or is remounted (e.g. when scrolled
+ * back into view in a virtualized list).
+ */
+const createRenderCache = (limit) => {
+    const entries = new Map();
+    return (key, render) => {
+        if (entries.has(key)) {
+            const cached = entries.get(key);
+            // re-insert to mark as most recently used
+            entries.delete(key);
+            entries.set(key, cached);
+            return cached;
+        }
+        const rendered = render();
+        entries.set(key, rendered);
+        if (entries.size > limit) {
+            entries.delete(entries.keys().next().value);
+        }
+        return rendered;
+    };
+};
+
+const markdownCache = createRenderCache(MARKDOWN_CACHE_SIZE);
+// tables are cached per content item, so they are released with their message
+const tableCache = new WeakMap();
+// figures are decoded once, however often their message re-renders
+const figureCache = new WeakMap();
+
+const decodedFigure = (figure) => {
+    if (!figure || typeof figure !== "object") {
+        return figure;
+    }
+    if (!figureCache.has(figure)) {
+        figureCache.set(figure, decodeFigure(figure));
+    }
+    return figureCache.get(figure);
 };
 
-const textRenderer = (item) => (
-    <Markdown remarkPlugins={[remarkGfm]}>
-        {item}
-    </Markdown>
-);
+// the raw text is shown until the markdown chunk has loaded
+const textRenderer = (item) => {
+    if (!loadedMarkdown) {
+        return (
+            <Suspense fallback={<div className="markdown-placeholder">{item}</div>}>
+                <MarkdownText>{item}</MarkdownText>
+            </Suspense>
+        );
+    }
+    // calling it directly lets the parsed tree be cached rather than only the
+    // element describing it
+    return markdownCache(item, () => loadedMarkdown({ children: item }));
+};
 
 const fileRenderer = (item) => {
+    // uploaded attachments are served from a URL, inline ones carry a data URL
+    const src = item.url || item.file;
     return item.fileName.match(/\.(jpeg|jpg|png|gif)$/i) ? (
         <img
-            src={item.file}
+            src={src}
             alt={item.fileName}
+            loading="lazy"
+            decoding="async"
             style={{
                 maxWidth: "30%",
                 borderRadius: "5px",
@@ -63,7 +88,7 @@ const fileRenderer = (item) => {
         />
     ) : (
         <a
-            href={item.file}
+            href={src}
             target="_blank"
             rel="noopener noreferrer"
             style={{ display: "block", marginTop: "10px" }}
@@ -86,48 +111,32 @@ const graphRenderer = (item) => {
         animation_options
     } = item.props;
     return (
-        <DashStyleGraph
-            divId={id}
-            figure={figure}
-            config={config}
-            style={style}
-            className={class_name}
-            animate={animate}
-            animationOptions={animation_options}
-            responsive={responsive}
-            useResizeHandler={responsive ? responsive : false}
-            revision={revision}
-        />
+        <Suspense fallback={<div className="graph-placeholder" style={style} />}>
+            <DashStyleGraph
+                divId={id}
+                figure={decodedFigure(figure)}
+                config={config}
+                style={style}
+                className={class_name}
+                animate={animate}
+                animationOptions={animation_options}
+                responsive={responsive}
+                useResizeHandler={responsive ? responsive : false}
+                revision={revision}
+            />
+        </Suspense>
     );
 };
 
 const tableRenderer = (item, i) => {
+    if (tableCache.has(item)) {
+        return tableCache.get(item);
+    }
     const { data, header, props } = item;
-    const {
-        class_name: className,
-        striped,
-        bordered,
-        borderless,
-        hover,
-        responsive,
-        size,
-        dark,
-        style,
-    } = props;
-
-    const classList = ["table"];
-    if (className) {classList.push(className);}
-    if (striped) {classList.push("table-striped");}
-    if (bordered) {classList.push("table-bordered");}
-    if (borderless) {classList.push("table-borderless");}
-    if (hover) {classList.push("table-hover");}
-    if (size === "sm") {classList.push("table-sm");}
-    else if (size === "lg") {classList.push("table-lg");}
-    else if (size === "md") {classList.push("table-md");}
-    if (dark) {classList.push("table-dark");}
+    const { responsive, style } = props;
 
     const table = (
-        <table key={i} className={classList.join(" ")} style={style}>
+        <table key={i} className={tableClassName(props)} style={style}>
             <thead>
                 <tr>
                     {header.map((col, idx) => (
@@ -147,9 +156,11 @@ const tableRenderer = (item, i) => {
         </table>
     );
 
-    return responsive ? (
+    const rendered = responsive ? (
         <div key={i} className="table-responsive">{table}</div>
     ) : table;
+    tableCache.set(item, rendered);
+    return rendered;
 };
 
 const renderMessageContent = (content) => {
@@ -193,6 +204,12 @@ const renderMessageContent = (content) => {
                                 {tableRenderer(item)}
                             </div>
                         );
+                    case "columnar_table":
+                        return (
+                            <div key={i}>
+                                <ColumnarTable item={item} />
+                            </div>
+                        );
                     default:
                         return null;
                 }
@@ -209,16 +226,4 @@ const renderMessageContent = (content) => {
 };
 
 
-DashStyleGraph.propTypes = {
-  figure: PropTypes.object,
-  config: PropTypes.object,
-  style: PropTypes.object,
-  className: PropTypes.string,
-  animate: PropTypes.bool,
-  animationOptions: PropTypes.object,
-  responsive: PropTypes.bool,
-  useResizeHandler: PropTypes.bool,
-  divId: PropTypes.string,
-};
-
 export default renderMessageContent;
@@ -0,0 +1,155 @@
+/**
+ * Example Usage:
+ * ```
+ * const tracker = createTurnTracker((turn) => batch.push(turn));
+ * tracker.start({ messageId, requestBytes });
+ * tracker.response(bytes, true);
+ * tracker.committed(lastMessage, historyLength);
+ * ```
+*/
+
+const now = () => performance.now();
+
+// tenths of a millisecond are plenty for a turn
+const round = (ms) => (ms === null ? null : Math.round(ms * 10) / 10);
+
+/**
+ * Size in bytes of a value once serialized to JSON, as sent over the wire.
+*/
+const jsonBytes = (value) => new Blob([JSON.stringify(value)]).size;
+
+/**
+ * Post a batch of turn metrics of the component `component` to the `metrics_url`
+ * endpoint. Uses `navigator.sendBeacon` when available so batches sent while the
+ * page is being closed are still delivered.
+*/
+const sendMetrics = (url, component, turns) => {
+    const body = JSON.stringify({ component, turns });
+    if (navigator.sendBeacon && navigator.sendBeacon(url, new Blob([body], { type: "application/json" }))) {
+        return;
+    }
+    fetch(url, { method: "POST", body, headers: { "Content-Type": "application/json" }, keepalive: true })
+        .catch((error) => console.error(error));
+};
+
+/**
+ * Tracks the timings of one turn at a time, from sending a message to its
+ * reply being rendered and persisted, and hands each finished turn to `onTurn`:
+ *    - `upload_ms`: uploading or reading the attachment before the message was sent.
+ *    - `ack_ms`: until the first response from the server (a stream delta or the reply).
+ *    - `first_token_ms`: until the first reply text was committed to the page.
+ *    - `render_ms`: from receiving the complete reply to committing it.
+ *    - `turn_ms`: from sending to the complete reply being committed.
+ *    - `persistence_ms`: time spent writing the turn's messages to storage.
+ *    - `request_bytes` and `response_bytes`: JSON size of `new_message` and of the responses.
+ * A turn still open when the next message is sent is reported with `completed: false`.
+*/
+const createTurnTracker = (onTurn) => {
+    let turn = null;
+
+    const report = (completed) => {
+        const elapsed = (at) => (at === null ? null : round(at - turn.sentAt));
+        onTurn({
+            message_id: turn.messageId,
+            completed,
+            streamed: turn.streamed,
+            upload_ms: round(turn.uploadMs),
+            ack_ms: elapsed(turn.ackAt),
+            first_token_ms: elapsed(turn.firstTokenAt),
+            render_ms: turn.renderedAt === null ? null : round(turn.renderedAt - turn.replyAt),
+            turn_ms: elapsed(turn.renderedAt),
+            persistence_ms: round(turn.persistenceMs),
+            request_bytes: turn.requestBytes,
+            response_bytes: turn.responseBytes,
+            history_length: turn.historyLength,
+        });
+        turn = null;
+    };
+
+    const finishIfDone = () => {
+        if (turn && turn.renderedAt !== null && turn.pendingWrites === 0) {
+            report(true);
+        }
+    };
+
+    return {
+        start: ({ messageId, requestBytes, uploadMs = null }) => {
+            if (turn) {
+                report(false);
+            }
+            turn = {
+                messageId,
+                requestBytes,
+                uploadMs,
+                sentAt: now(),
+                ackAt: null,
+                firstTokenAt: null,
+                replyAt: null,
+                renderedAt: null,
+                responseBytes: 0,
+                persistenceMs: 0,
+                pendingWrites: 0,
+                streamed: false,
+                historyLength: null,
+            };
+        },
+        /**
+         * A response arrived: a stream delta, or the complete reply when `final`.
+        */
+        response: (bytes, final) => {
+            if (!turn) {
+                return;
+            }
+            const at = now();
+            if (turn.ackAt === null) {
+                turn.ackAt = at;
+            }
+            turn.responseBytes += bytes;
+            if (final) {
+                turn.replyAt = at;
+            } else {
+                turn.streamed = true;
+            }
+        },
+        /**
+         * The messages were committed to the page, ending with `lastMessage`.
+        */
+        committed: (lastMessage, historyLength) => {
+            if (!turn || !lastMessage || lastMessage.role !== "assistant" || !lastMessage.content) {
+                return;
+            }
+            const at = now();
+            if (turn.firstTokenAt === null) {
+                turn.firstTokenAt = at;
+            }
+            if (turn.replyAt !== null && !lastMessage.streaming && turn.renderedAt === null) {
+                turn.renderedAt = at;
+                turn.historyLength = historyLength;
+            }
+        },
+        /**
+         * A persistence write starts; call the returned function once it is done.
+        */
+        write: () => {
+            if (!turn) {
+                return () => {};
+            }
+            const current = turn;
+            const startedAt = now();
+            current.pendingWrites += 1;
+            return () => {
+                current.persistenceMs += now() - startedAt;
+                current.pendingWrites -= 1;
+                if (current === turn) {
+                    finishIfDone();
+                }
+            };
+        },
+        /**
+         * End the turn if its reply is rendered and no write is pending.
+        */
+        settle: finishIfDone,
+    };
+};
+
+export { createTurnTracker, jsonBytes, sendMetrics };
@@ -0,0 +1,68 @@
+/**
+ * Example Usage:
+ * ```
+ * decodeTypedArray({ dtype: "f8", bdata: "AAAAAAAA8D8=" }); // Float64Array [1]
+ * ```
+*/
+
+const TYPED_ARRAYS = {
+    i1: Int8Array,
+    u1: Uint8Array,
+    i2: Int16Array,
+    u2: Uint16Array,
+    i4: Int32Array,
+    u4: Uint32Array,
+    f4: Float32Array,
+    f8: Float64Array,
+};
+
+const isTypedArraySpec = (value) => (
+    Boolean(value) && typeof value === "object" && typeof value.bdata === "string"
+    && Object.prototype.hasOwnProperty.call(TYPED_ARRAYS, value.dtype)
+);
+
+/**
+ * Decode a base64 typed array spec (`{ dtype, bdata, shape }`, as written by
+ * `dash_chat.figures`) into a typed array. The base64 text is decoded once into
+ * a buffer that the typed array views directly; 2-D arrays are returned as rows
+ * viewing the same buffer.
+*/
+const decodeTypedArray = ({ dtype, bdata, shape }) => {
+    const binary = window.atob(bdata);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    const values = new TYPED_ARRAYS[dtype](bytes.buffer);
+    if (!shape) {
+        return values;
+    }
+    const [rows, columns] = String(shape).split(",").map(Number);
+    return Array.from({ length: rows }, (_, row) => values.subarray(row * columns, (row + 1) * columns));
+};
+
+const decodeValue = (value) => {
+    if (isTypedArraySpec(value)) {
+        return decodeTypedArray(value);
+    }
+    if (Array.isArray(value) || !value || typeof value !== "object") {
+        return value;
+    }
+    const decoded = {};
+    Object.keys(value).forEach((key) => {
+        decoded[key] = decodeValue(value[key]);
+    });
+    return decoded;
+};
+
+/**
+ * Return a figure whose traces hold typed arrays in place of typed array specs.
+*/
+const decodeFigure = (figure) => {
+    if (!figure || !Array.isArray(figure.data)) {
+        return figure;
+    }
+    return { ...figure, data: figure.data.map(decodeValue) };
+};
+
+export { decodeFigure, decodeTypedArray };
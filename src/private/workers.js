@@ -0,0 +1,83 @@
+/**
+ * Example Usage:
+ * ```
+ * const runJob = createWorkerRunner(WORKER_SOURCE);
+ * const result = await runJob({ blob });
+ * ```
+*/
+
+/**
+ * Whether jobs can run in a Web Worker created from a script source.
+*/
+const canUseWorkers = () => typeof Worker !== "undefined" && typeof URL.createObjectURL === "function";
+
+/**
+ * Return a function running jobs in a Web Worker created from `source`, a script kept as a
+ * string so it reaches the worker untranspiled. The script answers each `{ id, ...job }`
+ * message with `{ id, ...result }`, or `{ id, error }` when the job failed. The worker is
+ * created on the first job and shared by all of them.
+ *
+ * When the worker cannot be created (e.g. a Content-Security-Policy without
+ * `worker-src blob:`) or crashes, every pending job and every later one is rejected with
+ * an error whose `workerFailed` is true, so callers can do the work on the page instead.
+*/
+const createWorkerRunner = (source) => {
+    let worker = null;
+    let failure = null;
+    let nextJobId = 0;
+    const pendingJobs = new Map();
+
+    const fail = (reason) => {
+        failure = new Error(`Web Worker failed: ${reason}`);
+        failure.workerFailed = true;
+        if (worker) {
+            worker.terminate();
+            worker = null;
+        }
+        pendingJobs.forEach((job) => job.reject(failure));
+        pendingJobs.clear();
+    };
+
+    const getWorker = () => {
+        if (!worker) {
+            const url = URL.createObjectURL(new Blob([source], { type: "text/javascript" }));
+            worker = new Worker(url);
+            worker.onmessage = (event) => {
+                const { id, error, ...result } = event.data;
+                const job = pendingJobs.get(id);
+                if (!job) {
+                    return;
+                }
+                pendingJobs.delete(id);
+                if (error) {
+                    job.reject(new Error(error));
+                } else {
+                    job.resolve(result);
+                }
+            };
+            worker.onerror = (event) => {
+                event.preventDefault();
+                fail(event.message || "could not run the worker script");
+            };
+            worker.onmessageerror = () => fail("could not read a reply");
+        }
+        return worker;
+    };
+
+    return (job) => new Promise((resolve, reject) => {
+        if (failure) {
+            reject(failure);
+            return;
+        }
+        const id = nextJobId++;
+        pendingJobs.set(id, { resolve, reject });
+        try {
+            getWorker().postMessage({ id, ...job });
+        } catch (error) {
+            // creating the worker is refused synchronously by some browsers
+            fail(error.message);
+        }
+    });
+};
+
+export { canUseWorkers, createWorkerRunner };
@@ -1,5 +1,5 @@
 import React from "react";
-import { render, screen, fireEvent, waitFor } from "@testing-library/react";
+import { act, render, screen, fireEvent, waitFor } from "@testing-library/react";
 import ChatComponent from "../../src/lib/components/ChatComponent";
 
 describe("ChatComponent", () => {
@@ -206,4 +206,297 @@ describe("ChatComponent", () => {
         expect(screen.queryByText("Old message")).not.toBeInTheDocument();
         expect(localStorage.getItem(id)).toBeNull();
     });
+
+    it("appends returned messages to the history in server history mode", () => {
+        const { rerender } = render(
+            <ChatComponent
+                {...defaultProps}
+                history_mode="server"
+                session_id="session-1"
+                messages={[{ role: "assistant", content: "Welcome!" }]}
+            />
+        );
+        rerender(
+            <ChatComponent
+                {...defaultProps}
+                history_mode="server"
+                session_id="session-1"
+                messages={[{ role: "assistant", content: "Second reply" }]}
+            />
+        );
+        expect(screen.getByText("Welcome!")).toBeInTheDocument();
+        expect(screen.getByText("Second reply")).toBeInTheDocument();
+    });
+
+    it("reports a generated session id in server history mode", () => {
+        const setProps = jest.fn();
+        render(<ChatComponent id="chat" history_mode="server" setProps={setProps} />);
+        expect(setProps).toHaveBeenCalledWith({ session_id: expect.any(String) });
+    });
+
+    it("streams deltas into the assistant bubble and replaces it with the final reply", () => {
+        const { rerender } = render(<ChatComponent {...defaultProps} />);
+        rerender(
+            <ChatComponent {...defaultProps} stream_delta={{ id: "reply-1", seq: 0, offset: 0, text: "Hello" }} />
+        );
+        expect(screen.getByText("Hello")).toBeInTheDocument();
+
+        rerender(
+            <ChatComponent {...defaultProps} stream_delta={{ id: "reply-1", seq: 1, offset: 5, text: " John" }} />
+        );
+        expect(screen.getByText("Hello John")).toBeInTheDocument();
+
+        // stale updates are ignored
+        rerender(
+            <ChatComponent {...defaultProps} stream_delta={{ id: "reply-1", seq: 1, offset: 0, text: "Stale" }} />
+        );
+        expect(screen.queryByText("Stale")).not.toBeInTheDocument();
+
+        rerender(
+            <ChatComponent
+                {...defaultProps}
+                messages={[{ role: "assistant", content: "Hello John Doe.", id: "reply-1" }]}
+            />
+        );
+        expect(screen.getByText("Hello John Doe.")).toBeInTheDocument();
+        expect(screen.queryByText("Hello John")).not.toBeInTheDocument();
+    });
+
+    it("uploads attachments to upload_url and sends only the file handle", async () => {
+        const handle = {
+            fileId: "5f0c2a0f9c3a4d7e8b1a2c3d4e5f6a7b",
+            fileName: "test-file.pdf",
+            fileType: "application/pdf",
+            fileSize: 13,
+            url: "/_dash-chat/uploads/5f0c2a0f9c3a4d7e8b1a2c3d4e5f6a7b",
+        };
+        global.fetch = jest.fn(() => Promise.resolve({ ok: true, json: () => Promise.resolve(handle) }));
+        const setProps = jest.fn();
+        render(<ChatComponent {...defaultProps} setProps={setProps} upload_url="/_dash-chat/uploads" />);
+
+        const testFile = new File(["dummy content"], "test-file.pdf", { type: "application/pdf" });
+        fireEvent.change(screen.getByTestId("file-input"), { target: { files: [testFile] } });
+        fireEvent.click(screen.getByTestId("send-button"));
+
+        await waitFor(() => {
+            expect(setProps).toHaveBeenCalledWith({
+                new_message: {
+                    role: "user",
+                    content: [
+                        { type: "text", text: "" },
+                        { type: "attachment", ...handle },
+                    ],
+                    id: 1741822740027,
+                },
+            });
+        });
+        expect(global.fetch).toHaveBeenCalledWith("/_dash-chat/uploads", expect.objectContaining({ method: "POST", body: testFile }));
+        // each browser gets a session of its own for the upload quotas
+        const [[, options]] = global.fetch.mock.calls;
+        expect(options.headers["X-Chat-Session"]).toEqual(expect.any(String));
+        expect(setProps).toHaveBeenCalledWith({ session_id: options.headers["X-Chat-Session"] });
+    });
+
+    it("only renders the latest messages when virtualized", () => {
+        const messages = Array.from({ length: 1000 }, (_, i) => ({
+            role: i % 2 ? "assistant" : "user",
+            content: `Message ${i}`,
+            id: `message-${i}`,
+        }));
+        const { container } = render(
+            <ChatComponent {...defaultProps} messages={messages} virtualize={true} overscan={2} />
+        );
+
+        const bubbles = container.querySelectorAll(".chat-bubble");
+        expect(bubbles.length).toBeGreaterThan(0);
+        expect(bubbles.length).toBeLessThan(50);
+        expect(screen.getByText("Message 999")).toBeInTheDocument();
+        expect(screen.queryByText("Message 0")).not.toBeInTheDocument();
+    });
+
+    it("loads server-side history a page at a time", () => {
+        const setProps = jest.fn();
+        const props = { ...defaultProps, setProps, history_mode: "server", session_id: "session-1", page_size: 2 };
+        const { container, rerender } = render(<ChatComponent {...props} />);
+        expect(setProps).toHaveBeenCalledWith({ request_history: { cursor: null, limit: 2 } });
+
+        rerender(
+            <ChatComponent
+                {...props}
+                history_page={{
+                    messages: [
+                        { role: "user", content: "Message 2", id: "m2" },
+                        { role: "assistant", content: "Message 3", id: "m3" },
+                    ],
+                    cursor: 2,
+                    has_more: true,
+                }}
+            />
+        );
+        expect(screen.getByText("Message 3")).toBeInTheDocument();
+
+        const chatMessages = container.querySelector(".chat-messages");
+        fireEvent.scroll(chatMessages);
+        expect(setProps).toHaveBeenCalledWith({ request_history: { cursor: 2, limit: 2 } });
+
+        rerender(
+            <ChatComponent
+                {...props}
+                history_page={{
+                    messages: [
+                        { role: "user", content: "Message 0", id: "m0" },
+                        { role: "assistant", content: "Message 1", id: "m1" },
+                    ],
+                    cursor: 0,
+                    has_more: false,
+                }}
+            />
+        );
+        const texts = [...container.querySelectorAll(".chat-bubble")].map((bubble) => bubble.textContent);
+        expect(texts).toEqual(["Message 0", "Message 1", "Message 2", "Message 3"]);
+
+        setProps.mockClear();
+        fireEvent.scroll(chatMessages);
+        expect(setProps).not.toHaveBeenCalled();
+    });
+
+    it("shows messages and deltas pushed to push_url", () => {
+        const sources = [];
+        global.EventSource = class {
+            constructor(url) {
+                this.url = url;
+                this.listeners = {};
+                sources.push(this);
+            }
+
+            addEventListener(type, listener) {
+                this.listeners[type] = listener;
+            }
+
+            emit(type, data, lastEventId) {
+                act(() => this.listeners[type]({ data: JSON.stringify(data), lastEventId }));
+            }
+
+            close() {
+                this.closed = true;
+            }
+        };
+        const setProps = jest.fn();
+        const { unmount } = render(
+            <ChatComponent {...defaultProps} setProps={setProps} session_id="s1" push_url="/_dash-chat/push" />
+        );
+        expect(sources).toHaveLength(1);
+        expect(sources[0].url).toBe("/_dash-chat/push?session=s1");
+
+        sources[0].emit("delta", { id: "r1", seq: 0, offset: 0, text: "Working" }, "a-0");
+        expect(screen.getByText("Working")).toBeInTheDocument();
+
+        const reply = { role: "assistant", content: "Done after a long tool run", id: "r1" };
+        sources[0].emit("message", reply, "a-1");
+        expect(screen.getByText("Done after a long tool run")).toBeInTheDocument();
+        expect(screen.queryByText("Working")).not.toBeInTheDocument();
+        expect(setProps).toHaveBeenCalledWith({ messages: [reply] });
+
+        unmount();
+        expect(sources[0].closed).toBe(true);
+        delete global.EventSource;
+    });
+
+    it("shows the job status and stops the job", () => {
+        const setProps = jest.fn();
+        const { rerender } = render(
+            <ChatComponent {...defaultProps} setProps={setProps} job_status={{ id: "j1", status: "queued", position: 2 }} />
+        );
+        expect(screen.getByTestId("typing-indicator")).toBeInTheDocument();
+        expect(screen.getByTestId("job-queue-status")).toHaveTextContent("Queued, 2 ahead");
+        expect(screen.queryByTestId("send-button")).not.toBeInTheDocument();
+
+        fireEvent.click(screen.getByTestId("stop-button"));
+        expect(setProps).toHaveBeenCalledWith({ cancel_job: "j1" });
+
+        rerender(<ChatComponent {...defaultProps} setProps={setProps} job_status={{ id: "j1", status: "cancelled" }} />);
+        expect(screen.queryByTestId("typing-indicator")).not.toBeInTheDocument();
+        expect(screen.getByTestId("send-button")).toBeInTheDocument();
+
+        // a late status from before the cancellation is ignored
+        rerender(<ChatComponent {...defaultProps} setProps={setProps} job_status={{ id: "j1", status: "running" }} />);
+        expect(screen.queryByTestId("stop-button")).not.toBeInTheDocument();
+    });
+
+    it("disables sending while a message is queued or rejected", () => {
+        jest.useFakeTimers();
+        const { rerender } = render(
+            <ChatComponent {...defaultProps} admission={{ status: "queued", position: 3 }} />
+        );
+        expect(screen.getByTestId("input-notice")).toHaveTextContent("Waiting for your turn, 3 ahead");
+        expect(screen.getByTestId("send-button")).toBeDisabled();
+
+        rerender(
+            <ChatComponent {...defaultProps} admission={{ status: "rejected", reason: "session_rate", retry_after: 2.5 }} />
+        );
+        expect(screen.getByTestId("input-notice")).toHaveTextContent(
+            "You are sending messages too quickly. Try again in 3 s."
+        );
+        expect(screen.getByTestId("send-button")).toBeDisabled();
+
+        act(() => jest.advanceTimersByTime(2500));
+        expect(screen.queryByTestId("input-notice")).not.toBeInTheDocument();
+        expect(screen.getByTestId("send-button")).not.toBeDisabled();
+        jest.useRealTimers();
+    });
+
+    it("searches the history and jumps to a match in an older page", () => {
+        jest.useFakeTimers();
+        const setProps = jest.fn();
+        const props = {
+            ...defaultProps, setProps, history_mode: "server", session_id: "session-1", page_size: 2, searchable: true,
+        };
+        const { container, rerender } = render(
+            <ChatComponent
+                {...props}
+                history_page={{
+                    messages: [
+                        { role: "user", content: "Message 8", id: "m8" },
+                        { role: "assistant", content: "Message 9", id: "m9" },
+                    ],
+                    cursor: 8,
+                    has_more: true,
+                }}
+            />
+        );
+
+        fireEvent.change(screen.getByTestId("search-input"), { target: { value: "rev" } });
+        fireEvent.change(screen.getByTestId("search-input"), { target: { value: "revenue " } });
+        act(() => jest.advanceTimersByTime(250));
+        expect(setProps.mock.calls.filter(([update]) => "search_query" in update)).toEqual([
+            [{ search_query: "revenue" }],
+        ]);
+
+        const results = [{ seq: 3, role: "assistant", snippet: ["Q3 ", "revenue", " table"] }];
+        rerender(<ChatComponent {...props} search_results={results} />);
+        expect(screen.getByTestId("search-results").querySelector("mark")).toHaveTextContent("revenue");
+
+        setProps.mockClear();
+        fireEvent.click(screen.getByText("revenue").closest("button"));
+        // every page up to the match at once
+        expect(setProps).toHaveBeenCalledWith({ request_history: { cursor: 8, limit: 5 } });
+        expect(screen.queryByTestId("search-results")).not.toBeInTheDocument();
+
+        rerender(
+            <ChatComponent
+                {...props}
+                search_results={results}
+                history_page={{
+                    messages: [3, 4, 5, 6, 7].map((seq) => ({ role: "assistant", content: `Message ${seq}` })),
+                    cursor: 3,
+                    has_more: true,
+                }}
+            />
+        );
+        expect(container.querySelector(".chat-bubble.highlighted")).toHaveTextContent("Message 3");
+
+        act(() => jest.advanceTimersByTime(2000));
+        expect(container.querySelector(".chat-bubble.highlighted")).toBeNull();
+        jest.useRealTimers();
+    });
 });
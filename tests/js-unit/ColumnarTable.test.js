@@ -0,0 +1,56 @@
+import React from "react";
+import { render, screen, fireEvent } from "@testing-library/react";
+import ColumnarTable from "../../src/private/ColumnarTable";
+
+const rows = (count) => Array.from({ length: count }, (_, i) => `row ${i}`);
+
+describe("ColumnarTable", () => {
+    it("decodes typed and dictionary encoded columns", () => {
+        render(
+            <ColumnarTable
+                item={{
+                    num_rows: 2,
+                    columns: [
+                        // Int32Array [3, 5]
+                        { name: "Orders", values: { dtype: "i4", bdata: "AwAAAAUAAAA=" } },
+                        { name: "City", dictionary: ["Lagos", "Paris"], codes: { dtype: "i1", bdata: "Af8=" } },
+                    ],
+                }}
+            />
+        );
+        expect(screen.getByText("Orders")).toBeInTheDocument();
+        expect(screen.getByText("5")).toBeInTheDocument();
+        expect(screen.getByText("Paris")).toBeInTheDocument();
+        expect(screen.queryByText("Lagos")).not.toBeInTheDocument();
+    });
+
+    it("pages through the rows and only mounts the visible ones", () => {
+        const { container } = render(
+            <ColumnarTable item={{ num_rows: 1000, page_size: 500, columns: [{ name: "Row", values: rows(1000) }] }} />
+        );
+        expect(screen.getByText("Rows 1–500 of 1000")).toBeInTheDocument();
+        expect(container.querySelectorAll("td").length).toBeLessThan(100);
+
+        fireEvent.click(screen.getByRole("button", { name: "next page" }));
+        expect(screen.getByText("Rows 501–1000 of 1000")).toBeInTheDocument();
+        expect(screen.getByText("row 500")).toBeInTheDocument();
+        expect(screen.getByRole("button", { name: "next page" })).toBeDisabled();
+    });
+
+    it("fetches later pages of tables kept on the server", async () => {
+        global.fetch = jest.fn(() => Promise.resolve({
+            ok: true,
+            json: () => Promise.resolve({ offset: 2, columns: [{ name: "Row", values: ["row 2"] }] }),
+        }));
+        render(
+            <ColumnarTable
+                item={{ num_rows: 3, page_size: 2, url: "/_dash-chat/tables/abc", columns: [{ name: "Row", values: rows(2) }] }}
+            />
+        );
+        expect(screen.getByText("row 1")).toBeInTheDocument();
+
+        fireEvent.click(screen.getByRole("button", { name: "next page" }));
+        expect(await screen.findByText("row 2")).toBeInTheDocument();
+        expect(global.fetch).toHaveBeenCalledWith("/_dash-chat/tables/abc?offset=2&limit=2");
+    });
+});
@@ -0,0 +1,123 @@
+import React from "react";
+import { render, screen, fireEvent, waitFor } from "@testing-library/react";
+import ChatComponent from "../../src/lib/components/ChatComponent";
+import openMessageStore from "../../src/private/indexedDbStore";
+
+// in-memory stand-in for IndexedDB, which jsdom does not provide
+jest.mock("../../src/private/indexedDbStore", () => {
+    const records = {};
+    const openStore = jest.fn((chatId) => {
+        records[chatId] = records[chatId] || new Map();
+        const chat = records[chatId];
+        return {
+            loadPage: jest.fn(async (beforeSeq, limit) => {
+                const seqs = [...chat.keys()]
+                    .filter((seq) => beforeSeq === null || seq < beforeSeq)
+                    .sort((a, b) => a - b);
+                const page = seqs.slice(-limit);
+                return {
+                    entries: page.map((seq) => ({ seq, message: chat.get(seq) })),
+                    hasMore: seqs.length > page.length,
+                };
+            }),
+            put: jest.fn(async (entries) => {
+                entries.forEach(({ seq, message }) => chat.set(seq, message));
+            }),
+            clear: jest.fn(async () => chat.clear()),
+        };
+    });
+    openStore.records = records;
+    return { __esModule: true, default: openStore };
+});
+
+const records = (chatId) => openMessageStore.records[chatId];
+
+describe("IndexedDB persistence", () => {
+    beforeAll(() => {
+        window.HTMLElement.prototype.scrollIntoView = jest.fn();
+    });
+
+    beforeEach(() => {
+        Object.keys(openMessageStore.records).forEach((chatId) => delete openMessageStore.records[chatId]);
+        localStorage.clear();
+    });
+
+    it("writes each sent message as its own record", async () => {
+        render(<ChatComponent id="chat" persistence={true} persistence_type="indexeddb" />);
+        await waitFor(() => expect(openMessageStore).toHaveBeenCalledWith("chat"));
+        const store = openMessageStore.mock.results[openMessageStore.mock.results.length - 1].value;
+        await waitFor(() => expect(store.loadPage).toHaveBeenCalled());
+
+        const inputField = screen.getByRole("textbox");
+        fireEvent.change(inputField, { target: { value: "First" } });
+        fireEvent.click(screen.getByTestId("send-button"));
+        await waitFor(() => expect(records("chat").size).toBe(1));
+
+        fireEvent.change(inputField, { target: { value: "Second" } });
+        fireEvent.click(screen.getByTestId("send-button"));
+        await waitFor(() => expect(records("chat").size).toBe(2));
+
+        // the second write only carries the new message
+        expect(store.put).toHaveBeenCalledTimes(2);
+        expect(store.put.mock.calls[1][0]).toEqual([
+            { seq: 1, message: expect.objectContaining({ content: "Second" }) },
+        ]);
+        expect(localStorage.getItem("chat")).toBeNull();
+    });
+
+    it("loads the newest page first and older pages when scrolled to the top", async () => {
+        openMessageStore("chat");
+        for (let seq = 0; seq < 60; seq++) {
+            records("chat").set(seq, { role: "assistant", content: `Message ${seq}`, id: seq });
+        }
+
+        const { container } = render(<ChatComponent id="chat" persistence={true} persistence_type="indexeddb" />);
+        expect(await screen.findByText("Message 59")).toBeInTheDocument();
+        expect(screen.getByText("Message 10")).toBeInTheDocument();
+        expect(screen.queryByText("Message 9")).not.toBeInTheDocument();
+
+        const chatMessages = container.querySelector(".chat-messages");
+        chatMessages.scrollTop = 0;
+        fireEvent.scroll(chatMessages);
+        expect(await screen.findByText("Message 0")).toBeInTheDocument();
+    });
+
+    it("replaces a stored reply instead of appending it again", async () => {
+        const { rerender } = render(
+            <ChatComponent id="chat" persistence={true} persistence_type="indexeddb" messages={[]} />
+        );
+        await waitFor(() => expect(openMessageStore).toHaveBeenCalledWith("chat"));
+        rerender(
+            <ChatComponent
+                id="chat"
+                persistence={true}
+                persistence_type="indexeddb"
+                messages={[{ role: "assistant", content: "Draft", id: "reply-1" }]}
+            />
+        );
+        await waitFor(() => expect(records("chat").size).toBe(1));
+        rerender(
+            <ChatComponent
+                id="chat"
+                persistence={true}
+                persistence_type="indexeddb"
+                messages={[{ role: "assistant", content: "Final", id: "reply-1" }]}
+            />
+        );
+        await waitFor(() => expect(records("chat").get(0).content).toBe("Final"));
+        expect(records("chat").size).toBe(1);
+    });
+
+    it("clears the stored messages on clear chat", async () => {
+        openMessageStore("chat");
+        records("chat").set(0, { role: "user", content: "Old message" });
+        render(<ChatComponent id="chat" persistence={true} persistence_type="indexeddb" />);
+        expect(await screen.findByText("Old message")).toBeInTheDocument();
+
+        fireEvent.click(screen.getByRole("button", { name: "clear" }));
+        fireEvent.click(screen.getByText("Clear chat"));
+
+        expect(screen.queryByText("Old message")).not.toBeInTheDocument();
+        await waitFor(() => expect(records("chat").size).toBe(0));
+    });
+});
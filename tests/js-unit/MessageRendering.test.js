@@ -0,0 +1,77 @@
+import React from "react";
+import { render, screen, fireEvent } from "@testing-library/react";
+import ChatComponent from "../../src/lib/components/ChatComponent";
+import renderMessageContent from "../../src/private/renderers";
+
+jest.mock("../../src/private/renderers", () => {
+    const actual = jest.requireActual("../../src/private/renderers");
+    return {
+        __esModule: true,
+        default: jest.fn(actual.default),
+    };
+});
+
+const KEYSTROKES = 20;
+
+const buildMessages = (count) => Array.from({ length: count }, (_, i) => ({
+    id: `message-${i}`,
+    role: i % 2 ? "assistant" : "user",
+    content: i % 2 ? `**Reply** number ${i}` : `Question ${i}`,
+}));
+
+// average time of one keystroke, after the history has been rendered
+const timeKeystrokes = (count) => {
+    const { unmount } = render(
+        <ChatComponent id={`chat-${count}`} messages={buildMessages(count)} setProps={() => {}} />
+    );
+    const input = screen.getByRole("textbox");
+    renderMessageContent.mockClear();
+
+    const start = performance.now();
+    for (let i = 1; i <= KEYSTROKES; i++) {
+        fireEvent.change(input, { target: { value: "a".repeat(i) } });
+    }
+    const perKeystroke = (performance.now() - start) / KEYSTROKES;
+
+    const calls = renderMessageContent.mock.calls.length;
+    unmount();
+    return { perKeystroke, calls };
+};
+
+describe("Message rendering", () => {
+    beforeAll(() => {
+        window.HTMLElement.prototype.scrollIntoView = jest.fn();
+    });
+
+    test("typing does not re-render the message history", () => {
+        const { calls } = timeKeystrokes(10);
+        expect(calls).toBe(0);
+    });
+
+    test("per-keystroke render cost does not grow with history length", () => {
+        // warm up so the first measurement does not pay for module setup
+        timeKeystrokes(10);
+        const small = timeKeystrokes(10);
+        const large = timeKeystrokes(5000);
+
+        expect(large.calls).toBe(0);
+        // 500 times more messages, allow generous noise on shared CI runners
+        expect(large.perKeystroke).toBeLessThan(Math.max(small.perKeystroke * 10, 5));
+    }, 60000);
+
+    test("re-rendering with new messages only renders the new ones", () => {
+        const messages = buildMessages(50);
+        const { rerender } = render(<ChatComponent id="chat" messages={messages} setProps={() => {}} />);
+        renderMessageContent.mockClear();
+
+        rerender(
+            <ChatComponent
+                id="chat"
+                messages={[...messages, { id: "message-50", role: "assistant", content: "New reply" }]}
+                setProps={() => {}}
+            />
+        );
+        expect(screen.getByText("New reply")).toBeInTheDocument();
+        expect(renderMessageContent).toHaveBeenCalledTimes(1);
+    });
+});
@@ -0,0 +1,149 @@
+import uploadInChunks from "../../src/private/chunkedUpload";
+
+const jsonResponse = (status, body) => Promise.resolve({ ok: status < 300, status, json: () => Promise.resolve(body) });
+
+describe("chunked uploads", () => {
+    const url = "/_dash-chat/uploads/chunked";
+    const handle = { fileId: "5f0c2a0f9c3a4d7e8b1a2c3d4e5f6a7b", fileName: "data.csv", fileSize: 10 };
+    let file;
+    let hashed;
+
+    beforeAll(() => {
+        Object.defineProperty(global, "crypto", { value: { subtle: {} }, configurable: true });
+        URL.createObjectURL = () => "blob:worker";
+        global.Worker = class {
+            postMessage(job) {
+                hashed.push(job.blob.size);
+                Promise.resolve().then(() => this.onmessage({ data: { id: job.id, hash: `hash-${job.blob.size}` } }));
+            }
+        };
+    });
+
+    afterAll(() => {
+        delete global.crypto;
+        delete global.Worker;
+        delete URL.createObjectURL;
+    });
+
+    beforeEach(() => {
+        hashed = [];
+        file = new File(["0123456789"], "data.csv", { type: "text/csv", lastModified: 1 });
+        window.sessionStorage.clear();
+        jest.spyOn(global, "setTimeout").mockImplementation((callback) => callback());
+    });
+
+    afterEach(() => {
+        jest.restoreAllMocks();
+    });
+
+    const chunkOffsets = () => global.fetch.mock.calls
+        .filter(([, options]) => options && options.method === "PUT")
+        .map(([, options]) => options.headers["X-Upload-Offset"]);
+
+    it("sends the file in hashed chunks and reports progress", async () => {
+        global.fetch = jest.fn((requestUrl, options) => {
+            if (options.method === "POST") {
+                expect(JSON.parse(options.body)).toEqual({ fileName: "data.csv", fileType: "text/csv", fileSize: 10, chunkSize: 4 });
+                return jsonResponse(201, { uploadId: "u1", chunkSize: 4, received: 0, fileSize: 10 });
+            }
+            const offset = Number(options.headers["X-Upload-Offset"]);
+            expect(options.headers["X-Chunk-SHA256"]).toBe(`hash-${Math.min(4, 10 - offset)}`);
+            return offset + 4 >= 10 ? jsonResponse(201, handle) : jsonResponse(200, { received: offset + 4 });
+        });
+        const progress = [];
+
+        const result = await uploadInChunks(file, { url, chunkSize: 4, onProgress: (value) => progress.push(value) });
+
+        expect(result).toEqual(handle);
+        expect(chunkOffsets()).toEqual(["0", "4", "8"]);
+        expect(hashed).toEqual([4, 4, 2]);
+        expect(progress).toEqual([0, 0.4, 0.8, 1]);
+        expect(window.sessionStorage.length).toBe(0);
+    });
+
+    it("resumes from the offset the server received after a dropped connection", async () => {
+        let dropped = false;
+        global.fetch = jest.fn((requestUrl, options = {}) => {
+            if (options.method === "POST") {
+                return jsonResponse(201, { uploadId: "u1", chunkSize: 4, received: 0, fileSize: 10 });
+            }
+            if (!options.method) {
+                // the dropped chunk did reach the server
+                return jsonResponse(200, { uploadId: "u1", chunkSize: 4, received: 8, fileSize: 10 });
+            }
+            const offset = Number(options.headers["X-Upload-Offset"]);
+            if (offset === 4 && !dropped) {
+                dropped = true;
+                return Promise.reject(new TypeError("Failed to fetch"));
+            }
+            return offset === 8 ? jsonResponse(201, handle) : jsonResponse(200, { received: offset + 4 });
+        });
+
+        expect(await uploadInChunks(file, { url, chunkSize: 4 })).toEqual(handle);
+        expect(chunkOffsets()).toEqual(["0", "4", "8"]);
+    });
+
+    it("continues an upload saved in sessionStorage", async () => {
+        window.sessionStorage.setItem(`dash-chat-upload:${url}:data.csv:10:1`, "u1");
+        global.fetch = jest.fn((requestUrl, options = {}) => {
+            if (!options.method) {
+                expect(requestUrl).toBe(`${url}/u1`);
+                return jsonResponse(200, { uploadId: "u1", chunkSize: 4, received: 4, fileSize: 10 });
+            }
+            const offset = Number(options.headers["X-Upload-Offset"]);
+            return offset === 8 ? jsonResponse(201, handle) : jsonResponse(409, { received: 8 });
+        });
+
+        expect(await uploadInChunks(file, { url, chunkSize: 4 })).toEqual(handle);
+        expect(chunkOffsets()).toEqual(["4", "8"]);
+    });
+
+    it("gives up on client errors", async () => {
+        global.fetch = jest.fn((requestUrl, options) => (options.method === "POST"
+            ? jsonResponse(201, { uploadId: "u1", chunkSize: 4, received: 0, fileSize: 10 })
+            : jsonResponse(413, {})));
+
+        await expect(uploadInChunks(file, { url, chunkSize: 4 })).rejects.toThrow("failed with status 413");
+        expect(window.sessionStorage.length).toBe(0);
+    });
+
+    it("hashes on the page when the worker fails", async () => {
+        let created = 0;
+        global.Worker = class {
+            constructor() {
+                created += 1;
+            }
+
+            postMessage() {
+                Promise.resolve().then(() => this.onerror({ message: "blocked by CSP", preventDefault: () => {} }));
+            }
+
+            terminate() {}
+        };
+        global.crypto.subtle.digest = jest.fn(() => Promise.resolve(new Uint8Array([1, 171]).buffer));
+        // older jsdom Blobs cannot be read as an ArrayBuffer
+        const { arrayBuffer } = Blob.prototype;
+        Blob.prototype.arrayBuffer = arrayBuffer || function read() {
+            return Promise.resolve(new ArrayBuffer(this.size));
+        };
+        global.fetch = jest.fn((requestUrl, options) => {
+            if (options.method === "POST") {
+                return jsonResponse(201, { uploadId: "u1", chunkSize: 4, received: 0, fileSize: 10 });
+            }
+            expect(options.headers["X-Chunk-SHA256"]).toBe("01ab");
+            const offset = Number(options.headers["X-Upload-Offset"]);
+            return offset + 4 >= 10 ? jsonResponse(201, handle) : jsonResponse(200, { received: offset + 4 });
+        });
+        let upload;
+        jest.isolateModules(() => {
+            upload = require("../../src/private/chunkedUpload").default;
+        });
+
+        expect(await upload(file, { url, chunkSize: 4 })).toEqual(handle);
+        expect(chunkOffsets()).toEqual(["0", "4", "8"]);
+        expect(global.crypto.subtle.digest).toHaveBeenCalledTimes(3);
+        // the broken worker is not created again for the next chunks
+        expect(created).toBe(1);
+        Blob.prototype.arrayBuffer = arrayBuffer;
+    });
+});
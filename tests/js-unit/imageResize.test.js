@@ -0,0 +1,97 @@
+import resizeImage from "../../src/private/imageResize";
+
+describe("image resizing", () => {
+    let reply;
+    let jobs;
+    const OriginalImage = global.Image;
+
+    beforeAll(() => {
+        global.OffscreenCanvas = class {};
+        global.createImageBitmap = () => {};
+        URL.createObjectURL = () => "blob:worker";
+        global.Worker = class {
+            postMessage(job) {
+                jobs.push(job);
+                setTimeout(() => this.onmessage({ data: { id: job.id, ...reply } }), 0);
+            }
+        };
+    });
+
+    afterAll(() => {
+        delete global.OffscreenCanvas;
+        delete global.createImageBitmap;
+        delete global.Worker;
+        global.Image = OriginalImage;
+        delete URL.createObjectURL;
+        delete URL.revokeObjectURL;
+    });
+
+    beforeEach(() => {
+        jobs = [];
+        jest.spyOn(console, "error").mockImplementation(() => {});
+    });
+
+    afterEach(() => {
+        jest.restoreAllMocks();
+    });
+
+    const photo = new File(["x".repeat(1000)], "photo.jpeg", { type: "image/jpeg" });
+
+    it("downscales and re-encodes images in the worker", async () => {
+        reply = { blob: new Blob(["small"], { type: "image/webp" }), scaled: true };
+        const resized = await resizeImage(photo, { maxDimension: 1024, format: "webp", quality: 0.8 });
+
+        expect(jobs).toHaveLength(1);
+        expect(jobs[0]).toMatchObject({ file: photo, maxDimension: 1024, type: "image/webp", quality: 0.8 });
+        expect(resized.name).toBe("photo.webp");
+        expect(resized.type).toBe("image/webp");
+        expect(resized.size).toBe(5);
+    });
+
+    it("keeps images that fit when re-encoding does not make them smaller", async () => {
+        reply = { blob: new Blob(["x".repeat(2000)], { type: "image/jpeg" }), scaled: false };
+        expect(await resizeImage(photo, { maxDimension: 4096 })).toBe(photo);
+    });
+
+    it("keeps the original file when decoding fails", async () => {
+        reply = { error: "InvalidStateError" };
+        expect(await resizeImage(photo, { maxDimension: 1024 })).toBe(photo);
+        expect(console.error).toHaveBeenCalled();
+    });
+
+    it("falls back to the page when the worker fails", async () => {
+        global.Worker = class {
+            postMessage() {
+                setTimeout(() => this.onerror({ message: "blocked by CSP", preventDefault: () => {} }), 0);
+            }
+
+            terminate() {}
+        };
+        const loaded = [];
+        global.Image = class {
+            set src(url) {
+                loaded.push(url);
+                setTimeout(() => this.onerror(), 0);
+            }
+        };
+        URL.revokeObjectURL = () => {};
+        let resize;
+        jest.isolateModules(() => {
+            resize = require("../../src/private/imageResize").default;
+        });
+
+        expect(await resize(photo, { maxDimension: 1024 })).toBe(photo);
+        expect(loaded).toEqual(["blob:worker"]);
+        expect(console.error).toHaveBeenCalledWith(new Error("Could not decode photo.jpeg"));
+    });
+
+    it("sends other files unchanged", async () => {
+        const pdf = new File(["%PDF"], "report.pdf", { type: "application/pdf" });
+        const gif = new File(["GIF89a"], "cat.gif", { type: "image/gif" });
+
+        expect(await resizeImage(pdf, { maxDimension: 1024 })).toBe(pdf);
+        expect(await resizeImage(gif, { maxDimension: 1024 })).toBe(gif);
+        expect(await resizeImage(photo, {})).toBe(photo);
+        expect(jobs).toHaveLength(0);
+    });
+});
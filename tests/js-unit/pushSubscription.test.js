@@ -0,0 +1,87 @@
+import subscribeToPush from "../../src/private/pushSubscription";
+
+describe("push subscription", () => {
+    let sources;
+
+    beforeAll(() => {
+        global.EventSource = class {
+            constructor(url) {
+                this.url = url;
+                this.listeners = {};
+                this.readyState = 0;
+                sources.push(this);
+            }
+
+            addEventListener(type, listener) {
+                this.listeners[type] = listener;
+            }
+
+            close() {
+                this.readyState = global.EventSource.CLOSED;
+            }
+        };
+        global.EventSource.CLOSED = 2;
+    });
+
+    afterAll(() => {
+        delete global.EventSource;
+    });
+
+    beforeEach(() => {
+        sources = [];
+        jest.useFakeTimers();
+    });
+
+    afterEach(() => {
+        jest.useRealTimers();
+    });
+
+    it("passes pushed messages, deltas and job statuses to their handlers", () => {
+        const onMessage = jest.fn();
+        const onDelta = jest.fn();
+        const onJob = jest.fn();
+        subscribeToPush("/_dash-chat/push", "s1", { onMessage, onDelta, onJob });
+
+        sources[0].listeners.message({ data: "{\"role\":\"assistant\",\"content\":\"Hi\"}", lastEventId: "a-0" });
+        sources[0].listeners.delta({ data: "{\"id\":\"r1\",\"text\":\"He\"}", lastEventId: "a-1" });
+
+        expect(onMessage).toHaveBeenCalledWith({ role: "assistant", content: "Hi" });
+        expect(onDelta).toHaveBeenCalledWith({ id: "r1", text: "He" });
+
+        sources[0].listeners.job({ data: "{\"id\":\"j1\",\"status\":\"running\"}", lastEventId: "a-2" });
+        expect(onJob).toHaveBeenCalledWith({ id: "j1", status: "running" });
+    });
+
+    it("reconnects with backoff from the last event received", () => {
+        const subscription = subscribeToPush("/_dash-chat/push", "s1", { onMessage: jest.fn(), onDelta: jest.fn() });
+        sources[0].listeners.message({ data: "{}", lastEventId: "a-4" });
+
+        // EventSource gives up when the server answers with an error
+        sources[0].readyState = global.EventSource.CLOSED;
+        sources[0].onerror();
+        jest.advanceTimersByTime(999);
+        expect(sources).toHaveLength(1);
+        jest.advanceTimersByTime(1);
+        expect(sources[1].url).toBe("/_dash-chat/push?session=s1&last_event_id=a-4");
+
+        sources[1].readyState = global.EventSource.CLOSED;
+        sources[1].onerror();
+        jest.advanceTimersByTime(1999);
+        expect(sources).toHaveLength(2);
+        jest.advanceTimersByTime(1);
+        expect(sources).toHaveLength(3);
+
+        subscription.close();
+        expect(sources[2].readyState).toBe(global.EventSource.CLOSED);
+        sources[2].onerror();
+        jest.advanceTimersByTime(60000);
+        expect(sources).toHaveLength(3);
+    });
+
+    it("leaves reconnecting to EventSource while it retries by itself", () => {
+        subscribeToPush("/_dash-chat/push", "s1", { onMessage: jest.fn(), onDelta: jest.fn() });
+        sources[0].onerror();
+        jest.advanceTimersByTime(60000);
+        expect(sources).toHaveLength(1);
+    });
+});
@@ -0,0 +1,33 @@
+import React from "react";
+import { render, screen, waitFor } from "@testing-library/react";
+import renderMessageContent from "../../src/private/renderers";
+
+describe("renderMessageContent", () => {
+    it("shows the raw text until the markdown renderer has loaded", async () => {
+        const { container } = render(<div>{renderMessageContent("**Bold** reply")}</div>);
+        expect(container.querySelector(".markdown-placeholder")).toHaveTextContent("**Bold** reply");
+
+        await waitFor(() => expect(container.querySelector(".markdown-placeholder")).not.toBeInTheDocument());
+        expect(screen.getByText("**Bold** reply")).toBeInTheDocument();
+
+        // once loaded, later messages render without a placeholder
+        const { container: next } = render(<div>{renderMessageContent("Second reply")}</div>);
+        expect(next.querySelector(".markdown-placeholder")).not.toBeInTheDocument();
+        expect(screen.getByText("Second reply")).toBeInTheDocument();
+    });
+
+    it("renders tables without loading any chunk", () => {
+        const { container } = render(
+            <div>
+                {renderMessageContent({
+                    type: "table",
+                    header: ["Name", "Age"],
+                    data: [["Alice", 30]],
+                    props: { striped: true },
+                })}
+            </div>
+        );
+        expect(container.querySelector("table")).toHaveClass("table table-striped");
+        expect(screen.getByText("Alice")).toBeInTheDocument();
+    });
+});
@@ -0,0 +1,76 @@
+import { createTurnTracker, jsonBytes } from "../../src/private/turnMetrics";
+
+describe("turn metrics", () => {
+    let clock;
+
+    beforeEach(() => {
+        clock = 0;
+        jest.spyOn(performance, "now").mockImplementation(() => clock);
+    });
+
+    afterEach(() => {
+        jest.restoreAllMocks();
+    });
+
+    const reply = { role: "assistant", content: "Hello" };
+
+    it("measures a streamed turn until its reply is rendered and persisted", () => {
+        const turns = [];
+        const tracker = createTurnTracker((turn) => turns.push(turn));
+        tracker.start({ messageId: 1, requestBytes: 40 });
+
+        clock = 50;
+        tracker.response(20, false);
+        clock = 60;
+        tracker.committed({ ...reply, streaming: true }, 2);
+        clock = 400;
+        tracker.response(100, true);
+        clock = 410;
+        tracker.committed(reply, 2);
+        const written = tracker.write();
+        tracker.settle();
+        expect(turns).toHaveLength(0);
+
+        clock = 425;
+        written();
+        expect(turns).toEqual([{
+            message_id: 1,
+            completed: true,
+            streamed: true,
+            upload_ms: null,
+            ack_ms: 50,
+            first_token_ms: 60,
+            render_ms: 10,
+            turn_ms: 410,
+            persistence_ms: 15,
+            request_bytes: 40,
+            response_bytes: 120,
+            history_length: 2,
+        }]);
+    });
+
+    it("reports an unfinished turn when the next one starts", () => {
+        const turns = [];
+        const tracker = createTurnTracker((turn) => turns.push(turn));
+        tracker.start({ messageId: 1, requestBytes: 40, uploadMs: 12.34 });
+        tracker.start({ messageId: 2, requestBytes: 40 });
+
+        expect(turns).toHaveLength(1);
+        expect(turns[0]).toMatchObject({ message_id: 1, completed: false, upload_ms: 12.3, turn_ms: null });
+    });
+
+    it("ignores user messages and writes outside a turn", () => {
+        const turns = [];
+        const tracker = createTurnTracker((turn) => turns.push(turn));
+        tracker.write()();
+        tracker.start({ messageId: 1, requestBytes: 40 });
+        tracker.committed({ role: "user", content: "Hi" }, 1);
+        tracker.settle();
+
+        expect(turns).toHaveLength(0);
+    });
+
+    it("measures JSON sizes in bytes", () => {
+        expect(jsonBytes({ content: "é" })).toBe(16);
+    });
+});
@@ -0,0 +1,29 @@
+import { decodeFigure, decodeTypedArray } from "../../src/private/typedArrays";
+
+describe("typed arrays", () => {
+    it("decodes a base64 spec into a typed array view", () => {
+        // Float64Array [1, 2]
+        const values = decodeTypedArray({ dtype: "f8", bdata: "AAAAAAAA8D8AAAAAAAAAQA==" });
+        expect(values).toBeInstanceOf(Float64Array);
+        expect(Array.from(values)).toEqual([1, 2]);
+    });
+
+    it("decodes 2-D specs into rows sharing one buffer", () => {
+        // Int32Array [0, 1, 2, 3, 4, 5]
+        const rows = decodeTypedArray({ dtype: "i4", bdata: "AAAAAAEAAAACAAAAAwAAAAQAAAAFAAAA", shape: "2, 3" });
+        expect(rows.map((row) => Array.from(row))).toEqual([[0, 1, 2], [3, 4, 5]]);
+        expect(rows[0].buffer).toBe(rows[1].buffer);
+    });
+
+    it("only decodes trace data", () => {
+        const figure = {
+            data: [{ type: "scatter", x: ["a", "b"], y: { dtype: "u1", bdata: "AQI=" }, marker: { size: 3 } }],
+            layout: { xaxis: { range: [0, 1] } },
+        };
+        const decoded = decodeFigure(figure);
+        expect(Array.from(decoded.data[0].y)).toEqual([1, 2]);
+        expect(decoded.data[0].x).toEqual(["a", "b"]);
+        expect(decoded.data[0].marker).toEqual({ size: 3 });
+        expect(decoded.layout).toBe(figure.layout);
+    });
+});
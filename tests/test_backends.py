@@ -0,0 +1,216 @@
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+
+from dash_chat.backends import (
+    BackendRunner,
+    ChatBackend,
+    FakeBackend,
+    OpenAIBackend,
+    to_openai_messages,
+)
+from dash_chat.streaming import stream_to_progress
+from dash_chat.uploads import UploadStore
+
+HISTORY = [{"role": "user", "content": "Hello there"}]
+
+
+@pytest.fixture
+def runner():
+    runner = BackendRunner()
+    yield runner
+    runner.close()
+
+
+def test_fake_backend_is_deterministic():
+    backend = FakeBackend()
+    assert asyncio.run(backend.complete(HISTORY)) == "You said: Hello there"
+
+    async def chunks():
+        return [chunk async for chunk in backend.stream(HISTORY)]
+
+    assert asyncio.run(chunks()) == ["You", " said:", " Hello", " there"]
+    assert FakeBackend(reply=lambda messages: str(len(messages))).calls == 0
+    assert asyncio.run(FakeBackend(reply="Hi").complete(HISTORY)) == "Hi"
+
+
+def test_submit_does_not_block(runner):
+    backend = FakeBackend(reply="Done", latency=0.2)
+
+    start = time.monotonic()
+    future = runner.submit(backend, HISTORY, session_key="s1")
+    assert time.monotonic() - start < 0.1
+    assert runner.pending("s1") == 1
+    assert runner.collect("s1") == []
+
+    reply = future.result(5)
+    assert reply["role"] == "assistant"
+    assert reply["content"] == "Done"
+    assert reply["id"]
+    assert runner.collect("s1") == [reply]
+    assert runner.pending("s1") == 0
+
+
+def test_sessions_are_answered_concurrently(runner):
+    backend = FakeBackend(latency=0.2)
+
+    start = time.monotonic()
+    futures = [
+        runner.submit(backend, HISTORY, session_key="s{}".format(i)) for i in range(20)
+    ]
+    for future in futures:
+        future.result(5)
+    # 20 slow generations share one thread and wait together
+    assert time.monotonic() - start < 1
+    assert backend.peak_concurrency == 20
+
+
+def test_backend_concurrency_limit(runner):
+    backend = FakeBackend(latency=0.05, max_concurrency=3)
+
+    futures = [
+        runner.submit(backend, HISTORY, session_key="s{}".format(i)) for i in range(10)
+    ]
+    for future in futures:
+        future.result(5)
+    assert backend.calls == 10
+    assert backend.peak_concurrency == 3
+
+
+def test_session_requests_run_in_order(runner):
+    answers = iter(["first", "second", "third"])
+    backend = FakeBackend(reply=lambda messages: next(answers), latency=0.02)
+
+    futures = [runner.submit(backend, HISTORY, session_key="s1") for _ in range(3)]
+    futures[-1].result(5)
+    replies = runner.collect("s1")
+    assert [reply["content"] for reply in replies] == ["first", "second", "third"]
+    assert backend.peak_concurrency == 1
+
+
+def test_collect_raises_failures(runner):
+    class FailingBackend(ChatBackend):
+        async def complete(self, messages, **options):
+            raise RuntimeError("model unavailable")
+
+    future = runner.submit(FailingBackend(), HISTORY, session_key="s1")
+    with pytest.raises(RuntimeError):
+        future.result(5)
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        runner.collect("s1")
+    assert runner.pending("s1") == 0
+
+
+def test_a_failure_does_not_lose_other_replies(runner):
+    answers = iter(["first", RuntimeError("model unavailable"), "third"])
+
+    def reply(messages):
+        answer = next(answers)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    backend = FakeBackend(reply=reply)
+    futures = [runner.submit(backend, HISTORY, session_key="s1") for _ in range(3)]
+    for future in futures:
+        try:
+            future.result(5)
+        except RuntimeError:
+            pass
+
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        runner.collect("s1")
+    assert [reply["content"] for reply in runner.collect("s1")] == ["first", "third"]
+    assert runner.pending("s1") == 0
+
+
+def test_run_and_stream(runner):
+    backend = FakeBackend(chunk_latency=0.01)
+    assert runner.run(backend, HISTORY, timeout=5)["content"] == "You said: Hello there"
+
+    progress = []
+    message = stream_to_progress(
+        progress.append, runner.stream(backend, HISTORY, timeout=5), interval=0
+    )
+    assert message["content"] == "You said: Hello there"
+    assert progress[-1]["text"] == message["content"]
+
+
+def test_closing_stream_early_cancels_request(runner):
+    backend = FakeBackend(reply="one two three four", chunk_latency=0.05)
+
+    chunks = runner.stream(backend, HISTORY, session_key="s1", timeout=5)
+    assert next(chunks) == "one"
+    chunks.close()
+    time.sleep(0.1)
+    assert backend.active == 0
+
+
+def test_to_openai_messages():
+    messages = [
+        {"role": "system", "content": "Be brief.", "id": "m0"},
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "What is this?"},
+                {
+                    "type": "attachment",
+                    "file": "data:image/png;base64,AAAA",
+                    "fileName": "a.png",
+                    "fileType": "image/png",
+                },
+                {"type": "attachment", "file": "x", "fileType": "text/csv"},
+            ],
+        },
+    ]
+    assert to_openai_messages(messages) == [
+        {"role": "system", "content": "Be brief."},
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "What is this?"},
+                {
+                    "type": "image_url",
+                    "image_url": {"url": "data:image/png;base64,AAAA"},
+                },
+            ],
+        },
+    ]
+
+
+def test_uploaded_images_are_sent_inline(tmp_path):
+    store = UploadStore(str(tmp_path), url="/_dash-chat/uploads")
+    handle = store.save(io.BytesIO(b"\x89PNG"), "chart.png", "image/png")
+    messages = [{"role": "user", "content": [handle]}]
+
+    with pytest.raises(ValueError, match="chart.png"):
+        to_openai_messages(messages)
+    [message] = to_openai_messages(messages, store)
+    assert message["content"] == [
+        {"type": "image_url", "image_url": {"url": "data:image/png;base64,iVBORw=="}}
+    ]
+
+
+def test_uploaded_images_are_read_off_the_event_loop(tmp_path):
+    threads = []
+
+    class RecordingStore(UploadStore):
+        def open(self, handle, mode="rb"):
+            threads.append(threading.get_ident())
+            return super().open(handle, mode)
+
+    store = RecordingStore(str(tmp_path), url="/_dash-chat/uploads")
+    handle = store.save(io.BytesIO(b"\x89PNG"), "chart.png", "image/png")
+    backend = OpenAIBackend(upload_store=store)
+
+    async def convert():
+        return threading.get_ident(), await backend._messages(
+            [{"role": "user", "content": [handle]}]
+        )
+
+    loop_thread, [message] = asyncio.run(convert())
+    assert message["content"][0]["image_url"]["url"].startswith("data:image/png")
+    assert threads and loop_thread not in threads
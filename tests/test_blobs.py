@@ -0,0 +1,189 @@
+import hashlib
+import io
+import os
+import threading
+
+import flask
+import pytest
+from dash_chat import blobs, uploads
+
+
+def _save(store, data, session_key="session-1", name="file.bin"):
+    return store.save(io.BytesIO(data), name, "image/png", session_key=session_key)
+
+
+def _object_count(store):
+    return sum(
+        len(files) for _, _, files in os.walk(os.path.join(store.root, "objects"))
+    )
+
+
+def test_identical_uploads_are_stored_once(tmp_path):
+    store = blobs.BlobStore(str(tmp_path))
+    first = _save(store, b"same screenshot", "session-1", "a.png")
+    second = _save(store, b"same screenshot", "session-2", "b.png")
+
+    assert first["fileId"] == second["fileId"]
+    assert first["fileId"] == hashlib.sha256(b"same screenshot").hexdigest()
+    assert second["fileName"] == "b.png"
+    assert _object_count(store) == 1
+    assert store.total_bytes() == len(b"same screenshot")
+    with store.open(first) as f:
+        assert f.read() == b"same screenshot"
+
+
+def test_stores_sharing_a_root_save_the_same_file_concurrently(tmp_path):
+    # one index connection each, as in separate server processes
+    stores = [blobs.BlobStore(str(tmp_path)) for _ in range(4)]
+    errors = []
+
+    def upload(store, writer):
+        try:
+            for i in range(20):
+                _save(store, b"same report %d" % i, "session-{}".format(writer))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=upload, args=(store, writer))
+        for writer, store in enumerate(stores)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert _object_count(stores[0]) == 20
+    assert stores[0].total_bytes("session-3") == stores[0].total_bytes()
+
+
+def test_session_quota_evicts_least_recently_used(tmp_path):
+    store = blobs.BlobStore(str(tmp_path), max_session_bytes=10)
+    old = _save(store, b"aaaaaa")
+    new = _save(store, b"bbbbbb")
+
+    assert store.total_bytes("session-1") == 6
+    assert not os.path.exists(store.path(old))
+    assert os.path.exists(store.path(new))
+
+
+def test_session_quota_keeps_blobs_shared_with_other_sessions(tmp_path):
+    store = blobs.BlobStore(str(tmp_path), max_session_bytes=10)
+    shared = _save(store, b"aaaaaa", "session-1")
+    _save(store, b"aaaaaa", "session-2")
+    _save(store, b"bbbbbb", "session-1")
+
+    assert store.total_bytes("session-1") == 6
+    assert store.total_bytes("session-2") == 6
+    assert os.path.exists(store.path(shared))
+
+
+def test_global_quota_evicts_least_recently_used(tmp_path):
+    store = blobs.BlobStore(str(tmp_path), max_bytes=10)
+    first = _save(store, b"aaaa", "session-1")
+    second = _save(store, b"bbbb", "session-2")
+    store.touch(first)
+    _save(store, b"cccc", "session-3")
+
+    assert store.total_bytes() == 8
+    assert os.path.exists(store.path(first))
+    assert not os.path.exists(store.path(second))
+
+
+def test_file_larger_than_quota_is_rejected(tmp_path):
+    store = blobs.BlobStore(str(tmp_path), max_session_bytes=4)
+    with pytest.raises(blobs.QuotaExceeded):
+        _save(store, b"too large")
+    assert _object_count(store) == 0
+    assert os.listdir(os.path.join(store.root, "tmp")) == []
+
+
+def test_uploads_without_a_session_are_rejected_with_session_quotas(tmp_path):
+    app = flask.Flask(__name__)
+    store = blobs.register(app, root=str(tmp_path), max_session_bytes=10)
+    uploads.register(app, store=store)
+    client = app.test_client()
+    headers = {"Content-Type": "text/plain", "X-File-Name": "notes.txt"}
+
+    assert (
+        client.post(store.upload_url, data=b"first", headers=headers).status_code == 400
+    )
+    chunked = client.post(
+        store.upload_url + "/chunked", json={"fileName": "notes.txt", "fileSize": 5}
+    )
+    assert chunked.status_code == 400
+    with pytest.raises(uploads.SessionRequired):
+        _save(store, b"first", session_key="")
+    assert store.total_bytes() == 0
+
+    headers["X-Chat-Session"] = "session-1"
+    assert (
+        client.post(store.upload_url, data=b"first", headers=headers).status_code == 201
+    )
+    assert store.total_bytes("session-1") == 5
+
+
+def test_release_deletes_unshared_blobs(tmp_path):
+    store = blobs.BlobStore(str(tmp_path))
+    own = _save(store, b"own", "session-1")
+    shared = _save(store, b"shared", "session-1")
+    _save(store, b"shared", "session-2")
+
+    store.release("session-1")
+
+    assert not os.path.exists(store.path(own))
+    assert os.path.exists(store.path(shared))
+
+
+def test_uploads_are_served_from_immutable_urls(tmp_path):
+    app = flask.Flask(__name__)
+    store = blobs.register(app, root=str(tmp_path))
+    uploads.register(app, store=store)
+    client = app.test_client()
+
+    response = client.post(
+        store.upload_url,
+        data=b"0123456789",
+        headers={
+            "Content-Type": "text/csv",
+            "X-File-Name": "data.csv",
+            "X-Chat-Session": "session-1",
+        },
+    )
+    handle = response.get_json()
+    digest = hashlib.sha256(b"0123456789").hexdigest()
+    assert handle["url"] == "/_dash-chat/blobs/" + digest
+    assert store.total_bytes("session-1") == 10
+
+    blob = client.get(handle["url"])
+    assert blob.data == b"0123456789"
+    assert blob.headers["ETag"] == '"{}"'.format(digest)
+    assert "immutable" in blob.headers["Cache-Control"]
+
+    partial = client.get(handle["url"], headers={"Range": "bytes=2-4"})
+    assert partial.status_code == 206
+    assert partial.data == b"234"
+
+    assert client.get("/_dash-chat/blobs/" + "0" * 64).status_code == 404
+
+
+def test_scriptable_blobs_are_private_downloads(tmp_path):
+    app = flask.Flask(__name__)
+    store = blobs.register(app, root=str(tmp_path))
+    client = app.test_client()
+    svg = store.save(
+        io.BytesIO(b"<svg onload='alert(1)'/>"), "logo.svg", "image/svg+xml"
+    )
+    image = _save(store, b"png bytes")
+
+    blob = client.get("/_dash-chat/blobs/" + svg["fileId"])
+    assert blob.headers["Content-Disposition"].startswith("attachment;")
+    assert blob.headers["X-Content-Type-Options"] == "nosniff"
+    assert blob.headers["Content-Security-Policy"] == "sandbox"
+    assert "private" in blob.headers["Cache-Control"]
+    assert "public" not in blob.headers["Cache-Control"]
+
+    blob = client.get("/_dash-chat/blobs/" + image["fileId"])
+    assert blob.headers["Content-Disposition"].startswith("inline;")
+    assert "public" in blob.headers["Cache-Control"]
@@ -0,0 +1,264 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from dash_chat.backends import BackendRunner, FakeBackend, OpenAIBackend
+from dash_chat.cache import CachedBackend, ResponseCache, cache_key, cached_reply
+
+HISTORY = [{"role": "user", "content": "What are your opening hours?"}]
+
+
+def test_cache_key_ignores_ids_and_key_order():
+    a = [{"id": "1", "role": "user", "content": [{"type": "text", "text": "Hi"}]}]
+    b = [{"content": [{"text": "Hi", "type": "text"}], "role": "user", "id": "2"}]
+    assert cache_key(a, model="m") == cache_key(b, model="m")
+    assert cache_key(a, model="m") != cache_key(a, model="other")
+    assert cache_key(a, model="m") != cache_key(a + a, model="m")
+
+
+def test_hits_and_misses():
+    cache = ResponseCache()
+    assert cache.get("k") is None
+    cache.set("k", "reply")
+    assert cache.get("k") == "reply"
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "coalesced": 0,
+        "evictions": 0,
+        "entries": 1,
+        "bytes": len('"reply"'),
+    }
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache = ResponseCache(max_bytes=20)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    assert cache.get("a") is None
+    assert cache.get("b") == "y" * 10
+    cache.set("huge", "z" * 100)
+    assert cache.get("huge") is None
+    assert cache.stats()["bytes"] <= 20
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = ResponseCache(ttl=10)
+    cache.set("k", "reply")
+    now[0] += 9
+    assert cache.get("k") == "reply"
+    now[0] += 2
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path=path)
+    cache.set("k", {"text": "reply"})
+    cache.close()
+
+    cache = ResponseCache(path=path)
+    assert len(cache) == 0
+    assert cache.get("k") == {"text": "reply"}
+    assert len(cache) == 1
+
+
+def test_sqlite_tier_is_capped(tmp_path):
+    cache = ResponseCache(max_entries=3, path=str(tmp_path / "cache.db"))
+    for i in range(10):
+        cache.set(str(i), i)
+    (count,) = cache._conn.execute("SELECT COUNT(*) FROM dash_chat_cache").fetchone()
+    assert count == 3
+    assert cache.get("9") == 9
+    assert cache._database_totals() == (3, 3)
+    cache.set("9", 99)
+    assert cache._database_totals() == (3, 4)
+
+
+def test_sqlite_tier_totals_are_shared(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = ResponseCache(max_entries=4, path=path)
+    second = ResponseCache(max_entries=4, path=path)
+    for i in range(3):
+        first.set("a{}".format(i), i)
+        second.set("b{}".format(i), i)
+    (count,) = first._conn.execute("SELECT COUNT(*) FROM dash_chat_cache").fetchone()
+    assert count == 4
+    assert second._database_totals() == (4, 4)
+    assert first.get("b2") == 2
+    plan = " ".join(
+        row[-1]
+        for row in first._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT key, size FROM dash_chat_cache ORDER BY used"
+        )
+    )
+    assert "dash_chat_cache_used" in plan
+
+
+def test_concurrent_misses_are_coalesced():
+    cache = ResponseCache()
+    calls = []
+
+    def generate():
+        calls.append(1)
+        time.sleep(0.2)
+        return "Open 9 to 5."
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cached_reply(cache, HISTORY, generate))
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["Open 9 to 5."] * 8
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 7
+    assert cached_reply(cache, HISTORY, generate) == "Open 9 to 5."
+    assert len(calls) == 1
+
+
+def test_failures_are_not_cached():
+    cache = ResponseCache()
+
+    def fail():
+        raise RuntimeError("rate limited")
+
+    with pytest.raises(RuntimeError):
+        cached_reply(cache, HISTORY, fail)
+    assert cached_reply(cache, HISTORY, lambda: "ok") == "ok"
+
+
+def test_message_opt_out():
+    cache = ResponseCache()
+    cached_reply(cache, HISTORY, lambda: "cached")
+    fresh = [dict(HISTORY[0], cache=False)]
+    assert cached_reply(cache, fresh, lambda: "fresh") == "fresh"
+    assert cached_reply(cache, HISTORY, lambda: "other") == "cached"
+
+
+def test_cached_backend_coalesces_on_runner():
+    runner = BackendRunner()
+    try:
+        backend = FakeBackend(reply="Open 9 to 5.", latency=0.1)
+        cache = ResponseCache()
+        cached = CachedBackend(backend, cache)
+
+        futures = [runner.submit(cached, HISTORY, session_key=str(i)) for i in range(5)]
+        assert {future.result(5)["content"] for future in futures} == {"Open 9 to 5."}
+        assert backend.calls == 1
+        assert runner.run(cached, HISTORY, timeout=5)["content"] == "Open 9 to 5."
+        assert backend.calls == 1
+        assert "".join(runner.stream(cached, HISTORY, timeout=5)) == "Open 9 to 5."
+        assert backend.calls == 1
+        assert cache.stats()["coalesced"] == 4
+    finally:
+        runner.close()
+
+
+def test_cached_backend_coalesces_streams_on_runner():
+    runner = BackendRunner()
+    try:
+        backend = FakeBackend(reply="Open 9 to 5.", latency=0.1, chunk_latency=0.02)
+        cache = ResponseCache()
+        cached = CachedBackend(backend, cache)
+        results = []
+
+        def read():
+            results.append(list(runner.stream(cached, HISTORY, timeout=5)))
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        completed = runner.submit(cached, HISTORY, session_key="other")
+        for thread in threads:
+            thread.join()
+
+        assert ["".join(chunks) for chunks in results] == ["Open 9 to 5."] * 4
+        assert completed.result(5)["content"] == "Open 9 to 5."
+        assert backend.calls == 1
+        assert cache.stats()["coalesced"] == 4
+        assert cache.get(cached._key(HISTORY, {})) == "Open 9 to 5."
+    finally:
+        runner.close()
+
+
+def test_cached_backend_stream_closed_early_is_cancelled():
+    runner = BackendRunner()
+    try:
+        backend = FakeBackend(reply="one two three", chunk_latency=0.2)
+        cache = ResponseCache()
+        cached = CachedBackend(backend, cache)
+        chunks = runner.stream(cached, HISTORY, timeout=5)
+        assert next(chunks) == "one"
+        chunks.close()
+        time.sleep(0.1)
+        assert backend.active == 0
+        assert cache.get(cached._key(HISTORY, {})) is None
+        assert "".join(runner.stream(cached, HISTORY, timeout=5)) == "one two three"
+    finally:
+        runner.close()
+
+
+def test_cached_backend_keys_include_backend_settings():
+    cache = ResponseCache()
+    cold = OpenAIBackend(model="m", temperature=0)
+    hot = OpenAIBackend(model="m", temperature=1)
+    other = OpenAIBackend(model="m", base_url="https://other.example/v1")
+    keys = {
+        CachedBackend(backend, cache)._key(HISTORY, {})
+        for backend in (cold, hot, other)
+    }
+    assert len(keys) == 3
+    # request options override the backend's
+    assert CachedBackend(cold, cache)._key(HISTORY, {"temperature": 1}) == (
+        CachedBackend(hot, cache)._key(HISTORY, {})
+    )
+
+
+def test_cached_backend_reads_the_cache_off_the_event_loop():
+    class SlowCache(ResponseCache):
+        def _fetch(self, key):
+            time.sleep(0.2)
+            return super()._fetch(key)
+
+    cached = CachedBackend(FakeBackend(reply="ok"), SlowCache())
+
+    async def run():
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.ensure_future(tick())
+        replies = [await cached.complete(HISTORY)]
+        replies.append("".join([chunk async for chunk in cached.stream(HISTORY)]))
+        ticker.cancel()
+        return replies, len(ticks)
+
+    replies, ticks = asyncio.run(run())
+    assert replies == ["ok", "ok"]
+    # the loop kept running while the cache was read twice
+    assert ticks >= 20
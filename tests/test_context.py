@@ -0,0 +1,128 @@
+from dash_chat.context import (
+    ATTACHMENT_TOKENS,
+    MESSAGE_OVERHEAD,
+    ContextManager,
+    PinSystem,
+    RollingSummary,
+    SlidingWindow,
+    TokenCounter,
+)
+
+
+def _turns(n):
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": "message {:04d}".format(i),
+            "id": i,
+        }
+        for i in range(n)
+    ]
+
+
+def test_token_counts_are_cached():
+    counter = TokenCounter()
+    messages = _turns(10)
+    total = counter.total(messages)
+    assert total == 10 * (MESSAGE_OVERHEAD + 3)
+    assert counter.counted == 10
+
+    messages.append({"role": "user", "content": "and one more", "id": 10})
+    counter.total(messages)
+    assert counter.counted == 11
+
+
+def test_messages_without_id_are_cached_by_content():
+    counter = TokenCounter()
+    counter.count({"role": "user", "content": "Hello"})
+    counter.count({"role": "user", "content": "Hello"})
+    counter.count({"role": "assistant", "content": "Hello"})
+    assert counter.counted == 2
+    # same length and role, other text
+    counter.count({"role": "user", "content": "Hullo"})
+    assert counter.counted == 3
+    # an id equal to the length of an unidentified message's text
+    counter.count({"role": "user", "content": "Hello", "id": 5})
+    assert counter.counted == 4
+
+
+def test_attachments_are_counted_by_reference():
+    counter = TokenCounter()
+    message = {
+        "role": "user",
+        "content": [
+            {"type": "text", "text": "What is this?"},
+            {
+                "type": "attachment",
+                "file": "data:image/png;base64," + "A" * 1000000,
+                "fileName": "chart.png",
+                "fileType": "image/png",
+            },
+        ],
+    }
+    tokens = counter.count(message)
+    assert tokens < MESSAGE_OVERHEAD + ATTACHMENT_TOKENS + 20
+
+
+def test_sliding_window_keeps_newest_messages():
+    context = ContextManager(max_tokens=7 * 5)
+    messages = _turns(20)
+    prompt = context.prompt(messages)
+    assert prompt == messages[-5:]
+    assert context.count(prompt) <= context.budget
+
+
+def test_sliding_window_always_keeps_newest_message():
+    counter = TokenCounter()
+    messages = _turns(3)
+    assert SlidingWindow().select(messages, 1, counter) == messages[-1:]
+
+
+def test_reserve_is_left_for_the_reply():
+    context = ContextManager(max_tokens=7 * 5, reserve=7 * 2)
+    assert len(context.prompt(_turns(20))) == 3
+
+
+def test_pinned_system_messages():
+    system = {"role": "system", "content": "Be brief.", "id": "system"}
+    messages = [system] + _turns(20)
+    context = ContextManager(max_tokens=7 * 5, policy=PinSystem())
+    prompt = context.prompt(messages)
+    assert prompt[0] == system
+    assert prompt[1:] == messages[-4:]
+
+
+def test_rolling_summary_only_summarizes_new_evictions():
+    calls = []
+
+    def summarize(messages, previous):
+        calls.append([message["id"] for message in messages])
+        return (previous or "") + "".join(str(m["id"]) for m in messages)
+
+    policy = RollingSummary(summarize, summary_tokens=7)
+    context = ContextManager(max_tokens=7 * 4, policy=policy)
+
+    messages = _turns(5)
+    prompt = context.prompt(messages, session_key="s1")
+    assert prompt[0]["role"] == "system"
+    assert prompt[0]["content"].endswith(": 01")
+    assert prompt[1:] == messages[2:]
+
+    messages = _turns(7)
+    prompt = context.prompt(messages, session_key="s1")
+    assert prompt[0]["content"].endswith(": 0123")
+    assert calls == [[0, 1], [2, 3]]
+
+    # nothing new dropped out, the summary is reused
+    context.prompt(messages, session_key="s1")
+    assert len(calls) == 2
+
+    # another session has its own summary
+    context.prompt(_turns(5), session_key="s2")
+    assert calls[-1] == [0, 1]
+
+
+def test_rolling_summary_without_evictions():
+    policy = RollingSummary(lambda messages, previous: "unused", summary_tokens=7)
+    messages = _turns(2)
+    assert ContextManager(max_tokens=100, policy=policy).prompt(messages) == messages
@@ -0,0 +1,111 @@
+import json
+
+import numpy as np
+import pytest
+from dash_chat import figures
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(10000)
+    y = np.zeros(10000)
+    y[5000] = 100.0
+    indices = figures.lttb_indices(x, y, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 9999
+    assert 5000 in indices
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_small_thresholds_keep_the_endpoints():
+    x = np.arange(10)
+    y = np.arange(10.0)
+    assert list(figures.lttb_indices(x, y, 2)) == [0, 9]
+    assert list(figures.lttb_indices(x, y, 20)) == list(range(10))
+    with pytest.raises(ValueError):
+        figures.lttb_indices(x, y, 1)
+    with pytest.raises(ValueError):
+        figures.compact_figure({"data": []}, max_points=1)
+
+
+def test_grid_indices_are_ordered_and_within_budget():
+    rng = np.random.default_rng(0)
+    x, y = rng.random(50000), rng.random(50000)
+    indices = figures.grid_indices(x, y, 400)
+
+    assert 0 < len(indices) <= 400
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_encode_array_round_trip():
+    values = np.linspace(0, 1, 7)
+    spec = figures.encode_array(values)
+    assert spec["dtype"] == "f8"
+    np.testing.assert_array_equal(figures.decode_array(spec), values)
+
+    matrix = figures.encode_array(np.arange(6, dtype=np.int64).reshape(2, 3))
+    assert matrix["dtype"] == "i4"
+    assert matrix["shape"] == "2, 3"
+    assert figures.decode_array(matrix).tolist() == [[0, 1, 2], [3, 4, 5]]
+
+    assert figures.encode_array(["a", "b"]) is None
+    assert figures.encode_array([True, False]) is None
+
+
+def test_compact_figure_downsamples_and_encodes_lines():
+    n = 100000
+    figure = {
+        "data": [{"type": "scatter", "y": np.sin(np.arange(n) / 100.0)}],
+        "layout": {"xaxis": {"range": [0, n]}},
+    }
+    compact = figures.compact_figure(figure, max_points=1000)
+    trace = compact["data"][0]
+
+    assert len(figures.decode_array(trace["y"])) == 1000
+    x = figures.decode_array(trace["x"])
+    assert x[0] == 0 and x[-1] == n - 1
+    # layout arrays are not data arrays and stay lists
+    assert compact["layout"]["xaxis"]["range"] == [0, n]
+    assert len(json.dumps(compact)) < 50000
+    # the input figure is left alone
+    assert len(figure["data"][0]["y"]) == n
+
+
+def test_compact_figure_slices_per_point_arrays():
+    n = 5000
+    figure = {
+        "data": [
+            {
+                "type": "scatter",
+                "mode": "markers",
+                "x": list(np.random.default_rng(1).random(n)),
+                "y": list(np.random.default_rng(2).random(n)),
+                "text": ["point {}".format(i) for i in range(n)],
+                "marker": {"color": list(range(n)), "line": {"width": 1}},
+            }
+        ]
+    }
+    trace = figures.compact_figure(figure, max_points=100)["data"][0]
+    kept = figures.decode_array(trace["marker"]["color"])
+
+    assert len(kept) <= 100
+    assert trace["text"] == ["point {}".format(i) for i in kept]
+    assert trace["marker"]["line"] == {"width": 1}
+
+
+def test_compact_figure_without_encoding_returns_lists():
+    figure = {"data": [{"type": "bar", "x": ["a", "b"], "y": np.array([1, 2])}]}
+    compact = figures.compact_figure(figure, encode=False)
+    assert compact["data"][0]["y"] == [1, 2]
+    assert compact["data"][0]["x"] == ["a", "b"]
+
+
+def test_graph_accepts_plotly_figures():
+    go = pytest.importorskip("plotly.graph_objects")
+    fig = go.Figure(go.Scatter(x=np.arange(20000), y=np.arange(20000) % 7))
+    part = figures.graph(fig, max_points=500, config={"displaylogo": False})
+
+    assert part["type"] == "graph"
+    assert part["props"]["config"] == {"displaylogo": False}
+    trace = part["props"]["figure"]["data"][0]
+    assert len(figures.decode_array(trace["x"])) == 500
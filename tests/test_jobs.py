@@ -0,0 +1,257 @@
+import threading
+import time
+
+import pytest
+
+from dash_chat import jobs
+from dash_chat.push import PushHub
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(handler, **options):
+        pool = jobs.JobPool(handler, poll_interval=0.05, **options)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def test_jobs_report_status_and_deliver_replies(make_pool):
+    release = threading.Event()
+
+    def handler(job):
+        release.wait(5)
+        return "Echo: {}".format(job.payload["text"])
+
+    pool = make_pool(handler, workers=1)
+    first = pool.submit("s1", {"text": "one"})
+    second = pool.submit("s1", {"text": "two"})
+
+    assert first["status"] in (jobs.QUEUED, jobs.RUNNING)
+    wait_for(lambda: pool.status(first["id"])["status"] == jobs.RUNNING)
+    assert pool.status(second["id"]) == {
+        "id": second["id"],
+        "status": jobs.QUEUED,
+        "position": 0,
+    }
+    assert pool.pending("s1") == 2
+
+    release.set()
+    wait_for(lambda: pool.pending("s1") == 0)
+    replies = pool.collect("s1")
+    assert [reply["content"] for reply in replies] == ["Echo: one", "Echo: two"]
+    assert replies[0]["id"] == first["id"]
+    assert pool.status(first["id"])["status"] == jobs.DONE
+    assert pool.collect("s1") == []
+
+
+def test_cancelling_stops_a_streamed_reply(make_pool):
+    closed = threading.Event()
+    sent = []
+
+    def chunks():
+        try:
+            for i in range(1000):
+                sent.append(i)
+                yield "word{} ".format(i)
+                time.sleep(0.01)
+        finally:
+            closed.set()
+
+    pool = make_pool(lambda job: chunks(), workers=1)
+    job = pool.submit("s1", {})
+    wait_for(lambda: len(sent) >= 3)
+
+    assert pool.cancel(job["id"], "other-session") is None
+    pool.cancel(job["id"], "s1")
+
+    assert closed.wait(5)
+    wait_for(lambda: pool.status(job["id"])["status"] == jobs.CANCELLED)
+    assert len(sent) < 1000
+    # the text streamed before the stop is kept
+    [reply] = pool.collect("s1")
+    assert reply["content"].startswith("word0 word1 word2")
+
+
+def test_queued_jobs_can_be_cancelled_and_failures_are_reported(make_pool):
+    release = threading.Event()
+    ran = []
+
+    def handler(job):
+        ran.append(job.payload)
+        release.wait(5)
+        if job.payload == "fail":
+            raise RuntimeError("model unavailable")
+        return {"role": "assistant", "content": "ok"}
+
+    pool = make_pool(handler, workers=1)
+    failing = pool.submit("s1", "fail")
+    skipped = pool.submit("s1", "skip")
+
+    assert pool.cancel(skipped["id"])["status"] == jobs.CANCELLED
+    release.set()
+    wait_for(lambda: pool.pending("s1") == 0)
+
+    assert ran == ["fail"]
+    assert pool.status(failing["id"]) == {
+        "id": failing["id"],
+        "status": jobs.FAILED,
+        "error": "model unavailable",
+    }
+    assert pool.collect("s1") == []
+
+
+def test_handlers_can_check_for_cancellation(make_pool):
+    started = threading.Event()
+
+    def handler(job):
+        started.set()
+        while True:
+            job.raise_if_cancelled()
+            time.sleep(0.01)
+
+    pool = make_pool(handler, workers=1)
+    job = pool.submit("s1", {})
+    assert started.wait(5)
+    pool.cancel(job["id"])
+    wait_for(lambda: pool.status(job["id"])["status"] == jobs.CANCELLED)
+
+
+def test_jobs_are_pushed_to_the_session(make_pool):
+    hub = PushHub()
+    pool = make_pool(lambda job: iter(["Hel", "lo"]), hub=hub)
+    events = hub._events("s1", 0)
+    next(events)
+
+    job = pool.submit("s1", {})
+    wait_for(lambda: pool.pending("s1") == 0)
+
+    received = []
+    while len(received) < 7:
+        event = next(events)
+        if event.startswith("id:"):
+            received.append(event.split("\n")[1][len("event: ") :])
+    events.close()
+    # the queued status is published by the submitting thread, possibly late
+    assert received.count("job") == 3
+    assert [event for event in received if event != "job"] == [
+        "delta",
+        "delta",
+        "delta",
+        "message",
+    ]
+    assert pool.status(job["id"])["status"] == jobs.DONE
+
+
+def test_processes_share_a_queue_file(tmp_path, make_pool):
+    path = str(tmp_path / "jobs.db")
+    # a web process only queuing jobs and one running them
+    web = jobs.JobQueue(path)
+    make_pool(lambda job: "done {}".format(job.payload), queue=jobs.JobQueue(path))
+
+    job_id = web.put("s1", 1)
+
+    wait_for(lambda: web.get(job_id)[1] == jobs.DONE)
+    assert web.collect("s1")[0]["content"] == "done 1"
+    web.close()
+
+
+def test_sessions_with_fewer_running_jobs_go_first(make_pool):
+    releases = {}
+    order = []
+
+    def handler(job):
+        order.append(job.payload)
+        releases.setdefault(job.payload, threading.Event()).wait(5)
+        return "ok"
+
+    pool = make_pool(handler, workers=2)
+    for i in range(3):
+        pool.submit("spammer", "spam{}".format(i))
+    wait_for(lambda: len(order) == 2)
+    pool.submit("polite", "polite")
+
+    # one worker frees up while the spammer still has a job running
+    releases.setdefault(order[0], threading.Event()).set()
+    wait_for(lambda: len(order) == 3)
+    assert order[2] == "polite"
+    for payload in ("spam0", "spam1", "spam2", "polite"):
+        releases.setdefault(payload, threading.Event()).set()
+
+
+def test_jobs_of_a_dead_process_are_queued_again(tmp_path, make_pool):
+    path = str(tmp_path / "jobs.db")
+    # a process that claimed jobs and died without finishing them
+    dead = jobs.JobQueue(path, lease=0.2, max_attempts=2)
+    retried = dead.put("s1", "retried")
+    stopped = dead.put("s2", "stopped")
+    exhausted = dead.put("s3", "exhausted")
+    for _ in range(3):
+        dead.claim()
+    dead.cancel(stopped)
+    dead._conn.execute(
+        "UPDATE dash_chat_jobs SET attempts = 2 WHERE id = ?", (exhausted,)
+    )
+    dead._conn.commit()
+
+    queue = jobs.JobQueue(path, lease=0.2, max_attempts=2)
+    make_pool(lambda job: "done {}".format(job.payload), queue=queue)
+
+    wait_for(lambda: queue.get(retried)[1] == jobs.DONE)
+    assert queue.collect("s1")[0]["content"] == "done retried"
+    assert queue.get(stopped)[1] == jobs.CANCELLED
+    assert queue.get(exhausted)[1:] == (
+        jobs.FAILED,
+        None,
+        "The worker running the job stopped",
+    )
+    assert queue.unfinished("s1") == 0
+    dead.close()
+
+
+def test_running_jobs_keep_their_lease(make_pool):
+    calls = []
+
+    def handler(job):
+        calls.append(job.id)
+        time.sleep(0.6)
+        return "slow"
+
+    pool = make_pool(handler, workers=2, queue=jobs.JobQueue(lease=0.2))
+    job = pool.submit("s1", {})
+
+    wait_for(lambda: pool.status(job["id"])["status"] == jobs.DONE)
+    assert calls == [job["id"]]
+
+
+def test_workers_survive_errors_outside_the_handler(make_pool, monkeypatch):
+    pool = make_pool(lambda job: "ok", workers=1, queue=jobs.JobQueue(lease=0.2))
+    finish = pool.queue.finish
+    failures = []
+
+    def flaky_finish(job_id, *args, **kwargs):
+        if not failures:
+            failures.append(job_id)
+            raise RuntimeError("database is locked")
+        return finish(job_id, *args, **kwargs)
+
+    monkeypatch.setattr(pool.queue, "finish", flaky_finish)
+    job = pool.submit("s1", {})
+
+    # the job is queued again once its lease runs out, and run by the same worker
+    wait_for(lambda: pool.status(job["id"])["status"] == jobs.DONE)
+    assert failures == [job["id"]]
+    assert pool.collect("s1")[0]["content"] == "ok"
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from dash_chat import limits
+from dash_chat.push import PushHub
+
+
+def test_token_bucket_allows_bursts_then_the_rate():
+    bucket = limits.TokenBucket(rate=2, burst=3)
+
+    assert [bucket.take(10.0) for _ in range(3)] == [0, 0, 0]
+    assert bucket.tokens(10.0) == 0
+    # later tokens are reserved in order, one every 1/rate seconds
+    assert bucket.take(10.0) == pytest.approx(0.5)
+    assert bucket.take(10.0) == pytest.approx(1.0)
+    assert bucket.delay(12.0) == 0
+    assert bucket.tokens(20.0) == 3
+
+
+def test_reject_policy_sheds_turns_over_the_session_rate():
+    limiter = limits.AdmissionController(
+        session_rate=1, session_burst=2, policy=limits.REJECT
+    )
+
+    assert limiter.admit("spammer") and limiter.admit("spammer")
+    rejected = limiter.admit("spammer")
+    assert not rejected
+    assert rejected.status["status"] == limits.REJECTED
+    assert rejected.status["reason"] == "session_rate"
+    assert 0 < rejected.status["retry_after"] <= 1
+    # other sessions have buckets of their own
+    assert limiter.admit("polite")
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_app_rate_is_shared_by_every_session():
+    limiter = limits.AdmissionController(
+        session_rate=10, app_rate=1, app_burst=2, policy=limits.REJECT
+    )
+
+    assert limiter.admit("a") and limiter.admit("b")
+    assert limiter.admit("c").status["reason"] == "app_rate"
+
+
+def test_queued_turns_wait_for_their_token():
+    hub = PushHub()
+    limiter = limits.AdmissionController(session_rate=20, session_burst=1, hub=hub)
+    events = hub._events("s1", 0)
+    next(events)
+
+    assert limiter.admit("s1")
+    started = time.monotonic()
+    admission = limiter.admit("s1")
+
+    assert admission.status == {"status": limits.ADMITTED}
+    assert time.monotonic() - started >= 0.04
+    pushed = [next(events).split("\n") for _ in range(2)]
+    assert [lines[1] for lines in pushed] == ["event: admission"] * 2
+    assert '"status":"queued"' in pushed[0][2]
+    events.close()
+
+
+def test_a_new_turn_replaces_the_waiting_one_when_coalescing():
+    limiter = limits.AdmissionController(
+        session_rate=5, session_burst=1, policy=limits.COALESCE
+    )
+    assert limiter.admit("s1")
+    results = {}
+
+    def turn(name):
+        results[name] = limiter.admit("s1").status["status"]
+
+    first = threading.Thread(target=turn, args=("first",))
+    first.start()
+    while limiter.waiting() == 0:
+        time.sleep(0.005)
+    started = time.monotonic()
+    turn("latest")
+    first.join()
+
+    assert results == {"first": limits.COALESCED, "latest": limits.ADMITTED}
+    # the latest turn kept the slot of the one it replaced instead of waiting
+    # for a token of its own, 0.4s after the first
+    assert time.monotonic() - started < 0.35
+
+
+def test_the_wait_queue_is_bounded():
+    limiter = limits.AdmissionController(session_rate=2, session_burst=1, max_queue=1)
+    for key in ("a", "b"):
+        assert limiter.admit(key)
+
+    waiting = threading.Thread(target=limiter.admit, args=("a",))
+    waiting.start()
+    while limiter.waiting() == 0:
+        time.sleep(0.005)
+
+    overloaded = limiter.admit("b")
+    assert overloaded.status["reason"] == "overloaded"
+    # turns that would wait longer than max_wait are not queued at all
+    limiter.max_wait = 0.1
+    assert limiter.admit("a").status["reason"] == "session_rate"
+    waiting.join()
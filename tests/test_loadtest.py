@@ -0,0 +1,90 @@
+import threading
+
+import flask
+import pytest
+from werkzeug.serving import make_server
+
+from dash_chat.loadtest import (
+    COMPONENT_ID,
+    UPDATE_PATH,
+    format_summary,
+    percentile,
+    rss_bytes,
+    run_load_test,
+)
+
+
+@pytest.fixture
+def chat_server():
+    """A server answering chat callbacks like the sample app, without Dash."""
+    app = flask.Flask(__name__)
+    requests = []
+
+    @app.route(UPDATE_PATH, methods=["POST"])
+    def update():
+        body = flask.request.get_json()
+        requests.append(body)
+        (new_message,) = [item["value"] for item in body["inputs"]]
+        (state,) = body["state"]
+        reply = {"role": "assistant", "content": "Hello"}
+        if state["property"] == "messages":
+            messages = state["value"] + [new_message, reply]
+        else:
+            messages = [reply]
+        return flask.jsonify(
+            {"multi": True, "response": {COMPONENT_ID: {"messages": messages}}}
+        )
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{}".format(server.server_port), requests
+    server.shutdown()
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == pytest.approx(50.5)
+    assert percentile(values, 99) == pytest.approx(99.01)
+    assert percentile([3], 95) == 3
+    assert percentile([], 50) is None
+
+
+def test_client_history_grows(chat_server):
+    url, requests = chat_server
+    summary = run_load_test(url, sessions=3, turns=4, think_time=0)
+
+    assert summary["requests"] == 12
+    assert summary["errors"] == 0
+    assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"]
+    assert [row["turn"] for row in summary["by_turn"]] == [1, 2, 3, 4]
+    sizes = [row["request_bytes"] for row in summary["by_turn"]]
+    assert sizes == sorted(sizes) and sizes[0] < sizes[-1]
+    # each turn sends the history returned by the previous one
+    history_lengths = {len(request["state"][0]["value"]) for request in requests}
+    assert history_lengths == {0, 2, 4, 6}
+    assert "3 sessions x 4 turns" in format_summary(summary)
+
+
+def test_server_history_requests_stay_small(chat_server):
+    url, requests = chat_server
+    summary = run_load_test(
+        url, sessions=2, turns=4, think_time=0, history_mode="server"
+    )
+
+    assert summary["errors"] == 0
+    assert {r["state"][0]["property"] for r in requests} == {"session_id"}
+    assert len({r["state"][0]["value"] for r in requests}) == 2
+    sizes = [row["request_bytes"] for row in summary["by_turn"]]
+    assert max(sizes) - min(sizes) < 10
+
+
+def test_errors_are_reported():
+    summary = run_load_test("http://127.0.0.1:9", sessions=1, turns=2, think_time=0)
+    assert summary["requests"] == 0
+    assert summary["errors"] == 2
+    assert "error in turn 1" in format_summary(summary)
+
+
+def test_rss_of_unknown_process():
+    assert rss_bytes(2**22 + 12345) is None
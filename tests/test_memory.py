@@ -0,0 +1,128 @@
+import threading
+
+import numpy as np
+
+from dash_chat.context import ContextManager, TokenCounter
+from dash_chat.memory import RelevantHistory, VectorMemory, hashing_embedder
+
+TOPICS = [
+    "the quarterly revenue numbers for the sales team",
+    "hiring plans for the new platform engineers",
+    "the product roadmap and launch dates",
+    "vacation policy and office holidays",
+]
+
+
+def _turns(n):
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": "{} (turn {})".format(TOPICS[i % len(TOPICS)], i),
+            "id": i,
+        }
+        for i in range(n)
+    ]
+
+
+def test_hashing_embedder_is_deterministic():
+    embed = hashing_embedder(dim=64)
+    first = embed(["Revenue by region", "hiring"])
+
+    assert first.shape == (2, 64)
+    np.testing.assert_array_equal(first, embed(["revenue BY region", "hiring"]))
+    assert not np.any(embed(["..."]))
+
+
+def test_search_returns_the_most_similar_messages():
+    memory = VectorMemory(embed=hashing_embedder(dim=256))
+    memory.add("s1", _turns(40))
+
+    results = memory.search("s1", "what were the revenue numbers?", k=3)
+
+    assert [position % len(TOPICS) for position, _ in results] == [0, 0, 0]
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+    assert 0 < scores[-1] <= scores[0] <= 1
+    # only messages before a position, e.g. those outside the window
+    assert all(p < 10 for p, _ in memory.search("s1", "revenue", k=5, before=10))
+    assert memory.search("s1", "", k=3) == []
+    assert memory.search("unknown", "revenue") == []
+
+
+def test_only_new_messages_are_embedded():
+    calls = []
+    embed = hashing_embedder(dim=1024)
+
+    def counting_embed(texts):
+        calls.append(len(texts))
+        return embed(texts)
+
+    memory = VectorMemory(embed=counting_embed)
+    messages = _turns(10)
+    memory.sync("s1", messages)
+    memory.sync("s1", messages + [{"role": "user", "content": "holidays?"}])
+    memory.sync("s1", messages + [{"role": "user", "content": "holidays?"}])
+    assert calls == [10, 1]
+
+    # an edited conversation is embedded again
+    memory.sync("s1", [{"role": "user", "content": "a fresh start"}])
+    assert calls == [10, 1, 1]
+    assert [position for position, _ in memory.search("s1", "roadmap")] == [0]
+
+
+def test_large_conversations_are_memory_mapped(tmp_path):
+    memory = VectorMemory(
+        embed=hashing_embedder(dim=16), mmap_rows=100, directory=str(tmp_path)
+    )
+    for start in range(0, 300, 50):
+        memory.add("s1", _turns(300)[start : start + 50])
+
+    [path] = tmp_path.iterdir()
+    assert path.stat().st_size >= 300 * 16 * 4
+    assert len(memory.search("s1", "launch dates", k=300)) == 300
+    assert memory.search("s1", "launch dates")[0][0] % len(TOPICS) == 2
+
+    memory.remove("s1")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_concurrent_syncs_embed_messages_once():
+    memory = VectorMemory(embed=hashing_embedder(dim=32))
+    messages = _turns(200)
+    threads = [
+        threading.Thread(target=memory.sync, args=("s1", messages)) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(memory.search("s1", "turn", k=1000)) == 200
+
+
+def test_relevant_history_recalls_older_turns():
+    memory = VectorMemory(embed=hashing_embedder(dim=256))
+    counter = TokenCounter()
+    per_message = counter.count(_turns(1)[0])
+    context = ContextManager(
+        max_tokens=per_message * 8,
+        counter=counter,
+        policy=RelevantHistory(memory, k=2, recall_tokens=per_message * 3),
+    )
+    messages = _turns(100) + [
+        {"role": "user", "content": "remind me about the vacation policy", "id": 100}
+    ]
+
+    prompt = context.prompt(messages, session_key="s1")
+
+    recalled = prompt[:-5]
+    assert len(recalled) == 2
+    assert all("vacation" in message["content"] for message in recalled)
+    assert [message["id"] for message in recalled] == sorted(
+        message["id"] for message in recalled
+    )
+    assert prompt[-5:] == messages[-5:]
+    assert context.count(prompt) <= context.budget
+    # prompts stay the same size as the conversation grows
+    longer = _turns(1000) + messages[-1:]
+    assert len(context.prompt(longer, session_key="s2")) == len(prompt)
@@ -0,0 +1,164 @@
+import base64
+import json
+
+import pytest
+
+from dash_chat import messages as messages_module
+from dash_chat.messages import (
+    AttachmentPart,
+    GraphPart,
+    Message,
+    MessageError,
+    TablePart,
+    TextPart,
+    dumps,
+    loads,
+    parse_messages,
+)
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+NEW_MESSAGE = {
+    "role": "user",
+    "id": 1700000000000,
+    "content": [
+        {"type": "text", "text": "What is in this image?"},
+        {
+            "type": "attachment",
+            "file": "data:image/png;base64," + base64.b64encode(PNG).decode(),
+            "fileName": "chart.png",
+            "fileType": "image/png",
+        },
+    ],
+}
+
+
+def test_parse_new_message():
+    message = Message.from_dict(NEW_MESSAGE)
+    assert message.role == "user"
+    assert message.id == 1700000000000
+    text, attachment = message.parts
+    assert isinstance(text, TextPart)
+    assert message.text == "What is in this image?"
+    assert isinstance(attachment, AttachmentPart)
+    assert attachment.is_image
+    assert attachment.data == PNG
+    assert message.to_dict() == NEW_MESSAGE
+
+
+def test_attachment_data_is_a_view():
+    part = AttachmentPart.from_bytes(bytearray(PNG), "chart.png", "image/png")
+    view = part.data[8:16]
+    assert isinstance(view, memoryview)
+    assert view.obj is part.data.obj
+    assert part.to_dict()["file"] == NEW_MESSAGE["content"][1]["file"]
+
+    parsed = Message.from_dict(NEW_MESSAGE).parts[1]
+    assert parsed.data is parsed.data
+    assert parsed.data.readonly
+
+
+def test_unpadded_base64_is_decoded():
+    part = AttachmentPart("a.bin", file="data:;base64," + "YWJj"[:3])
+    assert bytes(part.data) == b"ab"
+
+
+def test_uploaded_attachments_have_no_inline_data():
+    part = AttachmentPart.from_dict(
+        {
+            "type": "attachment",
+            "fileId": "f1",
+            "fileName": "report.pdf",
+            "fileType": "application/pdf",
+            "fileSize": 1234,
+            "url": "/_dash-chat/uploads/f1",
+        }
+    )
+    assert part.url == "/_dash-chat/uploads/f1"
+    with pytest.raises(MessageError):
+        part.data
+
+
+def test_content_shapes_round_trip():
+    for data in [
+        {"role": "assistant", "content": "Hello"},
+        {"role": "assistant", "content": {"type": "text", "text": "Hello"}},
+        {
+            "role": "assistant",
+            "content": [
+                "plain",
+                {"type": "graph", "props": {"figure": {"data": []}}},
+                {"type": "table", "header": ["a"], "data": [[1]], "props": {}},
+                {
+                    "type": "columnar_table",
+                    "columns": [],
+                    "num_rows": 0,
+                    "page_size": 50,
+                    "props": {},
+                },
+            ],
+            "cache": False,
+        },
+    ]:
+        message = Message.from_dict(data)
+        expected = dict(data)
+        if isinstance(data["content"], list):
+            expected["content"] = [
+                {"type": "text", "text": part} if isinstance(part, str) else part
+                for part in data["content"]
+            ]
+        assert message.to_dict() == expected
+
+    message = Message.from_dict(
+        {
+            "role": "assistant",
+            "content": [{"type": "graph", "props": {"figure": {"data": []}}}],
+        }
+    )
+    assert isinstance(message.parts[0], GraphPart)
+    assert message.parts[0].figure == {"data": []}
+
+
+@pytest.mark.parametrize(
+    "data, problem",
+    [
+        ({"role": "robot", "content": "hi"}, "messages[0].role"),
+        ({"role": "user", "content": 3}, "messages[0].content"),
+        (
+            {"role": "user", "content": [{"type": "video"}]},
+            "messages[0].content[0].type",
+        ),
+        (
+            {"role": "user", "content": [{"type": "attachment", "fileName": "a"}]},
+            "messages[0].content[0]",
+        ),
+        (
+            {"role": "user", "content": [{"type": "table", "header": ["a"]}]},
+            "messages[0].content[0].data",
+        ),
+    ],
+)
+def test_validation_errors_name_the_field(data, problem):
+    with pytest.raises(MessageError, match=problem.replace("[", r"\[")):
+        parse_messages([data])
+
+
+def test_messages_use_slots():
+    message = Message.from_dict(NEW_MESSAGE)
+    assert not hasattr(message, "__dict__")
+    for part in message.parts + [TablePart(["a"], [])]:
+        assert not hasattr(part, "__dict__")
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_and_loads(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(messages_module, "orjson", None)
+    elif messages_module.orjson is None:
+        pytest.skip("orjson is not installed")
+    history = parse_messages([NEW_MESSAGE, {"role": "assistant", "content": "A"}])
+    data = dumps(history)
+    assert isinstance(data, bytes)
+    assert json.loads(data) == [NEW_MESSAGE, {"role": "assistant", "content": "A"}]
+    assert loads(data) == history
+    assert loads(dumps(history[0])) == history[0]
+    assert loads(data, parse=False)[1] == {"role": "assistant", "content": "A"}
@@ -0,0 +1,133 @@
+import json
+
+import flask
+import pytest
+from dash_chat import metrics
+
+
+def turn(**fields):
+    data = {
+        "message_id": 1,
+        "completed": True,
+        "ack_ms": 40.0,
+        "first_token_ms": 120.0,
+        "render_ms": 8.5,
+        "turn_ms": 900.0,
+        "persistence_ms": 2.0,
+        "upload_ms": None,
+        "request_bytes": 300,
+        "response_bytes": 5000,
+    }
+    data.update(fields)
+    return data
+
+
+@pytest.fixture
+def server():
+    app = flask.Flask(__name__)
+    collector = metrics.register(app, max_turns=3, max_body_size=2048)
+    return app, collector
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram([1, 2, 5])
+    for value in (0.5, 1, 1.5, 4, 10):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [(1, 2), (2, 3), (5, 4), (float("inf"), 5)]
+    assert histogram.count == 5
+    assert histogram.sum == 17
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    assert histogram.quantile(1) == 5
+    assert metrics.Histogram([1]).quantile(0.5) is None
+
+
+def test_quantiles_skip_empty_buckets():
+    histogram = metrics.Histogram([1, 2, 5])
+    histogram.observe(3)
+    histogram.observe(4)
+
+    assert histogram.quantile(0) == 2
+    assert histogram.quantile(0.5) == pytest.approx(3.5)
+
+
+def test_turns_are_recorded_in_seconds_and_bytes():
+    collector = metrics.MetricsCollector()
+    collector.observe_batch({"turns": [turn(), turn(turn_ms=1500.0)]})
+
+    turns = collector.histogram("turn")
+    assert turns.count == 2
+    assert turns.sum == pytest.approx(2.4)
+    assert collector.histogram("response").sum == 10000
+    # missing timings are not observed
+    assert collector.histogram("upload").count == 0
+
+
+def test_invalid_values_are_ignored():
+    collector = metrics.MetricsCollector()
+    collector.observe(turn(ack_ms="fast", render_ms=-1, turn_ms=True))
+    collector.observe("not a turn")
+
+    assert collector.histogram("ack").count == 0
+    assert collector.histogram("render").count == 0
+    assert collector.histogram("turn").count == 0
+    assert collector.histogram("first_token").count == 1
+
+
+def test_component_labels_are_capped():
+    collector = metrics.MetricsCollector(max_components=2)
+    for component in ("a", {"type": "chat", "index": 1}, "c", "d"):
+        collector.observe(turn(), component)
+
+    text = collector.prometheus_text()
+    assert 'component="a"' in text
+    assert 'component="{\\"index\\":1,\\"type\\":\\"chat\\"}"' in text
+    assert 'dash_chat_turns_total{component="other",status="completed"} 2' in text
+    assert collector.histogram("turn", "a").count == 1
+
+
+def test_prometheus_text_format():
+    collector = metrics.MetricsCollector(time_buckets=(0.1, 1))
+    collector.observe(turn(turn_ms=500.0), "chat")
+    collector.observe(turn(completed=False, turn_ms=None), "chat")
+
+    lines = collector.prometheus_text().splitlines()
+    assert "# TYPE dash_chat_turn_turn_seconds histogram" in lines
+    assert 'dash_chat_turn_turn_seconds_bucket{component="chat",le="0.1"} 0' in lines
+    assert 'dash_chat_turn_turn_seconds_bucket{component="chat",le="1.0"} 1' in lines
+    assert 'dash_chat_turn_turn_seconds_bucket{component="chat",le="+Inf"} 1' in lines
+    assert 'dash_chat_turn_turn_seconds_sum{component="chat"} 0.5' in lines
+    assert 'dash_chat_turn_turn_seconds_count{component="chat"} 1' in lines
+    assert 'dash_chat_turns_total{component="chat",status="abandoned"} 1' in lines
+
+
+def test_beacon_and_prometheus_routes(server):
+    app, collector = server
+    client = app.test_client()
+    assert collector.url == "/_dash-chat/metrics"
+
+    # sendBeacon posts the batch as text/plain
+    response = client.post(
+        collector.url,
+        data=json.dumps({"component": "chat", "turns": [turn()] * 5}),
+        content_type="text/plain",
+    )
+    assert response.status_code == 204
+    # at most max_turns turns per batch
+    assert collector.histogram("turn", "chat").count == 3
+
+    scrape = client.get("/metrics")
+    assert scrape.status_code == 200
+    assert scrape.content_type == metrics.PROMETHEUS_CONTENT_TYPE
+    assert 'dash_chat_turn_turn_seconds_count{component="chat"} 3' in scrape.text
+
+
+def test_beacon_rejects_bad_batches(server):
+    app, collector = server
+    client = app.test_client()
+
+    assert client.post(collector.url, data="not json").status_code == 400
+    assert client.post(collector.url, json={"turns": "none"}).status_code == 400
+    too_large = {"turns": [turn(padding="x" * 4096)]}
+    assert client.post(collector.url, json=too_large).status_code == 413
+    assert collector.histogram("turn").count == 0
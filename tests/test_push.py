@@ -0,0 +1,160 @@
+import http.client
+import json
+import threading
+import time
+
+import flask
+import pytest
+from werkzeug.serving import make_server
+
+from dash_chat import push
+
+
+@pytest.fixture
+def server():
+    app = flask.Flask(__name__)
+    hub = push.register(app, history=4, heartbeat=0.2)
+    httpd = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield hub, httpd.server_port
+    hub.close()
+    httpd.shutdown()
+
+
+class Subscription:
+    def __init__(self, port, path, headers=None):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        self.conn.request("GET", path, headers=headers or {})
+        self.response = self.conn.getresponse()
+
+    def events(self, count):
+        """Read ``count`` events as (id, event, data) tuples, skipping comments."""
+        events = []
+        fields = {}
+        while len(events) < count:
+            line = self.response.readline().decode("utf-8").rstrip("\n")
+            if line:
+                name, _, value = line.partition(": ")
+                fields[name] = value
+            elif "data" in fields:
+                data = json.loads(fields["data"])
+                events.append((fields["id"], fields["event"], data))
+                fields = {}
+            else:
+                fields = {}
+        return events
+
+    def close(self):
+        self.response.close()
+        self.conn.close()
+
+
+def test_messages_are_fanned_out_to_every_subscriber(server):
+    hub, port = server
+    first = Subscription(port, "/_dash-chat/push?session=s1")
+    second = Subscription(port, "/_dash-chat/push?session=s1")
+    other = Subscription(port, "/_dash-chat/push?session=s2")
+    assert first.response.getheader("Content-Type").startswith("text/event-stream")
+    assert hub.wait_for_subscriber("s2")
+    while hub.subscribers("s1") < 2:
+        time.sleep(0.01)
+
+    message = hub.send_message("s1", {"role": "assistant", "content": "Later reply"})
+    hub.send_message("s2", {"role": "assistant", "content": "Other", "id": "o1"})
+
+    assert message["id"]
+    for subscription in (first, second):
+        [(_, event, data)] = subscription.events(1)
+        assert event == "message"
+        assert data == message
+    assert other.events(1)[0][2]["id"] == "o1"
+    for subscription in (first, second, other):
+        subscription.close()
+
+
+def test_streamed_replies_are_pushed_as_deltas(server):
+    hub, port = server
+    subscription = Subscription(port, "/_dash-chat/push?session=s1")
+    assert hub.wait_for_subscriber("s1")
+
+    reply = hub.stream("s1", iter(["Hello", "", " world"]), message_id="m1")
+
+    assert reply == {"role": "assistant", "content": "Hello world", "id": "m1"}
+    deltas = [data for _, event, data in subscription.events(3)]
+    assert [delta["text"] for delta in deltas] == ["Hello", " world", ""]
+    assert [delta["offset"] for delta in deltas] == [0, 5, 11]
+    assert deltas[-1]["done"] is True
+    subscription.close()
+
+
+def test_reconnecting_replays_missed_events(server):
+    hub, port = server
+    subscription = Subscription(port, "/_dash-chat/push?session=s1")
+    assert hub.wait_for_subscriber("s1")
+    hub.send_message("s1", {"role": "assistant", "content": "one", "id": "1"})
+    [(last_event_id, _, _)] = subscription.events(1)
+    subscription.close()
+
+    hub.send_message("s1", {"role": "assistant", "content": "two", "id": "2"})
+    hub.send_message("s1", {"role": "assistant", "content": "three", "id": "3"})
+
+    resumed = Subscription(
+        port, "/_dash-chat/push?session=s1", {"Last-Event-ID": last_event_id}
+    )
+    assert [data["id"] for _, _, data in resumed.events(2)] == ["2", "3"]
+    resumed.close()
+
+    # an id from before a restart replays every event kept, at most `history`
+    for i in range(4, 7):
+        hub.send_message("s1", {"role": "assistant", "content": "n", "id": str(i)})
+    restarted = Subscription(port, "/_dash-chat/push?session=s1&last_event_id=old-3")
+    assert [data["id"] for _, _, data in restarted.events(4)] == ["3", "4", "5", "6"]
+    restarted.close()
+
+
+def test_subscriptions_are_released_and_limited(server):
+    hub, port = server
+    hub.max_subscribers = 1
+    subscription = Subscription(port, "/_dash-chat/push?session=s1")
+    assert hub.wait_for_subscriber("s1")
+
+    refused = Subscription(port, "/_dash-chat/push?session=s2")
+    assert refused.response.status == 503
+    refused.close()
+    missing = Subscription(port, "/_dash-chat/push")
+    assert missing.response.status == 400
+    missing.close()
+
+    subscription.close()
+    # the closed connection is noticed at the next heartbeats
+    for _ in range(50):
+        if hub.subscribers() == 0:
+            break
+        time.sleep(0.05)
+    assert hub.subscribers() == 0
+
+
+def test_idle_conversations_are_evicted():
+    hub = push.PushHub(max_conversations=2)
+    for key in ("a", "b", "c"):
+        hub.send_message(key, {"role": "assistant", "content": key})
+
+    assert list(hub._channels) == ["b", "c"]
+
+
+def test_reconnecting_to_an_evicted_conversation_replays_its_new_events():
+    hub = push.PushHub(max_conversations=1, heartbeat=0.05)
+    for i in range(5):
+        last_event_id = hub.publish("s1", "message", {"id": str(i)})
+    # s1 is evicted while its browser reconnects
+    hub.publish("s2", "message", {"id": "other"})
+    assert list(hub._channels) == ["s2"]
+    for i in range(5, 7):
+        hub.publish("s1", "message", {"id": str(i)})
+
+    events = hub.subscribe("s1", last_event_id)
+    assert next(events).startswith("retry:")
+    assert 'data: {"id":"5"}' in next(events)
+    assert 'data: {"id":"6"}' in next(events)
+    events.close()
@@ -0,0 +1,185 @@
+import sqlite3
+
+import pytest
+
+from dash_chat.search import SearchIndex, _match_query, message_text
+from dash_chat.store import MemoryStore, SQLiteStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request):
+    if request.param == "memory":
+        yield MemoryStore()
+    else:
+        store = SQLiteStore()
+        yield store
+        store.close()
+
+
+@pytest.fixture
+def index(store):
+    index = SearchIndex()
+    index.attach(store)
+    yield index
+    index.close()
+
+
+def test_appended_messages_are_found_newest_first(store, index):
+    store.append("chat", "s1", {"role": "user", "content": "Show Q3 revenue", "id": 1})
+    store.append(
+        "chat",
+        "s1",
+        {"role": "assistant", "content": "Here is the revenue table"},
+        {"role": "user", "content": "Thanks", "id": 3},
+    )
+
+    results = index.search("chat", "s1", "revenue")
+
+    assert [result["seq"] for result in results] == [1, 0]
+    assert results[0] == {
+        "seq": 1,
+        "role": "assistant",
+        "snippet": ["Here is the ", "revenue", " table"],
+    }
+    assert results[1]["id"] == 1
+
+
+def test_queries_match_prefixes_and_ignore_accents(store, index):
+    store.append("chat", "s1", {"role": "user", "content": "Café prices in Zürich"})
+
+    assert index.search("chat", "s1", "cafe zur")[0]["snippet"] == [
+        "",
+        "Café",
+        " prices in ",
+        "Zürich",
+        "",
+    ]
+    # the last word is a prefix once it has two letters, up to six
+    assert index.search("chat", "s1", "c") == []
+    assert index.search("chat", "s1", "pri") != []
+    assert index.search("chat", "s1", "price") != []
+    assert index.search("chat", "s1", "pr") != []
+    assert _match_query("prices in zurich") == '"prices" "in" "zurich"*'
+    assert _match_query("zurichs") == '"zurichs"'
+    assert index.search("chat", "s1", "cafe london") == []
+    assert index.search("chat", "s1", " ,. ") == []
+
+
+def test_tables_and_attachment_names_are_indexed(store, index):
+    store.append(
+        "chat",
+        "s1",
+        {
+            "role": "assistant",
+            "content": [
+                {"type": "text", "text": "Headcount:"},
+                {
+                    "type": "table",
+                    "header": ["Team", "People"],
+                    "data": [["Platform", 12], {"Team": "Design", "People": 4}],
+                },
+            ],
+        },
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": ""},
+                {"type": "attachment", "fileName": "budget-2024.xlsx", "url": "/f/1"},
+            ],
+        },
+    )
+
+    assert [result["seq"] for result in index.search("chat", "s1", "design")] == [0]
+    assert [result["seq"] for result in index.search("chat", "s1", "budget")] == [1]
+
+
+def test_conversations_are_searched_separately(store, index):
+    store.append("chat", "s1", {"role": "user", "content": "roadmap for s1"})
+    store.append("chat", "s2", {"role": "user", "content": "roadmap for s2"})
+    store.append("other", "s1", {"role": "user", "content": "roadmap elsewhere"})
+
+    assert [r["snippet"][2] for r in index.search("chat", "s2", "roadmap")] == [
+        " for s2"
+    ]
+    assert index.search("chat", "unknown", "roadmap") == []
+
+    store.clear("chat", "s1")
+    assert index.search("chat", "s1", "roadmap") == []
+    assert len(index) == 2
+
+
+def test_existing_conversations_can_be_indexed(tmp_path):
+    store = MemoryStore()
+    store.append("chat", "s1", *({"role": "user", "content": w} for w in "abc"))
+    store.append("chat", "s1", {"role": "user", "content": "late addition"})
+    path = str(tmp_path / "search.db")
+    index = SearchIndex(path)
+
+    index.index_conversation(store, "chat", "s1")
+    index.close()
+
+    reopened = SearchIndex(path)
+    assert reopened.search("chat", "s1", "addition")[0]["seq"] == 3
+    reopened.close()
+
+
+def test_reindexing_after_attaching_does_not_duplicate(store, index):
+    store.append("chat", "s1", {"role": "user", "content": "budget review"})
+    index.index_conversation(store, "chat", "s1")
+    index.index_conversation(store, "chat", "s1")
+
+    assert [result["seq"] for result in index.search("chat", "s1", "budget")] == [0]
+    assert len(index) == 1
+
+
+def test_listener_failures_do_not_fail_appends(store, caplog):
+    class Broken:
+        def on_append(self, *args):
+            raise RuntimeError("index unavailable")
+
+        on_clear = on_append
+
+    store.add_listener(Broken())
+    store.append("chat", "s1", {"role": "user", "content": "saved anyway"})
+    store.clear("chat", "s2")
+
+    assert store.get_messages("chat", "s1")[0]["content"] == "saved anyway"
+    assert "index unavailable" in caplog.text
+
+
+def test_message_text_of_columnar_tables():
+    message = {
+        "role": "assistant",
+        "content": [
+            {
+                "type": "columnar_table",
+                "columns": [
+                    {
+                        "name": "city",
+                        "dictionary": ["Lagos", "Accra"],
+                        "values": "AAEA",
+                    },
+                    {"name": "sales", "values": "AAAAAAAA8D8="},
+                ],
+            }
+        ],
+    }
+
+    assert message_text(message).split("\n") == ["city", "Lagos", "Accra", "sales"]
+
+
+def test_index_files_keep_their_prefix_lengths(tmp_path):
+    path = str(tmp_path / "search.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE VIRTUAL TABLE dash_chat_search USING fts5("
+        "text, role UNINDEXED, message_id UNINDEXED, prefix = '2 3')"
+    )
+    conn.close()
+
+    index = SearchIndex(path)
+    index.add("chat", "s1", 0, [{"role": "user", "content": "quarterly revenue"}])
+    # four letters are not indexed as a prefix in this file
+    assert index.search("chat", "s1", "quar") == []
+    assert index.search("chat", "s1", "qua") != []
+    index.close()
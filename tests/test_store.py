@@ -0,0 +1,139 @@
+import threading
+
+import pytest
+from dash_chat.store import MemoryStore, SQLiteStore, history_page
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore()
+    return SQLiteStore(str(tmp_path / "history.db"))
+
+
+def test_append_and_get_messages(store):
+    """Messages come back in order, scoped by component id and session key."""
+    store.append("chat", "session-1", {"role": "user", "content": "Hello!"})
+    store.append(
+        "chat",
+        "session-1",
+        {"role": "assistant", "content": "Hi there!"},
+        {"role": "assistant", "content": [{"type": "text", "text": "Anything?"}]},
+    )
+    store.append("chat", "session-2", {"role": "user", "content": "Other session"})
+
+    assert store.get_messages("chat", "session-1") == [
+        {"role": "user", "content": "Hello!"},
+        {"role": "assistant", "content": "Hi there!"},
+        {"role": "assistant", "content": [{"type": "text", "text": "Anything?"}]},
+    ]
+    assert store.get_messages("chat", "session-2") == [
+        {"role": "user", "content": "Other session"}
+    ]
+    assert store.get_messages("other-chat", "session-1") == []
+
+
+def test_get_messages_limit(store):
+    for i in range(5):
+        store.append("chat", "s", {"role": "user", "content": str(i)})
+
+    assert [m["content"] for m in store.get_messages("chat", "s", limit=2)] == [
+        "3",
+        "4",
+    ]
+    assert store.get_messages("chat", "s", limit=0) == []
+
+
+def test_clear(store):
+    store.append("chat", "s", {"role": "user", "content": "Hello!"})
+    store.clear("chat", "s")
+    assert store.get_messages("chat", "s") == []
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryStore(max_conversations=2)
+    store.append("chat", "a", {"role": "user", "content": "a"})
+    store.append("chat", "b", {"role": "user", "content": "b"})
+    store.get_messages("chat", "a")
+    store.append("chat", "c", {"role": "user", "content": "c"})
+
+    assert len(store) == 2
+    assert store.get_messages("chat", "b") == []
+    assert store.get_messages("chat", "a") == [{"role": "user", "content": "a"}]
+
+
+def test_sqlite_store_persists_across_instances(tmp_path):
+    path = str(tmp_path / "history.db")
+    first = SQLiteStore(path)
+    first.append("chat", "s", {"role": "user", "content": "Hello!"})
+    first.close()
+
+    second = SQLiteStore(path)
+    second.append("chat", "s", {"role": "assistant", "content": "Welcome back!"})
+    assert [m["content"] for m in second.get_messages("chat", "s")] == [
+        "Hello!",
+        "Welcome back!",
+    ]
+
+
+def test_sqlite_stores_sharing_a_file_append_concurrently(tmp_path):
+    path = str(tmp_path / "history.db")
+    # one connection each, as in separate server processes
+    stores = [SQLiteStore(path) for _ in range(4)]
+
+    def chat(store, writer):
+        for i in range(25):
+            store.append("chat", "s", {"role": "user", "content": (writer, i)})
+
+    threads = [
+        threading.Thread(target=chat, args=(store, writer))
+        for writer, store in enumerate(stores)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    messages = stores[0].get_messages("chat", "s")
+    assert len(messages) == 100
+    for writer in range(4):
+        assert [m["content"][1] for m in messages if m["content"][0] == writer] == list(
+            range(25)
+        )
+
+
+def test_get_page_walks_back_through_history(store):
+    for i in range(7):
+        store.append("chat", "s", {"role": "user", "content": str(i)})
+
+    page = store.get_page("chat", "s", limit=3)
+    assert [m["content"] for m in page["messages"]] == ["4", "5", "6"]
+    assert page["has_more"]
+
+    page = store.get_page("chat", "s", before=page["cursor"], limit=3)
+    assert [m["content"] for m in page["messages"]] == ["1", "2", "3"]
+    assert page["has_more"]
+
+    page = store.get_page("chat", "s", before=page["cursor"], limit=3)
+    assert [m["content"] for m in page["messages"]] == ["0"]
+    assert not page["has_more"]
+
+    assert store.get_page("other-chat", "s") == {
+        "messages": [],
+        "cursor": None,
+        "has_more": False,
+    }
+
+
+def test_history_page_answers_request(store):
+    for i in range(5):
+        store.append("chat", "s", {"role": "user", "content": str(i)})
+
+    first = history_page(store, "chat", "s", {"cursor": None, "limit": 2})
+    assert [m["content"] for m in first["messages"]] == ["3", "4"]
+
+    second = history_page(store, "chat", "s", {"cursor": first["cursor"], "limit": 2})
+    assert [m["content"] for m in second["messages"]] == ["1", "2"]
+
+    capped = history_page(store, "chat", "s", {"limit": 100}, max_page_size=3)
+    assert len(capped["messages"]) == 3
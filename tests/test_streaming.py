@@ -0,0 +1,67 @@
+import asyncio
+
+from dash_chat.streaming import aiter_deltas, iter_deltas, stream_to_progress
+
+
+def _tokens():
+    yield "Hello"
+    yield ""
+    yield " John"
+    yield " Doe."
+
+
+async def _async_tokens():
+    for token in ["Hello", " John", " Doe."]:
+        await asyncio.sleep(0)
+        yield token
+
+
+def test_iter_deltas_are_append_only():
+    deltas = list(iter_deltas(_tokens(), message_id="reply-1"))
+
+    assert deltas == [
+        {"id": "reply-1", "seq": 0, "offset": 0, "text": "Hello"},
+        {"id": "reply-1", "seq": 1, "offset": 5, "text": " John"},
+        {"id": "reply-1", "seq": 2, "offset": 10, "text": " Doe."},
+        {"id": "reply-1", "seq": 3, "offset": 15, "text": "", "done": True},
+    ]
+
+
+def test_iter_deltas_accepts_async_generators():
+    deltas = list(iter_deltas(_async_tokens(), message_id="reply-1"))
+    assert "".join(delta["text"] for delta in deltas) == "Hello John Doe."
+    assert deltas[-1]["done"]
+
+
+def test_aiter_deltas():
+    async def collect():
+        return [delta async for delta in aiter_deltas(_async_tokens())]
+
+    deltas = asyncio.run(collect())
+    assert [delta["seq"] for delta in deltas] == [0, 1, 2, 3]
+    assert len({delta["id"] for delta in deltas}) == 1
+
+
+def test_stream_to_progress_sends_cumulative_text():
+    updates = []
+    reply = stream_to_progress(
+        updates.append, _tokens(), message_id="reply-1", interval=0
+    )
+
+    assert [update["text"] for update in updates] == [
+        "Hello",
+        "Hello John",
+        "Hello John Doe.",
+    ]
+    assert all(update["offset"] == 0 for update in updates)
+    assert [update["seq"] for update in updates] == [0, 1, 2]
+    assert reply == {"role": "assistant", "content": "Hello John Doe.", "id": "reply-1"}
+
+
+def test_stream_to_progress_throttles_updates():
+    updates = []
+    reply = stream_to_progress(updates.append, _async_tokens(), interval=60)
+
+    # the first chunk is sent straight away, the rest in one trailing update
+    assert [update["text"] for update in updates] == ["Hello", "Hello John Doe."]
+    assert reply["id"] == updates[0]["id"]
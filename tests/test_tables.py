@@ -0,0 +1,154 @@
+import flask
+import numpy as np
+import pytest
+from dash_chat import tables
+from dash_chat.figures import decode_array
+
+
+def _column(part, name):
+    return next(column for column in part["columns"] if column["name"] == name)
+
+
+def _cells(column):
+    if "dictionary" in column:
+        codes = decode_array(column["codes"])
+        return [None if code < 0 else column["dictionary"][code] for code in codes]
+    if isinstance(column["values"], dict):
+        return decode_array(column["values"]).tolist()
+    return column["values"]
+
+
+def test_columns_are_typed_and_dictionary_encoded():
+    part = tables.columnar_table(
+        {
+            "id": np.arange(6),
+            "city": ["Lagos", "Paris", "Lagos", None, "Paris", "Lagos"],
+            "note": ["a", "b", "c", "d", "e", "f"],
+            "paid": [True, False, True, True, False, True],
+        },
+        page_size=4,
+        striped=True,
+    )
+
+    assert part["type"] == "columnar_table"
+    assert part["num_rows"] == 6
+    assert part["page_size"] == 4
+    assert part["props"] == {"striped": True}
+
+    ids = _column(part, "id")
+    assert ids["values"]["dtype"] == "i4"
+    assert _cells(ids) == [0, 1, 2, 3, 4, 5]
+
+    city = _column(part, "city")
+    assert city["dictionary"] == ["Lagos", "Paris"]
+    assert city["codes"]["dtype"] == "i1"
+    assert _cells(city) == ["Lagos", "Paris", "Lagos", None, "Paris", "Lagos"]
+
+    # distinct values are not worth a dictionary
+    assert _column(part, "note")["values"] == ["a", "b", "c", "d", "e", "f"]
+
+    paid = _column(part, "paid")
+    assert paid["type"] == "bool"
+    assert _cells(paid) == [1, 0, 1, 1, 0, 1]
+
+
+def test_two_dimensional_arrays_need_column_names():
+    part = tables.columnar_table(
+        np.array([[1.5, 2.0], [3.0, 4.5]]), columns=["low", "high"]
+    )
+    assert [column["name"] for column in part["columns"]] == ["low", "high"]
+    assert _cells(_column(part, "high")) == [2.0, 4.5]
+
+    with pytest.raises(ValueError):
+        tables.columnar_table(np.zeros((2, 3)), columns=["only one"])
+
+
+def test_datetimes_are_sent_as_epoch_milliseconds():
+    times = np.array(["2024-01-01T00:00:00", "NaT"], dtype="datetime64[s]")
+    column = tables.encode_column("time", times)
+    assert column["type"] == "datetime"
+    values = decode_array(column["values"])
+    assert values[0] == 1704067200000
+    assert np.isnan(values[1])
+
+
+def test_missing_values_in_object_columns():
+    values = np.array(
+        ["a", None, float("nan"), np.datetime64("NaT"), "a", "b"], dtype=object
+    )
+    column = tables.encode_column("mixed", values)
+    assert _cells(column) == ["a", None, None, None, "a", "b"]
+
+
+def test_page_size_must_be_positive():
+    with pytest.raises(ValueError):
+        tables.columnar_table({"n": [1, 2]}, page_size=0)
+
+
+def test_pandas_dataframes():
+    pd = pytest.importorskip("pandas")
+    df = pd.DataFrame(
+        {
+            "item": pd.Categorical(["pen", "cup", "pen"]),
+            "price": [1.5, 3.0, 1.5],
+        }
+    )
+    part = tables.columnar_table(df)
+    item = _column(part, "item")
+    assert item["dictionary"] == ["cup", "pen"]
+    assert _cells(item) == ["pen", "cup", "pen"]
+    assert _cells(_column(part, "price")) == [1.5, 3.0, 1.5]
+
+    nullable = pd.DataFrame(
+        {
+            "name": pd.array(["a", None, "a", "b"], dtype="string"),
+            "when": pd.Series([pd.Timestamp("2024-01-01"), pd.NaT] * 2, dtype=object),
+        }
+    )
+    part = tables.columnar_table(nullable)
+    assert _cells(_column(part, "name")) == ["a", None, "a", "b"]
+    assert _cells(_column(part, "when"))[1::2] == [None, None]
+
+
+def test_server_side_pages():
+    app = flask.Flask(__name__)
+    store = tables.register(app)
+    client = app.test_client()
+
+    part = tables.columnar_table(
+        {"n": np.arange(120), "parity": ["even", "odd"] * 60},
+        page_size=50,
+        store=store,
+    )
+    assert part["num_rows"] == 120
+    assert _cells(_column(part, "n")) == list(range(50))
+    assert part["url"].startswith("/_dash-chat/tables/")
+
+    response = client.get(part["url"] + "?offset=100&limit=50")
+    page = response.get_json()
+    assert page["offset"] == 100
+    assert _cells(_column(page, "n")) == list(range(100, 120))
+    assert _cells(_column(page, "parity")) == ["even", "odd"] * 10
+
+    assert client.get("/_dash-chat/tables/" + "0" * 32).status_code == 404
+    assert client.get(part["url"] + "?offset=abc").status_code == 400
+
+
+def test_small_tables_are_sent_whole_even_with_a_store():
+    store = tables.TableStore(url="/tables")
+    part = tables.columnar_table({"n": [1, 2, 3]}, store=store)
+    assert "url" not in part
+    assert len(store) == 0
+
+
+def test_table_store_evicts_least_recently_used():
+    store = tables.TableStore(max_tables=2)
+    first = store.add({"n": np.arange(3)})
+    second = store.add({"n": np.arange(3)})
+    store.page(first, 0, 1)
+    store.add({"n": np.arange(3)})
+
+    assert len(store) == 2
+    store.page(first, 0, 1)
+    with pytest.raises(KeyError):
+        store.page(second, 0, 1)
@@ -0,0 +1,268 @@
+import hashlib
+import io
+import subprocess
+import sys
+import time
+
+import flask
+import pytest
+from dash_chat import uploads
+
+
+@pytest.fixture
+def server(tmp_path):
+    app = flask.Flask(__name__)
+    store = uploads.register(app, folder=str(tmp_path), max_file_size=1024)
+    return app, store
+
+
+def test_raw_upload_returns_handle(server):
+    app, store = server
+    client = app.test_client()
+
+    response = client.post(
+        "/_dash-chat/uploads",
+        data=b"%PDF-1.4 dummy content",
+        headers={
+            "Content-Type": "application/pdf",
+            "X-File-Name": "quarterly%20report.pdf",
+        },
+    )
+
+    assert response.status_code == 201
+    handle = response.get_json()
+    assert handle["fileName"] == "quarterly report.pdf"
+    assert handle["fileType"] == "application/pdf"
+    assert handle["fileSize"] == 22
+    assert handle["url"] == "/_dash-chat/uploads/" + handle["fileId"]
+    with store.open(handle) as f:
+        assert f.read() == b"%PDF-1.4 dummy content"
+
+
+def test_multipart_upload_and_download(server):
+    app, store = server
+    client = app.test_client()
+
+    response = client.post(
+        "/_dash-chat/uploads",
+        data={"file": (io.BytesIO(b"png bytes"), "image.png", "image/png")},
+        content_type="multipart/form-data",
+    )
+    handle = response.get_json()
+    assert handle["fileName"] == "image.png"
+
+    download = client.get(handle["url"])
+    assert download.status_code == 200
+    assert download.data == b"png bytes"
+    assert download.mimetype == "image/png"
+
+    partial = client.get(handle["url"], headers={"Range": "bytes=0-2"})
+    assert partial.status_code == 206
+    assert partial.data == b"png"
+
+
+def test_scriptable_uploads_are_downloaded_not_rendered(server):
+    app, _ = server
+    client = app.test_client()
+
+    html = client.post(
+        "/_dash-chat/uploads",
+        data=b"<script>alert(document.cookie)</script>",
+        headers={"Content-Type": "text/html", "X-File-Name": "page.html"},
+    ).get_json()
+    download = client.get(html["url"])
+    assert download.headers["Content-Disposition"].startswith("attachment;")
+    assert download.headers["X-Content-Type-Options"] == "nosniff"
+    assert download.headers["Content-Security-Policy"] == "sandbox"
+
+    image = client.post(
+        "/_dash-chat/uploads",
+        data=b"png bytes",
+        headers={"Content-Type": "image/png", "X-File-Name": "image.png"},
+    ).get_json()
+    download = client.get(image["url"])
+    assert download.headers["Content-Disposition"].startswith("inline;")
+    assert download.headers["X-Content-Type-Options"] == "nosniff"
+
+
+def test_upload_too_large_is_rejected(server, tmp_path):
+    app, store = server
+    client = app.test_client()
+
+    response = client.post(
+        "/_dash-chat/uploads",
+        data=b"x" * 2048,
+        headers={"Content-Type": "text/plain", "X-File-Name": "big.txt"},
+    )
+
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_invalid_ids_are_not_served(server):
+    app, store = server
+    client = app.test_client()
+
+    assert client.get("/_dash-chat/uploads/..%2F..%2Fetc%2Fpasswd").status_code == 404
+    with pytest.raises(KeyError):
+        store.path("../secret")
+
+
+def _put_chunk(client, upload_id, offset, data, sha256=True):
+    headers = {"X-Upload-Offset": str(offset)}
+    if sha256:
+        headers["X-Chunk-SHA256"] = hashlib.sha256(data).hexdigest()
+    return client.put(
+        "/_dash-chat/uploads/chunked/" + upload_id, data=data, headers=headers
+    )
+
+
+@pytest.fixture
+def chunked_server(tmp_path):
+    app = flask.Flask(__name__)
+    store = uploads.register(
+        app,
+        folder=str(tmp_path / "files"),
+        max_file_size=1024,
+        partial_folder=str(tmp_path / "partial"),
+        max_chunk_size=8,
+    )
+    return app, store
+
+
+def test_chunked_upload_is_saved_to_the_store(chunked_server, tmp_path):
+    app, store = chunked_server
+    client = app.test_client()
+    content = b"quarterly,report\n1,2\n"
+
+    created = client.post(
+        "/_dash-chat/uploads/chunked",
+        json={
+            "fileName": "report.csv",
+            "fileType": "text/csv",
+            "fileSize": len(content),
+            "chunkSize": 1024,
+        },
+    )
+    assert created.status_code == 201
+    upload = created.get_json()
+    # capped at the server's max_chunk_size
+    assert upload["chunkSize"] == 8
+    assert upload["received"] == 0
+
+    for offset in range(0, 16, 8):
+        response = _put_chunk(
+            client, upload["uploadId"], offset, content[offset : offset + 8]
+        )
+        assert response.status_code == 200
+        assert response.get_json()["received"] == offset + 8
+    response = _put_chunk(client, upload["uploadId"], 16, content[16:])
+
+    assert response.status_code == 201
+    handle = response.get_json()
+    assert handle["fileName"] == "report.csv"
+    assert handle["fileSize"] == len(content)
+    with store.open(handle) as f:
+        assert f.read() == content
+    assert list((tmp_path / "partial").iterdir()) == []
+
+
+def test_chunked_upload_resumes_from_received_offset(chunked_server):
+    app, store = chunked_server
+    client = app.test_client()
+    content = b"0123456789abcdef"
+    upload = store.chunked_uploads.create("data.bin", None, len(content))
+    upload_id = upload["uploadId"]
+
+    assert _put_chunk(client, upload_id, 0, content[:8]).status_code == 200
+    # a chunk sent again after a dropped connection is refused with the offset
+    repeated = _put_chunk(client, upload_id, 0, content[:8])
+    assert repeated.status_code == 409
+    assert repeated.get_json() == {"received": 8}
+
+    status = client.get("/_dash-chat/uploads/chunked/" + upload_id).get_json()
+    assert status["received"] == 8
+    assert _put_chunk(client, upload_id, 8, content[8:]).status_code == 201
+
+
+def test_corrupted_and_oversized_chunks_are_discarded(chunked_server):
+    app, store = chunked_server
+    client = app.test_client()
+    upload_id = store.chunked_uploads.create("data.bin", None, 16)["uploadId"]
+
+    response = client.put(
+        "/_dash-chat/uploads/chunked/" + upload_id,
+        data=b"01234567",
+        headers={"X-Upload-Offset": "0", "X-Chunk-SHA256": "0" * 64},
+    )
+    assert response.status_code == 422
+    assert _put_chunk(client, upload_id, 0, b"0123456789").status_code == 413
+    assert store.chunked_uploads.status(upload_id)["received"] == 0
+
+    assert (
+        _put_chunk(client, upload_id, 0, b"01234567", sha256=False).status_code == 200
+    )
+    assert store.chunked_uploads.status(upload_id)["received"] == 8
+
+
+def test_chunked_upload_limits(chunked_server):
+    app, store = chunked_server
+    client = app.test_client()
+
+    too_large = client.post(
+        "/_dash-chat/uploads/chunked", json={"fileName": "big.bin", "fileSize": 2048}
+    )
+    assert too_large.status_code == 413
+    assert (
+        client.post("/_dash-chat/uploads/chunked", json={"fileSize": "1"}).status_code
+        == 400
+    )
+    assert client.get("/_dash-chat/uploads/chunked/" + "0" * 32).status_code == 404
+
+    upload_id = store.chunked_uploads.create("data.bin", None, 16)["uploadId"]
+    assert client.delete("/_dash-chat/uploads/chunked/" + upload_id).status_code == 204
+    with pytest.raises(KeyError):
+        store.chunked_uploads.status(upload_id)
+
+
+def test_stale_chunked_uploads_are_deleted(chunked_server, tmp_path):
+    app, store = chunked_server
+    chunked = store.chunked_uploads
+    stale = chunked.create("old.bin", None, 16)
+    stale["updated"] -= chunked.expires + 1
+    chunked._save_state(stale)
+
+    chunked.create("new.bin", None, 16)
+
+    with pytest.raises(KeyError):
+        chunked.status(stale["uploadId"])
+    assert len(list((tmp_path / "partial").iterdir())) == 2
+
+
+def test_chunks_are_locked_across_processes(tmp_path):
+    store = uploads.UploadStore(str(tmp_path / "files"))
+    chunked = uploads.ChunkedUploads(store, folder=str(tmp_path / "partial"))
+    upload_id = chunked.create("data.bin", None, 4)["uploadId"]
+    holder = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import sys, time\n"
+            "from dash_chat.uploads import ChunkedUploads\n"
+            "with ChunkedUploads(None, folder=sys.argv[1])._locked(sys.argv[2]):\n"
+            "    print('locked', flush=True)\n"
+            "    time.sleep(0.5)\n",
+            str(tmp_path / "partial"),
+            upload_id,
+        ],
+        stdout=subprocess.PIPE,
+    )
+    try:
+        assert holder.stdout.readline() == b"locked\n"
+        started = time.monotonic()
+        _, handle = chunked.write(upload_id, 0, io.BytesIO(b"data"))
+        assert time.monotonic() - started > 0.2
+    finally:
+        holder.wait()
+    assert handle["fileSize"] == 4
+    assert list((tmp_path / "partial").iterdir()) == []
@@ -0,0 +1,62 @@
+import os
+import dash
+from dash import callback, dcc, html, Input, Output, State
+from dash_chat import ChatComponent
+from dash_chat.backends import FakeBackend, OpenAIBackend, get_runner
+from dash_chat.store import MemoryStore
+
+
+app = dash.Dash(__name__)
+store = MemoryStore()
+runner = get_runner()
+
+if os.environ.get("OPENAI_API_KEY"):
+    backend = OpenAIBackend(model="gpt-4o-mini", max_concurrency=8)
+else:
+    backend = FakeBackend(latency=2)
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[],
+            class_name="container",
+            history_mode="server",
+        ),
+        dcc.Interval(id="reply-poll", interval=250, disabled=True),
+    ]
+)
+
+
+@callback(
+    Output("reply-poll", "disabled"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, session_id):
+    if not new_message or new_message["role"] != "user":
+        return dash.no_update
+
+    store.append("chat-component", session_id, new_message)
+    # returns at once, the reply is generated on the runner's event loop
+    history = store.get_messages("chat-component", session_id)
+    runner.submit(backend, history, session_key=session_id)
+    return False
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Output("reply-poll", "disabled", allow_duplicate=True),
+    Input("reply-poll", "n_intervals"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def deliver_replies(_, session_id):
+    replies = runner.collect(session_id)
+    store.append("chat-component", session_id, *replies)
+    return replies or dash.no_update, runner.pending(session_id) == 0
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
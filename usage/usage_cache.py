@@ -0,0 +1,53 @@
+import time
+import dash
+from dash import callback, html, Input, Output, State
+from dash_chat import ChatComponent
+from dash_chat.cache import ResponseCache, cached_reply
+
+
+app = dash.Dash(__name__)
+cache = ResponseCache(ttl=24 * 3600, max_bytes=16 * 2**20, path="replies.db")
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[],
+            class_name="container",
+        ),
+        html.Pre(id="cache-stats"),
+    ]
+)
+
+
+def generate(messages):
+    # stands in for a slow, paid model call
+    time.sleep(2)
+    return "Thanks for asking: {}".format(messages[-1]["content"])
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Output("cache-stats", "children"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "messages"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, messages):
+    if not new_message:
+        return dash.no_update, dash.no_update
+
+    updated_messages = messages + [new_message]
+    if new_message["role"] == "user":
+        # asking the same question again is answered at once from the cache
+        text = cached_reply(
+            cache, updated_messages[-1:], lambda: generate(updated_messages)
+        )
+        bot_response = {"role": "assistant", "content": text}
+        return updated_messages + [bot_response], str(cache.stats())
+
+    return updated_messages, dash.no_update
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
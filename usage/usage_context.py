@@ -0,0 +1,62 @@
+import time
+import dash
+from dash import callback, html, Input, Output, State
+from dash_chat import ChatComponent
+from dash_chat.context import ContextManager, PinSystem, RollingSummary
+
+
+app = dash.Dash(__name__)
+
+
+def summarize(messages, previous_summary):
+    # a real app would ask the model for a summary
+    topics = ", ".join(
+        message["content"] for message in messages if message["role"] == "user"
+    )
+    return "{}; {}".format(previous_summary, topics) if previous_summary else topics
+
+
+context = ContextManager(
+    max_tokens=200,
+    reserve=50,
+    policy=PinSystem(RollingSummary(summarize, summary_tokens=60)),
+)
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[{"role": "system", "content": "You are a helpful assistant."}],
+            class_name="container",
+        )
+    ]
+)
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "messages"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, messages):
+    if not new_message:
+        return messages
+
+    updated_messages = messages + [new_message]
+    if new_message["role"] == "user":
+        prompt = context.prompt(updated_messages)
+        time.sleep(1)
+        bot_response = {
+            "role": "assistant",
+            "content": "The prompt has {} of {} messages ({} tokens).".format(
+                len(prompt), len(updated_messages), context.count(prompt)
+            ),
+        }
+        return updated_messages + [bot_response]
+
+    return updated_messages
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
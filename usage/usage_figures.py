@@ -0,0 +1,62 @@
+import dash
+import numpy as np
+import plotly.graph_objects as go
+from dash import callback, html, Input, Output, State
+from dash_chat import ChatComponent
+from dash_chat.figures import graph
+
+
+app = dash.Dash(__name__)
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[
+                {"role": "assistant", "content": "Ask me for the latency chart."},
+            ],
+            class_name="container",
+        )
+    ]
+)
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "messages"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, messages):
+    if not new_message:
+        return messages
+
+    updated_messages = messages + [new_message]
+
+    if new_message["role"] == "user":
+        # half a million points, sent as 2,000 base64 encoded points
+        n = 500_000
+        time = np.arange(n)
+        latency = (
+            50 + 10 * np.sin(time / 5000) + np.random.default_rng().normal(0, 3, n)
+        )
+        figure = go.Figure(go.Scatter(x=time, y=latency, mode="lines"))
+        figure.update_layout(title="Request latency (ms)")
+
+        bot_response = {
+            "role": "assistant",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "Here is the latency of the last 500,000 requests.",
+                },
+                graph(figure, max_points=2000, config={"displaylogo": False}),
+            ],
+        }
+        return updated_messages + [bot_response]
+
+    return updated_messages
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
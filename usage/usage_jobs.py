@@ -0,0 +1,61 @@
+import dash
+from dash import callback, html, Input, Output, State
+from dash_chat import ChatComponent
+from dash_chat.backends import FakeBackend, get_runner
+from dash_chat.jobs import JobPool, JobQueue
+import dash_chat.push
+
+
+app = dash.Dash(__name__)
+hub = dash_chat.push.register(app)
+runner = get_runner()
+# a slow model, so there is time to press the stop button
+backend = FakeBackend(latency=1.0, chunk_latency=0.3)
+
+
+def generate(job):
+    # closing the stream on cancellation cancels the model request
+    return runner.stream(backend, job.payload["messages"], job.session_key)
+
+
+# two workers: with more sessions, turns wait in the queue; share the queue file
+# between gunicorn workers with JobQueue("jobs.db")
+pool = JobPool(generate, workers=2, queue=JobQueue(), hub=hub)
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[],
+            class_name="container",
+            push_url=hub.url,
+        ),
+    ]
+)
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Output("chat-component", "job_status"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "messages"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, messages, session_id):
+    updated_messages = messages + [new_message]
+    return updated_messages, pool.submit(session_id, {"messages": updated_messages})
+
+
+@callback(
+    Output("chat-component", "job_status", allow_duplicate=True),
+    Input("chat-component", "cancel_job"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def stop(job_id, session_id):
+    return pool.cancel(job_id, session_id)
+
+
+if __name__ == "__main__":
+    app.run(debug=True, threaded=True)
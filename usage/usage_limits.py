@@ -0,0 +1,55 @@
+import time
+import dash
+from dash import callback, html, no_update, Input, Output, State
+from dash_chat import ChatComponent
+from dash_chat.limits import AdmissionController
+import dash_chat.push
+
+
+app = dash.Dash(__name__)
+# queue positions are pushed to the waiting sessions
+hub = dash_chat.push.register(app)
+# one message every 5 seconds per session after a burst of 3, 10 per second in all;
+# messages sent while one waits replace it
+limiter = AdmissionController(
+    session_rate=0.2,
+    session_burst=3,
+    app_rate=10,
+    policy="coalesce",
+    max_queue=32,
+    hub=hub,
+)
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[],
+            class_name="container",
+            push_url=hub.url,
+        ),
+    ]
+)
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Output("chat-component", "admission"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "messages"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, messages, session_id):
+    admission = limiter.admit(session_id)
+    if not admission:
+        return no_update, admission.status
+
+    updated_messages = messages + [new_message]
+    time.sleep(1)
+    bot_response = {"role": "assistant", "content": "Send a few more, quickly."}
+    return updated_messages + [bot_response], admission.status
+
+
+if __name__ == "__main__":
+    app.run(debug=True, threaded=True)
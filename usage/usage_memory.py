@@ -0,0 +1,59 @@
+import time
+import dash
+from dash import callback, html, Input, Output, State
+from dash_chat import ChatComponent
+from dash_chat.context import ContextManager, PinSystem
+from dash_chat.memory import RelevantHistory, VectorMemory, hashing_embedder
+
+
+app = dash.Dash(__name__)
+# swap in sentence_transformer_embedder() or your embedding API for semantic recall
+memory = VectorMemory(embed=hashing_embedder())
+context = ContextManager(
+    max_tokens=300,
+    reserve=50,
+    policy=PinSystem(RelevantHistory(memory, k=3, recall_tokens=100)),
+)
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[{"role": "system", "content": "You are a helpful assistant."}],
+            class_name="container",
+        )
+    ]
+)
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "messages"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, messages, session_id):
+    if not new_message:
+        return messages
+
+    updated_messages = messages + [new_message]
+    if new_message["role"] == "user":
+        prompt = context.prompt(updated_messages, session_key=session_id)
+        recalled = [
+            message["content"]
+            for message in prompt
+            if message not in updated_messages[-4:] and message["role"] != "system"
+        ]
+        time.sleep(1)
+        bot_response = {
+            "role": "assistant",
+            "content": "Recalled from earlier: {}".format(recalled or "nothing yet"),
+        }
+        return updated_messages + [bot_response]
+
+    return updated_messages
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
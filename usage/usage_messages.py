@@ -0,0 +1,51 @@
+import dash
+from dash import callback, html, Input, Output, State
+from dash_chat import ChatComponent
+from dash_chat.messages import AttachmentPart, Message, MessageError
+
+
+app = dash.Dash(__name__)
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[],
+            class_name="container",
+            supported_input_file_types=[".png", ".jpg", ".csv"],
+        )
+    ]
+)
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "messages"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, messages):
+    try:
+        message = Message.from_dict(new_message)
+    except MessageError as e:
+        reply = Message("assistant", "Could not read that message ({}).".format(e))
+        return messages + [reply.to_dict()]
+
+    if message.role != "user":
+        return messages + [message.to_dict()]
+
+    attachments = [part for part in message.parts if isinstance(part, AttachmentPart)]
+    summary = ", ".join(
+        "{} ({} bytes)".format(part.file_name, part.data.nbytes) for part in attachments
+    )
+    reply = Message(
+        "assistant",
+        "You wrote {!r}{}.".format(
+            message.text, " and attached " + summary if summary else ""
+        ),
+    )
+    return messages + [message.to_dict(), reply.to_dict()]
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
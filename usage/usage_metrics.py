@@ -0,0 +1,49 @@
+import time
+import dash
+from dash import callback, html, Input, Output, State
+from dash_chat import ChatComponent
+import dash_chat.metrics
+
+
+app = dash.Dash(__name__)
+# turn metrics are scraped by Prometheus at /metrics
+metrics = dash_chat.metrics.register(app)
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[],
+            class_name="container",
+            collect_metrics=True,
+            metrics_url=metrics.url,
+            metrics_batch_size=1,
+        ),
+    ]
+)
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "messages"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, messages):
+    if not new_message:
+        return messages
+
+    updated_messages = messages + [new_message]
+    if new_message["role"] == "user":
+        time.sleep(1)
+        bot_response = {
+            "role": "assistant",
+            "content": "Open /metrics to see this turn.",
+        }
+        return updated_messages + [bot_response]
+
+    return updated_messages
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
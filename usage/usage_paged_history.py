@@ -0,0 +1,65 @@
+import dash
+from dash import callback, html, Input, Output, State
+from dash_chat import ChatComponent
+from dash_chat.store import SQLiteStore, history_page
+
+
+app = dash.Dash(__name__)
+store = SQLiteStore("paged_history.db")
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[],
+            class_name="container",
+            history_mode="server",
+            persistence=True,
+            page_size=50,
+        )
+    ]
+)
+
+
+@callback(
+    Output("chat-component", "history_page"),
+    Input("chat-component", "request_history"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def load_history(request, session_id):
+    if not store.get_messages("chat-component", session_id, limit=1):
+        # give new sessions a long conversation to scroll through
+        store.append(
+            "chat-component",
+            session_id,
+            *[
+                {
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "content": f"Message {i}",
+                    "id": f"message-{i}",
+                }
+                for i in range(10000)
+            ],
+        )
+    return history_page(store, "chat-component", session_id, request)
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, session_id):
+    if not new_message:
+        return dash.no_update
+
+    store.append("chat-component", session_id, new_message)
+    bot_response = {"role": "assistant", "content": "Scroll up to load older messages."}
+    store.append("chat-component", session_id, bot_response)
+    return [bot_response]
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
@@ -0,0 +1,66 @@
+import threading
+import time
+import dash
+from dash import callback, html, Input, Output, State
+from dash_chat import ChatComponent
+import dash_chat.push
+
+
+app = dash.Dash(__name__)
+# the push endpoint keeps a connection open per browser tab
+hub = dash_chat.push.register(app)
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[],
+            class_name="container",
+            push_url=hub.url,
+        ),
+    ]
+)
+
+
+def generate_chunks(text):
+    for word in "Working on: {}. All done.".format(text).split(" "):
+        time.sleep(0.2)
+        yield word + " "
+
+
+def run_agent(session_id, new_message):
+    hub.send_message(
+        session_id,
+        {"role": "assistant", "content": "Looking into it, give me a moment."},
+    )
+    time.sleep(2)
+    hub.stream(session_id, generate_chunks(new_message["content"]))
+    time.sleep(3)
+    hub.send_message(
+        session_id, {"role": "assistant", "content": "Anything else I can do?"}
+    )
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "messages"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, messages, session_id):
+    if not new_message:
+        return messages
+
+    updated_messages = messages + [new_message]
+    if new_message["role"] == "user" and session_id:
+        # the replies are pushed after this callback has returned
+        threading.Thread(
+            target=run_agent, args=(session_id, new_message), daemon=True
+        ).start()
+
+    return updated_messages
+
+
+if __name__ == "__main__":
+    app.run(debug=True, threaded=True)
@@ -0,0 +1,84 @@
+import dash
+from dash import callback, html, Input, Output, State
+from dash_chat import ChatComponent
+from dash_chat.search import SearchIndex
+from dash_chat.store import SQLiteStore, history_page
+
+
+app = dash.Dash(__name__)
+TOPICS = ["revenue", "hiring", "roadmap"]
+store = SQLiteStore("search_history.db")
+# indexes every message appended to the store from now on
+index = SearchIndex("search_index.db")
+index.attach(store)
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[],
+            class_name="container",
+            history_mode="server",
+            persistence=True,
+            page_size=50,
+            searchable=True,
+        )
+    ]
+)
+
+
+@callback(
+    Output("chat-component", "history_page"),
+    Input("chat-component", "request_history"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def load_history(request, session_id):
+    if not store.get_messages("chat-component", session_id, limit=1):
+        # give new sessions a long conversation to search through
+        store.append(
+            "chat-component",
+            session_id,
+            *[
+                {
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "content": f"Message {i} about {TOPICS[i % 3]}",
+                    "id": f"message-{i}",
+                }
+                for i in range(5000)
+            ],
+        )
+    return history_page(store, "chat-component", session_id, request)
+
+
+@callback(
+    Output("chat-component", "search_results"),
+    Input("chat-component", "search_query"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def search(query, session_id):
+    return index.search("chat-component", session_id, query)
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, session_id):
+    if not new_message:
+        return dash.no_update
+
+    store.append("chat-component", session_id, new_message)
+    bot_response = {
+        "role": "assistant",
+        "content": "Search for 'revenue 12' to jump back to an old message.",
+    }
+    store.append("chat-component", session_id, bot_response)
+    return [bot_response]
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
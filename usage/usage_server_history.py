@@ -0,0 +1,49 @@
+import time
+import dash
+from dash import callback, html, Input, Output, State
+from dash_chat import ChatComponent
+from dash_chat.store import MemoryStore
+
+
+app = dash.Dash(__name__)
+store = MemoryStore()
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[],
+            class_name="container",
+            history_mode="server",
+        )
+    ]
+)
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "session_id"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, session_id):
+    if not new_message:
+        return dash.no_update
+
+    store.append("chat-component", session_id, new_message)
+
+    if new_message["role"] == "user":
+        time.sleep(2)
+        turns = len(store.get_messages("chat-component", session_id))
+        bot_response = {
+            "role": "assistant",
+            "content": f"Hello John Doe. This conversation has {turns} messages.",
+        }
+        store.append("chat-component", session_id, bot_response)
+        return [bot_response]
+
+    return dash.no_update
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
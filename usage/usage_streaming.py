@@ -0,0 +1,51 @@
+import time
+import dash
+import diskcache
+from dash import DiskcacheManager, callback, html, Input, Output, State
+from dash_chat import ChatComponent
+from dash_chat.streaming import stream_to_progress
+
+
+cache = diskcache.Cache("./cache")
+app = dash.Dash(__name__, background_callback_manager=DiskcacheManager(cache))
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[],
+            class_name="container",
+        )
+    ]
+)
+
+
+def generate_tokens():
+    for word in "Hello John Doe, this reply is streamed word by word.".split(" "):
+        time.sleep(0.2)
+        yield word + " "
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "messages"),
+    background=True,
+    progress=Output("chat-component", "stream_delta"),
+    prevent_initial_call=True,
+)
+def handle_chat(set_progress, new_message, messages):
+    if not new_message:
+        return messages
+
+    updated_messages = messages + [new_message]
+
+    if new_message["role"] == "user":
+        bot_response = stream_to_progress(set_progress, generate_tokens())
+        return updated_messages + [bot_response]
+
+    return updated_messages
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
@@ -0,0 +1,62 @@
+import dash
+import numpy as np
+from dash import callback, html, Input, Output, State
+import dash_chat
+from dash_chat import ChatComponent
+from dash_chat.tables import columnar_table
+
+
+app = dash.Dash(__name__)
+# later pages of large tables are served from here
+table_store = dash_chat.tables.register(app)
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[
+                {"role": "assistant", "content": "Ask me for the order report."},
+            ],
+            class_name="container",
+        )
+    ]
+)
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "messages"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, messages):
+    if not new_message:
+        return messages
+
+    updated_messages = messages + [new_message]
+
+    if new_message["role"] == "user":
+        rng = np.random.default_rng()
+        n = 50_000
+        orders = {
+            "Order ID": np.arange(10_000, 10_000 + n),
+            "Country": rng.choice(["Nigeria", "Ghana", "Kenya", "France"], n),
+            "Quantity": rng.integers(1, 10, n),
+            "Total": np.round(rng.uniform(5, 500, n), 2),
+        }
+        bot_response = {
+            "role": "assistant",
+            "content": [
+                {"type": "text", "text": f"Found {n:,} orders."},
+                columnar_table(
+                    orders, page_size=100, store=table_store, striped=True, hover=True
+                ),
+            ],
+        }
+        return updated_messages + [bot_response]
+
+    return updated_messages
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
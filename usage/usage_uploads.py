@@ -0,0 +1,56 @@
+import dash
+from dash import callback, html, Input, Output, State
+from dash_chat import ChatComponent, uploads
+
+
+app = dash.Dash(__name__)
+upload_store = uploads.register(app, max_file_size=50 * 1024 * 1024)
+
+app.layout = html.Div(
+    [
+        ChatComponent(
+            id="chat-component",
+            messages=[],
+            class_name="container",
+            upload_url=upload_store.upload_url,
+            supported_input_file_types=[".png", ".jpg", ".pdf", ".csv"],
+        )
+    ]
+)
+
+
+@callback(
+    Output("chat-component", "messages"),
+    Input("chat-component", "new_message"),
+    State("chat-component", "messages"),
+    prevent_initial_call=True,
+)
+def handle_chat(new_message, messages):
+    if not new_message:
+        return messages
+
+    updated_messages = messages + [new_message]
+
+    if new_message["role"] == "user" and isinstance(new_message["content"], list):
+        lines = []
+        for item in new_message["content"]:
+            if item["type"] == "attachment":
+                # the file was streamed to disk, no base64 decoding needed
+                with upload_store.open(item) as f:
+                    header = f.read(8)
+                lines.append(
+                    f"Received **{item['fileName']}** ({item['fileSize']} bytes), "
+                    f"starting with `{header!r}`."
+                )
+        bot_response = {"role": "assistant", "content": "\n\n".join(lines)}
+        return updated_messages + [bot_response]
+
+    if new_message["role"] == "user":
+        bot_response = {"role": "assistant", "content": "Attach a file to upload it."}
+        return updated_messages + [bot_response]
+
+    return updated_messages
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
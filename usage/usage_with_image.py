@@ -21,6 +21,10 @@ app.layout = html.Div(
             persistence_type="local",
             input_placeholder="Message Dash",
             supported_input_file_types=[".png", ".jpg"],
+            # phone photos are sent as ~200 KB WebP images instead of ~12 MB
+            max_image_dimension=1568,
+            image_format="webp",
+            image_quality=0.85,
         )
     ]
 )